@@ -6,10 +6,15 @@ import re
 # Add the project path to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Serverless startup: no schema setup, lazy imports (see the README's Cold Starts)
+os.environ.setdefault('SERVERLESS', 'true')
+
 # Import the Flask app
-from app import app, login_manager
+from app import app, login_manager, data_manager
 from flask_login import current_user, login_user
-from datamanager.interface import User
+
+# Auto-login lookups go through the identity cache: the user Flask-Login loads next is already there
+identity_cache = data_manager.identity_cache
 
 # Patch the login redirect for Vercel
 @app.before_request
@@ -23,7 +28,7 @@ def fix_vercel_redirects():
     if path == '/rate_movie' and request.method == 'POST':
         # Make sure a user is logged in
         if not current_user.is_authenticated:
-            user = User.query.first()  # Simply take the first user
+            user = identity_cache.first_user()  # Simply take the first user
             if user:
                 login_user(user)
         # No redirect, let the request continue normally
@@ -32,7 +37,7 @@ def fix_vercel_redirects():
     # Special handling for get_movie_rating (AJAX requests)
     if path.startswith('/get_movie_rating/') and request.method == 'GET':
         if not current_user.is_authenticated:
-            user = User.query.first()
+            user = identity_cache.first_user()
             if user:
                 login_user(user)
         return None
@@ -42,7 +47,7 @@ def fix_vercel_redirects():
     if user_profile_match and not current_user.is_authenticated:
         # Perform auto-login if not logged in
         user_id = int(user_profile_match.group(1))
-        user = User.query.get(user_id)
+        user = identity_cache.get_user(user_id)
         if user:
             login_user(user)
             # No redirect, allow the original request to continue
@@ -60,7 +65,7 @@ def fix_vercel_redirects():
         movie_match = movie_pattern.match(next_url)
         if movie_match and not current_user.is_authenticated:
             # Auto-login and redirect to the movie
-            user = User.query.first()  # Take the first user
+            user = identity_cache.first_user()  # Take the first user
             if user:
                 login_user(user)
                 return redirect(next_url)
@@ -69,7 +74,7 @@ def fix_vercel_redirects():
         user_match = user_pattern.match(next_url)
         if user_match and not current_user.is_authenticated:
             target_user_id = int(user_match.group(1))
-            user = User.query.get(target_user_id)
+            user = identity_cache.get_user(target_user_id)
             if user:
                 login_user(user)
                 return redirect(next_url)
@@ -90,7 +95,7 @@ def vercel_rate_movie():
     Returns JSON response with success status or error details.
     """
     if not current_user.is_authenticated:
-        user = User.query.first()
+        user = identity_cache.first_user()
         if user:
             login_user(user)
     
@@ -100,7 +105,6 @@ def vercel_rate_movie():
         comment = request.form.get('comment', '')
         
         # Call the original function directly, bypassing the decorator
-        from app import data_manager
         result = data_manager.upsert_favorite(current_user.id, movie_id, rating=rating, comment=comment)
         
         # Return a custom JSON response
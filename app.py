@@ -1,14 +1,33 @@
+import time
+STARTED = time.perf_counter()  # start of the cold start profile
 import os
+import click
 from functools import wraps
-from flask import Flask, render_template, url_for, request, redirect, flash, jsonify
+from flask import Flask, Response, render_template, stream_template, url_for, request, redirect, flash, jsonify, abort, \
+    get_template_attribute, get_flashed_messages
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from dotenv import load_dotenv
+from markupsafe import Markup
+from datamanager.catalog_snapshot import SnapshotDataManager
 from datamanager.db_manager import SQLiteDataManager
-from datamanager.interface import User, Avatar, Category, Movie, StreamingPlatform, UserFavorite, MovieOMDB
+from datamanager.home_feed import HomeFeedAssembler
+from datamanager.interface import User, Avatar, Category, Movie, StreamingPlatform, UserFavorite, MovieOMDB, db
 from datamanager.omdb_manager import OMDBManager
+from datamanager.pagination import InvalidCursor, decode_cursor
+from datamanager.poster_pipeline import poster_srcset
+from datamanager.query_stats import QueryInstrumentation
+from datamanager.startup import StartupProfile, bytecode_cache, precompile_templates
+from datamanager.static_assets import StaticAssets, build_manifest
 from sqlalchemy.orm import joinedload
 
-load_dotenv()
+startup_profile = StartupProfile(STARTED)
+startup_profile.mark('imports')
+
+# Serverless (Vercel sets VERCEL=1): settings come from the platform, the schema from the build
+SERVERLESS = os.getenv('SERVERLESS', os.getenv('VERCEL', '')).lower() in ('1', 'true')
+if not SERVERLESS:
+    from dotenv import load_dotenv
+    load_dotenv()
+
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24))
 
@@ -16,13 +35,63 @@ app.secret_key = os.getenv('SECRET_KEY', os.urandom(24))
 app.config['PREFERRED_URL_SCHEME'] = 'https'
 
 # Database setup
-db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data/senflix.sqlite'))
+# DATABASE_PATH points the app at another database, e.g. one from benchmarks/generate_dataset.py
+db_path = os.path.abspath(os.getenv('DATABASE_PATH') or os.path.join(os.path.dirname(__file__), 'data/senflix.sqlite'))
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite PRAGMA profile ('default', 'balanced' or 'fast'), see datamanager/sqlite_profile.py
+app.config['SQLITE_PROFILE'] = os.getenv('SQLITE_PROFILE', 'balanced')
+app.config['SQLITE_PRAGMAS'] = os.getenv('SQLITE_PRAGMAS')
+app.config['SQLITE_READONLY_GETS'] = os.getenv('SQLITE_READONLY_GETS', 'true').lower() != 'false'
+app.config['SQLITE_OPTIMIZE_INTERVAL'] = int(os.getenv('SQLITE_OPTIMIZE_INTERVAL', 3600))
+# WAL is stored in the database file: never on the bundled data/senflix.sqlite ('auto') or when serverless
+app.config['SQLITE_WAL'] = os.getenv('SQLITE_WAL', 'false' if SERVERLESS else 'auto')
+
+# Section cache for viewer independent page sections ('memory', 'disk', 'redis' or 'none')
+app.config['SECTION_CACHE_BACKEND'] = os.getenv('SECTION_CACHE_BACKEND', 'memory')
+app.config['SECTION_CACHE_TTL'] = int(os.getenv('SECTION_CACHE_TTL', 300))
+if os.getenv('SECTION_CACHE_REDIS_URL'):
+    app.config['SECTION_CACHE_REDIS_URL'] = os.getenv('SECTION_CACHE_REDIS_URL')
+# Persistent OMDB response cache (instance/omdb_cache.sqlite unless set; 'none' disables it)
+app.config['OMDB_CACHE_PATH'] = os.getenv('OMDB_CACHE_PATH')
+app.config['OMDB_CACHE_HIT_TTL'] = int(os.getenv('OMDB_CACHE_HIT_TTL', 30 * 86400))
+app.config['OMDB_CACHE_MISS_TTL'] = int(os.getenv('OMDB_CACHE_MISS_TTL', 86400))
+app.config['OMDB_CACHE_MAX_ENTRIES'] = int(os.getenv('OMDB_CACHE_MAX_ENTRIES', 5000))
+# Per-request query stats: Server-Timing header and N+1 warnings in the log
+app.config['SERVER_TIMING_HEADER'] = os.getenv('SERVER_TIMING_HEADER', 'true').lower() != 'false'
+app.config['QUERY_REPEAT_THRESHOLD'] = int(os.getenv('QUERY_REPEAT_THRESHOLD', 5))
+# Send /movies, category and top rated pages while they render (false renders them in full first)
+app.config['STREAM_TEMPLATES'] = os.getenv('STREAM_TEMPLATES', 'true').lower() != 'false'
+# ETags from the data version counters; 304 for an unchanged page (see datamanager/data_versions.py)
+app.config['CONDITIONAL_GET'] = os.getenv('CONDITIONAL_GET', 'true').lower() != 'false'
+app.config['ETAG_VERSION'] = os.getenv('ETAG_VERSION') or os.getenv('VERCEL_GIT_COMMIT_SHA')
+# Content-hashed static URLs from static/manifest.json (flask build-static-assets)
+app.config['STATIC_FINGERPRINTS'] = os.getenv('STATIC_FINGERPRINTS', 'true').lower() != 'false'
+# Create tables, run migrations and fill derived tables on startup; serverless starts only check the version
+app.config['SCHEMA_SETUP'] = os.getenv('SCHEMA_SETUP', 'false' if SERVERLESS else 'true').lower() != 'false'
+# Compiled templates, filled by running `flask precompile-templates` ('none' disables it)
+app.config['JINJA_BYTECODE_CACHE'] = os.getenv('JINJA_BYTECODE_CACHE', os.path.join(app.instance_path, 'jinja_bytecode'))
+# Set before the first use of app.jinja_env creates the environment
+app.jinja_options = dict(app.jinja_options, bytecode_cache=bytecode_cache(app.config['JINJA_BYTECODE_CACHE']))
+# Memory mapped catalog for anonymous reads, written by `flask build-catalog-snapshot` ('none' disables it)
+app.config['CATALOG_SNAPSHOT'] = os.getenv('CATALOG_SNAPSHOT', os.path.join(app.instance_path, 'catalog_snapshot.bin'))
+# Most operations one POST /api/interactions may carry
+app.config['INTERACTIONS_BATCH_LIMIT'] = int(os.getenv('INTERACTIONS_BATCH_LIMIT', 100))
+# Seconds a user and avatar are reused across requests by load_user and get_user (0 disables it)
+app.config['IDENTITY_CACHE_TTL'] = int(os.getenv('IDENTITY_CACHE_TTL', 30))
+startup_profile.mark('config')
 
-data_manager = SQLiteDataManager()
+data_manager = SnapshotDataManager(SQLiteDataManager())
 data_manager.init_app(app)
 omdb_manager = OMDBManager(data_manager)
+omdb_manager.init_app(app)
+home_feed = HomeFeedAssembler(data_manager)
+data_versions = data_manager.data_versions
+query_stats = QueryInstrumentation()
+query_stats.init_app(app)
+static_assets = StaticAssets()
+static_assets.init_app(app)
+startup_profile.init_app(app)
 
 # Login manager setup
 login_manager = LoginManager(app)
@@ -30,13 +99,56 @@ login_manager.login_view = 'user_selection'
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user for Flask-Login."""
-    return User.query.get(int(user_id))
+    """Load user for Flask-Login, with its avatar, from the identity cache."""
+    return data_manager.identity_cache.get_user(int(user_id))
 
 @app.context_processor
 def utility_processor():
     """Inject utility functions into Jinja context."""
-    return dict(get_user=lambda uid: data_manager.get_user_by_id(uid))
+    return dict(get_user=lambda uid: data_manager.get_user_by_id(uid),
+                stream_flush=lambda: '')  # stream_page() passes the real one
+
+@app.template_global('poster_srcset')
+def movie_poster_srcset(movie, fmt='webp'):
+    """srcset for a movie's poster derivatives (empty if none were built). Global, so macros can use it."""
+    omdb_data = (movie.get('omdb_data') if movie else None) or {}
+    return poster_srcset(omdb_data.get('poster_variants'), fmt, url_for)
+
+# --- Streaming ---
+
+STREAM_FLUSH = '<!-- flush -->'
+
+def stream_page(template_name, **context):
+    """
+    Render a page template, streamed when STREAM_TEMPLATES is on.
+
+    The response is sent while the template renders, in chunks that end at each
+    {{ stream_flush() }} in it, so the browser gets the shell and first sections while
+    later ones (passed as iterators or callables that load on first use) are still being
+    built. Anything that fails in such a lazy section happens after the headers went
+    out, so the section has to handle its own errors.
+    """
+    if not app.config['STREAM_TEMPLATES']:
+        return render_template(template_name, **context)
+
+    # The session is saved before the body streams: take the flashes out of it now, the
+    # template's get_flashed_messages() then reads them from the request
+    get_flashed_messages(with_categories=True)
+    rendered = stream_template(template_name, stream_flush=lambda: Markup(STREAM_FLUSH), **context)
+
+    def chunks():
+        buffer = []
+        for text in rendered:
+            *complete, rest = text.split(STREAM_FLUSH)
+            for part in complete:
+                buffer.append(part)
+                yield ''.join(buffer)
+                buffer = []
+            buffer.append(rest)
+        yield ''.join(buffer)
+
+    # X-Accel-Buffering: a buffering proxy would hold the chunks back until the end
+    return Response(chunks(), mimetype='text/html', headers={'X-Accel-Buffering': 'no'})
 
 # --- Decorators ---
 
@@ -95,82 +207,40 @@ def select_user(user_id):
 def movies():
     """Display the main movies page with various sections."""
     try:
-        new_releases = data_manager.get_new_releases(limit=10)
-        popular_movies = data_manager.get_popular_movies(limit=10)
-        top_rated = data_manager.get_top_rated_movies(limit=10)
-        recent_comments = data_manager.get_recent_commented_movies(limit=5)
-        categories = data_manager.get_all_categories_with_movies()
-        platforms = data_manager.get_all_platforms()
-        
-        # Apply user status using the helper function
-        new_releases = data_manager._add_watched_avatars_to_movies(new_releases)
-        popular_movies = data_manager._add_watched_avatars_to_movies(popular_movies)
-        top_rated = data_manager._add_watched_avatars_to_movies(top_rated)
-        
-        # Add status to movies within categories
-        for category in categories:
-            movies_with_avatars = data_manager._add_watched_avatars_to_movies(category.get('movies', []))
-            category['movies'] = data_manager._add_watched_avatars_to_movies(movies_with_avatars)
-            
-        # Get REAL favorites (favorite=True) from users with same avatar
-        same_avatar_favorites = []
-        if current_user.is_authenticated:
-            same_avatar_users = User.query.filter(
-                User.avatar_id == current_user.avatar_id, 
-                User.id != current_user.id
-            ).all()
-            
-            favorite_movie_ids = set() # Keep track of added movie IDs to avoid duplicates in this section
-            limit_per_section = 10 # Limit the number of movies shown in this section
-
-            for user in same_avatar_users:
-                if len(same_avatar_favorites) >= limit_per_section:
-                    break # Stop fetching if we reached the limit
-
-                # Fetch entries marked as FAVORITE by this user
-                user_favorites = UserFavorite.query.filter_by(
-                    user_id=user.id, 
-                    favorite=True # Filter by the new favorite flag
-                ).limit(limit_per_section - len(same_avatar_favorites)).all() # Limit query 
-                
-                for fav in user_favorites:
-                    if fav.movie_id not in favorite_movie_ids:
-                         # Use get_movie_data and apply status for the *current* user viewing the card
-                        movie_data = data_manager.get_movie_data(fav.movie_id)
-                        if movie_data:
-                            # Apply status for the logged-in user to the card
-                            movie_with_status = data_manager._add_watched_avatars_to_movies([movie_data])[0] 
-                            same_avatar_favorites.append({
-                                'movie': movie_with_status, # Use movie with status flags for the viewer
-                                'user': user, # User who favorited it (for potential future use, not shown on card)
-                                'rating': fav.rating, # Rating by the other user (not shown on card)
-                                'comment': fav.comment # Comment by the other user (not shown on card)
-                            })
-                            favorite_movie_ids.add(fav.movie_id)
-                            if len(same_avatar_favorites) >= limit_per_section:
-                                break # Stop inner loop if limit reached
-            
+        # All sections are built in a fixed number of queries and share one hydrated movie set;
+        # the category rows are loaded while the sections above them are already being sent
+        feed = home_feed.build(viewer=current_user, defer_categories=True)
+        new_releases = feed['new_releases']
+        released_this_month = feed['released_this_month']
+        popular_movies = feed['popular_movies']
+        top_rated = feed['top_rated']
+        recent_comments = feed['recent_comments']
+        categories = feed['categories']
+        platforms = feed['platforms']
+        same_avatar_favorites = feed['same_avatar_favorites']
+        same_avatar_users = feed['same_avatar_users']
+        because_you_watched = feed['because_you_watched']
     except Exception as e:
         app.logger.error(f"Error loading movie lists for /movies: {str(e)}")
         # Provide empty lists on error to prevent crashes
-        new_releases, popular_movies, top_rated, recent_comments = [], [], [], []
-        same_avatar_favorites, categories, platforms = [], [], []
+        new_releases, released_this_month, popular_movies, top_rated, recent_comments = [], [], [], [], []
+        same_avatar_favorites, same_avatar_users, categories, platforms = [], [], [], []
+        because_you_watched = None
 
-    # Get most loved movies (based on favorite count)
-    most_loved_movies = []
-    # ... (existing most_loved_movies fetching) ...
-
-    return render_template('movies.html',
+    return stream_page('movies.html',
                          new_releases=new_releases,
+                         released_this_month=released_this_month,
                          popular_movies=popular_movies,
                          same_avatar_favorites=same_avatar_favorites,
+                         same_avatar_users=same_avatar_users,
+                         because_you_watched=because_you_watched,
                          top_rated=top_rated,
-                         most_loved_movies=most_loved_movies, 
                          recent_comments=recent_comments,
                          categories=categories,
                          platforms=platforms)
 
 @app.route('/movie/<int:movie_id>')
+@data_versions.conditional('catalog', 'users', 'recommendations', 'movie:{movie_id}')
 @login_required
 def movie_detail(movie_id):
     """Display details for a specific movie."""
@@ -179,25 +249,29 @@ def movie_detail(movie_id):
         flash('Movie not found', 'error')
         return redirect(url_for('movies'))
         
-    # Get users who watched this movie
-    watched_entries = UserFavorite.query.filter_by(movie_id=movie_id, watched=True).all()
+    # Get users who watched this movie, with their avatars, in one query
+    watched_entries = db.session.query(User, UserFavorite.rating) \
+        .join(UserFavorite, UserFavorite.user_id == User.id) \
+        .filter(UserFavorite.movie_id == movie_id, UserFavorite.watched == True) \
+        .options(joinedload(User.avatar)).all()
     watched_users = []
-    for entry in watched_entries:
-        user = User.query.get(entry.user_id)
-        if user:
-            avatar = Avatar.query.get(user.avatar_id)
-            watched_users.append({
-                'id': user.id,
-                'name': user.name,
-                'avatar_url': avatar.profile_image_url if avatar else None, # simple Handle missing avatar
-                'rating': entry.rating
-            })
+    for user, rating in watched_entries:
+        avatar = user.avatar
+        watched_users.append({
+            'id': user.id,
+            'name': user.name,
+            'avatar_url': avatar.profile_image_url if avatar else None, # simple Handle missing avatar
+            'rating': rating
+        })
             
     # OMDB data is already included in movie via get_movie_data
     omdb_data = movie.get('omdb_data') 
     
     # Calculate average user rating
     avg_user_rating = data_manager.get_avg_movie_rating(movie_id)
+
+    # Precomputed item-item neighbours ("more like this")
+    similar_movies = data_manager.get_similar_movies(movie_id, limit=10)
     
     # Get comments for this movie
     comments = []
@@ -232,6 +306,7 @@ def movie_detail(movie_id):
                          omdb_data=omdb_data, 
                          comments=comments, # Pass comments to the template
                          avg_user_rating=avg_user_rating, # Pass average user rating
+                         similar_movies=similar_movies,
                          current_user=current_user)
 
 @app.route('/toggle_watchlist/<int:movie_id>', methods=['POST'])
@@ -396,18 +471,9 @@ def search():
     if not query:
         return redirect(url_for('movies'))
         
-    results = []
-    # Consider optimizing search (e.g., using SQL LIKE or a search index)
-    all_movies = data_manager.get_all_movies() 
-    for movie_summary in all_movies:
-        # Search in movie name/title (case-insensitive)
-        if query.lower() in movie_summary.get('name', '').lower():
-            # Fetch full data only for matches
-            details = data_manager.get_movie_data(movie_summary['id'])
-            if details: # Ensure movie data was found
-                 # OMDB data should be part of details now
-                # details['omdb'] = omdb_manager.get_omdb_data(m['id']) or {} # Removed redundant fetch
-                results.append(details)
+    # Ranked full-text search (FTS5) over names, titles, actors, directors, plots and genres
+    limit = min(request.args.get('limit', 50, type=int), 100)
+    results = data_manager.search_movies(query, limit=limit)
                 
     return render_template('search_results.html', query=query, results=results)
 
@@ -423,32 +489,28 @@ def search_omdb():
     
     app.logger.info(f"OMDB search: query='{query}', year='{year}'")
     
-    # First, search in our own database
+    # First, search in our own database (prefix matching for typeahead)
     results = []
-    all_movies = data_manager.get_all_movies()
-    for movie_summary in all_movies:
-        if query.lower() in movie_summary.get('name', '').lower():
-            # Fetch full data only for matches
-            details = data_manager.get_movie_data(movie_summary['id'])
-            if details:
-                # Get OMDB data if available
-                omdb_data = details.get('omdb_data') or {}
-                poster_img = omdb_data.get('poster_img')
-                default_poster = 'no-poster.jpg'
-                poster_path = f"movies/{poster_img}" if poster_img else f"movies/{default_poster}"
-                
-                movie_data = {
-                    'id': details.get('id'),
-                    'title': details.get('name'),
-                    'year': details.get('year'),
-                    'source': 'senflix',
-                    'plot': omdb_data.get('plot', ''),
-                    'director': omdb_data.get('director', ''),
-                    'actors': omdb_data.get('actors', ''),
-                    'imdbID': omdb_data.get('imdb_id', ''),
-                    'poster': url_for('static', filename=poster_path)
-                }
-                results.append(movie_data)
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    for details in data_manager.search_movies(query, limit=limit):
+        # Get OMDB data if available
+        omdb_data = details.get('omdb_data') or {}
+        poster_img = omdb_data.get('poster_img')
+        default_poster = 'no-poster.jpg'
+        poster_path = f"movies/{poster_img}" if poster_img else f"movies/{default_poster}"
+        
+        movie_data = {
+            'id': details.get('id'),
+            'title': details.get('name'),
+            'year': details.get('year'),
+            'source': 'senflix',
+            'plot': omdb_data.get('plot', ''),
+            'director': omdb_data.get('director', ''),
+            'actors': omdb_data.get('actors', ''),
+            'imdbID': omdb_data.get('imdb_id', ''),
+            'poster': url_for('static', filename=poster_path)
+        }
+        results.append(movie_data)
     
     # Try to get data from OMDB API if we have less than 5 results
     if len(results) < 5:
@@ -748,7 +810,8 @@ def add_new_movie():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/categories', methods=['GET'])
-@login_required
+@login_required  # before the 304 shortcut: the tag is the same for every viewer
+@data_versions.conditional('catalog', per_viewer=False)
 def get_categories():
     """API endpoint to get all categories."""
     try:
@@ -764,6 +827,35 @@ def get_categories():
             'error': str(e)
         }), 500
 
+@app.route('/api/cache/stats', methods=['GET'])
+@login_required
+def section_cache_stats():
+    """API endpoint with section, OMDB and identity cache hit/miss counts, used to tune TTLs."""
+    return jsonify({
+        'success': True,
+        'section_cache': data_manager.section_cache.stats(),
+        'omdb_cache': omdb_manager.response_cache.stats(),
+        'identity_cache': data_manager.identity_cache.stats()
+    })
+
+@app.route('/api/interactions', methods=['POST'])
+@login_required
+def apply_interactions():
+    """
+    API endpoint applying a batch of toggles, ratings and removals of the current user in
+    one transaction; body {"operations": [...]}, one result per operation (see
+    apply_interactions of the data manager). movie_card.js queues clicks and sends them here.
+    """
+    payload = request.get_json(silent=True)
+    operations = payload.get('operations') if isinstance(payload, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'success': False, 'error': 'Expected a JSON body with a list of operations'}), 400
+    limit = app.config['INTERACTIONS_BATCH_LIMIT']
+    if len(operations) > limit:
+        return jsonify({'success': False, 'error': f"At most {limit} operations per request"}), 413
+    results = data_manager.apply_interactions(current_user.id, operations)
+    return jsonify({'success': all(result['success'] for result in results), 'results': results})
+
 # Obsolete route? Consider removing if not used.
 @app.route('/users')
 def users():
@@ -805,12 +897,13 @@ def user_profile(user_id):
     # Favorites list includes watched/watchlist status
     favorites = user_data.get('favorites', [])
     
-    # Ensure each favorite has the movie data
-    for fav in favorites:
-        if isinstance(fav, dict) and 'movie' not in fav:
-            movie_data = data_manager.get_movie_data(fav.get('movie_id'))
-            if movie_data:
-                fav.update(movie_data)
+    # Ensure each favorite has the movie data (hydrated in one batch)
+    missing = [fav for fav in favorites if isinstance(fav, dict) and 'movie' not in fav]
+    movies_data = data_manager.get_movies_data([fav.get('movie_id') for fav in missing], view='card')
+    for fav in missing:
+        movie_data = movies_data.get(fav.get('movie_id'))
+        if movie_data:
+            fav.update(movie_data)
     
     watched = [fav for fav in favorites if fav.get('watched')]
     watchlist = [fav for fav in favorites if fav.get('watchlist')]    
@@ -887,6 +980,7 @@ def delete_movie(user_id, movie_id):
     return redirect(url_for('user_profile', user_id=user_id))
 
 @app.route('/category/<int:category_id>')
+@data_versions.conditional('catalog')
 def category_detail(category_id):
     """Display movies belonging to a specific category."""
     category_obj = Category.query.get(category_id)
@@ -894,34 +988,96 @@ def category_detail(category_id):
         flash('Category not found', 'error')
         return redirect(url_for('movies'))
         
-    movies_in_category = data_manager.get_movies_by_category(category_id)
     category_data = category_obj.to_dict(include_relationships=False) # Don't need movies inside dict again
-    category_data['movies'] = movies_in_category # Add movies separately
+    if app.config['STREAM_TEMPLATES']:
+        # Movies are loaded in growing batches while the page is sent
+        movie_batches = data_manager.iter_movies_by_category(category_id, view='card')
+    else:
+        movie_batches = [data_manager.get_movies_by_category(category_id, view='card')]
     
-    return render_template('category_detail.html', category=category_data, current_user=current_user)
+    return stream_page('category_detail.html', category=category_data, movie_batches=movie_batches,
+                       current_user=current_user)
+
+# --- Paginated listings: the page renders the first page, /api/... the following ones ---
+
+PAGED_LISTINGS = {
+    # endpoint: (data manager page method, paged_items.html macro, sort order of its cursors)
+    'top_rated': ('get_top_rated_page', 'top_rated_items', SQLiteDataManager.TOP_RATED_ORDER),
+    'blockbuster': ('get_popular_page', 'blockbuster_items', SQLiteDataManager.POPULAR_ORDER),
+    'community_comments': ('get_comments_page', 'comment_items', SQLiteDataManager.COMMENTS_ORDER),
+}
+
+def listing_page(endpoint):
+    """Page of a listing for ?cursor= (the first page without one); 400 for an invalid cursor."""
+    method, _, _ = PAGED_LISTINGS[endpoint]
+    try:
+        return getattr(data_manager, method)(cursor=request.args.get('cursor'))
+    except InvalidCursor:
+        abort(400, description='Invalid cursor')
+
+def deferred_listing_page(endpoint):
+    """listing_page() for a streamed template to load when it gets there; the cursor is checked now."""
+    _, _, order = PAGED_LISTINGS[endpoint]
+    try:
+        decode_cursor(request.args.get('cursor'), len(order))
+    except InvalidCursor:
+        abort(400, description='Invalid cursor')
+    return lambda: listing_page(endpoint)
+
+def listing_json(endpoint):
+    """Next page of a listing as rendered grid items plus the cursor after it, for infinite scroll."""
+    method, macro, _ = PAGED_LISTINGS[endpoint]
+    try:
+        page = getattr(data_manager, method)(cursor=request.args.get('cursor'))
+    except InvalidCursor:
+        return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+    items = [dict(item, movie=dict(item['movie'])) if 'movie' in item else dict(item) for item in page.items]
+    return jsonify({
+        'success': True,
+        'items': items,
+        'html': str(get_template_attribute('components/paged_items.html', macro)(page.items)),
+        'next_cursor': page.next_cursor
+    })
 
 @app.route('/blockbuster')
+@data_versions.conditional('catalog', 'favorites')
 def blockbuster():
-    """Display all blockbuster/popular movies."""
-    # Get all movies without limit
-    popular_movies = data_manager.get_popular_movies(limit=None)
-    # Sort by number of favorites if available
-    popular_movies = sorted(popular_movies, key=lambda x: len(x.get('favorites', [])) if x.get('favorites') else 0, reverse=True)
-    popular_movies = data_manager._add_watched_avatars_to_movies(popular_movies)
-    return render_template('blockbuster.html', movies=popular_movies, current_user=current_user)
+    """Display the most popular movies, one page at a time."""
+    page = listing_page('blockbuster')
+    return render_template('blockbuster.html', movies=page.items, next_cursor=page.next_cursor,
+                           current_user=current_user)
 
 @app.route('/top-rated')
+@data_versions.conditional('catalog', 'favorites')
 def top_rated():
-    """Display all top rated movies."""
-    top_rated_movies = data_manager.get_top_rated_movies(limit=None)  # No limit here to get all movies
-    top_rated_movies = data_manager._add_watched_avatars_to_movies(top_rated_movies)
-    return render_template('top_rated.html', movies=top_rated_movies, current_user=current_user)
+    """Display the top rated movies, one page at a time."""
+    return stream_page('top_rated.html', load_page=deferred_listing_page('top_rated'), current_user=current_user)
 
 @app.route('/community-comments')
+@data_versions.conditional('catalog', 'favorites', 'users')
 def community_comments():
-    """Display all community comments."""
-    recent_comments = data_manager.get_recent_commented_movies(limit=None)  # Remove limit to get all comments
-    return render_template('community_comments.html', comments=recent_comments, current_user=current_user)
+    """Display the newest community comments, one page at a time."""
+    page = listing_page('community_comments')
+    return render_template('community_comments.html', comments=page.items, next_cursor=page.next_cursor,
+                           current_user=current_user)
+
+@app.route('/api/top-rated', methods=['GET'])
+@data_versions.conditional('catalog', 'favorites')
+def api_top_rated():
+    """API endpoint with the next page of top rated movies (?cursor=)."""
+    return listing_json('top_rated')
+
+@app.route('/api/blockbuster', methods=['GET'])
+@data_versions.conditional('catalog', 'favorites')
+def api_blockbuster():
+    """API endpoint with the next page of popular movies (?cursor=)."""
+    return listing_json('blockbuster')
+
+@app.route('/api/community-comments', methods=['GET'])
+@data_versions.conditional('catalog', 'favorites', 'users')
+def api_community_comments():
+    """API endpoint with the next page of community comments (?cursor=)."""
+    return listing_json('community_comments')
 
 @app.route('/avatar/<int:avatar_id>')
 def avatar_detail(avatar_id):
@@ -937,143 +1093,14 @@ def avatar_detail(avatar_id):
         users = User.query.filter_by(avatar_id=avatar_id).all()
         app.logger.info(f"Found {len(users)} users with avatar_id={avatar_id}")
 
-        # Get favorites from users with this avatar
-        favorites = []
-        favorite_movie_ids = set()  # To avoid duplicates
-        limit_per_section = 10
-
-        # Also collect all movie IDs favorited by users with this avatar for category analysis
-        all_favorite_movie_ids = set()
-
-        for user in users:
-            app.logger.info(f"Processing favorites for user_id={user.id}")
-            if len(favorites) >= limit_per_section:
-                break
-
-            user_favorites = UserFavorite.query.filter_by(
-                user_id=user.id,
-                favorite=True
-            ).all()  # Get all for category counting, but limit display
-            
-            app.logger.info(f"User {user.id} has {len(user_favorites)} favorites")
-
-            for fav in user_favorites:
-                # Add to the complete set for category analysis
-                all_favorite_movie_ids.add(fav.movie_id)
-                
-                # Add to display list if under limit
-                if len(favorites) < limit_per_section and fav.movie_id not in favorite_movie_ids:
-                    movie_data = data_manager.get_movie_data(fav.movie_id)
-                    if movie_data:
-                        movie_with_status = data_manager._add_watched_avatars_to_movies([movie_data])[0]
-                        favorites.append({
-                            'movie': movie_with_status,
-                            'user': user,
-                            'rating': fav.rating,
-                            'comment': fav.comment
-                        })
-                        favorite_movie_ids.add(fav.movie_id)
-                        if len(favorites) >= limit_per_section:
-                            break
-
-        app.logger.info(f"Collected {len(all_favorite_movie_ids)} unique favorite movie IDs")
-
-        # Get all movie categories for the favorited movies
-        popular_categories = []
-        category_counts = {}
-        
-        try:
-            # First method: Query directly using SQLAlchemy relationships
-            if all_favorite_movie_ids:
-                # Get all movies with their categories
-                favorite_movies = Movie.query.filter(Movie.id.in_(all_favorite_movie_ids)).options(
-                    joinedload(Movie.categories)
-                ).all()
-                
-                # Count categories and track category objects for their IDs and images
-                category_objects = {}
-                
-                # Count categories
-                for movie in favorite_movies:
-                    for category in movie.categories:
-                        if category.name in category_counts:
-                            category_counts[category.name] += 1
-                        else:
-                            category_counts[category.name] = 1
-                            
-                        # Store the category object for later use
-                        category_objects[category.name] = category
-                
-                # Also check direct category relationship
-                for movie in favorite_movies:
-                    if movie.category:
-                        if movie.category.name in category_counts:
-                            category_counts[movie.category.name] += 1
-                        else:
-                            category_counts[movie.category.name] = 1
-                            
-                        # Store the category object for later use
-                        category_objects[movie.category.name] = movie.category
-                
-                app.logger.info(f"Collected {len(category_counts)} categories from favorite movies")
-                
-                # Convert to list of dicts and sort by count
-                popular_categories = [
-                    {
-                        'name': name,
-                        'count': count,
-                        'id': category_objects[name].id,
-                        'img': category_objects[name].img
-                    }
-                    for name, count in category_counts.items()
-                ]
-                popular_categories.sort(key=lambda x: x['count'], reverse=True)
-                
-                # Limit to top 8
-                popular_categories = popular_categories[:8]
-            
-            # If no results from first method, try the SQL method
-            if not popular_categories and all_favorite_movie_ids:
-                app.logger.info("Using SQL query method for categories")
-                # Query to get category counts from favorites of users with this avatar
-                category_counts = db.session.query(
-                    Category.name,
-                    Category.id,
-                    Category.img,
-                    db.func.count(movie_categories.c.movie_id).label('count')
-                ).join(
-                    movie_categories,
-                    Category.id == movie_categories.c.category_id
-                ).join(
-                    Movie,
-                    Movie.id == movie_categories.c.movie_id
-                ).filter(
-                    Movie.id.in_(all_favorite_movie_ids)
-                ).group_by(
-                    Category.name,
-                    Category.id,
-                    Category.img
-                ).order_by(
-                    db.desc('count')
-                ).limit(8).all()
-
-                popular_categories = [
-                    {
-                        'name': name,
-                        'id': id,
-                        'img': img,
-                        'count': count
-                    }
-                    for name, id, img, count in category_counts
-                ]
-                
-                app.logger.info(f"SQL query returned {len(popular_categories)} categories")
-            
-        except Exception as e:
-            app.logger.error(f"Error fetching popular categories: {e}", exc_info=True)
-            popular_categories = []
-
-        app.logger.info(f"Final popular categories: {popular_categories}")
+        # Cohort favorites and categories are precomputed in avatar_movie_stats / avatar_category_stats
+        favorite_counts = data_manager.get_avatar_top_movie_ids(avatar_id, limit=10)
+        movies_data = data_manager.get_movies_data(list(favorite_counts), view='card')
+        favorites = [
+            {'movie': movies_data[movie_id], 'favorite_count': count}
+            for movie_id, count in favorite_counts.items() if movie_id in movies_data
+        ]
+        popular_categories = data_manager.get_avatar_categories(avatar_id, limit=8)
 
         return render_template('avatar_detail.html',
                              avatar=avatar,
@@ -1087,6 +1114,158 @@ def avatar_detail(avatar_id):
         flash('Error loading avatar details', 'error')
         return redirect(url_for('movies'))
 
+# --- CLI Commands ---
+
+@app.cli.command('omdb-backfill')
+@click.option('--workers', default=4, show_default=True, help='Parallel OMDB requests / poster downloads.')
+@click.option('--rate', default=5.0, show_default=True, help='Max OMDB API requests per second (0 = unlimited).')
+@click.option('--batch-size', default=20, show_default=True, help='Movies per database commit.')
+@click.option('--limit', type=int, default=None, help='Only process this many movies.')
+@click.option('--retry-failed', is_flag=True, help='Retry movies that OMDB could not resolve in earlier runs.')
+def omdb_backfill_command(workers, rate, batch_size, limit, retry_failed):
+    """Fetch missing OMDB data and posters for all movies. Safe to interrupt and re-run."""
+    if not omdb_manager.api_key:
+        print("OMDB_API_KEY is not set")
+        return
+    from datamanager.omdb_backfill import OMDBBackfill
+    backfill = OMDBBackfill(
+        omdb_manager, workers=workers, rate_limit=rate, batch_size=batch_size,
+        state_path=os.path.join(app.instance_path, 'omdb_backfill.json')
+    )
+
+    def report(stats):
+        print(f"{stats['processed']}/{stats['total']} processed, {stats['saved']} saved, {stats['failed']} failed")
+
+    stats = backfill.run(limit=limit, retry_failed=retry_failed, progress=report)
+    if not stats['total']:
+        print("No movies with missing OMDB data")
+
+@app.cli.command('omdb-cache')
+@click.option('--evict', is_flag=True, help='Drop expired entries and trim to OMDB_CACHE_MAX_ENTRIES.')
+@click.option('--clear', is_flag=True, help='Remove all cached OMDB responses.')
+def omdb_cache_command(evict, clear):
+    """Show (and optionally clean up) the persistent OMDB response cache."""
+    cache = omdb_manager.response_cache
+    if not cache.enabled:
+        print("OMDB response cache is disabled (OMDB_CACHE_PATH=none).")
+        return
+    if clear:
+        cache.clear()
+        print("OMDB response cache cleared.")
+    elif evict:
+        print(f"Evicted {cache.evict()} OMDB cache entries.")
+    stats = cache.stats()
+    print(f"{cache.path}: {stats['entries']} entries ({stats['negative_entries']} not found), "
+          f"{stats['stored_hits']} hits served")
+
+@app.cli.command('build-poster-variants')
+@click.option('--force', is_flag=True, help='Rebuild posters that already have variants.')
+def build_poster_variants_command(force):
+    """Create responsive WebP/JPEG sizes for every stored poster."""
+    count = omdb_manager.build_poster_variants(force=force)
+    if count is None:
+        print("Error building poster variants, see log for details")
+    else:
+        print(f"Built poster variants for {count} movies")
+
+@app.cli.command('build-static-assets')
+@click.option('--no-compress', is_flag=True, help='Skip the .gz/.br copies of text assets.')
+def build_static_assets_command(no_compress):
+    """Write static/manifest.json with content-hashed names and precompress text assets."""
+    files = build_manifest(app.static_folder, compress=not no_compress)
+    compressed = sum(1 for entry in files.values() if entry['encodings'])
+    print(f"Fingerprinted {len(files)} static files, {compressed} with precompressed copies")
+    static_assets.load()
+
+@app.cli.command('build-catalog-snapshot')
+def build_catalog_snapshot_command():
+    """Compile movies, categories, platforms and rankings into the snapshot file (CATALOG_SNAPSHOT)."""
+    if not data_manager.path:
+        print("Catalog snapshot is disabled (CATALOG_SNAPSHOT=none)")
+        return
+    stats = data_manager.build_snapshot()
+    print(f"Wrote {stats['movies']} movies, {stats['categories']} categories, {stats['top_rated']} top rated and "
+          f"{stats['popular']} popular entries to {data_manager.path} ({stats['bytes'] / 1024:.0f} KB)")
+
+@app.cli.command('precompile-templates')
+def precompile_templates_command():
+    """Compile all templates into the Jinja bytecode cache (JINJA_BYTECODE_CACHE) for faster cold starts."""
+    count = precompile_templates(app)
+    if not count:
+        print("Jinja bytecode cache is disabled (JINJA_BYTECODE_CACHE=none)")
+    else:
+        print(f"Compiled {count} templates into {app.config['JINJA_BYTECODE_CACHE']}")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Re-index the whole catalog in the FTS5 search table."""
+    count = data_manager.rebuild_search_index()
+    if count is None:
+        print("Search index not rebuilt (FTS5 unavailable or error, see log)")
+    else:
+        print(f"Indexed {count} movies")
+
+@app.cli.command('rebuild-movie-stats')
+def rebuild_movie_stats_command():
+    """Recompute the movie_stats table from user_favorites."""
+    count = data_manager.rebuild_movie_stats()
+    if count is None:
+        print("Error rebuilding movie stats, see log for details")
+    else:
+        print(f"Rebuilt movie stats for {count} movies")
+
+@app.cli.command('rebuild-recommendations')
+@click.option('--full', is_flag=True, help='Recompute all movies instead of only those with new interactions.')
+def rebuild_recommendations_command(full):
+    """Recompute the item-item movie neighbours used for recommendation rows."""
+    stats = data_manager.rebuild_recommendations(full=full)
+    if stats is None:
+        print("Error rebuilding recommendations, see log for details")
+    else:
+        print(f"Rebuilt neighbours of {stats['movies']} movies ({stats['neighbors']} rows) in {stats['seconds']}s")
+
+@app.cli.command('rebuild-avatar-stats')
+def rebuild_avatar_stats_command():
+    """Recompute the avatar_movie_stats and avatar_category_stats tables from user_favorites."""
+    count = data_manager.rebuild_avatar_stats()
+    if count is None:
+        print("Error rebuilding avatar stats, see log for details")
+    else:
+        print(f"Rebuilt avatar stats for {count} avatars")
+
+@app.cli.command('backfill-release-dates')
+@click.option('--all', 'all_movies', is_flag=True, help='Re-parse every movie, not only those without a date.')
+def backfill_release_dates_command(all_movies):
+    """Parse OMDB 'Released' strings into movies.release_date (new rows get it on save)."""
+    count = data_manager.backfill_release_dates(only_missing=not all_movies)
+    if count is None:
+        print("Error backfilling release dates, see log for details")
+    else:
+        print(f"Set the release date of {count} movies")
+
+@app.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations and fill the derived tables (on startup unless SCHEMA_SETUP is off)."""
+    runner = data_manager.migrations
+    applied = data_manager.setup_schema()
+    with data_manager.db.engine.connect() as connection:
+        version = runner.current_version(connection)
+    print(f"Applied migrations {applied}" if applied else "No pending migrations")
+    print(f"Schema version {version} (latest {runner.latest})")
+
+@app.cli.command('sqlite-optimize')
+@click.option('--analyze', is_flag=True, help='Run a full ANALYZE instead of PRAGMA optimize.')
+def sqlite_optimize_command(analyze):
+    """Refresh query planner statistics and checkpoint the WAL into the database file."""
+    profile = data_manager.sqlite_profile
+    print(f"SQLite profile '{profile.name}': {profile.connection_pragmas() or 'SQLite defaults'}")
+    try:
+        stats = profile.optimize(analyze=analyze)
+    except Exception as e:
+        print(f"Error optimizing the database: {e}")
+        return
+    print(f"{'ANALYZE' if analyze else 'PRAGMA optimize'} done in {stats['seconds']}s (journal mode: {stats['journal_mode']})")
+
 if __name__ == "__main__":
     # For development only
     # In production, use gunicorn or similar WSGI server
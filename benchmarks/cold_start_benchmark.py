@@ -0,0 +1,165 @@
+"""
+Measure cold starts: a fresh interpreter that imports the app and answers one request,
+as a serverless function does on its first invocation.
+
+    python benchmarks/cold_start_benchmark.py                              # data/senflix.sqlite
+    python benchmarks/cold_start_benchmark.py --database /tmp/senflix-large.sqlite --importtime 15
+
+Every run starts a new Python process, so nothing is shared between runs but the OS
+file cache. Two modes are compared: 'classic' (schema setup on startup, no template
+bytecode cache) and 'serverless' (SERVERLESS=true with templates precompiled by
+`precompile_templates`, as `flask precompile-templates` does at build time). Reported
+per mode as p50/p95 in ms: the whole process, the app import and the first response,
+plus the app's own startup profile (imports, config, init, first_response) and the
+number of loaded modules. --importtime lists the slowest imports of one serverless
+start, from `python -X importtime`. The database is copied and upgraded first.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from route_benchmark import DATABASE, ROOT, git_commit, percentile
+
+# Runs in the fresh interpreter; prints one JSON line
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+response.close()
+done = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (done - imported) * 1000,
+    'profile': app.startup_profile.report(),
+    'modules': sorted(sys.modules),
+}))
+"""
+
+MODES = {
+    'classic': {'SERVERLESS': 'false', 'JINJA_BYTECODE_CACHE': 'none'},
+    'serverless': {'SERVERLESS': 'true'},
+}
+
+
+def app_environment(path, **settings):
+    """Environment of a child process that runs the app against the database at `path`."""
+    env = dict(os.environ, DATABASE_PATH=path, SQLITE_OPTIMIZE_INTERVAL='0', OMDB_API_KEY='',
+               OMDB_CACHE_PATH='none', PYTHONPATH=ROOT)
+    env.update(settings)
+    return env
+
+
+def prepare(path, cache_dir):
+    """Upgrade the copied database and precompile the templates, as a deploy build would."""
+    script = "import app; from datamanager.startup import precompile_templates; precompile_templates(app.app)"
+    subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True, capture_output=True,
+                   env=app_environment(path, SERVERLESS='false', JINJA_BYTECODE_CACHE=cache_dir))
+
+
+def cold_start(path, url='/', **settings):
+    """One cold start in a new process; the CHILD measurements plus 'process_ms' (interpreter start included)."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, url], cwd=ROOT, capture_output=True, text=True,
+                            env=app_environment(path, **settings))
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Cold start failed:\n{result.stderr[-2000:]}")
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement['process_ms'] = elapsed
+    return measurement
+
+
+def slowest_imports(path, cache_dir, count):
+    """(cumulative ms, module) of the slowest imports of one serverless start."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, capture_output=True,
+                            text=True, env=app_environment(path, SERVERLESS='true', JINJA_BYTECODE_CACHE=cache_dir))
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                imports.append((int(cumulative) / 1000, module.rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def summarize(runs):
+    def stats(values):
+        return {'p50': round(percentile(values, .50), 1), 'p95': round(percentile(values, .95), 1)}
+    phases = {phase: stats([run['profile'][phase] for run in runs]) for phase in runs[0]['profile']}
+    return {
+        'process_ms': stats([run['process_ms'] for run in runs]),
+        'import_ms': stats([run['import_ms'] for run in runs]),
+        'first_response_ms': stats([run['first_response_ms'] for run in runs]),
+        'phases_ms': phases,
+        'modules': len(runs[-1]['modules']),
+        'heavy_modules': [name for name in ('requests', 'numpy', 'PIL') if name in runs[-1]['modules']],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=DATABASE, help='Database to copy and benchmark.')
+    parser.add_argument('--runs', type=int, default=10, help='Cold starts per mode.')
+    parser.add_argument('--url', default='/', help='URL of the first request.')
+    parser.add_argument('--importtime', type=int, default=0, metavar='N', help='Show the N slowest imports.')
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    directory = tempfile.mkdtemp(prefix='senflix-cold-start-')
+    path = os.path.join(directory, 'senflix.sqlite')
+    cache_dir = os.path.join(directory, 'jinja_bytecode')
+    shutil.copy(args.database, path)
+    try:
+        prepare(path, cache_dir)
+        results = {}
+        for mode, settings in MODES.items():
+            settings = dict(settings, JINJA_BYTECODE_CACHE=settings.get('JINJA_BYTECODE_CACHE', cache_dir))
+            results[mode] = summarize([cold_start(path, args.url, **settings) for _ in range(args.runs)])
+        imports = slowest_imports(path, cache_dir, args.importtime) if args.importtime else []
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{os.path.basename(args.database)}: {args.runs} cold starts per mode, first request GET {args.url} (ms)")
+    header = f"{'mode':<11} {'process p50':>12} {'import p50':>11} {'response p50':>13} {'modules':>8}  phases p50"
+    print(header)
+    print('-' * (len(header) + 30))
+    for mode, stats in results.items():
+        phases = ', '.join(f"{phase} {value['p50']:.0f}" for phase, value in stats['phases_ms'].items())
+        print(f"{mode:<11} {stats['process_ms']['p50']:>12.1f} {stats['import_ms']['p50']:>11.1f} "
+              f"{stats['first_response_ms']['p50']:>13.1f} {stats['modules']:>8}  {phases}")
+        if stats['heavy_modules']:
+            print(f"{'':<11} loaded at startup: {', '.join(stats['heavy_modules'])}")
+    if imports:
+        print("\nSlowest imports (serverless, cumulative ms):")
+        for milliseconds, module in imports:
+            print(f"{milliseconds:>9.1f}  {module}")
+
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'commit': git_commit(),
+                'database': os.path.abspath(args.database),
+                'python': sys.version.split()[0],
+                'args': {key: value for key, value in vars(args).items() if key != 'output'},
+            },
+            'modes': results,
+            'slowest_imports': imports,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
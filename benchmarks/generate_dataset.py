@@ -0,0 +1,220 @@
+"""
+Fill a new SQLite database with a synthetic Senflix catalog at production scale.
+
+    python benchmarks/generate_dataset.py /tmp/senflix-large.sqlite
+    python benchmarks/generate_dataset.py /tmp/senflix-small.sqlite --users 2000 --movies 5000 --favorites-per-user 15
+
+Avatars, platform names and the category/poster images are taken from
+data/senflix.sqlite so pages render like the real thing. Everything else is drawn
+with realistic skew: movie popularity follows a Zipf-like curve, users have a
+log-normal number of interactions, a few avatars and categories are far more common
+than the rest, and release years lean towards recent decades. The derived tables
+(movie stats, avatar stats, neighbours, search index) are rebuilt at the end.
+Use the result with `DATABASE_PATH=... flask run` or benchmarks/route_benchmark.py.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import (db, User, Avatar, Category, StreamingPlatform, Movie, MovieOMDB, UserFavorite,
+                                   movie_categories, movie_platforms, parse_release_date)
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'senflix.sqlite')
+CHUNK = 20_000
+
+ADJECTIVES = ('Silent', 'Last', 'Dark', 'Golden', 'Broken', 'Hidden', 'Endless', 'Crimson', 'Frozen', 'Wild',
+              'Electric', 'Lost', 'Secret', 'Burning', 'Quiet', 'Final', 'Savage', 'Midnight', 'Distant', 'Iron')
+NOUNS = ('Horizon', 'Empire', 'River', 'Kingdom', 'Signal', 'Garden', 'Station', 'Mirror', 'Storm', 'Orbit',
+         'Harbor', 'Forest', 'Machine', 'Promise', 'Frontier', 'Shadow', 'Voyage', 'Memory', 'Witness', 'Desert')
+FIRST_NAMES = ('Anna', 'Ben', 'Clara', 'David', 'Elif', 'Finn', 'Greta', 'Hugo', 'Ida', 'Jonas', 'Kira', 'Leon',
+               'Mila', 'Noah', 'Olga', 'Paul', 'Rosa', 'Sami', 'Tara', 'Yusuf')
+LAST_NAMES = ('Kubrick', 'Varda', 'Kurosawa', 'Bigelow', 'Fellini', 'Campion', 'Tarkovsky', 'Sciamma', 'Lang',
+              'Gerwig', 'Bergman', 'Denis', 'Wilder', 'Coppola', 'Ozu', 'Akerman', 'Leone', 'Ramsay', 'Hitchcock')
+COMMENTS = ('Loved it!', 'Not my thing.', 'The soundtrack is incredible.', 'Watch it on a big screen.',
+            'Slow start, great ending.', 'Overrated, honestly.', 'One of the best of the decade.',
+            'Would watch again with friends.')
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def zipf_choice(rng, n, size, exponent=1.0):
+    """Indices 0..n-1 where index 0 is the most likely, with Zipf-like falloff."""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+def source_rows(query):
+    connection = sqlite3.connect(SOURCE)
+    try:
+        return connection.execute(query).fetchall()
+    finally:
+        connection.close()
+
+
+def insert(table, rows):
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(table.insert(), rows[start:start + CHUNK])
+
+
+def people(rng, pool_size, size, exponent=1.1):
+    """Names from a pool of `pool_size` people, a few of whom appear very often."""
+    return [f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[i // len(FIRST_NAMES) % len(LAST_NAMES)]} {i}"
+            for i in zipf_choice(rng, pool_size, size, exponent).tolist()]
+
+
+def generate_catalog(rng, args):
+    avatars = source_rows('SELECT id, name, image, description FROM avatars ORDER BY id')
+    insert(Avatar.__table__, [dict(id=a[0], name=a[1], image=a[2], description=a[3]) for a in avatars])
+
+    source_categories = source_rows('SELECT name, img FROM categories ORDER BY id')
+    insert(Category.__table__, [
+        dict(id=i + 1, name=source_categories[i][0] if i < len(source_categories) else f"Category {i + 1}",
+             img=source_categories[i % len(source_categories)][1])
+        for i in range(args.categories)
+    ])
+    source_platforms = [row[0] for row in source_rows('SELECT name FROM streaming_platforms ORDER BY id')]
+    insert(StreamingPlatform.__table__, [
+        dict(id=i + 1, name=source_platforms[i] if i < len(source_platforms) else f"Platform {i + 1}")
+        for i in range(args.platforms)
+    ])
+
+    posters = [row[0] for row in source_rows('SELECT poster_img FROM movies_omdb WHERE poster_img IS NOT NULL')]
+    n = args.movies
+    years = np.clip(2025 - rng.exponential(14, n), 1920, 2025).astype(int)
+    ratings = np.round(np.clip(rng.normal(6.6, 1.0, n), 1.5, 9.7), 1)
+    primary = zipf_choice(rng, args.categories, n, 0.8) + 1
+    category_names = {i + 1: name for i, (name, _) in enumerate(source_categories)}
+    directors, writers = people(rng, 2000, n), people(rng, 3000, n)
+    actors = people(rng, 20000, n * 3, 0.9)
+    # Up to two linked categories besides the primary one, one to three platforms
+    extra_categories = zipf_choice(rng, args.categories, (n, 2), 0.8) + 1
+    extra_counts = rng.integers(0, 3, n)
+    platform_ids = zipf_choice(rng, args.platforms, (n, 3), 0.7) + 1
+    platform_counts = rng.integers(1, 4, n)
+
+    movies, links, platforms, omdb = [], [], [], []
+    for i in range(n):
+        movie_id = i + 1
+        title = f"{ADJECTIVES[rng.integers(len(ADJECTIVES))]} {NOUNS[rng.integers(len(NOUNS))]} {movie_id}"
+        genre = category_names.get(int(primary[i]), 'Drama')
+        movies.append(dict(id=movie_id, name=title, director=directors[i], year=int(years[i]),
+                           rating=float(ratings[i]), category_id=int(primary[i]), genre=genre, release_date=None))
+        for category_id in {int(primary[i])} | set(extra_categories[i, :extra_counts[i]].tolist()):
+            links.append(dict(movie_id=movie_id, category_id=category_id))
+        for platform_id in set(platform_ids[i, :platform_counts[i]].tolist()):
+            platforms.append(dict(movie_id=movie_id, platform_id=platform_id))
+        if rng.random() < args.omdb_share:
+            released = f"{rng.integers(1, 29):02d} {MONTHS[rng.integers(12)]} {years[i]}"
+            # Bulk inserts bypass the ORM hook that keeps movies.release_date in sync
+            movies[-1]['release_date'] = parse_release_date(released)
+            omdb.append(dict(
+                id=movie_id, imdb_id=f"tt{9000000 + movie_id:08d}", title=title, year=str(years[i]),
+                rated=('G', 'PG', 'PG-13', 'R')[rng.integers(4)],
+                released=released,
+                runtime=f"{rng.integers(80, 180)} min", genre=genre, director=directors[i],
+                writer=writers[i], actors=', '.join(actors[i * 3:i * 3 + 3]),
+                plot=f"A {ADJECTIVES[rng.integers(len(ADJECTIVES))].lower()} story about a "
+                     f"{NOUNS[rng.integers(len(NOUNS))].lower()} and the people who chase it.",
+                language='English', country='United States', awards='N/A',
+                poster_img=posters[i % len(posters)] if posters else None,
+                imdb_rating=float(np.clip(ratings[i] + rng.normal(0, 0.4), 1, 10).round(1)),
+                rotten_tomatoes=f"{rng.integers(20, 100)}%", metacritic=f"{rng.integers(30, 95)}/100",
+            ))
+    insert(Movie.__table__, movies)
+    insert(movie_categories, links)
+    insert(movie_platforms, platforms)
+    insert(MovieOMDB.__table__, omdb)
+    db.session.commit()
+    return len(avatars), len(omdb)
+
+
+def generate_users(rng, args, avatar_count):
+    avatar_ids = zipf_choice(rng, avatar_count, args.users, 0.7) + 1
+    insert(User.__table__, [
+        dict(id=i + 1, name=f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {i + 1}",
+             whatsapp_number=f"+49 15{rng.integers(10**8, 10**9)}", avatar_id=int(avatar_ids[i]))
+        for i in range(args.users)
+    ])
+    db.session.commit()
+
+    per_user = np.clip(rng.lognormal(np.log(args.favorites_per_user), 0.9, args.users).astype(int), 1, args.movies)
+    popularity = 1.0 / np.arange(1, args.movies + 1) ** 0.9
+    popularity /= popularity.sum()
+    # Popularity rank is independent of movie ID, so blockbusters are spread over the catalog
+    ranked_movie_ids = rng.permutation(args.movies) + 1
+    total = 0
+    for start in range(0, args.users, 5000):
+        rows = []
+        for user_index in range(start, min(start + 5000, args.users)):
+            movie_ids = np.unique(ranked_movie_ids[rng.choice(args.movies, size=per_user[user_index], p=popularity)])
+            for movie_id in movie_ids.tolist():
+                watched = rng.random() < 0.7
+                rated = watched and rng.random() < 0.45
+                rows.append(dict(
+                    user_id=user_index + 1, movie_id=movie_id, watched=watched,
+                    watchlist=not watched and rng.random() < 0.8,
+                    favorite=watched and rng.random() < 0.2,
+                    rating=float(rng.integers(1, 11)) if rated else None,
+                    comment=COMMENTS[rng.integers(len(COMMENTS))] if rated and rng.random() < args.comment_share else None,
+                ))
+        insert(UserFavorite.__table__, rows)
+        db.session.commit()
+        total += len(rows)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='SQLite file to create.')
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--movies', type=int, default=50_000)
+    parser.add_argument('--categories', type=int, default=40)
+    parser.add_argument('--platforms', type=int, default=15)
+    parser.add_argument('--favorites-per-user', type=float, default=25, help='Mean interactions per user.')
+    parser.add_argument('--omdb-share', type=float, default=0.8, help='Share of movies with OMDB data.')
+    parser.add_argument('--comment-share', type=float, default=0.3, help='Share of ratings with a comment.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--force', action='store_true', help='Replace an existing file.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.path)
+    if os.path.exists(path):
+        if not args.force:
+            parser.error(f"{path} exists, use --force to replace it")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config['SQLITE_PROFILE'] = 'fast'  # throwaway until the import is done
+    app.config['SQLITE_OPTIMIZE_INTERVAL'] = 0
+    data_manager = SQLiteDataManager()
+    data_manager.init_app(app)
+
+    rng = np.random.default_rng(args.seed)
+    started = time.perf_counter()
+    with app.app_context():
+        avatar_count, omdb_count = generate_catalog(rng, args)
+        print(f"catalog: {args.movies} movies ({omdb_count} with OMDB data), {args.categories} categories, "
+              f"{args.platforms} platforms, {avatar_count} avatars ({time.perf_counter() - started:.1f}s)")
+        favorites = generate_users(rng, args, avatar_count)
+        print(f"users: {args.users} users, {favorites} interactions ({time.perf_counter() - started:.1f}s)")
+
+        data_manager.rebuild_movie_stats()
+        data_manager.rebuild_avatar_stats()
+        data_manager.rebuild_recommendations(full=True)
+        data_manager.rebuild_search_index()
+        data_manager.sqlite_profile.optimize(analyze=True)
+    print(f"derived tables rebuilt, {path} is ready ({time.perf_counter() - started:.1f}s, "
+          f"{os.path.getsize(path) / 2**20:.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
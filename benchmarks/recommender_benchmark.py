@@ -0,0 +1,58 @@
+"""
+Rebuild time of the item-item recommender on a synthetic interaction matrix.
+
+    python benchmarks/recommender_benchmark.py                  # 100k users x 50k movies
+    python benchmarks/recommender_benchmark.py --users 10000 --movies 5000
+
+Movie popularity follows a Zipf-like curve and users have a log-normal number of
+interactions, so a few blockbusters are seen by a large share of all users. The
+database is not involved: this measures building the matrix and the top-k
+neighbour computation, which dominate `flask rebuild-recommendations --full`.
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from datamanager.recommender import InteractionMatrix, ItemItemRecommender
+
+
+def synthetic_interactions(users, movies, mean_per_user, seed=42):
+    rng = np.random.default_rng(seed)
+    per_user = np.clip(rng.lognormal(np.log(mean_per_user), 0.8, users).astype(np.int64), 1, movies)
+    user_ids = np.repeat(np.arange(users), per_user)
+    popularity = 1.0 / np.arange(1, movies + 1) ** 0.9
+    movie_ids = rng.choice(movies, size=len(user_ids), p=popularity / popularity.sum())
+    # One row per (user, movie), as in user_favorites
+    unique = np.unique(user_ids * movies + movie_ids)
+    user_ids, movie_ids = unique // movies, unique % movies
+    weights = rng.choice([0.5, 1.0, 3.0, 3.8], size=len(unique))  # watchlist / watched / favorite / rated
+    return user_ids, movie_ids, weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--movies', type=int, default=50_000)
+    parser.add_argument('--per-user', type=float, default=20, help='Mean interactions per user.')
+    parser.add_argument('--k', type=int, default=20)
+    args = parser.parse_args()
+
+    user_ids, movie_ids, weights = synthetic_interactions(args.users, args.movies, args.per_user)
+    started = time.perf_counter()
+    matrix = InteractionMatrix(user_ids, movie_ids, weights)
+    built = time.perf_counter()
+    neighbors = ItemItemRecommender(k=args.k).compute_neighbors(matrix)
+    finished = time.perf_counter()
+
+    print(f"users={matrix.n_users} movies={matrix.n_items} interactions={matrix.nnz} "
+          f"co-occurrences={int(matrix.item_costs.sum())}")
+    print(f"matrix build: {built - started:.2f}s")
+    print(f"top-{args.k} neighbours: {finished - built:.2f}s "
+          f"({sum(len(n) for n in neighbors.values())} rows for {len(neighbors)} movies)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Drive every page and API route through the Flask test client and report latency,
+SQL statements and peak memory per route.
+
+    python benchmarks/route_benchmark.py                                   # data/senflix.sqlite
+    python benchmarks/route_benchmark.py --database /tmp/senflix-large.sqlite --output before.json
+    python benchmarks/route_benchmark.py --database /tmp/senflix-large.sqlite --compare before.json
+
+The database is copied to a temporary directory first, so the toggle routes do not
+change it. Every route is requested --requests times with random (seeded) IDs after
+--warmup untimed requests; latencies are reported as p50/p95/p99 in ms together with
+the median number of SQL statements per request. Peak memory is measured in a
+separate tracemalloc pass, because tracing slows every allocation down.
+Results are written as JSON (--output) and --compare prints the change against an
+earlier result file. Use benchmarks/generate_dataset.py for a production-sized
+database.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+DATABASE = os.path.join(ROOT, 'data', 'senflix.sqlite')
+
+
+def routes(ids, include_writes):
+    """(name, method, url factory) of the routes to benchmark; factories take a random.Random."""
+    movie, user, category, avatar = ids['movies'], ids['users'], ids['categories'], ids['avatars']
+    words = ids['words']
+    table = [
+        ('user_selection', 'GET', lambda rng: '/'),
+        ('movies', 'GET', lambda rng: '/movies'),
+        ('movie_detail', 'GET', lambda rng: f'/movie/{rng.choice(movie)}'),
+        ('search', 'GET', lambda rng: f'/search?q={rng.choice(words)}'),
+        ('top_rated', 'GET', lambda rng: '/top-rated'),
+        ('blockbuster', 'GET', lambda rng: '/blockbuster'),
+        ('community_comments', 'GET', lambda rng: '/community-comments'),
+        ('users', 'GET', lambda rng: '/users'),
+        ('user_profile', 'GET', lambda rng: f'/users/{rng.choice(user)}'),
+        ('category_detail', 'GET', lambda rng: f'/category/{rng.choice(category)}'),
+        ('avatar_detail', 'GET', lambda rng: f'/avatar/{rng.choice(avatar)}'),
+        ('api_categories', 'GET', lambda rng: '/api/categories'),
+        ('get_movie_rating', 'GET', lambda rng: f'/get_movie_rating/{rng.choice(movie)}'),
+    ]
+    if include_writes:
+        table += [
+            ('toggle_favorite', 'POST', lambda rng: f'/toggle_favorite/{rng.choice(movie)}'),
+            ('toggle_watched', 'POST', lambda rng: f'/toggle_watched/{rng.choice(movie)}'),
+            ('toggle_watchlist', 'POST', lambda rng: f'/toggle_watchlist/{rng.choice(movie)}'),
+        ]
+    return table
+
+
+def percentile(values, share):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method='inclusive')[int(share * 100) - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_app(path, section_cache):
+    """Import the app against `path`; configuration comes from the environment, so set it first."""
+    os.environ['DATABASE_PATH'] = path
+    os.environ['SECTION_CACHE_BACKEND'] = section_cache
+    os.environ['SQLITE_OPTIMIZE_INTERVAL'] = '0'
+    os.environ['OMDB_API_KEY'] = ''       # never call the OMDB API from a benchmark
+    os.environ['OMDB_CACHE_PATH'] = 'none'
+    from app import app
+    from datamanager.interface import User, Movie, Category, Avatar, UserFavorite, db
+    with app.app_context():
+        ids = {
+            'users': [row[0] for row in db.session.query(User.id)],
+            'movies': [row[0] for row in db.session.query(Movie.id)],
+            'categories': [row[0] for row in db.session.query(Category.id)],
+            'avatars': [row[0] for row in db.session.query(Avatar.id)],
+            'words': sorted({word.lower() for (name,) in db.session.query(Movie.name).limit(500)
+                             for word in name.split() if len(word) > 3 and not word.isdigit()}) or ['the'],
+        }
+        counts = {'users': len(ids['users']), 'movies': len(ids['movies']),
+                  'interactions': db.session.query(UserFavorite).count()}
+    return app, ids, counts
+
+
+def run_route(app, client, method, url_for_request, args, rng):
+    from datamanager.query_stats import QueryCounter
+    for _ in range(args.warmup):
+        client.open(url_for_request(rng), method=method)
+
+    latencies, queries, statuses = [], [], {}
+    for _ in range(args.requests):
+        url = url_for_request(rng)
+        with QueryCounter(app) as counter:
+            started = time.perf_counter()
+            response = client.open(url, method=method)
+            response.get_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(counter))
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    # Peak Python heap per request, traced separately so it does not skew the latencies
+    peaks = []
+    tracemalloc.start()
+    for _ in range(max(1, args.requests // 5)):
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        client.open(url_for_request(rng), method=method).get_data()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return {
+        'requests': args.requests,
+        'p50_ms': round(percentile(latencies, .50), 2),
+        'p95_ms': round(percentile(latencies, .95), 2),
+        'p99_ms': round(percentile(latencies, .99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'queries': statistics.median(queries),
+        'max_queries': max(queries),
+        'peak_kb': round(max(peaks) / 1024, 1),
+        'statuses': statuses,
+    }
+
+
+def print_results(results, previous=None):
+    header = f"{'route':<20} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'peak KB':>9}  statuses"
+    print(header)
+    print('-' * len(header))
+    for name, stats in results.items():
+        statuses = ' '.join(f"{code}x{count}" for code, count in sorted(stats['statuses'].items()))
+        print(f"{name:<20} {stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} "
+              f"{stats['queries']:>8g} {stats['peak_kb']:>9.1f}  {statuses}")
+        before = (previous or {}).get(name)
+        if before:
+            print(f"{'  vs previous':<20} {change(before['p50_ms'], stats['p50_ms']):>8} "
+                  f"{change(before['p95_ms'], stats['p95_ms']):>8} {change(before['p99_ms'], stats['p99_ms']):>8} "
+                  f"{stats['queries'] - before['queries']:>+8g} {change(before['peak_kb'], stats['peak_kb']):>9}")
+
+
+def change(before, after):
+    return f"{(after - before) / before:+.0%}" if before else 'n/a'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=DATABASE, help='Database to copy and benchmark.')
+    parser.add_argument('--requests', type=int, default=50, help='Timed requests per route.')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route first.')
+    parser.add_argument('--routes', nargs='+', help='Only these routes (names as printed).')
+    parser.add_argument('--writes', action='store_true', help='Also benchmark the toggle POST routes.')
+    parser.add_argument('--section-cache', default='memory', choices=('memory', 'none'),
+                        help="Section cache backend; 'none' measures the uncached queries.")
+    parser.add_argument('--user', type=int, help='User to log in as (a random one by default).')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    parser.add_argument('--compare', help='Earlier JSON result to compare against.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    directory = tempfile.mkdtemp(prefix='senflix-routes-')
+    path = os.path.join(directory, 'senflix.sqlite')
+    shutil.copy(args.database, path)
+    try:
+        app, ids, counts = load_app(path, args.section_cache)
+        logging.getLogger().setLevel(logging.WARNING)  # the app configures INFO logging on import
+        rng = random.Random(args.seed)
+        client = app.test_client()
+        user_id = args.user or rng.choice(ids['users'])
+        client.get(f'/select_user/{user_id}')
+        print(f"{os.path.basename(args.database)}: {counts['users']} users, {counts['movies']} movies, "
+              f"{counts['interactions']} interactions; user {user_id}, {args.requests} requests per route "
+              f"(latencies in ms)")
+
+        results = {}
+        for name, method, url_for_request in routes(ids, args.writes):
+            if args.routes and name not in args.routes:
+                continue
+            results[name] = run_route(app, client, method, url_for_request, args, rng)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['routes']
+    print_results(results, previous)
+
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'commit': git_commit(),
+                'database': os.path.abspath(args.database),
+                'python': sys.version.split()[0],
+                'dataset': counts,
+                'args': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            },
+            'routes': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Compare the SQLite profiles under concurrent reads and favorite toggles.
+
+    python benchmarks/sqlite_profile_benchmark.py                        # all profiles, 4 workers
+    python benchmarks/sqlite_profile_benchmark.py --profiles default balanced --workers 8 --seconds 20
+
+Every profile runs on its own copy of data/senflix.sqlite. Worker processes (like
+gunicorn workers) each build the data manager and, for the given time, either load
+a movie page's data inside a GET request context (so the read-only engine is used)
+or toggle a random favorite flag inside a POST request context. A toggle that
+returns an error, typically "database is locked", counts as failed.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask import Flask
+from flask_login import LoginManager
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import Movie, User
+from datamanager.sqlite_profile import PROFILES
+
+DATABASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'senflix.sqlite')
+
+
+def make_app(path, profile):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config['SQLITE_PROFILE'] = profile
+    app.config['SQLITE_OPTIMIZE_INTERVAL'] = 0
+    LoginManager(app).user_loader(lambda user_id: None)  # movie data looks at current_user
+    data_manager = SQLiteDataManager()
+    data_manager.init_app(app)
+    return app, data_manager
+
+
+def worker(path, profile, seconds, write_share, seed, results):
+    app, data_manager = make_app(path, profile)
+    rng = random.Random(seed)
+    with app.app_context():
+        user_ids = [user.id for user in User.query.all()]
+        movie_ids = [movie.id for movie in Movie.query.all()]
+
+    reads, writes, failed = [], [], 0
+    deadline = time.perf_counter() + seconds
+    try:
+        while time.perf_counter() < deadline:
+            movie_id = rng.choice(movie_ids)
+            started = time.perf_counter()
+            if rng.random() < write_share:
+                with app.test_request_context(f'/toggle_favorite/{movie_id}', method='POST'):
+                    result = data_manager.toggle_user_favorite_attribute(
+                        rng.choice(user_ids), movie_id, rng.choice(('watched', 'watchlist', 'favorite')))
+                writes.append(time.perf_counter() - started)
+                failed += 'error' in result
+            else:
+                with app.test_request_context(f'/movie/{movie_id}', method='GET'):
+                    data_manager.get_movie_data(movie_id)
+                    data_manager.get_similar_movies(movie_id, limit=10)
+                    data_manager.get_avg_movie_rating(movie_id)
+                reads.append(time.perf_counter() - started)
+    finally:
+        # Always report, so the parent never waits on a crashed worker
+        results.put((reads, writes, failed))
+
+
+def percentile(values, share):
+    if not values:
+        return 0.0
+    return statistics.quantiles(values, n=100)[int(share * 100) - 1] * 1000 if len(values) > 1 else values[0] * 1000
+
+
+def run_profile(profile, args):
+    directory = tempfile.mkdtemp(prefix=f'senflix-{profile}-')
+    path = os.path.join(directory, 'senflix.sqlite')
+    shutil.copy(args.database, path)
+    make_app(path, profile)  # create the derived tables once, before the workers start
+
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, profile, args.seconds, args.write_share, seed, results))
+                 for seed in range(args.workers)]
+    for process in processes:
+        process.start()
+    reads, writes, failed = [], [], 0
+    for _ in processes:
+        worker_reads, worker_writes, worker_failed = results.get()
+        reads += worker_reads
+        writes += worker_writes
+        failed += worker_failed
+    for process in processes:
+        process.join()
+    shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{profile:<10} {(len(reads) + len(writes)) / args.seconds:>8.0f} "
+          f"{percentile(reads, .5):>8.2f} {percentile(reads, .95):>8.2f} "
+          f"{percentile(writes, .5):>8.2f} {percentile(writes, .95):>8.2f} "
+          f"{len(writes):>7} {failed:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent worker processes.')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-share', type=float, default=0.2, help='Share of operations that are toggles.')
+    parser.add_argument('--database', default=DATABASE, help='Database to copy for every profile.')
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.seconds:g}s per profile, {args.write_share:.0%} writes (latencies in ms)")
+    print(f"{'profile':<10} {'ops/s':>8} {'read p50':>8} {'read p95':>8} {'write p50':>8} {'write p95':>8} "
+          f"{'writes':>7} {'failed':>7}")
+    for profile in args.profiles:
+        run_profile(profile, args)
+
+
+if __name__ == '__main__':
+    main()
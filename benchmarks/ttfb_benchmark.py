@@ -0,0 +1,136 @@
+"""
+Measure time to first byte and total time of the streamed pages, streamed and buffered.
+
+    python benchmarks/generate_dataset.py /tmp/senflix-large.sqlite
+    python benchmarks/ttfb_benchmark.py --database /tmp/senflix-large.sqlite
+
+/movies, a category page and /top-rated are requested through the Flask test client
+without buffering, once with STREAM_TEMPLATES on and once with it off. TTFB is the
+time until the first body chunk arrives, total the time until the last one; both are
+reported as p50/p95 in ms, together with the number of chunks and the page size.
+With buffering the first chunk is the whole page, so TTFB equals the total time.
+The database is copied to a temporary directory first, as in route_benchmark.py.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from route_benchmark import DATABASE, git_commit, load_app, percentile
+
+
+def pages(ids):
+    """(name, url factory) of the streamed pages; factories take a random.Random."""
+    return [
+        ('movies', lambda rng: '/movies'),
+        ('category_detail', lambda rng: f'/category/{rng.choice(ids["categories"])}'),
+        ('top_rated', lambda rng: '/top-rated'),
+    ]
+
+
+def fetch(client, url):
+    """(seconds to the first chunk, seconds to the last, chunks, bytes) of one unbuffered GET."""
+    started = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first, chunks, size = None, 0, 0
+    for chunk in response.response:
+        if first is None:
+            first = time.perf_counter() - started
+        chunks += 1
+        size += len(chunk)
+    response.close()
+    total = time.perf_counter() - started
+    return first if first is not None else total, total, chunks, size
+
+
+def run_page(app, client, url_for_request, stream, args):
+    app.config['STREAM_TEMPLATES'] = stream
+    rng = random.Random(args.seed)  # same URLs in both modes
+    for _ in range(args.warmup):
+        fetch(client, url_for_request(rng))
+    ttfb, total, chunks, sizes = [], [], [], []
+    for _ in range(args.requests):
+        first, last, count, size = fetch(client, url_for_request(rng))
+        ttfb.append(first * 1000)
+        total.append(last * 1000)
+        chunks.append(count)
+        sizes.append(size)
+    return {
+        'ttfb_p50_ms': round(percentile(ttfb, .50), 2),
+        'ttfb_p95_ms': round(percentile(ttfb, .95), 2),
+        'total_p50_ms': round(percentile(total, .50), 2),
+        'total_p95_ms': round(percentile(total, .95), 2),
+        'chunks': max(chunks),
+        'kb': round(max(sizes) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=DATABASE, help='Database to copy and benchmark.')
+    parser.add_argument('--requests', type=int, default=20, help='Timed requests per page and mode.')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per page and mode first.')
+    parser.add_argument('--section-cache', default='memory', choices=('memory', 'none'),
+                        help="Section cache backend; 'none' measures the uncached queries.")
+    parser.add_argument('--user', type=int, help='User to log in as (a random one by default).')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the results to this JSON file.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    directory = tempfile.mkdtemp(prefix='senflix-ttfb-')
+    path = os.path.join(directory, 'senflix.sqlite')
+    shutil.copy(args.database, path)
+    try:
+        app, ids, counts = load_app(path, args.section_cache)
+        logging.getLogger().setLevel(logging.WARNING)  # the app configures INFO logging on import
+        client = app.test_client()
+        user_id = args.user or random.Random(args.seed).choice(ids['users'])
+        client.get(f'/select_user/{user_id}')
+        print(f"{os.path.basename(args.database)}: {counts['users']} users, {counts['movies']} movies; "
+              f"user {user_id}, {args.requests} requests per page and mode (ms)")
+
+        results = {}
+        for name, url_for_request in pages(ids):
+            results[name] = {mode: run_page(app, client, url_for_request, mode == 'streamed', args)
+                             for mode in ('buffered', 'streamed')}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    header = f"{'page':<16} {'mode':<9} {'ttfb p50':>9} {'ttfb p95':>9} {'total p50':>10} {'total p95':>10} " \
+             f"{'chunks':>7} {'KB':>9}"
+    print(header)
+    print('-' * len(header))
+    for name, modes in results.items():
+        for mode, stats in modes.items():
+            print(f"{name:<16} {mode:<9} {stats['ttfb_p50_ms']:>9.2f} {stats['ttfb_p95_ms']:>9.2f} "
+                  f"{stats['total_p50_ms']:>10.2f} {stats['total_p95_ms']:>10.2f} {stats['chunks']:>7} "
+                  f"{stats['kb']:>9.1f}")
+        buffered, streamed = modes['buffered']['ttfb_p50_ms'], modes['streamed']['ttfb_p50_ms']
+        if streamed:
+            print(f"{'':<16} {'ttfb':<9} {buffered / streamed:>8.1f}x faster to first byte")
+
+    if args.output:
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'commit': git_commit(),
+                'database': os.path.abspath(args.database),
+                'python': sys.version.split()[0],
+                'dataset': counts,
+                'args': {key: value for key, value in vars(args).items() if key != 'output'},
+            },
+            'pages': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Tests that import app.py run against a throwaway copy of the bundled database, so the
+# git-tracked data/senflix.sqlite is never written (or switched to WAL) by a test run
+_directory = tempfile.mkdtemp(prefix='senflix-tests-')
+_database = os.path.join(_directory, 'senflix.sqlite')
+shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'senflix.sqlite'), _database)
+os.environ['DATABASE_PATH'] = _database
+atexit.register(shutil.rmtree, _directory, True)
+
+# ...and without the build output that may or may not be in the working tree:
+# static/manifest.json, the catalog snapshot and the precompiled templates
+os.environ['STATIC_FINGERPRINTS'] = 'false'
+os.environ['CATALOG_SNAPSHOT'] = 'none'
+os.environ['JINJA_BYTECODE_CACHE'] = 'none'
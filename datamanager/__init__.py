@@ -1,9 +1,11 @@
 from .db_manager import *
+from .home_feed import HomeFeedAssembler
+from .projections import MovieCard
 
 __all__ = [
     'db', 'SQLiteDataManager', 'User', 'Movie', 'UserFavorite',
     'StreamingPlatform', 'MoviePlatform', 'Category', 'MovieCategory',
-    'MovieOMDB'
+    'MovieOMDB', 'HomeFeedAssembler', 'MovieCard'
 ]
 
 # This file is intentionally empty to make the directory a Python package 
\ No newline at end of file
@@ -0,0 +1,472 @@
+from .interface import db, logger, DataManagerInterface, Movie, Category, StreamingPlatform, MovieStats, movie_categories
+from .pagination import PAGE_SIZE, InvalidCursor, Page, decode_cursor, encode_cursor
+from .projections import MovieCard, load_movie_cards, load_movie_details
+from array import array
+from bisect import bisect_left
+from flask_login import current_user
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import SQLAlchemyError
+from typing import Dict, List, Optional
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+
+MAGIC = b'SFXCATLG'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sII')  # magic, format version, length of the meta JSON
+
+# Columns of the precomputed rankings; each is sorted by its second column (descending), then movie_id
+RANKINGS = {
+    'top_rated': ('movie_id', 'rating_avg'),
+    'popular': ('movie_id', 'interaction_count', 'favorite_count'),
+}
+
+# The data versions a snapshot is built from; 'catalog' covers movies and their relations, 'favorites' the rankings
+SNAPSHOT_VERSIONS = ('catalog', 'favorites')
+
+VIEWER_FLAGS_SQL = text(
+    "SELECT movie_id, watched, watchlist, rating IS NOT NULL, favorite FROM user_favorites "
+    "WHERE user_id = :user_id AND movie_id IN :movie_ids"
+).bindparams(bindparam('movie_ids', expanding=True))
+
+
+def _json(value) -> bytes:
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def _packed(blobs: List[bytes]):
+    """(offsets, data) of byte strings stored back to back; blob i is data[offsets[i]:offsets[i + 1]]."""
+    offsets = array('q', [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return offsets, b''.join(blobs)
+
+
+def build_catalog_snapshot(data_manager, path: str, chunk_size=500) -> Dict[str, int]:
+    """
+    Compile the catalog into a snapshot file at `path`: every movie as its detail dict
+    (Movie.to_dict() with OMDB data, categories and platforms) and its card, the movie
+    IDs of every category, all categories and platforms, and the top rated and popular
+    rankings. The file is written next to `path` and moved into place, so a running
+    reader never sees half of it. Returns counts of what was written.
+
+    The data versions are read first: a write during the build makes the snapshot look
+    older than it is, never newer.
+    """
+    versions = data_manager.data_versions.get(*SNAPSHOT_VERSIONS)
+
+    movie_ids = [movie_id for movie_id, in db.session.query(Movie.id).order_by(Movie.id)]
+    details, cards = [], []
+    for start in range(0, len(movie_ids), chunk_size):
+        chunk = movie_ids[start:start + chunk_size]
+        loaded_details, loaded_cards = load_movie_details(chunk), load_movie_cards(chunk)
+        for movie_id in chunk:
+            card = loaded_cards[movie_id]
+            details.append(_json(loaded_details[movie_id]))
+            cards.append(_json([card.id, card.name, card.year, card.rating, card.poster_img, card.imdb_rating,
+                                card.categories, card.poster_variants]))
+        db.session.expunge_all()  # keep the identity map small on large catalogs
+
+    # Linked through the association table or the direct foreign key, as _category_movie_ids() finds them
+    category_movies = {}
+    links = db.select(movie_categories.c.category_id, movie_categories.c.movie_id).union(
+        db.select(Movie.category_id, Movie.id).where(Movie.category_id.isnot(None)))
+    for category_id, movie_id in db.session.execute(links):
+        category_movies.setdefault(category_id, []).append(movie_id)
+    categories = [c.to_dict(include_relationships=False) for c in Category.query.order_by(Category.id)]
+    category_ids = sorted(category_movies)
+    category_offsets = array('q', [0])
+    category_movie_ids = array('q')
+    for category_id in category_ids:
+        category_movie_ids.extend(sorted(category_movies[category_id]))
+        category_offsets.append(len(category_movie_ids))
+
+    sections = {
+        'movie_ids': array('q', movie_ids),
+        'category_ids': array('q', category_ids),
+        'category_offsets': category_offsets,
+        'category_movie_ids': category_movie_ids,
+    }
+    sections['detail_offsets'], sections['details'] = _packed(details)
+    sections['card_offsets'], sections['cards'] = _packed(cards)
+
+    rankings = {
+        'top_rated': db.session.query(MovieStats.movie_id, MovieStats.rating_avg)
+        .filter(MovieStats.rating_count > 0).order_by(MovieStats.rating_avg.desc(), MovieStats.movie_id),
+        'popular': db.session.query(MovieStats.movie_id, MovieStats.interaction_count, MovieStats.favorite_count)
+        .filter(MovieStats.interaction_count > 0).order_by(MovieStats.interaction_count.desc(), MovieStats.movie_id),
+    }
+    for name, query in rankings.items():
+        rows = query.all()
+        for i, column in enumerate(RANKINGS[name]):
+            typecode = 'd' if column == 'rating_avg' else 'q'
+            sections[f"{name}.{column}"] = array(typecode, [row[i] for row in rows])
+
+    # Sections follow the header and meta JSON, 8 byte aligned so they can be cast in place
+    layout, offset = {}, 0
+    for name, data in sections.items():
+        typecode = data.typecode if isinstance(data, array) else 'B'
+        size = len(data) * data.itemsize if isinstance(data, array) else len(data)
+        layout[name] = (offset, size, typecode)
+        offset += size + (-size % 8)
+    meta = _json({
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'byteorder': sys.byteorder,
+        'versions': versions,
+        'categories': categories,
+        'platforms': [p.to_dict(include_relationships=False) for p in StreamingPlatform.query.order_by(StreamingPlatform.id)],
+        'sections': layout,
+    })
+    meta += b' ' * (-(HEADER.size + len(meta)) % 8)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(meta)))
+            f.write(meta)
+            for name, data in sections.items():
+                data = data.tobytes() if isinstance(data, array) else data
+                f.write(data + b'\0' * (-len(data) % 8))
+        os.replace(tmp_path, path)
+    except OSError:
+        os.remove(tmp_path)
+        raise
+    return {'movies': len(movie_ids), 'categories': len(categories), 'top_rated': len(sections['top_rated.movie_id']),
+            'popular': len(sections['popular.movie_id']), 'bytes': os.path.getsize(path)}
+
+
+class CatalogSnapshot:
+    """
+    Read side of a snapshot file from build_catalog_snapshot().
+
+    The file is memory mapped and its sections are used in place as typed arrays, so
+    opening it costs a header read, and a lookup is a binary search over the sorted
+    movie IDs plus json.loads of that one movie. The OS shares the mapped pages
+    between the worker processes of a host.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, meta_length = HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a catalog snapshot of format {FORMAT_VERSION}")
+        self.meta = json.loads(bytes(view[HEADER.size:HEADER.size + meta_length]))
+        if self.meta['byteorder'] != sys.byteorder:
+            raise ValueError(f"{path} was built on a {self.meta['byteorder']} endian machine")
+        start = HEADER.size + meta_length
+        self._sections = {name: view[start + offset:start + offset + size].cast(typecode)
+                          for name, (offset, size, typecode) in self.meta['sections'].items()}
+        self.versions: Dict[str, int] = self.meta['versions']
+        self.categories: List[Dict] = self.meta['categories']
+        self.platforms: List[Dict] = self.meta['platforms']
+
+    def __len__(self):
+        return len(self._sections['movie_ids'])
+
+    def _blob(self, kind: str, movie_id: int) -> Optional[bytes]:
+        ids = self._sections['movie_ids']
+        i = bisect_left(ids, movie_id)
+        if i == len(ids) or ids[i] != movie_id:
+            return None
+        offsets = self._sections[f"{kind}_offsets"]
+        return self._sections[f"{kind}s"][offsets[i]:offsets[i + 1]]
+
+    def detail(self, movie_id: int) -> Optional[Dict]:
+        """A new Movie.to_dict() dictionary of the movie, None for an unknown ID."""
+        blob = self._blob('detail', movie_id)
+        return json.loads(bytes(blob)) if blob is not None else None
+
+    def card(self, movie_id: int) -> Optional[MovieCard]:
+        """A new MovieCard of the movie, None for an unknown ID."""
+        blob = self._blob('card', movie_id)
+        return MovieCard(*json.loads(bytes(blob))) if blob is not None else None
+
+    def movie_ids(self) -> List[int]:
+        return self._sections['movie_ids'].tolist()
+
+    def category_movie_ids(self, category_id: int) -> List[int]:
+        """IDs of the movies of a category in ID order, [] for an unknown one."""
+        ids = self._sections['category_ids']
+        i = bisect_left(ids, category_id)
+        if i == len(ids) or ids[i] != category_id:
+            return []
+        offsets = self._sections['category_offsets']
+        return self._sections['category_movie_ids'][offsets[i]:offsets[i + 1]].tolist()
+
+    def ranking_length(self, name: str) -> int:
+        return len(self._sections[f"{name}.movie_id"])
+
+    def ranked(self, name: str, start: int, stop: Optional[int]) -> List[tuple]:
+        """Rows start:stop of a ranking as tuples of its RANKINGS columns."""
+        columns = [self._sections[f"{name}.{column}"][start:stop].tolist() for column in RANKINGS[name]]
+        return list(zip(*columns))
+
+    def position_after(self, name: str, after: List) -> int:
+        """Index of the first row of a ranking that sorts after the key [value, movie_id]."""
+        ids, values = self._sections[f"{name}.movie_id"], self._sections[f"{name}.{RANKINGS[name][1]}"]
+        key = (-after[0], after[1])
+        low, high = 0, len(ids)
+        while low < high:  # values descending, ties by ascending ID
+            middle = (low + high) // 2
+            if (-values[middle], ids[middle]) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+
+class SnapshotDataManager(DataManagerInterface):
+    """
+    Data manager that answers catalog reads from a CatalogSnapshot and everything else
+    from the wrapped SQLiteDataManager.
+
+    Movie dicts and cards, category movie lists, categories, platforms and the top rated
+    and popular rankings come from the snapshot without touching SQLAlchemy's ORM; a
+    logged in viewer's status flags are added with one plain SQL query. Other methods
+    and attributes are passed on to the wrapped manager.
+
+    A snapshot stays in use only while it matches the data: its 'catalog' and
+    'favorites' versions are compared with the data_versions table once per request,
+    through the same DataVersions.current() read the ETags are made of, so a page never
+    comes from a snapshot older than its tag. A write in this process (seen through the
+    section cache invalidation) marks its part stale at once. Reads of a stale part go
+    to the database until `flask build-catalog-snapshot` writes a new file. Without a
+    snapshot file every call goes to the wrapped manager.
+
+    Configured from app.config:
+        CATALOG_SNAPSHOT  snapshot file (instance/catalog_snapshot.bin); 'none' disables it
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.path = None
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._stale = set()
+
+    def __getattr__(self, name):
+        # Only called for attributes not defined here: section_cache, data_versions, upsert_favorite, ...
+        if name == 'fallback':
+            raise AttributeError(name)
+        return getattr(self.fallback, name)
+
+    def init_app(self, app):
+        self.fallback.init_app(app)
+        self.fallback.section_cache.listeners.append(self._invalidated)
+        path = app.config.get('CATALOG_SNAPSHOT', os.path.join(app.instance_path, 'catalog_snapshot.bin'))
+        self.path = path if path and path.lower() != 'none' else None
+        self.load()
+
+    def load(self) -> bool:
+        """Open the snapshot file; False (and all reads from the database) when there is none."""
+        self.snapshot = None
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            snapshot = CatalogSnapshot(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Catalog snapshot {self.path} unreadable, reading the catalog from the database: {e}")
+            return False
+        self.snapshot, self._stale = snapshot, set()
+        return True
+
+    def build_snapshot(self) -> Dict[str, int]:
+        """Write a new snapshot file from the database and start using it."""
+        stats = build_catalog_snapshot(self.fallback, self.path)
+        self.load()
+        return stats
+
+    def _mark_stale(self, part: str):
+        if part not in self._stale:
+            self._stale.add(part)
+            logger.info(f"Catalog snapshot {self.path} is older than the '{part}' data, "
+                        f"reading it from the database until the snapshot is rebuilt")
+
+    def _invalidated(self, tags):
+        for tag in tags:
+            if tag in SNAPSHOT_VERSIONS and self.snapshot is not None:
+                self._mark_stale(tag)
+
+    def _serves(self, part: str) -> bool:
+        """Whether reads of `part` ('catalog' or 'favorites') can come from the snapshot."""
+        if self.snapshot is None or part in self._stale:
+            return False
+        try:
+            current = self.data_versions.current(*SNAPSHOT_VERSIONS)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error reading data versions for the catalog snapshot: {e}")
+            return False
+        for name in SNAPSHOT_VERSIONS:
+            if current['epoch'] != self.snapshot.versions['epoch'] or current[name] != self.snapshot.versions[name]:
+                self._mark_stale(name)
+        return part not in self._stale
+
+    # --- Catalog Reads ---
+
+    def get_all_movies(self):
+        if not self._serves('catalog'):
+            return self.fallback.get_all_movies()
+        return [self.snapshot.detail(movie_id) for movie_id in self.snapshot.movie_ids()]
+
+    def get_movie_data(self, movie_id):
+        return self.get_movies_data([movie_id]).get(movie_id)
+
+    def get_movies_data(self, movie_ids, viewer=None, view='detail') -> Dict[int, Dict]:
+        """Same results as SQLiteDataManager.get_movies_data(), read from the snapshot."""
+        if not self._serves('catalog'):
+            return self.fallback.get_movies_data(movie_ids, viewer=viewer, view=view)
+        load = {'detail': self.snapshot.detail, 'card': self.snapshot.card}[view]
+        movies = {}
+        for movie_id in dict.fromkeys(movie_ids):
+            if movie_id is not None:
+                movie = load(movie_id)
+                if movie is not None:
+                    movies[movie_id] = movie
+
+        if viewer is None:
+            viewer = current_user
+        if movies and viewer and getattr(viewer, 'is_authenticated', False):
+            try:
+                rows = db.session.execute(VIEWER_FLAGS_SQL, {'user_id': viewer.id, 'movie_ids': list(movies)})
+                for movie_id, watched, watchlist, rated, favorite in rows:
+                    movies[movie_id].update({
+                        'user_watched': None if watched is None else bool(watched),
+                        'user_watchlist': None if watchlist is None else bool(watchlist),
+                        'user_rated': bool(rated),
+                        'user_favorite': None if favorite is None else bool(favorite)
+                    })
+            except SQLAlchemyError as e:
+                logger.error(f"DB Error getting status flags of user {viewer.id}: {e}")
+        return movies
+
+    def get_movie_platforms(self, movie_id):
+        if not self._serves('catalog'):
+            return self.fallback.get_movie_platforms(movie_id)
+        movie = self.snapshot.detail(movie_id)
+        return movie['streaming_platforms'] if movie else []
+
+    def get_movie_categories(self, movie_id):
+        if not self._serves('catalog'):
+            return self.fallback.get_movie_categories(movie_id)
+        movie = self.snapshot.detail(movie_id)
+        return movie['categories'] if movie else []
+
+    def get_movies_by_category(self, category_id, view='detail'):
+        if not self._serves('catalog'):
+            return self.fallback.get_movies_by_category(category_id, view=view)
+        movie_ids = self.snapshot.category_movie_ids(category_id)
+        movies = self.get_movies_data(movie_ids, view=view)
+        return [movies[m_id] for m_id in movie_ids if m_id in movies]
+
+    def iter_movies_by_category(self, category_id, first_batch=PAGE_SIZE, max_batch=16 * PAGE_SIZE, view='card'):
+        if not self._serves('catalog'):
+            yield from self.fallback.iter_movies_by_category(category_id, first_batch, max_batch, view=view)
+            return
+        movie_ids = self.snapshot.category_movie_ids(category_id)
+        start, size = 0, first_batch
+        while start < len(movie_ids):
+            batch = movie_ids[start:start + size]
+            movies = self.get_movies_data(batch, view=view)
+            yield [movies[m_id] for m_id in batch if m_id in movies]
+            start, size = start + size, min(size * 2, max_batch)
+
+    def get_all_categories(self):
+        if not self._serves('catalog'):
+            return self.fallback.get_all_categories()
+        return [dict(category) for category in self.snapshot.categories]
+
+    def get_all_platforms(self):
+        if not self._serves('catalog'):
+            return self.fallback.get_all_platforms()
+        return [dict(platform) for platform in self.snapshot.platforms]
+
+    def get_all_categories_with_movies(self):
+        if not self._serves('catalog'):
+            return self.fallback.get_all_categories_with_movies()
+        return [dict(category, movies=[self.snapshot.detail(m_id) for m_id in self.snapshot.category_movie_ids(category['id'])])
+                for category in self.snapshot.categories]
+
+    # --- Rankings ---
+
+    def _ranking_page(self, name, cursor, limit) -> Page:
+        after = decode_cursor(cursor, 2)
+        if after is not None and not all(isinstance(value, (int, float)) for value in after):
+            raise InvalidCursor(cursor)
+        start = self.snapshot.position_after(name, after) if after is not None else 0
+        rows = self.snapshot.ranked(name, start, start + limit)
+        more = start + limit < self.snapshot.ranking_length(name)
+        return Page(rows, encode_cursor([rows[-1][1], rows[-1][0]]) if more and rows else None)
+
+    def _top_rated_results(self, ranked, view):
+        movies = self.get_movies_data([movie_id for movie_id, _ in ranked], view=view)
+        return [dict(movies[movie_id], average_rating=round(avg_rating, 2) if avg_rating else None)
+                for movie_id, avg_rating in ranked if movie_id in movies]
+
+    def _popular_results(self, ranked, view):
+        movies = self.get_movies_data([movie_id for movie_id, _, _ in ranked], view=view)
+        return [dict(movies[movie_id], interaction_count=count, favorite_count=favorite_count)
+                for movie_id, count, favorite_count in ranked if movie_id in movies]
+
+    def get_top_rated_movies(self, limit=10, offset=0, view='detail'):
+        if not self._serves('favorites'):
+            return self.fallback.get_top_rated_movies(limit, offset, view=view)
+        ranked = self.snapshot.ranked('top_rated', offset, offset + limit if limit is not None else None)
+        return self._top_rated_results(ranked, view)
+
+    def get_top_rated_page(self, cursor=None, limit=PAGE_SIZE, view='card') -> Page:
+        if not self._serves('favorites'):
+            return self.fallback.get_top_rated_page(cursor, limit, view=view)
+        page = self._ranking_page('top_rated', cursor, limit)
+        return Page(self._top_rated_results(page.items, view), page.next_cursor)
+
+    def get_popular_movies(self, limit=10, offset=0, view='detail'):
+        if not self._serves('favorites'):
+            return self.fallback.get_popular_movies(limit, offset, view=view)
+        ranked = self.snapshot.ranked('popular', offset, offset + limit if limit is not None else None)
+        return self._popular_results(ranked, view)
+
+    def get_popular_page(self, cursor=None, limit=PAGE_SIZE, view='card') -> Page:
+        if not self._serves('favorites'):
+            return self.fallback.get_popular_page(cursor, limit, view=view)
+        page = self._ranking_page('popular', cursor, limit)
+        return Page(self._popular_results(page.items, view), page.next_cursor)
+
+    # --- Everything Else ---
+
+    def get_all_users(self):
+        return self.fallback.get_all_users()
+
+    def get_user_by_id(self, user_id):
+        return self.fallback.get_user_by_id(user_id)
+
+    def add_user(self, name, whatsapp_number, avatar_id=None, description=None):
+        return self.fallback.add_user(name, whatsapp_number, avatar_id=avatar_id, description=description)
+
+    def get_user_data(self, user_id):
+        return self.fallback.get_user_data(user_id)
+
+    def get_user_favorites(self, user_id):
+        return self.fallback.get_user_favorites(user_id)
+
+    def add_favorite(self, user_id, movie_id, **kwargs):
+        return self.fallback.add_favorite(user_id, movie_id, **kwargs)
+
+    def remove_favorite(self, user_id, movie_id):
+        return self.fallback.remove_favorite(user_id, movie_id)
+
+    def add_movie(self, movie_data):
+        return self.fallback.add_movie(movie_data)
+
+    def update_movie(self, movie_id, movie_data):
+        return self.fallback.update_movie(movie_id, movie_data)
+
+    def delete_movie(self, movie_id):
+        return self.fallback.delete_movie(movie_id)
@@ -0,0 +1,237 @@
+from .interface import (db, logger, DataVersion, User, Avatar, Movie, MovieOMDB, Category, StreamingPlatform,
+                        UserFavorite, MovieStats, AvatarMovieStats, AvatarCategoryStats, MovieNeighbor,
+                        movie_categories, movie_platforms)
+from flask import Response, g, has_app_context, make_response, request, session
+from functools import wraps
+from sqlalchemy import bindparam, event, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Optional
+import hashlib
+import os
+
+VERSIONS_MEMO_KEY = '_data_versions'
+
+VERSIONS_SQL = text("SELECT name, version FROM data_versions WHERE name IN :names") \
+    .bindparams(bindparam('names', expanding=True))
+
+# Which global version a write to each model / table bumps
+MODEL_VERSIONS = {
+    Movie: 'catalog',
+    MovieOMDB: 'catalog',
+    Category: 'catalog',
+    StreamingPlatform: 'catalog',
+    UserFavorite: 'favorites',
+    MovieStats: 'favorites',
+    AvatarMovieStats: 'favorites',
+    AvatarCategoryStats: 'favorites',
+    User: 'users',
+    Avatar: 'users',
+    MovieNeighbor: 'recommendations',
+}
+TABLE_VERSIONS = {model.__table__.name: name for model, name in MODEL_VERSIONS.items()}
+TABLE_VERSIONS[movie_categories.name] = 'catalog'
+TABLE_VERSIONS[movie_platforms.name] = 'catalog'
+
+
+def entity_versions(obj) -> Iterable[str]:
+    """Per-entity versions a written object bumps besides its global one."""
+    if isinstance(obj, (Movie, MovieOMDB)):
+        return (f"movie:{obj.id}",)
+    if isinstance(obj, UserFavorite):
+        return (f"movie:{obj.movie_id}", f"user:{obj.user_id}")
+    if isinstance(obj, User):
+        return (f"user:{obj.id}",)
+    return ()
+
+
+# The app's own code; everything else under the root (venv, data, static files) is left out
+CODE_PATHS = ('app.py', 'wsgi.py', 'api', 'datamanager', 'templates')
+
+
+def code_fingerprint(root: str) -> str:
+    """Hash of the paths, sizes and mtimes of the app's Python files and templates."""
+    digest = hashlib.sha1()
+    for path in CODE_PATHS:
+        path = os.path.join(root, path)
+        files = [path] if os.path.isfile(path) else []
+        for directory, subdirectories, filenames in os.walk(path):
+            subdirectories[:] = sorted(d for d in subdirectories if d != '__pycache__' and not d.startswith('.'))
+            files += [os.path.join(directory, filename) for filename in sorted(filenames)]
+        for filename in files:
+            if filename.endswith(('.py', '.html')):
+                stat = os.stat(filename)
+                digest.update(f"{os.path.relpath(filename, root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:12]
+
+
+class DataVersions:
+    """
+    Write counters of the data behind the pages, kept in the data_versions table, and
+    the conditional GET handling built on them.
+
+    Global versions are 'catalog', 'favorites', 'users' and 'recommendations', entity
+    versions 'movie:<id>' (the movie, its OMDB data and interactions) and 'user:<id>'
+    (the user and their interactions). Every write bumps its versions in the same
+    transaction, so all workers see them, a rollback discards them and they survive a
+    restart; the random 'epoch' row keeps a replaced database file from reviving old
+    ETags. Raw SQL writes are not seen and must call bump() themselves.
+
+    Configured from app.config:
+        CONDITIONAL_GET  answer If-None-Match with 304 on decorated routes (True)
+        ETAG_VERSION     code version mixed into every ETag (a fingerprint of the
+                         app's Python files and templates)
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.code_version = ''
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CONDITIONAL_GET', True)
+        self.code_version = app.config.get('ETAG_VERSION') or code_fingerprint(app.root_path)
+
+    def get(self, *names: str) -> Dict[str, int]:
+        """Current versions of the names plus 'epoch' (0 for a name never bumped)."""
+        wanted = sorted(set(names) | {'epoch'})
+        versions = dict.fromkeys(wanted, 0)
+        versions.update(db.session.execute(VERSIONS_SQL, {'names': wanted}).all())
+        return versions
+
+    def current(self, *names: str) -> Dict[str, int]:
+        """
+        Like get(), but each name is read once per request: the ETag and the caches the
+        page is built from (section cache keys, catalog snapshot) see the same versions.
+        A commit in the request drops what was read.
+        """
+        if not has_app_context():
+            return self.get(*names)
+        memo = g.setdefault(VERSIONS_MEMO_KEY, {})
+        wanted = sorted(set(names) | {'epoch'})
+        missing = [name for name in wanted if name not in memo]
+        if missing:
+            memo.update(self.get(*missing))
+        return {name: memo[name] for name in wanted}
+
+    def bump(self, *names: str):
+        """Bump versions after writes the session hooks can't see (raw SQL), in a transaction of its own."""
+        try:
+            bump_versions(db.session.connection(), names)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error bumping data versions {names}: {e}")
+
+    def etag(self, *names: str, extra: str = '') -> Optional[str]:
+        """Strong ETag of the current versions of `names`; None if they can't be read."""
+        try:
+            versions = self.current(*names)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error reading data versions {names}: {e}")
+            return None
+        state = ';'.join(f"{name}={version}" for name, version in versions.items())
+        return hashlib.sha1(f"{self.code_version}|{extra}|{state}".encode()).hexdigest()[:20]
+
+    def conditional(self, *names: str, per_viewer=True):
+        """
+        Route decorator: ETag the response with the versions of `names` and answer a
+        matching If-None-Match with 304 before the view runs. Names are formatted with
+        the view arguments ('movie:{movie_id}'). With `per_viewer` the logged in user
+        (from the session, without loading it) and their 'user:<id>' version are part
+        of the tag. Responses are always private: shared caches must not hand a page
+        behind a login to someone else.
+
+        The versions are read before the view builds the page, so a write in between
+        only makes the page newer than its tag, and the next request re-renders it.
+        The per-process caches behind the page are keyed on the same reads (see
+        current()), so a write of another worker never leaves a stale cached section
+        under a new tag.
+        Place it above @login_required, so a 304 costs one query; without `per_viewer`
+        the tag says nothing about the viewer, so put @login_required above it instead.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapped(*args, **kwargs):
+                # Pending flash messages are shown once and must not be skipped by a 304
+                if not self.enabled or request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                    return view(*args, **kwargs)
+                keys = [name.format(**kwargs) for name in names]
+                viewer = session.get('_user_id') if per_viewer else None
+                if viewer is not None:
+                    keys.append(f"user:{viewer}")
+                etag = self.etag(*keys, extra=f"{request.path}?{request.query_string.decode()}:{viewer}")
+                if etag is None:
+                    return view(*args, **kwargs)
+
+                if etag in request.if_none_match:
+                    response = Response(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                response.vary.add('Cookie')
+                return response
+            return wrapped
+        return decorator
+
+
+def bump_versions(connection, names: Iterable[str]):
+    """Add one to each version, creating missing rows; runs in the connection's transaction."""
+    names = sorted(set(names))
+    if not names:
+        return
+    table = DataVersion.__table__
+    statement = sqlite_insert(table).on_conflict_do_update(index_elements=['name'], set_={'version': table.c.version + 1})
+    connection.execute(statement, [{'name': name, 'version': 1} for name in names])
+
+
+def track_versions(session, names: Iterable[str]):
+    """Bump versions with the session's next commit, for Core writes whose rows the flush hooks never see."""
+    session.info.setdefault('data_versions', set()).update(names)
+
+
+# --- Write Tracking ---
+# Flushed objects are bumped right away in the flush's transaction. Bulk statements
+# (association tables, recommender rebuilds) are collected and bumped before commit.
+
+@event.listens_for(Session, 'after_flush')
+def _bump_flushed_versions(session, flush_context):
+    names = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = MODEL_VERSIONS.get(type(obj))
+        if name:
+            names.add(name)
+            names.update(entity_versions(obj))
+    if names:
+        bump_versions(session.connection(), names)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_statement_versions(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        name = TABLE_VERSIONS.get(getattr(table, 'name', None))
+        if name:
+            orm_execute_state.session.info.setdefault('data_versions', set()).add(name)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_statement_versions(session):
+    names = session.info.pop('data_versions', None)
+    if names:
+        bump_versions(session.connection(), names)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_statement_versions(session):
+    session.info.pop('data_versions', None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_read_versions(session):
+    # Reads after a write of this request must see the bumped versions
+    if has_app_context():
+        g.pop(VERSIONS_MEMO_KEY, None)
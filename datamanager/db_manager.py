@@ -1,17 +1,76 @@
-from .interface import db, DataManagerInterface, User, Movie, Category, StreamingPlatform, UserFavorite, MovieOMDB, logger, Rating, Avatar
+from .interface import db, DataManagerInterface, User, Movie, Category, StreamingPlatform, UserFavorite, MovieOMDB, MovieStats, AvatarMovieStats, AvatarCategoryStats, MovieNeighbor, logger, Rating, Avatar, movie_categories, movie_platforms
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import joinedload, subqueryload
 from typing import Dict, List, Optional, Any
+from datetime import date
+from calendar import monthrange
 import os
-from flask import current_app
+from flask import current_app, g, has_app_context
 from flask_login import current_user
 from sqlalchemy.sql import func, and_
-from sqlalchemy import text
+from sqlalchemy import text, event, bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .search_index import MovieSearchIndex
+from .recommender import ItemItemRecommender
+from .projections import MOVIE_PROJECTIONS
+from .section_cache import SectionCache
+from .identity_cache import IdentityCache
+from .data_versions import DataVersions, track_versions
+from .sqlite_profile import SQLiteProfile
+from .migrations import MigrationRunner, backfill_release_dates
+from .pagination import PAGE_SIZE, Page, decode_cursor, keyset_page
+
+MOVIE_MEMO_KEY = '_movie_data_memo'
+
+# Boolean interaction flags of a user_favorites row
+INTERACTION_ATTRIBUTES = ('watched', 'watchlist', 'favorite')
+
+# Distinct favorited movies per avatar and category; a movie counts for its linked
+# categories and its primary category, once each
+AVATAR_CATEGORY_STATS_SQL = """
+    INSERT INTO avatar_category_stats (avatar_id, category_id, movie_count)
+    SELECT ams.avatar_id, mc.category_id, COUNT(*)
+    FROM avatar_movie_stats ams
+    JOIN (
+        SELECT movie_id, category_id FROM movie_categories
+        UNION
+        SELECT id, category_id FROM movies WHERE category_id IS NOT NULL
+    ) mc ON mc.movie_id = ams.movie_id
+    {where}
+    GROUP BY ams.avatar_id, mc.category_id
+"""
+
+
+def _movie_memo():
+    """Per-request cache of serialized movies, keyed by (viewer ID, movie ID)."""
+    if not has_app_context():
+        return None
+    if MOVIE_MEMO_KEY not in g:
+        setattr(g, MOVIE_MEMO_KEY, {})
+    return getattr(g, MOVIE_MEMO_KEY)
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_movie_memo(session):
+    """Any committed write may change a serialized movie, so drop the memo."""
+    if has_app_context():
+        g.pop(MOVIE_MEMO_KEY, None)
+
 
 class SQLiteDataManager(DataManagerInterface):
     """SQLite implementation of the Data Manager Interface."""
     def __init__(self):
         self.db = db
+        self.search_index = MovieSearchIndex()
+        self.section_cache = SectionCache()
+        self.identity_cache = IdentityCache()
+        self.data_versions = DataVersions()
+        # Section cache keys follow the shared versions the ETags are made of
+        self.section_cache.versions = self.data_versions.current
+        self.recommender = ItemItemRecommender()
+        self.sqlite_profile = SQLiteProfile()
+        self.migrations = MigrationRunner()
 
     def init_app(self, app):
         """Initialize DB with Flask app."""
@@ -20,10 +79,54 @@ class SQLiteDataManager(DataManagerInterface):
             db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/senflix.sqlite'))
             app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        self.sqlite_profile.init_app(app)
         db.init_app(app)
-        # Create tables if they don't exist
+        self.section_cache.init_app(app)
+        self.identity_cache.init_app(app)
+        self.data_versions.init_app(app)
         with app.app_context():
-            self.db.create_all()
+            self.sqlite_profile.attach()
+            if app.config.get('SCHEMA_SETUP', True):
+                self.setup_schema()
+            else:
+                self.check_schema()
+
+    def setup_schema(self) -> List[int]:
+        """
+        Create missing tables, apply pending migrations and fill the derived tables of
+        databases created before they existed. Returns the applied migration versions.
+        """
+        applied = self.migrations.upgrade()
+        # Populate movie_stats on databases created before the table existed
+        if not MovieStats.query.first() and UserFavorite.query.first():
+            self.rebuild_movie_stats()
+        if not AvatarMovieStats.query.first() and UserFavorite.query.filter_by(favorite=True).first():
+            self.rebuild_avatar_stats()
+        if not MovieNeighbor.query.first() and UserFavorite.query.first():
+            self.rebuild_recommendations(full=True)
+        self.search_index.create()
+        return applied
+
+    def check_schema(self) -> bool:
+        """
+        Startup without SCHEMA_SETUP (serverless): one read of the schema version and
+        the search table instead of setup_schema(), which takes the write lock once per
+        migration. An outdated database is logged, not upgraded; returns whether it is current.
+        """
+        try:
+            version, searchable = db.session.execute(text("""
+                SELECT (SELECT user_version FROM pragma_user_version),
+                       EXISTS (SELECT 1 FROM sqlite_master WHERE name = :table)
+            """), {'table': self.search_index.TABLE}).one()
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error checking the schema version: {e}")
+            return False
+        self.search_index.available = bool(searchable)
+        if version < self.migrations.latest:
+            logger.error(f"Database schema is at version {version}, the app needs {self.migrations.latest}: "
+                         f"run `flask db-upgrade` before deploying")
+            return False
+        return True
 
     # --- Private Helper Methods ---
 
@@ -46,6 +149,195 @@ class SQLiteDataManager(DataManagerInterface):
             logger.error(f"DB Error listing {model.__name__}: {e}")
             return []
 
+    def _favorite_state(self, fav):
+        """Snapshot the counted fields of a UserFavorite or user_favorites row (None if it doesn't exist)."""
+        if fav is None:
+            return None
+        return {
+            'watched': bool(fav.watched),
+            'watchlist': bool(fav.watchlist),
+            'favorite': bool(fav.favorite),
+            'rating': fav.rating
+        }
+
+    def _write_favorite(self, user_id, movie_id, new_row: Dict[str, Any], changes: Dict[str, Any]):
+        """
+        Write the user_favorites row of a user and movie, update the stats and queue the
+        recommendations; returns its (before, after) states, or None when the user or the
+        movie doesn't exist.
+
+        `new_row` holds the columns of a row that is created, `changes` the values or SQL
+        expressions set on an existing one. SQLite has no SELECT ... FOR UPDATE, so a no-op
+        UPDATE ... RETURNING reads the current state and takes the write lock in one
+        statement; INSERT ... ON CONFLICT DO UPDATE ... RETURNING then writes the row and
+        returns its new state. No other writer gets in between, so two quick clicks or two
+        workers never both start from the same old state, and the stats deltas add up.
+        Runs inside the caller's transaction; the caller commits.
+        """
+        table = UserFavorite.__table__
+        state = (table.c.watched, table.c.watchlist, table.c.favorite, table.c.rating)
+        key = (table.c.user_id == user_id) & (table.c.movie_id == movie_id)
+        before = self._favorite_state(db.session.execute(
+            table.update().where(key).values(user_id=table.c.user_id).returning(*state)
+        ).first())
+
+        # INSERT ... SELECT, so an unknown user or movie inserts nothing instead of an orphan row
+        columns = dict(new_row, user_id=user_id, movie_id=movie_id)
+        known = db.select(User.id).where(User.id == user_id).exists() & \
+            db.select(Movie.id).where(Movie.id == movie_id).exists()
+        stmt = sqlite_insert(table).from_select(
+            list(columns), db.select(*[db.literal(value, table.c[name].type) for name, value in columns.items()]).where(known)
+        ).on_conflict_do_update(
+            index_elements=['user_id', 'movie_id'], set_=changes or {'user_id': table.c.user_id}
+        ).returning(*state)
+        after = self._favorite_state(db.session.execute(stmt).first())
+        if after is None:
+            return None
+        self._update_movie_stats(movie_id, before, after)
+        self._update_avatar_stats(user_id, movie_id, before, after)
+        if before != after:
+            self.recommender.queue_user_movies(user_id, movie_id)
+        # The row is written with Core, so the flush hooks can't bump its entity versions
+        track_versions(db.session, (f"movie:{movie_id}", f"user:{user_id}"))
+        return before, after
+
+    def _delete_favorite(self, user_id, movie_id):
+        """
+        Delete the user_favorites row of a user and movie and update the stats; returns
+        its old state, or None when there was none. Runs inside the caller's transaction.
+        """
+        table = UserFavorite.__table__
+        # DELETE ... RETURNING: only one of two concurrent removals gets the row back
+        before = self._favorite_state(db.session.execute(
+            table.delete().where((table.c.user_id == user_id) & (table.c.movie_id == movie_id))
+            .returning(table.c.watched, table.c.watchlist, table.c.favorite, table.c.rating)
+        ).first())
+        if before is None:
+            return None
+        self._update_movie_stats(movie_id, before, None)
+        self._update_avatar_stats(user_id, movie_id, before, None)
+        self.recommender.queue_user_movies(user_id, movie_id)
+        track_versions(db.session, (f"movie:{movie_id}", f"user:{user_id}"))
+        return before
+
+    @staticmethod
+    def _upsert_values(**values):
+        """(new_row, changes) of _write_favorite() for upsert_favorite() style values; None means keep."""
+        new_row = {name: values.get(name) or False for name in INTERACTION_ATTRIBUTES}
+        new_row.update(rating=values.get('rating'), comment=values.get('comment'))
+        changes = {name: value for name, value in values.items() if value is not None}
+        return new_row, changes
+
+    @staticmethod
+    def _toggle_values(attribute):
+        """(new_row, changes) of _write_favorite() that flip one boolean attribute in SQL."""
+        new_row = dict.fromkeys(INTERACTION_ATTRIBUTES, False)
+        new_row[attribute] = True
+        return new_row, {attribute: ~func.coalesce(UserFavorite.__table__.c[attribute], False)}
+
+    def _update_movie_stats(self, movie_id, before, after):
+        """
+        Apply the difference between two favorite states to movie_stats.
+        Runs inside the caller's transaction; the caller commits.
+        """
+        delta = dict(rating_sum=0.0, rating_count=0, interaction_count=0,
+                     favorite_count=0, watched_count=0, watchlist_count=0)
+        for state, sign in ((before, -1), (after, 1)):
+            if state is None:
+                continue
+            delta['interaction_count'] += sign
+            delta['favorite_count'] += sign * int(state['favorite'])
+            delta['watched_count'] += sign * int(state['watched'])
+            delta['watchlist_count'] += sign * int(state['watchlist'])
+            if state['rating'] is not None:
+                delta['rating_sum'] += sign * state['rating']
+                delta['rating_count'] += sign
+
+        if not any(delta.values()):
+            return
+
+        # Atomic increment: insert the delta or add it to the existing row
+        table = MovieStats.__table__
+        stmt = sqlite_insert(table).values(
+            movie_id=movie_id,
+            rating_avg=(delta['rating_sum'] / delta['rating_count']) if delta['rating_count'] > 0 else None,
+            **delta
+        )
+        new_sum = table.c.rating_sum + stmt.excluded.rating_sum
+        new_count = table.c.rating_count + stmt.excluded.rating_count
+        update_values = {key: getattr(table.c, key) + getattr(stmt.excluded, key) for key in delta}
+        update_values['rating_avg'] = db.case((new_count > 0, new_sum / new_count), else_=None)
+        db.session.execute(stmt.on_conflict_do_update(index_elements=['movie_id'], set_=update_values))
+
+    def _movie_category_ids(self, movie_id):
+        """Linked categories plus the primary category of a movie."""
+        rows = db.session.execute(text("""
+            SELECT category_id FROM movie_categories WHERE movie_id = :movie_id
+            UNION
+            SELECT category_id FROM movies WHERE id = :movie_id AND category_id IS NOT NULL
+        """), {'movie_id': movie_id}).all()
+        return [row[0] for row in rows]
+
+    def _update_avatar_stats(self, user_id, movie_id, before, after):
+        """
+        Apply a change of the favorite flag to the user's avatar cohort: the movie's
+        favorite count, and the category counts when the movie enters or leaves the
+        cohort's favorites. Runs inside the caller's transaction; the caller commits.
+        """
+        delta = int(bool(after and after['favorite'])) - int(bool(before and before['favorite']))
+        if not delta:
+            return
+        avatar_id = db.session.query(User.avatar_id).filter(User.id == user_id).scalar()
+        if avatar_id is None:
+            return
+
+        table = AvatarMovieStats.__table__
+        stmt = sqlite_insert(table).values(avatar_id=avatar_id, movie_id=movie_id, favorite_count=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['avatar_id', 'movie_id'],
+            set_={'favorite_count': table.c.favorite_count + stmt.excluded.favorite_count}
+        ).returning(table.c.favorite_count)
+        new_count = db.session.execute(stmt).scalar()
+        if new_count <= 0:
+            db.session.execute(table.delete().where(
+                (table.c.avatar_id == avatar_id) & (table.c.movie_id == movie_id)
+            ))
+
+        entered, left = (delta > 0 and new_count == 1), new_count == 0
+        category_ids = self._movie_category_ids(movie_id) if entered or left else []
+        if not category_ids:
+            return
+        category_table = AvatarCategoryStats.__table__
+        category_stmt = sqlite_insert(category_table).values([
+            {'avatar_id': avatar_id, 'category_id': category_id, 'movie_count': 1 if entered else -1}
+            for category_id in category_ids
+        ])
+        db.session.execute(category_stmt.on_conflict_do_update(
+            index_elements=['avatar_id', 'category_id'],
+            set_={'movie_count': category_table.c.movie_count + category_stmt.excluded.movie_count}
+        ))
+        if left:
+            db.session.execute(category_table.delete().where(
+                (category_table.c.avatar_id == avatar_id) & (category_table.c.movie_count <= 0)
+            ))
+
+    def _refresh_avatar_category_stats(self, avatar_ids):
+        """Recount the category stats of some avatars, after a movie's categories changed."""
+        if not avatar_ids:
+            return
+        table = AvatarCategoryStats.__table__
+        db.session.execute(table.delete().where(table.c.avatar_id.in_(avatar_ids)))
+        db.session.execute(
+            text(AVATAR_CATEGORY_STATS_SQL.format(where='WHERE ams.avatar_id IN :avatar_ids'))
+            .bindparams(bindparam('avatar_ids', expanding=True)),
+            {'avatar_ids': list(avatar_ids)}
+        )
+
+    def _movie_avatar_ids(self, movie_id):
+        """Avatars whose users have favorited a movie."""
+        rows = db.session.query(AvatarMovieStats.avatar_id).filter(AvatarMovieStats.movie_id == movie_id).all()
+        return [row.avatar_id for row in rows]
+
     def _add_watched_avatars_to_movies(self, movies: List[Dict], limit_avatars=3):
         """
         This method is kept for backward compatibility but no longer adds avatar data,
@@ -62,9 +354,13 @@ class SQLiteDataManager(DataManagerInterface):
         return [u.to_dict() for u in users]
 
     def get_user_by_id(self, user_id):
-        """Get a single user by ID as dictionary."""
-        user = self._get(User, id=user_id)
-        return user.to_dict() if user else None
+        """Get a single user by ID as dictionary (from the identity cache)."""
+        try:
+            user = self.identity_cache.get_user(user_id)
+            return user.to_dict() if user else None
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting User with id={user_id}: {e}")
+            return None
 
     def add_user(self, name, whatsapp_number, avatar_id=None, description=None):
         """Add a new user."""
@@ -127,31 +423,62 @@ class SQLiteDataManager(DataManagerInterface):
 
     def get_movie_data(self, movie_id):
         """Get detailed data for a single movie."""
-        try:
-            # Eager load necessary relationships
-            movie = Movie.query.options(
-                joinedload(Movie.omdb_data), 
-                subqueryload(Movie.categories),
-                subqueryload(Movie.streaming_platforms)
-            ).get(movie_id)
-            
-            result = movie.to_dict() if movie else None
-            
-            # Check if user is logged in and add user-specific status
-            if result and current_user and hasattr(current_user, 'id') and current_user.is_authenticated:
-                # Get user favorite data if exists
-                user_favorite = UserFavorite.query.get((current_user.id, movie_id))
-                if user_favorite:
-                    # Add user status to movie data
-                    result['user_watched'] = user_favorite.watched
-                    result['user_watchlist'] = user_favorite.watchlist
-                    result['user_rated'] = user_favorite.rating is not None
-                    result['user_favorite'] = user_favorite.favorite
-            
-            return result
-        except Exception as e:
-            logger.error(f"Error getting movie data for {movie_id}: {e}", exc_info=True) # Add exc_info for traceback
-            return None
+        return self.get_movies_data([movie_id]).get(movie_id)
+
+    def get_movies_data(self, movie_ids, viewer=None, view='detail') -> Dict[int, Dict]:
+        """
+        Get data for many movies at once, keyed by movie ID.
+
+        `view` names a projection from MOVIE_PROJECTIONS: 'detail' returns full
+        Movie.to_dict() dictionaries, 'card' returns compact MovieCard records with only
+        the columns a poster card needs. Either way a fixed number of queries runs
+        however many IDs are passed, plus one for the viewer's UserFavorite flags.
+        Results are memoized for the rest of the request, so a movie shown in several
+        sections of a page is only built once. Detail dicts and cards are returned as
+        copies, callers may modify them.
+        """
+        loader = MOVIE_PROJECTIONS[view]
+        if viewer is None:
+            viewer = current_user
+        viewer_id = viewer.id if viewer and getattr(viewer, 'is_authenticated', False) else None
+
+        memo = _movie_memo()
+        if memo is None:
+            memo = {}
+        # Keep the order of the requested IDs and skip duplicates / empty values
+        wanted = [m_id for m_id in dict.fromkeys(movie_ids) if m_id is not None]
+        missing = [m_id for m_id in wanted if (view, viewer_id, m_id) not in memo]
+
+        if missing:
+            try:
+                loaded = loader(missing)
+
+                # Add the viewer's status flags in a single query
+                if viewer_id is not None and loaded:
+                    statuses = db.session.query(
+                        UserFavorite.movie_id, UserFavorite.watched, UserFavorite.watchlist,
+                        UserFavorite.rating, UserFavorite.favorite
+                    ).filter(
+                        UserFavorite.user_id == viewer_id,
+                        UserFavorite.movie_id.in_(loaded.keys())
+                    ).all()
+                    for fav in statuses:
+                        loaded[fav.movie_id].update({
+                            'user_watched': fav.watched,
+                            'user_watchlist': fav.watchlist,
+                            'user_rated': fav.rating is not None,
+                            'user_favorite': fav.favorite
+                        })
+                # Unknown IDs are remembered too, so they are not queried again
+                for m_id in missing:
+                    memo[(view, viewer_id, m_id)] = loaded.get(m_id)
+            except Exception as e:
+                logger.error(f"Error getting movie data for {missing}: {e}", exc_info=True) # Add exc_info for traceback
+
+        return {
+            m_id: memo[(view, viewer_id, m_id)].copy()
+            for m_id in wanted if memo.get((view, viewer_id, m_id)) is not None
+        }
 
     def add_movie(self, data: Dict[str, Any]):
         """Add a new movie with optional relations."""
@@ -176,6 +503,8 @@ class SQLiteDataManager(DataManagerInterface):
                 movie.categories.extend(categories)
 
             db.session.add(movie)
+            db.session.flush()
+            self.search_index.index_movie(movie.id)
             db.session.commit()
             # Return the full data of the newly added movie
             return self.get_movie_data(movie.id)
@@ -225,7 +554,11 @@ class SQLiteDataManager(DataManagerInterface):
             if category_ids is not None:
                 categories = Category.query.filter(Category.id.in_(category_ids)).all()
                 movie.categories = categories # Replace existing categories
+            if category_ids is not None or 'category_id' in data:
+                db.session.flush()
+                self._refresh_avatar_category_stats(self._movie_avatar_ids(movie_id))
 
+            self.search_index.index_movie(movie_id)
             db.session.commit()
             # Return full data after update
             return self.get_movie_data(movie_id)
@@ -247,7 +580,12 @@ class SQLiteDataManager(DataManagerInterface):
                 # Handle related OMDB data if needed (cascade should handle it)
                 # Handle UserFavorite manually if cascade is not set or fails
                 # UserFavorite.query.filter_by(movie_id=movie_id).delete()
+                self.search_index.remove_movie(movie_id)
+                avatar_ids = self._movie_avatar_ids(movie_id)
+                self.recommender.remove_movie(movie_id)
                 db.session.delete(movie)
+                db.session.flush()
+                self._refresh_avatar_category_stats(avatar_ids)
                 db.session.commit()
                 return True
             logger.warning(f"Delete failed: Movie with ID {movie_id} not found.")
@@ -265,98 +603,59 @@ class SQLiteDataManager(DataManagerInterface):
                         rating: Optional[float] = None, 
                         watchlist: Optional[bool] = None,
                         favorite: Optional[bool] = None): # Add favorite parameter
-        """Add or update a user's favorite/interaction entry for a movie."""
+        """
+        Add or update a user's favorite/interaction entry for a movie. A new entry gets
+        the given values (False / None for the rest), an existing one only the values
+        that are not None; an empty comment clears the comment.
+        """
+        new_row, changes = self._upsert_values(watched=watched, watchlist=watchlist, favorite=favorite,
+                                               rating=rating, comment=comment)
         try:
-            # First check if user and movie exist
-            user = User.query.get(user_id)
-            if not user:
-                logger.error(f"upsert_favorite: User with ID {user_id} does not exist")
+            result = self._write_favorite(user_id, movie_id, new_row, changes)
+            if result is None:
+                db.session.rollback()
+                logger.error(f"upsert_favorite: User {user_id} or movie {movie_id} does not exist")
                 return False
-                
-            movie = Movie.query.get(movie_id)
-            if not movie:
-                logger.error(f"upsert_favorite: Movie with ID {movie_id} does not exist")
-                return False
-                
-            fav = UserFavorite.query.get((user_id, movie_id))
-            if not fav:
-                # Create new entry if it doesn't exist
-                fav = UserFavorite(user_id=user_id, movie_id=movie_id)
-                db.session.add(fav)
-                # Set initial values explicitly, respecting defaults in model if None is passed
-                fav.watched = watched if watched is not None else False
-                fav.watchlist = watchlist if watchlist is not None else False
-                fav.favorite = favorite if favorite is not None else False # Set initial favorite
-                fav.rating = rating
-                fav.comment = comment
-                logger.info(f"New rating created: User {user_id}, Movie {movie_id}, Rating: {rating}")
-            else:
-                # Update existing entry only if values are provided
-                if watched is not None: fav.watched = watched
-                if watchlist is not None: fav.watchlist = watchlist
-                if favorite is not None: fav.favorite = favorite # Update favorite status
-                if rating is not None: fav.rating = rating
-                 # Allow clearing comment by passing empty string, but not None
-                if comment is not None: fav.comment = comment
-                logger.info(f"Existing rating updated: User {user_id}, Movie {movie_id}, Rating: {rating}")
-                # Set watched=True if user rates or comments? Common pattern.
-                # if rating is not None or (comment is not None and comment.strip() != ''):
-                #    fav.watched = True 
-
+            before, after = result
+            logger.info(f"{'New' if before is None else 'Existing'} rating {'created' if before is None else 'updated'}: "
+                        f"User {user_id}, Movie {movie_id}, Rating: {rating}")
             db.session.commit()
             return True # Indicate success
         except SQLAlchemyError as e:
             db.session.rollback()
-            logger.error(f"DB Error upserting favorite for user {user_id}, movie {movie_id}: {e}")
-            # Log additional details for easier debugging
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error(f"DB Error upserting favorite for user {user_id}, movie {movie_id}: {e}", exc_info=True)
             return False
         except Exception as e: # Catch potential non-DB errors
             db.session.rollback()
-            logger.error(f"General error upserting favorite for user {user_id}, movie {movie_id}: {e}")
-            # Log stacktrace for better debugging
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error(f"General error upserting favorite for user {user_id}, movie {movie_id}: {e}", exc_info=True)
             return False
 
     def toggle_user_favorite_attribute(self, user_id: int, movie_id: int, attribute: str):
-        """Toggles a boolean attribute (watched, watchlist, favorite) for a UserFavorite entry."""
-        allowed_attributes = ['watched', 'watchlist', 'favorite']
-        if attribute not in allowed_attributes:
+        """
+        Toggles a boolean attribute (watched, watchlist, favorite) for a UserFavorite entry,
+        creating the entry with only that attribute set. The flip happens in SQL, so
+        concurrent toggles are applied one after the other and none is lost.
+        """
+        if attribute not in INTERACTION_ATTRIBUTES:
             logger.error(f"Invalid attribute '{attribute}' for toggling.")
             return {'error': f"Invalid attribute '{attribute}'"}
 
         try:
-            fav = UserFavorite.query.get((user_id, movie_id))
-            current_value = False
-            if not fav:
-                fav = UserFavorite(user_id=user_id, movie_id=movie_id)
-                db.session.add(fav)
-                # Set default values for other fields if creating new
-                fav.watched = False
-                fav.watchlist = False
-                fav.favorite = False
-                # Set the target attribute to True since it's being toggled from non-existence
-                setattr(fav, attribute, True)
-                current_value = False # Effective previous value was false
-            else:
-                current_value = getattr(fav, attribute, False)
-                setattr(fav, attribute, not current_value)
-
-            # Optional: Set watched=True if adding to watchlist or favorite?
-            # if attribute in ['watchlist', 'favorite'] and getattr(fav, attribute):
-            #     fav.watched = True # Or maybe only if rating/comment?
-
+            result = self._write_favorite(user_id, movie_id, *self._toggle_values(attribute))
+            if result is None:
+                db.session.rollback()
+                logger.error(f"Toggle '{attribute}': User {user_id} or movie {movie_id} does not exist")
+                return {'error': 'User or movie not found'}
+            before, after = result
             db.session.commit()
             
             # Return the new state for all attributes
             return {
                 'success': True, 
-                'new_state': not current_value,
-                'user_watched': fav.watched,
-                'user_watchlist': fav.watchlist,
-                'user_rated': fav.rating is not None
+                'new_state': after[attribute],
+                'user_watched': after['watched'],
+                'user_watchlist': after['watchlist'],
+                'user_rated': after['rating'] is not None
             }
 
         except SQLAlchemyError as e:
@@ -378,17 +677,96 @@ class SQLiteDataManager(DataManagerInterface):
     def remove_favorite(self, user_id: int, movie_id: int):
         """Remove a user's favorite/interaction entry for a movie."""
         try:
-            fav = UserFavorite.query.get((user_id, movie_id))
-            if fav:
-                db.session.delete(fav)
-                db.session.commit()
-                return True
-            return False # Return False if not found
+            if self._delete_favorite(user_id, movie_id) is None:
+                db.session.rollback()
+                return False # Return False if not found
+            db.session.commit()
+            return True
         except SQLAlchemyError as e:
             db.session.rollback()
             logger.error(f"DB Error removing favorite for user {user_id}, movie {movie_id}: {e}")
             return False
 
+    def apply_interactions(self, user_id: int, operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Apply a batch of one user's interactions in a single transaction and return one
+        result per operation, in order. An operation is one of
+
+            {'movie_id': 1, 'action': 'toggle', 'attribute': 'watched' | 'watchlist' | 'favorite'}
+            {'movie_id': 1, 'action': 'set', 'watched': True, 'favorite': False}  (any of the flags)
+            {'movie_id': 1, 'action': 'rate', 'rating': 8, 'comment': 'Great'}     (also marks it watched)
+            {'movie_id': 1, 'action': 'remove'}
+
+        and its result {'movie_id', 'success': True, 'user_watched', 'user_watchlist',
+        'user_favorite', 'user_rated'} with the row's new state, or {'movie_id',
+        'success': False, 'error'}. An invalid operation, an unknown movie or removing a
+        movie the user has no entry for fails on its own; a database error rolls the whole
+        batch back and fails every operation.
+        """
+        results = []
+        try:
+            for operation in operations:
+                movie_id = operation.get('movie_id') if isinstance(operation, dict) else None
+                try:
+                    values = self._interaction_values(operation)
+                except ValueError as e:
+                    results.append({'movie_id': movie_id, 'success': False, 'error': str(e)})
+                    continue
+                if values is None:
+                    if self._delete_favorite(user_id, movie_id) is None:
+                        results.append({'movie_id': movie_id, 'success': False, 'error': 'Nothing to remove'})
+                        continue
+                    after = {'watched': False, 'watchlist': False, 'favorite': False, 'rating': None}
+                else:
+                    written = self._write_favorite(user_id, movie_id, *values)
+                    if written is None:
+                        results.append({'movie_id': movie_id, 'success': False, 'error': 'User or movie not found'})
+                        continue
+                    after = written[1]
+                results.append({
+                    'movie_id': movie_id,
+                    'success': True,
+                    'user_watched': after['watched'],
+                    'user_watchlist': after['watchlist'],
+                    'user_favorite': after['favorite'],
+                    'user_rated': after['rating'] is not None
+                })
+            db.session.commit()
+            return results
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error applying {len(operations)} interactions for user {user_id}: {e}")
+            return [{'movie_id': operation.get('movie_id') if isinstance(operation, dict) else None,
+                     'success': False, 'error': 'Database error'} for operation in operations]
+
+    def _interaction_values(self, operation):
+        """Validate an apply_interactions() operation; (new_row, changes) of _write_favorite(), None to remove."""
+        if not isinstance(operation, dict):
+            raise ValueError('Operation must be an object')
+        movie_id, action = operation.get('movie_id'), operation.get('action')
+        if not isinstance(movie_id, int) or isinstance(movie_id, bool):
+            raise ValueError('movie_id must be an integer')
+        if action == 'remove':
+            return None
+        if action == 'toggle':
+            attribute = operation.get('attribute')
+            if attribute not in INTERACTION_ATTRIBUTES:
+                raise ValueError(f"Invalid attribute '{attribute}'")
+            return self._toggle_values(attribute)
+        if action == 'set':
+            flags = {name: operation[name] for name in INTERACTION_ATTRIBUTES if name in operation}
+            if not flags or not all(isinstance(value, bool) for value in flags.values()):
+                raise ValueError('set needs a boolean watched, watchlist or favorite')
+            return self._upsert_values(**flags)
+        if action == 'rate':
+            rating, comment = operation.get('rating'), operation.get('comment')
+            if not isinstance(rating, (int, float)) or isinstance(rating, bool) or not 0 <= rating <= 10:
+                raise ValueError('rating must be a number from 0 to 10')
+            if comment is not None and not isinstance(comment, str):
+                raise ValueError('comment must be a string')
+            return self._upsert_values(rating=float(rating), comment=comment, watched=True)
+        raise ValueError(f"Unknown action '{action}'")
+
     def get_user_favorites(self, user_id):
         """Get all favorite/interaction entries for a user."""
         # This is often handled by get_user_data which eager loads. 
@@ -477,22 +855,45 @@ class SQLiteDataManager(DataManagerInterface):
             logger.error(f"DB Error getting categories for movie {movie_id}: {e}")
             return []
 
-    def get_movies_by_category(self, category_id: int):
-        """Get movies belonging to a specific category."""
+    def _category_movie_ids(self, category_id: int) -> List[int]:
+        """IDs of the movies of a category, in ID order ([] for an unknown category)."""
         try:
             # Find movies linked via the association table or the direct foreign key
             category = Category.query.get(category_id)
             if not category: return []
             
-            movies = Movie.query.filter(
-                (Movie.categories.any(id=category_id)) | (Movie.category_id == category_id)
-            ).options(joinedload(Movie.omdb_data)).all() # Fetch OMDB data too
-            
-            return [m.to_dict() for m in movies]
+            return self.section_cache.get_or_set(
+                'category_movies',
+                lambda: [row.id for row in db.session.query(Movie.id).filter(
+                    Movie.id.in_(db.select(movie_categories.c.movie_id).where(movie_categories.c.category_id == category_id))
+                    | (Movie.category_id == category_id)
+                ).order_by(Movie.id).all()],
+                tags=('catalog',), key=str(category_id)
+            )
         except SQLAlchemyError as e:
             logger.error(f"DB Error getting movies for category {category_id}: {e}")
             return []
 
+    def get_movies_by_category(self, category_id: int, view='detail'):
+        """Get movies belonging to a specific category."""
+        movie_ids = self._category_movie_ids(category_id)
+        movies = self.get_movies_data(movie_ids, view=view)
+        return [movies[m_id] for m_id in movie_ids if m_id in movies]
+
+    def iter_movies_by_category(self, category_id: int, first_batch=PAGE_SIZE, max_batch=16 * PAGE_SIZE, view='card'):
+        """
+        Movies of a category in lists that are hydrated as they are read, for pages that
+        stream the list. Batches start at `first_batch` movies, so the first ones are sent
+        quickly, and double up to `max_batch`, so a long list needs few hydration passes.
+        """
+        movie_ids = self._category_movie_ids(category_id)
+        start, size = 0, first_batch
+        while start < len(movie_ids):
+            batch = movie_ids[start:start + size]
+            movies = self.get_movies_data(batch, view=view)
+            yield [movies[m_id] for m_id in batch if m_id in movies]
+            start, size = start + size, min(size * 2, max_batch)
+
     def get_all_categories(self):
         """Get all categories."""
         cats = self._all(Category)
@@ -509,12 +910,28 @@ class SQLiteDataManager(DataManagerInterface):
             platform = StreamingPlatform.query.get(platform_id)
             if not platform: return []
             # Query movies linked via association table
-            movies = Movie.query.filter(Movie.streaming_platforms.any(id=platform_id)).options(joinedload(Movie.omdb_data)).all()
+            movies = Movie.query.filter(
+                Movie.id.in_(db.select(movie_platforms.c.movie_id).where(movie_platforms.c.platform_id == platform_id))
+            ).options(joinedload(Movie.omdb_data)).all()
             return [m.to_dict() for m in movies]
         except SQLAlchemyError as e:
             logger.error(f"DB Error getting movies for platform {platform_id}: {e}")
             return []
 
+    def search_movies(self, query: str, limit: int = 20, offset: int = 0):
+        """Full-text search over names and OMDB fields, best matches first."""
+        try:
+            movie_ids = self.search_index.search_ids(query, limit=limit, offset=offset)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error searching movies for '{query}': {e}")
+            return []
+        movies = self.get_movies_data(movie_ids)
+        return [movies[m_id] for m_id in movie_ids if m_id in movies]
+
+    def rebuild_search_index(self):
+        """Re-index every movie in the full-text search table."""
+        return self.search_index.rebuild()
+
     def get_all_categories_with_movies(self):
         """Get all categories, each with a list of associated movies (dictionaries)."""
         try:
@@ -539,147 +956,171 @@ class SQLiteDataManager(DataManagerInterface):
 
     # --- Aggregation/Ranking Methods ---
 
-    def get_top_rated_movies(self, limit=10, offset=0):
-        """Get movies with the highest average rating from UserFavorite."""
+    # Sort orders of the paginated rankings; movie_id / the primary key breaks ties
+    TOP_RATED_ORDER = ((MovieStats.rating_avg, True), (MovieStats.movie_id, False))
+    POPULAR_ORDER = ((MovieStats.interaction_count, True), (MovieStats.movie_id, False))
+    COMMENTS_ORDER = ((UserFavorite.user_id, True), (UserFavorite.movie_id, True))
+
+    def _top_rated_query(self):
+        return db.session.query(MovieStats.movie_id, MovieStats.rating_avg).filter(MovieStats.rating_count > 0)
+
+    def _popular_query(self):
+        return db.session.query(MovieStats.movie_id, MovieStats.interaction_count, MovieStats.favorite_count) \
+            .filter(MovieStats.interaction_count > 0)
+
+    def _comments_query(self):
+        return db.session.query(UserFavorite.user_id, UserFavorite.movie_id, UserFavorite.comment) \
+            .filter(UserFavorite.comment.isnot(None), UserFavorite.comment != '')
+
+    def _ranked_page(self, section, query, order, cursor, limit):
+        """One keyset page of a ranking query, cached per cursor like the other sections."""
+        decode_cursor(cursor, len(order))  # reject a bad cursor before touching the cache
+        return self.section_cache.get_or_set(
+            section, lambda: keyset_page(query, order, cursor, limit), tags=('favorites',), key=f"page:{cursor}:{limit}"
+        )
+
+    def _top_rated_results(self, ranked, view):
+        # Hydrate in one batch, adding the average rating
+        movies = self.get_movies_data([movie_id for movie_id, _ in ranked], view=view)
+        results = []
+        for movie_id, avg_rating in ranked:
+            if movie_id in movies:
+                results.append(dict(movies[movie_id], average_rating=round(avg_rating, 2) if avg_rating else None))
+        return results
+
+    def get_top_rated_movies(self, limit=10, offset=0, view='detail'):
+        """Get movies with the highest average user rating (read from movie_stats)."""
         try:
-            # Calculate average rating from UserFavorite table, filtering out non-rated entries
-            avg_ratings = db.session.query(
-                UserFavorite.movie_id,
-                func.avg(UserFavorite.rating).label('average_rating')
-            ).filter(UserFavorite.rating.isnot(None)) \
-             .group_by(UserFavorite.movie_id) \
-             .order_by(func.avg(UserFavorite.rating).desc()) \
-             .limit(limit).offset(offset) \
-             .subquery()
+            query = self._top_rated_query().order_by(MovieStats.rating_avg.desc(), MovieStats.movie_id)
 
-            # Join with Movie table to get movie details
-            top_movies_query = db.session.query(Movie, avg_ratings.c.average_rating) \
-                .join(avg_ratings, Movie.id == avg_ratings.c.movie_id) \
-                .options(joinedload(Movie.omdb_data)) # Load OMDB data
-
-            top_movies_results = top_movies_query.all()
-
-            # Convert to list of dictionaries, adding average rating
-            results = []
-            for movie, avg_rating in top_movies_results:
-                movie_dict = movie.to_dict()
-                movie_dict['average_rating'] = round(avg_rating, 2) if avg_rating else None
-                results.append(movie_dict)
-                
-            return results
+            if limit is not None:
+                query = query.limit(limit)
+            if offset > 0:
+                query = query.offset(offset)
+            ranked = self.section_cache.get_or_set(
+                'top_rated', lambda: [tuple(row) for row in query.all()],
+                tags=('favorites',), key=f"{limit}:{offset}"
+            )
         except SQLAlchemyError as e:
             logger.error(f"DB Error getting top rated movies: {e}")
             return []
+        return self._top_rated_results(ranked, view)
+
+    def get_top_rated_page(self, cursor=None, limit=PAGE_SIZE, view='card') -> Page:
+        """
+        One page of top rated movies after `cursor` (the first page without one).
+        Raises InvalidCursor for a cursor that was not returned by this method.
+        """
+        try:
+            page = self._ranked_page('top_rated', self._top_rated_query(), self.TOP_RATED_ORDER, cursor, limit)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting top rated page: {e}")
+            return Page([], None)
+        return Page(self._top_rated_results(page.items, view), page.next_cursor)
+
+    def _comment_results(self, rows):
+        """Template dicts for (user_id, movie_id, comment) rows, with users and movies loaded in batches."""
+        users = {user.id: user for user in User.query.options(joinedload(User.avatar))
+                 .filter(User.id.in_({user_id for user_id, _, _ in rows}))} if rows else {}
+        movies = self.get_movies_data({movie_id for _, movie_id, _ in rows})
+
+        # Prepare the result in the format expected by the template
+        results = []
+        for user_id, movie_id, comment in rows:
+            user = users.get(user_id)
+            if movie_id in movies and user:  # Ensure movie and user data are loaded
+                # Get avatar URLs safely, providing defaults
+                profile_avatar_url = user.avatar.profile_image_url if user.avatar else Avatar().profile_image_url
+                hero_avatar_url = user.avatar.hero_image_url if user.avatar else Avatar().hero_image_url
+
+                # Add comment-specific info
+                results.append({
+                    'movie': movies[movie_id],
+                    'comment_text': comment,
+                    'comment_user_name': user.name,
+                    'comment_user_id': user.id,
+                    'comment_user_avatar_url': profile_avatar_url,
+                    'comment_user_hero_avatar_url': hero_avatar_url,
+                    'composite_id': f"{user_id}-{movie_id}"  # Create a composite ID for sorting
+                })
+        return results
 
     def get_recent_commented_movies(self, limit=6, offset=0):
         """Get movies with the most recent comments from UserFavorite."""
         try:
-            # Get UserFavorite entries with comments, ordered by composite key in descending order
-            recent_comments = UserFavorite.query.filter(
-                UserFavorite.comment.isnot(None), 
-                UserFavorite.comment != ''
-            ).options(
-                joinedload(UserFavorite.movie).joinedload(Movie.omdb_data),
-                joinedload(UserFavorite.user).joinedload(User.avatar)
-            ).order_by(
-                UserFavorite.user_id.desc(),
-                UserFavorite.movie_id.desc()
-            )
+            # Entries with comments, ordered by composite key in descending order
+            query = self._comments_query().order_by(UserFavorite.user_id.desc(), UserFavorite.movie_id.desc())
 
             if limit is not None:
-                recent_comments = recent_comments.limit(limit)
+                query = query.limit(limit)
             if offset > 0:
-                recent_comments = recent_comments.offset(offset)
-
-            recent_comments = recent_comments.all()
-
-            # Prepare the result in the format expected by the template
-            results = []
-            for entry in recent_comments:
-                if entry.movie and entry.user:  # Ensure movie and user data are loaded
-                    movie_dict = entry.movie.to_dict()  # Get base movie data
-                    # Get avatar URLs safely, providing defaults
-                    profile_avatar_url = entry.user.avatar.profile_image_url if entry.user.avatar else Avatar().profile_image_url
-                    hero_avatar_url = entry.user.avatar.hero_image_url if entry.user.avatar else Avatar().hero_image_url
-
-                    # Add comment-specific info
-                    results.append({
-                        'movie': movie_dict,
-                        'comment_text': entry.comment,
-                        'comment_user_name': entry.user.name,
-                        'comment_user_id': entry.user.id,
-                        'comment_user_avatar_url': profile_avatar_url,
-                        'comment_user_hero_avatar_url': hero_avatar_url,
-                        'composite_id': f"{entry.user_id}-{entry.movie_id}"  # Create a composite ID for sorting
-                    })
-            return results
+                query = query.offset(offset)
+            return self._comment_results([tuple(row) for row in query.all()])
 
         except SQLAlchemyError as e:
             logger.error(f"DB Error getting recent commented movies: {e}")
             return []
 
-    def get_popular_movies(self, limit=10, offset=0):
+    def get_comments_page(self, cursor=None, limit=PAGE_SIZE) -> Page:
+        """One page of get_recent_commented_movies after `cursor`; raises InvalidCursor for a bad one."""
+        try:
+            decode_cursor(cursor, len(self.COMMENTS_ORDER))
+            page = keyset_page(self._comments_query(), self.COMMENTS_ORDER, cursor, limit)
+            return Page(self._comment_results(page.items), page.next_cursor)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting comments page: {e}")
+            return Page([], None)
+
+    def _popular_results(self, ranked, view):
+        movies = self.get_movies_data([movie_id for movie_id, _, _ in ranked], view=view)
+        results = []
+        for movie_id, count, favorite_count in ranked:
+            if movie_id in movies:
+                results.append(dict(movies[movie_id], interaction_count=count, favorite_count=favorite_count))
+        return results
+
+    def get_popular_movies(self, limit=10, offset=0, view='detail'):
         """Get movies based on the number of interactions (watched/watchlist/rated/favorited)."""
         try:
-            # Base query for interaction counts
-            interaction_query = db.session.query(
-                UserFavorite.movie_id,
-                func.count(UserFavorite.user_id).label('interaction_count')
-            ).group_by(UserFavorite.movie_id) \
-             .order_by(func.count(UserFavorite.user_id).desc())
+            popular_movies_query = self._popular_query() \
+                .order_by(MovieStats.interaction_count.desc(), MovieStats.movie_id)
 
             # Apply limit only if it's not None
             if limit is not None:
-                interaction_query = interaction_query.limit(limit)
+                popular_movies_query = popular_movies_query.limit(limit)
             if offset > 0:
-                interaction_query = interaction_query.offset(offset)
+                popular_movies_query = popular_movies_query.offset(offset)
 
-            interaction_counts = interaction_query.subquery()
-
-            # Join with Movie to get details
-            popular_movies_query = db.session.query(Movie, interaction_counts.c.interaction_count) \
-                .join(interaction_counts, Movie.id == interaction_counts.c.movie_id) \
-                .options(
-                    joinedload(Movie.omdb_data),
-                    joinedload(Movie.favorites)  # Load favorites relationship
-                )
-
-            popular_movies_results = popular_movies_query.all()
-
-            results = []
-            for movie, count in popular_movies_results:
-                movie_dict = movie.to_dict()
-                movie_dict['interaction_count'] = count
-                movie_dict['favorites'] = [fav.to_dict() for fav in movie.favorites]  # Include favorites data
-                results.append(movie_dict)
-            
-            return results
+            ranked = self.section_cache.get_or_set(
+                'popular', lambda: [tuple(row) for row in popular_movies_query.all()],
+                tags=('favorites',), key=f"{limit}:{offset}"
+            )
         except SQLAlchemyError as e:
             logger.error(f"DB Error getting popular movies: {e}")
             return []
+        return self._popular_results(ranked, view)
+
+    def get_popular_page(self, cursor=None, limit=PAGE_SIZE, view='card') -> Page:
+        """One page of get_popular_movies after `cursor`; raises InvalidCursor for a bad one."""
+        try:
+            page = self._ranked_page('popular', self._popular_query(), self.POPULAR_ORDER, cursor, limit)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting popular page: {e}")
+            return Page([], None)
+        return Page(self._popular_results(page.items, view), page.next_cursor)
 
     def get_most_loved_movies(self, limit=10, offset=0):
         """Get movies ranked by the number of times they were marked as favorite."""
         try:
-            # Count favorite=True entries per movie_id
-            favorite_counts = db.session.query(
-                UserFavorite.movie_id,
-                func.count(UserFavorite.user_id).label('favorite_count')
-            ).filter(UserFavorite.favorite == True) \
-             .group_by(UserFavorite.movie_id) \
-             .order_by(func.count(UserFavorite.user_id).desc()) \
-             .limit(limit).offset(offset) \
-             .subquery()
-
-            # Join with Movie to get details
-            loved_movies_query = db.session.query(Movie, favorite_counts.c.favorite_count) \
-                .join(favorite_counts, Movie.id == favorite_counts.c.movie_id) \
-                .options(joinedload(Movie.omdb_data))
-
-            loved_movies_results = loved_movies_query.all()
+            loved_movies_query = db.session.query(Movie, MovieStats.favorite_count) \
+                .join(MovieStats, MovieStats.movie_id == Movie.id) \
+                .filter(MovieStats.favorite_count > 0) \
+                .order_by(MovieStats.favorite_count.desc(), MovieStats.movie_id) \
+                .options(joinedload(Movie.omdb_data)) \
+                .limit(limit).offset(offset)
 
             results = []
-            for movie, count in loved_movies_results:
+            for movie, count in loved_movies_query.all():
                 movie_dict = movie.to_dict()
                 movie_dict['favorite_count'] = count
                 results.append(movie_dict)
@@ -690,61 +1131,184 @@ class SQLiteDataManager(DataManagerInterface):
             return []
 
     def get_avg_movie_rating(self, movie_id):
-        """Calculate the average user rating for a movie."""
+        """Get the average user rating for a movie from movie_stats."""
         try:
-            # Get all ratings for this movie where rating is not null
-            ratings = UserFavorite.query.filter(
-                UserFavorite.movie_id == movie_id,
-                UserFavorite.rating.isnot(None)
-            ).all()
-            
-            if not ratings:
+            stats = db.session.get(MovieStats, movie_id)
+            if not stats or not stats.rating_count:
                 return None
-                
-            # Calculate average
-            total = sum(entry.rating for entry in ratings if entry.rating)
-            count = len(ratings)
-            
-            if count == 0:
-                return None
-                
-            avg_rating = round(total / count, 1)
-            logger.info(f"Calculated average rating for movie {movie_id}: {avg_rating} from {count} ratings")
-            return avg_rating
+            return round(stats.rating_sum / stats.rating_count, 1)
         except Exception as e:
             logger.error(f"Error calculating average rating for movie {movie_id}: {e}")
             return None
 
+    def get_movie_stats(self, movie_id):
+        """Get the aggregated interaction counters for a movie."""
+        stats = self._get(MovieStats, movie_id=movie_id)
+        return stats.to_dict() if stats else None
+
+    def rebuild_movie_stats(self):
+        """Recompute movie_stats from user_favorites from scratch (for repair)."""
+        try:
+            db.session.execute(MovieStats.__table__.delete())
+            db.session.execute(text("""
+                INSERT INTO movie_stats (movie_id, rating_sum, rating_count, rating_avg,
+                                         interaction_count, favorite_count, watched_count, watchlist_count)
+                SELECT movie_id,
+                       COALESCE(SUM(rating), 0),
+                       COUNT(rating),
+                       AVG(rating),
+                       COUNT(*),
+                       SUM(CASE WHEN favorite THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN watched THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN watchlist THEN 1 ELSE 0 END)
+                FROM user_favorites
+                GROUP BY movie_id
+            """))
+            db.session.commit()
+            # Raw SQL writes are not seen by the section cache and data version write tracking
+            self.section_cache.invalidate('favorites')
+            self.data_versions.bump('favorites')
+            count = MovieStats.query.count()
+            logger.info(f"Rebuilt movie_stats for {count} movies")
+            return count
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error rebuilding movie stats: {e}")
+            return None
+
+    def rebuild_avatar_stats(self):
+        """Recompute avatar_movie_stats and avatar_category_stats from scratch (for repair)."""
+        try:
+            db.session.execute(AvatarMovieStats.__table__.delete())
+            db.session.execute(AvatarCategoryStats.__table__.delete())
+            db.session.execute(text("""
+                INSERT INTO avatar_movie_stats (avatar_id, movie_id, favorite_count)
+                SELECT u.avatar_id, uf.movie_id, COUNT(*)
+                FROM user_favorites uf
+                JOIN users u ON u.id = uf.user_id
+                WHERE uf.favorite AND u.avatar_id IS NOT NULL
+                GROUP BY u.avatar_id, uf.movie_id
+            """))
+            db.session.execute(text(AVATAR_CATEGORY_STATS_SQL.format(where='')))
+            db.session.commit()
+            self.section_cache.invalidate('favorites')
+            self.data_versions.bump('favorites')
+            count = db.session.query(func.count(func.distinct(AvatarMovieStats.avatar_id))).scalar()
+            logger.info(f"Rebuilt avatar stats for {count} avatars")
+            return count
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error rebuilding avatar stats: {e}")
+            return None
+
+    def rebuild_recommendations(self, full=False):
+        """Recompute item-item neighbours of queued movies, or of all movies with full=True."""
+        return self.recommender.rebuild(full=full)
+
+    def get_similar_movies(self, movie_id, limit=10, view='card'):
+        """Movies most similar to one movie (from the precomputed neighbours), best first."""
+        try:
+            movie_ids = self.recommender.similar_movie_ids(movie_id, limit=limit)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting similar movies for {movie_id}: {e}")
+            return []
+        movies = self.get_movies_data(movie_ids, view=view)
+        return [movies[m_id] for m_id in movie_ids if m_id in movies]
+
+    def get_avatar_top_movie_ids(self, avatar_id, limit=10, exclude_user_id=None):
+        """
+        Movies most favorited by the users of an avatar, as {movie_id: favorite_count}
+        (read from avatar_movie_stats). With exclude_user_id, that user's own
+        favorites are not counted, e.g. for "other users with your avatar".
+        """
+        try:
+            count = AvatarMovieStats.favorite_count
+            query = db.session.query(AvatarMovieStats.movie_id, count) \
+                .filter(AvatarMovieStats.avatar_id == avatar_id)
+            if exclude_user_id is not None:
+                own = db.aliased(UserFavorite)
+                query = query.outerjoin(own, and_(
+                    own.user_id == exclude_user_id, own.movie_id == AvatarMovieStats.movie_id, own.favorite == True
+                ))
+                count = AvatarMovieStats.favorite_count - db.case((own.user_id.isnot(None), 1), else_=0)
+                query = query.with_entities(AvatarMovieStats.movie_id, count).filter(count > 0)
+            rows = query.order_by(AvatarMovieStats.favorite_count.desc(), AvatarMovieStats.movie_id) \
+                .limit(limit).all()
+            return {movie_id: favorite_count for movie_id, favorite_count in rows}
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting top movies for avatar {avatar_id}: {e}")
+            return {}
+
+    def get_avatar_categories(self, avatar_id, limit=8):
+        """Categories with the most movies favorited by an avatar's users (read from avatar_category_stats)."""
+        try:
+            rows = db.session.query(Category.id, Category.name, Category.img, AvatarCategoryStats.movie_count) \
+                .join(Category, Category.id == AvatarCategoryStats.category_id) \
+                .filter(AvatarCategoryStats.avatar_id == avatar_id) \
+                .order_by(AvatarCategoryStats.movie_count.desc(), AvatarCategoryStats.category_id) \
+                .limit(limit).all()
+            return [{'id': id, 'name': name, 'img': img, 'count': count} for id, name, img, count in rows]
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting categories for avatar {avatar_id}: {e}")
+            return []
+
     def get_friends_favorites(self, user_id, limit=10, offset=0):
         """DEPRECATED: Friends functionality removed."""
         logger.warning("get_friends_favorites called, but friends feature is removed.")
         return []
 
     def get_new_releases(self, limit=10, offset=0):
-        """Get movies released recently based on OMDB 'Released' date."""
-        # Note: OMDB 'Released' is a string, requires careful parsing or storing as date
-        # This is a basic implementation assuming 'Released' can be somewhat sorted lexically (YYYY-MM-DD ideally)
-        # or relies on Movie.year primarily. A proper date conversion/storage is recommended.
-        try:
-             # Try sorting by MovieOMDB.released if it's reasonably formatted, fallback to Movie.year
-             # This might be slow without an index on MovieOMDB.released
-             # A dedicated 'release_date' column in Movie table would be better.
-            
-             # Simple approach: Order by year, then maybe title?
+        """
+        Get the most recently released movies (movies.release_date, parsed from OMDB
+        'Released'). Movies without a parsed date follow, by year.
+        """
+        try:
+            # SQLite sorts NULL dates last in DESC order, as ix_movies_release_date does
             new_movies = Movie.query.options(joinedload(Movie.omdb_data)) \
-                                   .order_by(Movie.year.desc(), Movie.name.asc()) \
-                                   .limit(limit).offset(offset).all()
-                                   
-            # Alternative: Try sorting by OMDB released string (might not be accurate)
-            # new_movies = Movie.query.join(MovieOMDB).options(joinedload(Movie.omdb_data)) \
-            #                        .order_by(MovieOMDB.released.desc()) \
-            #                        .limit(limit).offset(offset).all()
-
+                .order_by(Movie.release_date.desc(), Movie.year.desc(), Movie.id) \
+                .limit(limit).offset(offset).all()
             return [m.to_dict() for m in new_movies]
         except SQLAlchemyError as e:
             logger.error(f"DB Error getting new releases: {e}")
             return []
 
+    def get_movies_released_between(self, start: date, end: date, limit=None, view='card'):
+        """Movies released from `start` to `end` (inclusive), newest first; a range seek on the release date index."""
+        try:
+            query = db.session.query(Movie.id) \
+                .filter(Movie.release_date >= start, Movie.release_date <= end) \
+                .order_by(Movie.release_date.desc(), Movie.year.desc(), Movie.id)
+            if limit is not None:
+                query = query.limit(limit)
+            movie_ids = [row.id for row in query.all()]
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error getting movies released between {start} and {end}: {e}")
+            return []
+        movies = self.get_movies_data(movie_ids, view=view)
+        return [movies[movie_id] for movie_id in movie_ids if movie_id in movies]
+
+    def get_movies_released_in_year(self, year: int, limit=None, view='card'):
+        """Movies released in a calendar year, newest first."""
+        return self.get_movies_released_between(date(year, 1, 1), date(year, 12, 31), limit=limit, view=view)
+
+    def get_released_this_month(self, limit=10, today: Optional[date] = None, view='card'):
+        """Movies released in the current calendar month, newest first."""
+        today = today or date.today()
+        last_day = today.replace(day=monthrange(today.year, today.month)[1])
+        return self.get_movies_released_between(today.replace(day=1), last_day, limit=limit, view=view)
+
+    def backfill_release_dates(self, only_missing=True) -> int:
+        """Re-parse movies_omdb.released into movies.release_date, e.g. after a raw SQL import."""
+        try:
+            with db.engine.begin() as connection:
+                updated = backfill_release_dates(connection, only_missing=only_missing)
+        except SQLAlchemyError as e:
+            logger.error(f"DB Error backfilling release dates: {e}")
+            return None
+        self.section_cache.invalidate('catalog')
+        self.data_versions.bump('catalog')
+        return updated
+
     # --- Category/Platform Management (Optional, depends on UI) ---
     def add_category(self, category_data):
         """Add a new category."""
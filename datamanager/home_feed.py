@@ -0,0 +1,231 @@
+from .interface import db, User, Movie, Category, StreamingPlatform, UserFavorite, MovieStats, Avatar, movie_categories
+from sqlalchemy.orm import joinedload
+from sqlalchemy.sql import func, union
+from typing import Dict, List, Optional
+from calendar import monthrange
+from datetime import date
+
+
+class HomeFeedAssembler:
+    """
+    Builds every section of the /movies home page in a fixed number of queries.
+
+    Each section query only selects movie IDs (plus its ranking value). All IDs are
+    then hydrated together in one pass, so a movie that shows up in several sections
+    is loaded and serialized once and the query count does not depend on how many
+    users, favorites or categories exist. Viewer independent sections are kept in the
+    data manager's section cache until a write invalidates them.
+    """
+
+    def __init__(self, data_manager, section_limit=10, comments_limit=5, category_limit=10):
+        self.data_manager = data_manager # Used for batched movie hydration
+        self.section_limit = section_limit
+        self.comments_limit = comments_limit
+        self.category_limit = category_limit
+
+    def build(self, viewer: Optional[User] = None, defer_categories=False) -> Dict:
+        """
+        Return all home page sections as template-ready dictionaries.
+
+        With `defer_categories` the category rows, the largest part of the page, are not
+        hydrated here: 'categories' is then an iterator that loads their movies in one pass
+        when it is first read, so a streamed page can send the other sections first.
+        """
+        # Sections that are the same for every viewer come from the section cache
+        cache = self.data_manager.section_cache
+        key = f"{self.section_limit}:{self.category_limit}"
+        new_release_ids = cache.get_or_set('new_releases', self._new_release_ids, tags=('catalog',), key=key)
+        today = date.today()
+        this_month_ids = cache.get_or_set('released_this_month', lambda: self._released_this_month_ids(today),
+                                          tags=('catalog',), key=f"{key}:{today:%Y-%m}")
+        popular_counts = cache.get_or_set('popular_counts', self._popular_counts, tags=('favorites',), key=key)
+        top_rated_avgs = cache.get_or_set('top_rated_averages', self._top_rated_averages, tags=('favorites',), key=key)
+        categories, category_movie_ids = cache.get_or_set(
+            'category_rows', self._categories_with_movie_ids, tags=('catalog',), key=key
+        )
+        platforms = cache.get_or_set(
+            'platforms', lambda: [p.to_dict(include_relationships=False) for p in StreamingPlatform.query.all()],
+            tags=('catalog',)
+        )
+        comment_entries = self._recent_comment_entries()
+        same_avatar_counts = self._same_avatar_counts(viewer)
+        seed_id, recommended_ids = self._because_you_watched(viewer)
+
+        # Collect every movie ID referenced by any section and hydrate them together
+        movie_ids = set(new_release_ids)
+        movie_ids.update(this_month_ids)
+        movie_ids.update(popular_counts)
+        movie_ids.update(top_rated_avgs)
+        movie_ids.update(entry.movie_id for entry in comment_entries)
+        movie_ids.update(same_avatar_counts)
+        movie_ids.update(recommended_ids)
+        if seed_id is not None:
+            movie_ids.add(seed_id)
+        if not defer_categories:
+            for ids in category_movie_ids.values():
+                movie_ids.update(ids)
+        movies = self._hydrate(movie_ids, viewer)
+
+        popular_movies = []
+        for movie_id, count in popular_counts.items():
+            if movie_id in movies:
+                movie_dict = dict(movies[movie_id], interaction_count=count)
+                popular_movies.append(movie_dict)
+
+        top_rated = []
+        for movie_id, avg_rating in top_rated_avgs.items():
+            if movie_id in movies:
+                movie_dict = dict(movies[movie_id], average_rating=round(avg_rating, 2) if avg_rating else None)
+                top_rated.append(movie_dict)
+
+        recent_comments = []
+        for entry in comment_entries:
+            if entry.movie_id in movies and entry.user:
+                avatar = entry.user.avatar or Avatar()
+                recent_comments.append({
+                    'movie': movies[entry.movie_id],
+                    'comment_text': entry.comment,
+                    'comment_user_name': entry.user.name,
+                    'comment_user_id': entry.user.id,
+                    'comment_user_avatar_url': avatar.profile_image_url,
+                    'comment_user_hero_avatar_url': avatar.hero_image_url,
+                    'composite_id': f"{entry.user_id}-{entry.movie_id}"
+                })
+
+        categories = self._category_rows(categories, category_movie_ids, movies, viewer)
+        if not defer_categories:
+            categories = list(categories)
+
+        same_avatar_favorites = [
+            {'movie': movies[movie_id], 'favorite_count': count}
+            for movie_id, count in same_avatar_counts.items() if movie_id in movies
+        ]
+
+        because_you_watched = None
+        if seed_id in movies:
+            because_you_watched = {
+                'movie': movies[seed_id],
+                'movies': [movies[m_id] for m_id in recommended_ids if m_id in movies]
+            }
+
+        return {
+            'new_releases': [movies[m_id] for m_id in new_release_ids if m_id in movies],
+            'released_this_month': [movies[m_id] for m_id in this_month_ids if m_id in movies],
+            'popular_movies': popular_movies,
+            'top_rated': top_rated,
+            'recent_comments': recent_comments,
+            'categories': categories,
+            'platforms': platforms,
+            'same_avatar_favorites': same_avatar_favorites,
+            'same_avatar_users': self._same_avatar_users(viewer),
+            'because_you_watched': because_you_watched
+        }
+
+    # --- Section Queries (IDs only) ---
+
+    def _new_release_ids(self) -> List[int]:
+        # Movies without a parsed release date come last (NULLs sort last in DESC order), by year
+        rows = db.session.query(Movie.id) \
+            .order_by(Movie.release_date.desc(), Movie.year.desc(), Movie.id) \
+            .limit(self.section_limit).all()
+        return [row.id for row in rows]
+
+    def _released_this_month_ids(self, today: date) -> List[int]:
+        last_day = today.replace(day=monthrange(today.year, today.month)[1])
+        rows = db.session.query(Movie.id) \
+            .filter(Movie.release_date >= today.replace(day=1), Movie.release_date <= last_day) \
+            .order_by(Movie.release_date.desc(), Movie.year.desc(), Movie.id) \
+            .limit(self.section_limit).all()
+        return [row.id for row in rows]
+
+    def _popular_counts(self) -> Dict[int, int]:
+        rows = db.session.query(MovieStats.movie_id, MovieStats.interaction_count) \
+            .filter(MovieStats.interaction_count > 0) \
+            .order_by(MovieStats.interaction_count.desc(), MovieStats.movie_id) \
+            .limit(self.section_limit).all()
+        return {row.movie_id: row.interaction_count for row in rows}
+
+    def _top_rated_averages(self) -> Dict[int, float]:
+        rows = db.session.query(MovieStats.movie_id, MovieStats.rating_avg) \
+            .filter(MovieStats.rating_count > 0) \
+            .order_by(MovieStats.rating_avg.desc(), MovieStats.movie_id) \
+            .limit(self.section_limit).all()
+        return {row.movie_id: row.rating_avg for row in rows}
+
+    def _recent_comment_entries(self) -> List[UserFavorite]:
+        return UserFavorite.query.filter(
+            UserFavorite.comment.isnot(None),
+            UserFavorite.comment != ''
+        ).options(
+            joinedload(UserFavorite.user).joinedload(User.avatar)
+        ).order_by(
+            UserFavorite.user_id.desc(),
+            UserFavorite.movie_id.desc()
+        ).limit(self.comments_limit).all()
+
+    def _categories_with_movie_ids(self):
+        """Return category dicts and the first movie IDs of each, in two queries."""
+        categories = [c.to_dict(include_relationships=False) for c in Category.query.all()]
+
+        # Movies are linked to a category either through the M2M table or the direct FK
+        links = union(
+            db.select(movie_categories.c.category_id, movie_categories.c.movie_id),
+            db.select(Movie.category_id, Movie.id).where(Movie.category_id.isnot(None))
+        ).subquery()
+        ranked = db.select(
+            links.c.category_id,
+            links.c.movie_id,
+            func.row_number().over(
+                partition_by=links.c.category_id,
+                order_by=links.c.movie_id
+            ).label('position')
+        ).subquery()
+        rows = db.session.execute(
+            db.select(ranked.c.category_id, ranked.c.movie_id)
+            .where(ranked.c.position <= self.category_limit)
+            .order_by(ranked.c.category_id, ranked.c.position)
+        ).all()
+
+        category_movie_ids = {}
+        for category_id, movie_id in rows:
+            category_movie_ids.setdefault(category_id, []).append(movie_id)
+        return categories, category_movie_ids
+
+    def _same_avatar_counts(self, viewer: Optional[User]) -> Dict[int, int]:
+        """Movies most favorited by other users sharing the viewer's avatar (from avatar_movie_stats)."""
+        if viewer is None or not getattr(viewer, 'is_authenticated', False) or viewer.avatar_id is None:
+            return {}
+        return self.data_manager.get_avatar_top_movie_ids(
+            viewer.avatar_id, limit=self.section_limit, exclude_user_id=viewer.id
+        )
+
+    def _same_avatar_users(self, viewer: Optional[User]) -> List[User]:
+        """Other users sharing the viewer's avatar."""
+        if viewer is None or not getattr(viewer, 'is_authenticated', False) or viewer.avatar_id is None:
+            return []
+        return User.query.filter(User.avatar_id == viewer.avatar_id, User.id != viewer.id) \
+            .options(joinedload(User.avatar)).order_by(User.id).all()
+
+    def _because_you_watched(self, viewer: Optional[User]):
+        """(seed movie ID, unwatched neighbours) from the precomputed item-item neighbours."""
+        if viewer is None or not getattr(viewer, 'is_authenticated', False):
+            return None, []
+        return self.data_manager.recommender.because_you_watched(viewer.id, limit=self.section_limit)
+
+    # --- Hydration ---
+
+    def _category_rows(self, categories, category_movie_ids, movies, viewer: Optional[User]):
+        """Yield the category dicts with their movies, hydrating the ones no other section loaded."""
+        missing = {m_id for ids in category_movie_ids.values() for m_id in ids} - movies.keys()
+        if missing:
+            movies = {**movies, **self._hydrate(missing, viewer)}
+        # Cached category dicts are shared, so build new ones with the movies added
+        for category in categories:
+            yield dict(category, movies=[movies[m_id] for m_id in category_movie_ids.get(category['id'], [])
+                                         if m_id in movies])
+
+    def _hydrate(self, movie_ids, viewer: Optional[User]) -> Dict[int, Dict]:
+        """Load all movies once as poster cards, including the viewer's status flags."""
+        if not movie_ids:
+            return {}
+        return self.data_manager.get_movies_data(sorted(movie_ids), viewer=viewer, view='card')
@@ -0,0 +1,207 @@
+from .interface import db, logger, User, Avatar
+from flask import g, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from collections import OrderedDict
+from typing import Dict, Optional
+import threading
+import time
+import weakref
+
+IDENTITY_MEMO_KEY = '_identity_memo'
+
+# Live caches that listen to session writes
+_caches = weakref.WeakSet()
+
+
+def _columns(obj):
+    """Column values of a loaded model instance."""
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+def _detached(model, columns):
+    """A detached instance of `model` as if it had just been loaded with `columns`; no query."""
+    obj = model.__mapper__.class_manager.new_instance()
+    for key, value in columns.items():
+        set_committed_value(obj, key, value)
+    make_transient_to_detached(obj)
+    return obj
+
+
+class IdentityCache:
+    """
+    Cache of who is asking: the User row and its Avatar, which Flask-Login loads on
+    every request and templates read through get_user().
+
+    A per-request memo answers repeated lookups of a request from the same instance,
+    and a small cross-request LRU keeps the column values of recently seen users and
+    their avatars for a few seconds. A hit builds the instances from those values and
+    merges them into the session without a query, so current_user is a regular User
+    whose avatar is already loaded; relationships like favorites still load lazily.
+    A miss is one indexed query that loads the avatar with the user. Committed writes
+    to users or avatars in this process drop their records; other workers see them
+    once the TTL runs out.
+
+    Configured from app.config:
+        IDENTITY_CACHE_TTL          seconds a record is reused across requests (30, 0 disables it)
+        IDENTITY_CACHE_MAX_ENTRIES  LRU size (256)
+    """
+
+    def __init__(self):
+        self.ttl = 30
+        self.max_entries = 256
+        self._records = OrderedDict()  # user_id -> (expires_at, user columns, avatar columns or None)
+        self._first_user = None  # (expires_at, user_id) of the lowest user ID
+        self._counts = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def init_app(self, app):
+        """Read the TTL and size from the app config."""
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', 30)
+        self.max_entries = app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 256)
+
+    def get_user(self, user_id) -> Optional[User]:
+        """The User with its avatar in the current session, or None if it doesn't exist."""
+        memo = self._memo()
+        if user_id in memo:
+            return memo[user_id]
+
+        # Already in this session (e.g. just created): use it as it is
+        user = db.session.identity_map.get(identity_key(User, user_id))
+        if user is None:
+            record = self._record(user_id)
+            if record is not None:
+                user = self._attach(*record)
+            else:
+                user = db.session.query(User).options(joinedload(User.avatar)).filter(User.id == user_id).first()
+                if user is not None:
+                    self._store(user)
+        memo[user_id] = user
+        return user
+
+    def first_user(self) -> Optional[User]:
+        """The user with the lowest ID, whom the Vercel entry point logs in automatically."""
+        now = time.time()
+        with self._lock:
+            first = self._first_user if self._first_user and self._first_user[0] > now else None
+        if first is not None:
+            return self.get_user(first[1])
+
+        user = db.session.query(User).options(joinedload(User.avatar)).order_by(User.id).first()
+        if user is None:
+            return None
+        if self.ttl:
+            with self._lock:
+                self._first_user = (now + self.ttl, user.id)
+        self._store(user)
+        self._memo()[user.id] = user
+        return user
+
+    def invalidate(self, user_ids=None):
+        """Drop the records of some users, or of all (None), e.g. after an avatar changed."""
+        with self._lock:
+            if user_ids is None:
+                self._records.clear()
+            else:
+                for user_id in user_ids:
+                    self._records.pop(user_id, None)
+            # A new or deleted user may change who comes first
+            self._first_user = None
+            self._counts['invalidations'] += 1
+
+    def clear(self):
+        """Drop every record and reset the counters."""
+        with self._lock:
+            self._records.clear()
+            self._first_user = None
+            self._counts = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def stats(self) -> Dict:
+        """Hit/miss counts of the cross-request cache and the number of records."""
+        with self._lock:
+            counts = dict(self._counts)
+            size = len(self._records)
+        lookups = counts['hits'] + counts['misses']
+        counts.update(size=size, hit_rate=round(counts['hits'] / lookups, 3) if lookups else None)
+        return counts
+
+    def _memo(self):
+        # Outside a request nothing is memoized
+        if not has_app_context():
+            return {}
+        return g.setdefault(IDENTITY_MEMO_KEY, {})
+
+    def _record(self, user_id):
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._records.get(user_id)
+            if entry is None or entry[0] < time.time():
+                self._records.pop(user_id, None)
+                self._counts['misses'] += 1
+                return None
+            self._records.move_to_end(user_id)
+            self._counts['hits'] += 1
+            return entry[1:]
+
+    def _store(self, user):
+        if not self.ttl:
+            return
+        try:
+            entry = (time.time() + self.ttl, _columns(user), _columns(user.avatar) if user.avatar else None)
+        except Exception as e:
+            logger.error(f"Identity cache could not store user {user.id}: {e}")
+            return
+        with self._lock:
+            self._records[user.id] = entry
+            self._records.move_to_end(user.id)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def _attach(self, user_columns, avatar_columns):
+        user = _detached(User, user_columns)
+        set_committed_value(user, 'avatar', _detached(Avatar, avatar_columns) if avatar_columns else None)
+        # load=False: trust the cached state instead of selecting the row again
+        return db.session.merge(user, load=False)
+
+
+# --- Write Tracking ---
+# Users touched by a session are collected on flush / statement execution and dropped
+# once the transaction ends. Also on rollback: a record stored after the flush may hold
+# the uncommitted values.
+
+ALL_USERS = object()
+
+
+def _pending_users(session):
+    return session.info.setdefault('identity_cache_users', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_users(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            _pending_users(session).add(obj.id)
+        elif isinstance(obj, Avatar):
+            _pending_users(session).add(ALL_USERS)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_statement_users(orm_execute_state):
+    # Bulk UPDATE/DELETE statements can touch any user
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(table, 'name', None) in (User.__tablename__, Avatar.__tablename__):
+            _pending_users(orm_execute_state.session).add(ALL_USERS)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _apply_pending_users(session):
+    user_ids = session.info.pop('identity_cache_users', None)
+    if user_ids:
+        for cache in list(_caches):
+            cache.invalidate(None if ALL_USERS in user_ids else user_ids)
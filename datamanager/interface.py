@@ -1,8 +1,13 @@
 from abc import ABC, abstractmethod
+from flask import has_app_context, has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from sqlalchemy.orm import validates
+from flask_sqlalchemy.session import Session as FlaskSession
+from datetime import date, datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, validates
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.ext.hybrid import hybrid_property
+from typing import Optional
 import logging
 import re
 
@@ -10,8 +15,59 @@ import re
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bind key of the read-only engine that GET requests use (see sqlite_profile.py)
+READ_ONLY_BIND = 'read_only'
+# session.info flag: the current transaction has begun a connection of the primary engine
+PRIMARY_IN_TRANSACTION = 'primary_in_transaction'
+
+
+# Raw SQL that only reads; anything else (writes, PRAGMAs, WITH ... UPDATE) may write
+_READ_SQL = re.compile(r'\s*SELECT\b', re.IGNORECASE)
+
+
+def _is_read(clause) -> bool:
+    """Whether a statement given to get_bind() only reads. None (Session.connection(), flushes) may write."""
+    if clause is None or getattr(clause, 'is_dml', False) or getattr(clause, 'is_ddl', False):
+        return False
+    if isinstance(clause, TextClause):
+        return _READ_SQL.match(clause.text) is not None
+    return bool(getattr(clause, 'is_select', False))
+
+
+class RoutingSession(FlaskSession):
+    """
+    Session that sends the reads of GET/HEAD requests to the read-only engine when one
+    is configured. Writes always use the primary engine: INSERT/UPDATE/DELETE (also
+    Core statements and raw SQL), flushes of pending changes and Session.connection().
+    Once the transaction has a primary connection, reads stay on it until the
+    transaction ends, so they see its uncommitted rows and a GET view that writes works.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and request.method in ('GET', 'HEAD') \
+                and _is_read(clause) and not self.info.get(PRIMARY_IN_TRANSACTION) \
+                and not (self.new or self.dirty or self.deleted):
+            engine = self._db.engines.get(READ_ONLY_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_begin')
+def _note_primary_connection(session, transaction, connection):
+    read_engine = session._db.engines.get(READ_ONLY_BIND) if has_app_context() else None
+    if connection.engine is not read_engine:
+        session.info[PRIMARY_IN_TRANSACTION] = True
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _forget_primary_connection(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(PRIMARY_IN_TRANSACTION, None)
+
+
 # Initialize SQLAlchemy
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 # Junction tables
 movie_platforms = db.Table('movie_platforms',
@@ -179,6 +235,7 @@ class Movie(db.Model):
     rating = db.Column(db.Float)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'))
     genre = db.Column(db.Text)
+    release_date = db.Column(db.Date)  # Parsed MovieOMDB.released, kept in sync on every OMDB save
     
     # Relationships
     category = db.relationship('Category', back_populates='movies')
@@ -189,6 +246,8 @@ class Movie(db.Model):
     omdb_data = db.relationship("MovieOMDB", back_populates="movie", uselist=False, cascade='all, delete-orphan')
     favorites = db.relationship('UserFavorite', back_populates='movie', cascade='all, delete-orphan')
     ratings = db.relationship('Rating', back_populates='movie', cascade='all, delete-orphan')
+    stats = db.relationship('MovieStats', back_populates='movie', uselist=False, cascade='all, delete-orphan')
+    avatar_stats = db.relationship('AvatarMovieStats', back_populates='movie', cascade='all, delete-orphan')
     
     @validates('name')
     def validate_name(self, key, name):
@@ -204,14 +263,15 @@ class Movie(db.Model):
             'director': self.director,
             'year': self.year,
             'rating': self.rating,
-            'genre': self.genre
+            'genre': self.genre,
+            'release_date': self.release_date.isoformat() if self.release_date else None
         }
         if include_relationships:
             # Add debug log for OMDB data
             if not self.omdb_data:
-                logger.warning(f"Movie {self.id} ({self.name}) has no OMDB data")
+                logger.debug(f"Movie {self.id} ({self.name}) has no OMDB data")
             movie_dict.update({
-                'category': self.category.to_dict() if self.category else None,
+                'category': self.category.to_dict(include_relationships=False) if self.category else None,
                 'categories': [c.to_dict(include_relationships=False) for c in self.categories],
                 'streaming_platforms': [p.to_dict(include_relationships=False) for p in self.streaming_platforms],
                 'omdb_data': self.omdb_data.to_dict() if self.omdb_data else None
@@ -252,6 +312,128 @@ class UserFavorite(db.Model):
             # 'updated_at': self.updated_at.isoformat() if self.updated_at else None  # REMOVED
         }
 
+class MovieStats(db.Model):
+    """
+    Aggregated user_favorites counters per movie.
+    Kept up to date in the same transaction as every favorite write, so rankings
+    can be read with an indexed ORDER BY ... LIMIT instead of a GROUP BY.
+    """
+    __tablename__ = 'movie_stats'
+
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), primary_key=True)
+    rating_sum = db.Column(db.Float, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_avg = db.Column(db.Float)  # rating_sum / rating_count, NULL when unrated
+    interaction_count = db.Column(db.Integer, nullable=False, default=0)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0)
+    watched_count = db.Column(db.Integer, nullable=False, default=0)
+    watchlist_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Relationships
+    movie = db.relationship('Movie', back_populates='stats')
+
+    def to_dict(self):
+        """Convert stats object to dictionary."""
+        return {
+            'movie_id': self.movie_id,
+            'rating_sum': self.rating_sum,
+            'rating_count': self.rating_count,
+            'rating_avg': self.rating_avg,
+            'interaction_count': self.interaction_count,
+            'favorite_count': self.favorite_count,
+            'watched_count': self.watched_count,
+            'watchlist_count': self.watchlist_count
+        }
+
+# Ranking indexes (DESC first column, movie_id as the tie-breaker)
+db.Index('ix_movie_stats_rating_avg', MovieStats.rating_avg.desc(), MovieStats.movie_id)
+db.Index('ix_movie_stats_interaction_count', MovieStats.interaction_count.desc(), MovieStats.movie_id)
+db.Index('ix_movie_stats_favorite_count', MovieStats.favorite_count.desc(), MovieStats.movie_id)
+
+class AvatarMovieStats(db.Model):
+    """
+    How many users of one avatar have favorited a movie.
+    Updated with every favorite change; rows are removed when the count drops to 0.
+    """
+    __tablename__ = 'avatar_movie_stats'
+
+    avatar_id = db.Column(db.Integer, db.ForeignKey('avatars.id'), primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), primary_key=True)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Relationships
+    movie = db.relationship('Movie', back_populates='avatar_stats')
+
+    def to_dict(self):
+        """Convert stats object to dictionary."""
+        return {
+            'avatar_id': self.avatar_id,
+            'movie_id': self.movie_id,
+            'favorite_count': self.favorite_count
+        }
+
+class AvatarCategoryStats(db.Model):
+    """
+    Number of distinct movies favorited by an avatar's users, per category
+    (linked categories and the movie's primary category).
+    """
+    __tablename__ = 'avatar_category_stats'
+
+    avatar_id = db.Column(db.Integer, db.ForeignKey('avatars.id'), primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    movie_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        """Convert stats object to dictionary."""
+        return {
+            'avatar_id': self.avatar_id,
+            'category_id': self.category_id,
+            'movie_count': self.movie_count
+        }
+
+class MovieNeighbor(db.Model):
+    """
+    Precomputed item-item neighbours: the movies most similar to `movie_id` by
+    who watched, favorited and rated them, ranked 0..k-1. Built by ItemItemRecommender.
+    """
+    __tablename__ = 'movie_neighbors'
+
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+    def to_dict(self):
+        """Convert neighbour object to dictionary."""
+        return {
+            'movie_id': self.movie_id,
+            'rank': self.rank,
+            'neighbor_id': self.neighbor_id,
+            'score': self.score
+        }
+
+class MovieNeighborQueue(db.Model):
+    """Movies whose neighbours are stale since their interactions changed."""
+    __tablename__ = 'movie_neighbor_queue'
+
+    movie_id = db.Column(db.Integer, primary_key=True)
+
+class DataVersion(db.Model):
+    """
+    Write counter of a set of data ('catalog', 'movie:12', ...) that ETags are derived
+    from. Bumped in the transaction of every write, see data_versions.py.
+    """
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+# Per-avatar ranking indexes
+db.Index('ix_avatar_movie_stats_rank', AvatarMovieStats.avatar_id,
+         AvatarMovieStats.favorite_count.desc(), AvatarMovieStats.movie_id)
+db.Index('ix_avatar_category_stats_rank', AvatarCategoryStats.avatar_id,
+         AvatarCategoryStats.movie_count.desc(), AvatarCategoryStats.category_id)
+
 class StreamingPlatform(db.Model):
     """
     Represents a streaming platform.
@@ -362,6 +544,7 @@ class MovieOMDB(db.Model):
     country = db.Column(db.String(50))
     awards = db.Column(db.String(255))
     poster_img = db.Column(db.String(255))
+    poster_variants = db.Column(db.JSON(none_as_null=True))  # Responsive derivatives, see PosterPipeline.process()
     imdb_rating = db.Column(db.Float)
     rotten_tomatoes = db.Column(db.String(10))
     metacritic = db.Column(db.String(10))
@@ -400,6 +583,7 @@ class MovieOMDB(db.Model):
             'country': self.country,
             'awards': self.awards,
             'poster_img': self.poster_img,
+            'poster_variants': self.poster_variants,
             'effective_poster': self.effective_poster
         }
         
@@ -423,6 +607,37 @@ class MovieOMDB(db.Model):
             
         return data
 
+# OMDB writes 'Released' as "16 Jul 2010"; ISO dates come from manual edits and imports
+RELEASE_DATE_FORMATS = ('%d %b %Y', '%Y-%m-%d', '%d %B %Y')
+
+def parse_release_date(released) -> Optional[date]:
+    """Parse an OMDB 'Released' string; None for 'N/A', empty or unknown formats."""
+    if isinstance(released, date):
+        return released
+    if not released or not isinstance(released, str):
+        return None
+    for fmt in RELEASE_DATE_FORMATS:
+        try:
+            return datetime.strptime(released.strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+@event.listens_for(Session, 'before_flush')
+def _sync_release_dates(session, flush_context, instances):
+    """Copy the parsed MovieOMDB.released into Movie.release_date whenever OMDB data is saved."""
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, MovieOMDB):
+            continue
+        if obj not in session.new and not inspect(obj).attrs.released.history.has_changes():
+            continue
+        with session.no_autoflush:
+            movie = obj.movie
+            if movie is None and obj.id is not None:
+                movie = session.get(Movie, obj.id)
+        if movie is not None:
+            movie.release_date = parse_release_date(obj.released)
+
 class DataManagerInterface(ABC):
     """Abstract base class defining the interface for data management operations."""
     
@@ -496,6 +711,11 @@ class DataManagerInterface(ABC):
         """Return complete movie data including categories and platforms"""
         pass
 
+    @abstractmethod
+    def get_movies_data(self, movie_ids, viewer=None, view='detail'):
+        """Return complete movie data for many movies at once, keyed by movie ID"""
+        pass
+
     @abstractmethod
     def get_user_data(self, user_id):
         """Return complete user data including all favorites, comments and watch history"""
@@ -0,0 +1,265 @@
+from .interface import db, logger, parse_release_date
+from sqlalchemy import text
+from typing import Callable, List, NamedTuple
+import random
+import sqlite3
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable
+
+
+# Registered migrations, applied in version order
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a function(connection) as the schema change to `version`."""
+    def register(apply):
+        MIGRATIONS.append(Migration(version, description, apply))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return apply
+    return register
+
+
+class MigrationRunner:
+    """
+    Minimal versioned schema migrations for the SQLite database.
+
+    The schema version lives in SQLite's `PRAGMA user_version` header field, so no
+    bookkeeping table is needed. Each pending migration runs in its own
+    `BEGIN IMMEDIATE` transaction together with the version bump: it is applied
+    completely or not at all, and when several workers start at once the first one
+    takes the write lock and the others see the new version and skip it.
+    """
+
+    def __init__(self, migrations: List[Migration] = None):
+        self.migrations = MIGRATIONS if migrations is None else migrations
+
+    @property
+    def latest(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    @staticmethod
+    def current_version(connection) -> int:
+        return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+    def upgrade(self, engine=None) -> List[int]:
+        """Apply all pending migrations; returns the versions that were applied."""
+        engine = engine or db.engine
+        applied = []
+        with engine.connect() as connection:
+            for step in self.migrations:
+                connection.exec_driver_sql('BEGIN IMMEDIATE')
+                try:
+                    if self.current_version(connection) >= step.version:
+                        connection.rollback()
+                        continue
+                    step.apply(connection)
+                    # PRAGMA does not take bound parameters; the version is an int
+                    connection.exec_driver_sql(f'PRAGMA user_version = {int(step.version)}')
+                    connection.commit()
+                except Exception as e:
+                    connection.rollback()
+                    logger.error(f"DB Error applying migration {step.version} ({step.description}): {e}")
+                    raise
+                logger.info(f"Applied migration {step.version}: {step.description}")
+                applied.append(step.version)
+        return applied
+
+
+def add_missing_columns(connection, statements):
+    """
+    CREATE TABLE IF NOT EXISTS leaves tables of older database files as they are. Add
+    the nullable columns of the frozen `statements` that such a table still lacks.
+    """
+    # Parse the DDL with SQLite itself instead of depending on the current models
+    scratch = sqlite3.connect(':memory:')
+    try:
+        for statement in statements:
+            scratch.execute(statement)
+        tables = [row[0] for row in scratch.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            existing = {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({table})')}
+            for _, name, column_type, not_null, _, primary_key in scratch.execute(f'PRAGMA table_info({table})'):
+                if name not in existing and not not_null and not primary_key:
+                    connection.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+                    logger.info(f"Added column {table}.{name}")
+    finally:
+        scratch.close()
+
+
+# --- Migrations ---
+
+# The schema of version 1, frozen: later model changes need a migration of their own,
+# so fresh and upgraded databases end up with the same schema
+BASELINE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS avatars (
+        id INTEGER NOT NULL, name VARCHAR(100), image VARCHAR(255), description TEXT,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE IF NOT EXISTS streaming_platforms (
+        id INTEGER NOT NULL, name VARCHAR(100) NOT NULL,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, img TEXT,
+        PRIMARY KEY (id))""",
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER NOT NULL, name VARCHAR(100), whatsapp_number VARCHAR(20), avatar_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY (avatar_id) REFERENCES avatars (id))""",
+    """CREATE TABLE IF NOT EXISTS movies (
+        id INTEGER NOT NULL, name VARCHAR(100), director TEXT, year INTEGER, rating FLOAT,
+        category_id INTEGER, genre TEXT,
+        PRIMARY KEY (id),
+        FOREIGN KEY (category_id) REFERENCES categories (id))""",
+    """CREATE TABLE IF NOT EXISTS movies_omdb (
+        id INTEGER NOT NULL, imdb_id VARCHAR(20), title VARCHAR(255), year VARCHAR(10),
+        rated VARCHAR(10), released VARCHAR(20), runtime VARCHAR(20), genre VARCHAR(100),
+        director VARCHAR(255), writer VARCHAR(255), actors VARCHAR(255), plot TEXT,
+        language VARCHAR(50), country VARCHAR(50), awards VARCHAR(255), poster_img VARCHAR(255),
+        poster_variants JSON, imdb_rating FLOAT, rotten_tomatoes VARCHAR(10), metacritic VARCHAR(10),
+        type VARCHAR(20), dvd VARCHAR(20), box_office VARCHAR(20), production VARCHAR(100),
+        website VARCHAR(255),
+        PRIMARY KEY (id),
+        FOREIGN KEY (id) REFERENCES movies (id))""",
+    """CREATE TABLE IF NOT EXISTS movie_platforms (
+        movie_id INTEGER NOT NULL, platform_id INTEGER NOT NULL,
+        PRIMARY KEY (movie_id, platform_id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id),
+        FOREIGN KEY (platform_id) REFERENCES streaming_platforms (id))""",
+    """CREATE TABLE IF NOT EXISTS movie_categories (
+        movie_id INTEGER NOT NULL, category_id INTEGER NOT NULL,
+        PRIMARY KEY (movie_id, category_id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id),
+        FOREIGN KEY (category_id) REFERENCES categories (id))""",
+    """CREATE TABLE IF NOT EXISTS ratings (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL,
+        rating FLOAT NOT NULL, comment TEXT, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id))""",
+    """CREATE TABLE IF NOT EXISTS user_favorites (
+        user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL, watched BOOLEAN, watchlist BOOLEAN,
+        favorite BOOLEAN, rating FLOAT, comment TEXT,
+        PRIMARY KEY (user_id, movie_id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id))""",
+    """CREATE TABLE IF NOT EXISTS movie_stats (
+        movie_id INTEGER NOT NULL, rating_sum FLOAT NOT NULL, rating_count INTEGER NOT NULL,
+        rating_avg FLOAT, interaction_count INTEGER NOT NULL, favorite_count INTEGER NOT NULL,
+        watched_count INTEGER NOT NULL, watchlist_count INTEGER NOT NULL,
+        PRIMARY KEY (movie_id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id))""",
+    """CREATE TABLE IF NOT EXISTS avatar_movie_stats (
+        avatar_id INTEGER NOT NULL, movie_id INTEGER NOT NULL, favorite_count INTEGER NOT NULL,
+        PRIMARY KEY (avatar_id, movie_id),
+        FOREIGN KEY (avatar_id) REFERENCES avatars (id),
+        FOREIGN KEY (movie_id) REFERENCES movies (id))""",
+    """CREATE TABLE IF NOT EXISTS avatar_category_stats (
+        avatar_id INTEGER NOT NULL, category_id INTEGER NOT NULL, movie_count INTEGER NOT NULL,
+        PRIMARY KEY (avatar_id, category_id),
+        FOREIGN KEY (avatar_id) REFERENCES avatars (id),
+        FOREIGN KEY (category_id) REFERENCES categories (id))""",
+    """CREATE TABLE IF NOT EXISTS movie_neighbors (
+        movie_id INTEGER NOT NULL, rank INTEGER NOT NULL, neighbor_id INTEGER NOT NULL,
+        score FLOAT NOT NULL,
+        PRIMARY KEY (movie_id, rank),
+        FOREIGN KEY (movie_id) REFERENCES movies (id),
+        FOREIGN KEY (neighbor_id) REFERENCES movies (id))""",
+    """CREATE TABLE IF NOT EXISTS movie_neighbor_queue (
+        movie_id INTEGER NOT NULL,
+        PRIMARY KEY (movie_id))""",
+)
+
+BASELINE_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS ix_movie_stats_rating_avg ON movie_stats (rating_avg DESC, movie_id)',
+    'CREATE INDEX IF NOT EXISTS ix_movie_stats_interaction_count ON movie_stats (interaction_count DESC, movie_id)',
+    'CREATE INDEX IF NOT EXISTS ix_movie_stats_favorite_count ON movie_stats (favorite_count DESC, movie_id)',
+    'CREATE INDEX IF NOT EXISTS ix_avatar_movie_stats_rank ON avatar_movie_stats '
+    '(avatar_id, favorite_count DESC, movie_id)',
+    'CREATE INDEX IF NOT EXISTS ix_avatar_category_stats_rank ON avatar_category_stats '
+    '(avatar_id, movie_count DESC, category_id)',
+)
+
+
+@migration(1, 'Baseline: tables and columns missing from files created before version 1')
+def baseline(connection):
+    for statement in BASELINE_SCHEMA + BASELINE_INDEXES:
+        connection.execute(text(statement))
+    add_missing_columns(connection, BASELINE_SCHEMA)
+
+
+@migration(2, 'Indexes for the hot query paths')
+def hot_path_indexes(connection):
+    for statement in (
+        # Interactions by movie; covers "watched by" on the movie page (user and rating)
+        'CREATE INDEX IF NOT EXISTS ix_user_favorites_movie ON user_favorites (movie_id, watched, user_id, rating)',
+        # Favorite counts and cohorts only ever look at favorite rows
+        'CREATE INDEX IF NOT EXISTS ix_user_favorites_favorite ON user_favorites (movie_id, user_id) WHERE favorite = 1',
+        # Comments of a movie, and the newest comments across all movies
+        'CREATE INDEX IF NOT EXISTS ix_user_favorites_movie_comments ON user_favorites (movie_id) WHERE comment IS NOT NULL',
+        'CREATE INDEX IF NOT EXISTS ix_user_favorites_comments ON user_favorites (user_id DESC, movie_id DESC) '
+        'WHERE comment IS NOT NULL',
+        # Avatars whose users favorited a movie (the primary key starts with avatar_id)
+        'CREATE INDEX IF NOT EXISTS ix_avatar_movie_stats_movie ON avatar_movie_stats (movie_id, avatar_id)',
+        # add_new_movie looks up existing OMDB data by IMDb ID
+        'CREATE INDEX IF NOT EXISTS ix_movies_omdb_imdb_id ON movies_omdb (imdb_id)',
+        # New releases: ORDER BY year DESC, name (replaced by ix_movies_release_date, dropped in migration 5)
+        'CREATE INDEX IF NOT EXISTS ix_movies_year_name ON movies (year DESC, name)',
+        # Category pages: movies by linked or primary category
+        'CREATE INDEX IF NOT EXISTS ix_movies_category_id ON movies (category_id)',
+        'CREATE INDEX IF NOT EXISTS ix_movie_categories_category ON movie_categories (category_id, movie_id)',
+        'CREATE INDEX IF NOT EXISTS ix_movie_platforms_platform ON movie_platforms (platform_id, movie_id)',
+    ):
+        connection.execute(text(statement))
+
+
+def backfill_release_dates(connection, only_missing=True) -> int:
+    """
+    Fill movies.release_date from movies_omdb.released for rows saved before the column
+    existed (or written with raw SQL, which bypasses the ORM hook). Returns the rows set.
+    """
+    query = 'SELECT o.id, o.released FROM movies_omdb o JOIN movies m ON m.id = o.id'
+    if only_missing:
+        query += ' WHERE m.release_date IS NULL'
+    updates = []
+    for movie_id, released in connection.exec_driver_sql(query).all():
+        parsed = parse_release_date(released)
+        if parsed is not None:
+            updates.append({'id': movie_id, 'release_date': parsed.isoformat()})
+    if updates:
+        connection.execute(text('UPDATE movies SET release_date = :release_date WHERE id = :id'), updates)
+    return len(updates)
+
+
+@migration(3, 'Parsed movies.release_date with backfill and index')
+def release_dates(connection):
+    add_missing_columns(connection, ('CREATE TABLE movies (release_date DATE)',))
+    backfilled = backfill_release_dates(connection)
+    logger.info(f"Backfilled release dates of {backfilled} movies")
+    # New releases and date range rows: ORDER BY release_date DESC, id
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_movies_release_date ON movies (release_date DESC, id)'))
+
+
+@migration(4, 'data_versions table with a random epoch for ETags')
+def data_version_counters(connection):
+    connection.execute(text('CREATE TABLE IF NOT EXISTS data_versions '
+                            '(name VARCHAR(64) NOT NULL, version INTEGER NOT NULL, PRIMARY KEY (name))'))
+    # Random per database file, so ETags of a replaced file never match the new one
+    connection.execute(text("INSERT OR IGNORE INTO data_versions (name, version) VALUES ('epoch', :epoch)"),
+                       {'epoch': random.randrange(1, 2 ** 31)})
+
+
+@migration(5, 'Drop ix_movies_year_name, unused since new releases order by release_date')
+def drop_year_name_index(connection):
+    # Every movie write paid for it without a query reading it
+    connection.execute(text('DROP INDEX IF EXISTS ix_movies_year_name'))
+
+
+@migration(6, 'Movies without a release date in new releases: year in ix_movies_release_date')
+def release_date_year_index(connection):
+    # New releases: ORDER BY release_date DESC, year DESC, id; undated movies (NULL) come last by year
+    connection.execute(text('DROP INDEX IF EXISTS ix_movies_release_date'))
+    connection.execute(text('CREATE INDEX ix_movies_release_date ON movies (release_date DESC, year DESC, id)'))
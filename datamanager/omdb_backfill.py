@@ -0,0 +1,190 @@
+from .interface import db, Movie, MovieOMDB
+from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Spaces out calls from all threads to at most `rate` per second."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class OMDBBackfill:
+    """
+    Fetches OMDB data for every movie that has none or only part of it.
+
+    API calls and poster downloads (plus their derivatives) run in a bounded thread
+    pool, with all OMDB API calls going through one shared rate limiter. Worker threads
+    never touch the database: results are written by the calling thread and committed
+    every `batch_size` movies. A run can be stopped at any time; committed movies no
+    longer count as missing, and movies OMDB could not resolve are remembered in the
+    state file so the next run skips them (unless retry_failed is set).
+    """
+
+    # Columns that must be filled for a movie to count as complete
+    REQUIRED_FIELDS = ('imdb_id', 'title', 'plot', 'poster_img')
+
+    def __init__(self, omdb_manager, workers: int = 4, rate_limit: Optional[float] = 5.0,
+                 batch_size: int = 20, state_path: Optional[str] = None):
+        self.omdb_manager = omdb_manager
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.batch_size = max(1, batch_size)
+        self.state_path = state_path
+
+    # --- Resume State ---
+
+    def _load_state(self) -> Dict:
+        if self.state_path and os.path.exists(self.state_path):
+            try:
+                with open(self.state_path) as f:
+                    state = json.load(f)
+                return {'failed': set(state.get('failed', [])), 'incomplete': set(state.get('incomplete', []))}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable backfill state {self.state_path}: {e}")
+        return {'failed': set(), 'incomplete': set()}
+
+    def _save_state(self, state: Dict):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({key: sorted(ids) for key, ids in state.items()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    # --- Candidates ---
+
+    def find_candidates(self, skip_ids=(), limit: Optional[int] = None) -> List[Dict]:
+        """Movies without a MovieOMDB row or with any of REQUIRED_FIELDS empty, by movie ID."""
+        missing = [MovieOMDB.id.is_(None)]
+        missing += [getattr(MovieOMDB, field).is_(None) for field in self.REQUIRED_FIELDS]
+        query = db.session.query(Movie.id, Movie.name, Movie.year, MovieOMDB.imdb_id, MovieOMDB.poster_img) \
+            .outerjoin(MovieOMDB, MovieOMDB.id == Movie.id) \
+            .filter(or_(*missing)) \
+            .order_by(Movie.id)
+        if skip_ids:
+            query = query.filter(Movie.id.notin_(list(skip_ids)))
+        if limit:
+            query = query.limit(limit)
+        return [
+            {'movie_id': row.id, 'name': row.name, 'year': row.year, 'imdb_id': row.imdb_id, 'poster_img': row.poster_img}
+            for row in query.all()
+        ]
+
+    # --- Worker (no database access) ---
+
+    def _fetch(self, job: Dict) -> Dict:
+        """Fetch one movie's OMDB data and poster. Runs in a worker thread."""
+        movie_id = job['movie_id']
+        self.rate_limiter.wait()
+        if job['imdb_id']:
+            omdb_data = self.omdb_manager.fetch_omdb_data_by_imdb_id(job['imdb_id'])
+        else:
+            omdb_data = self.omdb_manager.fetch_omdb_data_by_title(job['name'], job['year'])
+        if not omdb_data:
+            return {'movie_id': movie_id, 'db_data': None}
+
+        db_data = self.omdb_manager.format_omdb_data(movie_id, omdb_data)
+        if not job['poster_img']:
+            poster_img = self.omdb_manager.save_poster(omdb_data.get('Poster'), movie_id, db_data.get('imdb_id'))
+            if poster_img:
+                db_data['poster_img'] = poster_img
+                db_data['poster_variants'] = self.omdb_manager.poster_pipeline.process(poster_img)
+        return {'movie_id': movie_id, 'db_data': db_data}
+
+    # --- Run ---
+
+    def _apply(self, result: Dict, state: Dict, stats: Dict):
+        """Write one fetched result inside a savepoint, so one bad row can't sink the batch."""
+        movie_id, db_data = result['movie_id'], result['db_data']
+        if db_data is None:
+            state['failed'].add(movie_id)
+            stats['failed'] += 1
+            return
+
+        savepoint = db.session.begin_nested()
+        if self.omdb_manager.save_omdb_data_to_db(movie_id, db_data, commit=False):
+            savepoint.commit()
+            stats['saved'] += 1
+            # OMDB itself has no value for some fields (e.g. no poster): don't ask again
+            if any(not db_data.get(field) or db_data.get(field) == 'N/A' for field in self.REQUIRED_FIELDS):
+                state['incomplete'].add(movie_id)
+        else:
+            savepoint.rollback()
+            state['failed'].add(movie_id)
+            stats['failed'] += 1
+
+    def run(self, limit: Optional[int] = None, retry_failed: bool = False,
+            progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        Backfill all candidates. Returns counts: total, saved, failed, processed.
+        `progress` is called with the same dict after every committed batch.
+        """
+        state = self._load_state()
+        if retry_failed:
+            state = {'failed': set(), 'incomplete': set()}
+        jobs = self.find_candidates(skip_ids=state['failed'] | state['incomplete'], limit=limit)
+        stats = {'total': len(jobs), 'processed': 0, 'saved': 0, 'failed': 0}
+        if not jobs:
+            return stats
+
+        pending = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._fetch, job) for job in jobs]
+            try:
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"OMDB backfill worker failed: {e}", exc_info=True)
+                        stats['failed'] += 1
+                        stats['processed'] += 1
+                        continue
+                    self._apply(result, state, stats)
+                    stats['processed'] += 1
+                    pending += 1
+                    if pending >= self.batch_size:
+                        self._commit(state, stats, progress)
+                        pending = 0
+            except BaseException:
+                # Keep what is already fetched (e.g. on Ctrl-C) and stop queued work
+                for future in futures:
+                    future.cancel()
+                self._commit(state, stats, progress)
+                raise
+        self._commit(state, stats, progress)
+        return stats
+
+    def _commit(self, state: Dict, stats: Dict, progress: Optional[Callable[[Dict], None]]):
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error committing OMDB backfill batch: {e}")
+            return
+        self._save_state(state)
+        if progress:
+            progress(dict(stats))
@@ -0,0 +1,178 @@
+from typing import Dict, Optional, Tuple
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class OMDBResponseCache:
+    """
+    Persistent cache of OMDB API responses in a small SQLite file.
+
+    The file is separate from the main database so cache writes never mix with (or
+    wait on) the caller's transaction, and every worker process on the host shares
+    it. Keys are normalized lookups ('title:the godfather:1972', 'imdb:tt0068646').
+    "Movie not found" answers are cached too (negative caching) with their own,
+    shorter TTL. Least recently used rows are evicted beyond `max_entries`.
+
+    Configured from app.config:
+        OMDB_CACHE_PATH         SQLite file (instance/omdb_cache.sqlite), 'none' disables
+        OMDB_CACHE_HIT_TTL      seconds a found movie is kept (30 days)
+        OMDB_CACHE_MISS_TTL     seconds a "not found" answer is kept (1 day)
+        OMDB_CACHE_MAX_ENTRIES  rows kept before LRU eviction (5000)
+    """
+
+    TABLE = 'omdb_responses'
+    # Evict after this many writes instead of counting rows on every insert
+    EVICT_EVERY = 50
+
+    def __init__(self, path: Optional[str] = None, hit_ttl: int = 30 * 86400, miss_ttl: int = 86400,
+                 max_entries: int = 5000):
+        self.path = path
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counts = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def init_app(self, app):
+        """Set path and limits from the app config."""
+        path = app.config.get('OMDB_CACHE_PATH') or os.path.join(app.instance_path, 'omdb_cache.sqlite')
+        self.path = None if path == 'none' else path
+        self.hit_ttl = app.config.get('OMDB_CACHE_HIT_TTL', self.hit_ttl)
+        self.miss_ttl = app.config.get('OMDB_CACHE_MISS_TTL', self.miss_ttl)
+        self.max_entries = app.config.get('OMDB_CACHE_MAX_ENTRIES', self.max_entries)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread (and per path), created on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.path == self.path:
+            return connection
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                key TEXT PRIMARY KEY,
+                payload TEXT,              -- JSON response, NULL for "not found"
+                expires_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE}_last_used ON {self.TABLE} (last_used)")
+        self._local.connection = connection
+        self._local.path = self.path
+        return connection
+
+    @staticmethod
+    def make_key(kind: str, *parts) -> str:
+        """Normalize a lookup so 'The  Godfather' and 'the godfather' share an entry."""
+        normalized = [re.sub(r'\s+', ' ', str(part)).strip().lower() for part in parts if part not in (None, '')]
+        return ':'.join([kind] + normalized)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] += amount
+
+    def get(self, key: str) -> Optional[Tuple[bool, Optional[Dict]]]:
+        """
+        Return (True, response) for a cached hit, (False, None) for a cached
+        "not found", or None when the lookup has to go to OMDB.
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                f"SELECT payload FROM {self.TABLE} WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            connection.execute(
+                f"UPDATE {self.TABLE} SET last_used = ?, hit_count = hit_count + 1 WHERE key = ?", (now, key)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"OMDB cache read failed for '{key}': {e}")
+            return None
+
+        if row[0] is None:
+            self._count('negative_hits')
+            return (False, None)
+        self._count('hits')
+        return (True, json.loads(row[0]))
+
+    def set(self, key: str, response: Optional[Dict]):
+        """Store a response, or None to remember that OMDB doesn't know the movie."""
+        if not self.enabled:
+            return
+        now = time.time()
+        ttl = self.hit_ttl if response is not None else self.miss_ttl
+        payload = json.dumps(response) if response is not None else None
+        try:
+            self._connection().execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} (key, payload, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"OMDB cache write failed for '{key}': {e}")
+            return
+        self._count('stores')
+        with self._lock:
+            self._writes += 1
+            evict = self._writes % self.EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired rows, then the least recently used ones above max_entries."""
+        if not self.enabled:
+            return 0
+        try:
+            connection = self._connection()
+            removed = connection.execute(f"DELETE FROM {self.TABLE} WHERE expires_at <= ?", (time.time(),)).rowcount
+            removed += connection.execute(f"""
+                DELETE FROM {self.TABLE} WHERE key IN (
+                    SELECT key FROM {self.TABLE} ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,)).rowcount
+        except sqlite3.Error as e:
+            logger.error(f"OMDB cache eviction failed: {e}")
+            return 0
+        self._count('evictions', removed)
+        return removed
+
+    def clear(self):
+        if self.enabled:
+            self._connection().execute(f"DELETE FROM {self.TABLE}")
+
+    def stats(self) -> Dict:
+        """Counters of this process plus totals stored in the shared file."""
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['hits'] + counts['negative_hits'] + counts['misses']
+        counts['hit_rate'] = round((counts['hits'] + counts['negative_hits']) / lookups, 3) if lookups else None
+        counts['enabled'] = self.enabled
+        if self.enabled:
+            try:
+                entries, negative, stored_hits = self._connection().execute(
+                    f"SELECT count(*), sum(payload IS NULL), coalesce(sum(hit_count), 0) FROM {self.TABLE}"
+                ).fetchone()
+                counts.update({'entries': entries, 'negative_entries': negative or 0, 'stored_hits': stored_hits})
+            except sqlite3.Error as e:
+                logger.error(f"OMDB cache stats failed: {e}")
+        return counts
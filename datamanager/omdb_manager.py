@@ -1,14 +1,12 @@
 import os
-import sys
-import requests
-from dotenv import load_dotenv
 from .interface import db, MovieOMDB, Movie
+from .poster_pipeline import PosterPipeline
+from .omdb_cache import OMDBResponseCache
+from .query_stats import timed
 from sqlalchemy.exc import SQLAlchemyError
-import urllib.request
-import ssl
+from functools import cached_property
 from pathlib import Path
 import logging
-from functools import lru_cache
 from typing import Optional, Dict
 
 # Configure logging
@@ -27,18 +25,28 @@ class OMDBManager:
             # raise ValueError("OMDB_API_KEY environment variable not set")
             
         self.base_url = 'https://www.omdbapi.com/'
-        # Ensure static/movies directory exists
+        # Posters go to static/movies, created with the first download
         self.movies_dir = Path('static/movies')
-        self.movies_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Secure SSL context for downloading posters
+        # Responsive WebP/JPEG sizes of every saved poster
+        self.poster_pipeline = PosterPipeline(self.movies_dir)
+        # API responses shared by all workers; disabled until init_app() sets its path
+        self.response_cache = OMDBResponseCache()
+
+    # HTTP code (requests, ssl) is imported on first use: most requests and every
+    # serverless cold start never talk to OMDB
+
+    @cached_property
+    def ssl_context(self):
+        """Secure SSL context for downloading posters, created on first use."""
+        import ssl
         try:
-            self.ssl_context = ssl.create_default_context()
-            self.ssl_context.check_hostname = True
-            self.ssl_context.verify_mode = ssl.CERT_REQUIRED
+            context = ssl.create_default_context()
+            context.check_hostname = True
+            context.verify_mode = ssl.CERT_REQUIRED
+            return context
         except Exception as e:
             logger.error(f"Failed to create secure SSL context: {e}", exc_info=True)
-            self.ssl_context = None # Fallback to default context if creation fails
+            return None # Fallback to default context if creation fails
 
     def save_poster(self, poster_url: str, movie_id: int, imdb_id: str) -> Optional[str]:
         """Download poster image from URL and save locally."""
@@ -46,12 +54,15 @@ class OMDBManager:
             logger.warning(f"Skipping poster save for movie {movie_id}: Invalid URL ('{poster_url}') or missing IMDB ID ('{imdb_id}').")
             return None
             
+        import requests
         filename = f"{imdb_id}-omdb-poster.jpg"
         filepath = self.movies_dir / filename
         
         try:
+            self.movies_dir.mkdir(parents=True, exist_ok=True)
             # Use requests instead of urllib for better SSL handling
-            response = requests.get(poster_url, timeout=10, stream=True)
+            with timed('omdb'):
+                response = requests.get(poster_url, timeout=10, stream=True)
             response.raise_for_status()  # Raise exception for HTTP errors
             
             # Check content type to ensure it's an image
@@ -81,13 +92,30 @@ class OMDBManager:
             logger.error(f"Unexpected error saving poster for movie {movie_id}: {e}", exc_info=True)
             return None
 
-    # Cache OMDB API responses based on title (consider using IMDB ID for more specific caching)
-    @lru_cache(maxsize=200)
+    def init_app(self, app):
+        """Configure the persistent OMDB response cache from the app config."""
+        self.response_cache.init_app(app)
+
+    def _cached_response(self, key: str, data: Dict) -> Optional[Dict]:
+        """Store an OMDB answer in the response cache and return it, or None if it was an error."""
+        if data.get('Response') != 'False':
+            self.response_cache.set(key, data)
+            return data
+        # Only "not found" is a stable answer; limits or key errors must be retried
+        if 'not found' in (data.get('Error') or '').lower():
+            self.response_cache.set(key, None)
+        return None
+
     def fetch_omdb_data_by_title(self, title: str, year: Optional[int] = None) -> Optional[Dict]:
         """Fetch movie data from OMDB API by title (and optionally year)."""
         if not self.api_key:
              logger.error("Cannot fetch OMDB data: API key not configured.")
              return None
+
+        cache_key = self.response_cache.make_key('title', title, year)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached[1]
              
         params = {
             'apikey': self.api_key,
@@ -97,17 +125,18 @@ class OMDBManager:
         if year:
             params['y'] = str(year)
         
+        import requests
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
+            with timed('omdb'):
+                response = requests.get(self.base_url, params=params, timeout=10)
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
             data = response.json()
             
             if data.get('Response') == 'False':
                 # Log API errors (e.g., "Movie not found!") but return None
                 logger.warning(f"OMDB API Error for title '{title}' ({year or 'any year'}): {data.get('Error')}")
-                return None
                 
-            return data # Return the JSON data as a dictionary
+            return self._cached_response(cache_key, data)
             
         except requests.exceptions.Timeout:
              logger.error(f"Timeout fetching OMDB data for title '{title}'.")
@@ -116,12 +145,16 @@ class OMDBManager:
             logger.error(f"Request error fetching OMDB data for title '{title}': {e}", exc_info=True)
             return None
 
-    @lru_cache(maxsize=200)
     def fetch_omdb_data_by_imdb_id(self, imdb_id: str) -> Optional[Dict]:
         """Fetch movie data from OMDB API by IMDB ID."""
         if not self.api_key:
              logger.error("Cannot fetch OMDB data: API key not configured.")
              return None
+
+        cache_key = self.response_cache.make_key('imdb', imdb_id)
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached[1]
              
         params = {
             'apikey': self.api_key,
@@ -129,17 +162,18 @@ class OMDBManager:
             'plot': 'full' # Request full plot details
         }
         
+        import requests
         try:
-            response = requests.get(self.base_url, params=params, timeout=10)
+            with timed('omdb'):
+                response = requests.get(self.base_url, params=params, timeout=10)
             response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
             data = response.json()
             
             if data.get('Response') == 'False':
                 # Log API errors (e.g., "Movie not found!") but return None
                 logger.warning(f"OMDB API Error for IMDB ID '{imdb_id}': {data.get('Error')}")
-                return None
                 
-            return data # Return the JSON data as a dictionary
+            return self._cached_response(cache_key, data)
             
         except requests.exceptions.Timeout:
              logger.error(f"Timeout fetching OMDB data for IMDB ID '{imdb_id}'.")
@@ -148,29 +182,9 @@ class OMDBManager:
             logger.error(f"Request error fetching OMDB data for IMDB ID '{imdb_id}': {e}", exc_info=True)
             return None
 
-    def get_or_fetch_omdb_data(self, movie_id: int) -> Optional[Dict]:
-        """Get OMDB data from DB or fetch from API if missing."""
-        # Check if data exists in DB first
-        existing_omdb = MovieOMDB.query.get(movie_id)
-        if existing_omdb:
-            logger.info(f"Found existing OMDB data for movie {movie_id}.")
-            return existing_omdb.to_dict()
-        
-        logger.info(f"No existing OMDB data for movie {movie_id}, attempting fetch.")
-        movie = Movie.query.get(movie_id) # Get the base movie info
-        if not movie:
-            logger.error(f"Cannot fetch OMDB data: Movie with ID {movie_id} not found.")
-            return None
-            
-        # Fetch data using title and year
-        omdb_data_dict = self.fetch_omdb_data_by_title(movie.name, movie.year)
-        
-        if not omdb_data_dict:
-            logger.warning(f"Failed to fetch OMDB data for movie {movie_id} ('{movie.name}').")
-            return None
-        
-        # Prepare data for DB insertion
-        db_data = {
+    def format_omdb_data(self, movie_id: int, omdb_data_dict: Dict) -> Dict:
+        """Map an OMDB API response to MovieOMDB columns (the poster is handled separately)."""
+        return {
             'id': movie_id,
             'imdb_id': omdb_data_dict.get('imdbID'),
             'title': omdb_data_dict.get('Title'),
@@ -196,6 +210,30 @@ class OMDBManager:
             'website': omdb_data_dict.get('Website'),
             # Poster needs to be handled separately after saving
         }
+
+    def get_or_fetch_omdb_data(self, movie_id: int) -> Optional[Dict]:
+        """Get OMDB data from DB or fetch from API if missing."""
+        # Check if data exists in DB first
+        existing_omdb = MovieOMDB.query.get(movie_id)
+        if existing_omdb:
+            logger.info(f"Found existing OMDB data for movie {movie_id}.")
+            return existing_omdb.to_dict()
+        
+        logger.info(f"No existing OMDB data for movie {movie_id}, attempting fetch.")
+        movie = Movie.query.get(movie_id) # Get the base movie info
+        if not movie:
+            logger.error(f"Cannot fetch OMDB data: Movie with ID {movie_id} not found.")
+            return None
+            
+        # Fetch data using title and year
+        omdb_data_dict = self.fetch_omdb_data_by_title(movie.name, movie.year)
+        
+        if not omdb_data_dict:
+            logger.warning(f"Failed to fetch OMDB data for movie {movie_id} ('{movie.name}').")
+            return None
+        
+        # Prepare data for DB insertion
+        db_data = self.format_omdb_data(movie_id, omdb_data_dict)
         
         # Attempt to save the poster
         poster_url = omdb_data_dict.get('Poster')
@@ -211,8 +249,14 @@ class OMDBManager:
             logger.error(f"Failed to save fetched OMDB data for movie {movie_id}.")
             return None
 
-    def save_omdb_data_to_db(self, movie_id: int, db_data: Dict) -> bool:
-        """Save formatted OMDB data dictionary to the database."""
+    def save_omdb_data_to_db(self, movie_id: int, db_data: Dict, commit: bool = True) -> bool:
+        """
+        Save formatted OMDB data dictionary to the database.
+        With commit=False the caller owns the transaction (and the rollback on failure).
+        """
+        # Build the poster derivatives the first time a poster is stored
+        if db_data.get('poster_img') and not db_data.get('poster_variants'):
+            db_data['poster_variants'] = self.poster_pipeline.process(db_data['poster_img'])
         try:
             # Check again if data was inserted concurrently
             existing_data = MovieOMDB.query.get(movie_id)
@@ -238,17 +282,43 @@ class OMDBManager:
                 new_data = MovieOMDB(**db_data)
                 db.session.add(new_data)
 
-            db.session.commit()
+            # Keep the full-text search index in the same transaction
+            self.data_manager.search_index.index_movie(movie_id)
+            if commit:
+                db.session.commit()
+            else:
+                db.session.flush()
             return True
         except SQLAlchemyError as e:
             logger.error(f"DB Error saving OMDB data for movie {movie_id}: {e}", exc_info=True)
-            db.session.rollback()
+            if commit:
+                db.session.rollback()
             return False
         except Exception as e:
             logger.error(f"Unexpected error saving OMDB data for movie {movie_id}: {e}", exc_info=True)
-            db.session.rollback()
+            if commit:
+                db.session.rollback()
             return False
 
+    def build_poster_variants(self, force: bool = False) -> Optional[int]:
+        """Create poster derivatives for all stored posters. Returns the number of posters processed."""
+        try:
+            query = MovieOMDB.query.filter(MovieOMDB.poster_img.isnot(None))
+            if not force:
+                query = query.filter(MovieOMDB.poster_variants.is_(None))
+            count = 0
+            for omdb in query.all():
+                manifest = self.poster_pipeline.process(omdb.poster_img)
+                if manifest:
+                    omdb.poster_variants = manifest
+                    count += 1
+            db.session.commit()
+            return count
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error building poster variants: {e}")
+            return None
+
     # --- Potentially deprecated/unused methods below ---
     
     # get_omdb_data seems less useful than get_or_fetch_omdb_data
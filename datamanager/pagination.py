@@ -0,0 +1,74 @@
+from sqlalchemy import and_, or_
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import base64
+import binascii
+import json
+
+PAGE_SIZE = 24
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not produced by encode_cursor() for this ordering."""
+
+
+class Page(NamedTuple):
+    items: List
+    next_cursor: Optional[str]  # None on the last page
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque, URL safe cursor for the sort key of the last row of a page."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """Sort key of a cursor from encode_cursor(), None for no cursor (the first page)."""
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor) from None
+    if not isinstance(values, list) or len(values) != size or \
+            not all(isinstance(value, (int, float, str)) for value in values):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def after_position(order: Sequence[Tuple], values: Sequence):
+    """
+    WHERE clause for the rows after `values` in `order` [(column, descending), ...].
+
+    Expanded to a <= x AND (a < x OR (a = x AND b > y) ...) rather than a row value
+    comparison, so columns may be sorted in different directions. The leading bound
+    on the first column lets SQLite seek into the ORDER BY index instead of walking
+    it from the start.
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        equal = [order[j][0] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    first, descending = order[0]
+    return and_(first <= values[0] if descending else first >= values[0], or_(*clauses))
+
+
+def keyset_page(query, order: Sequence[Tuple], cursor: Optional[str], limit: int = PAGE_SIZE) -> Page:
+    """
+    Run `query` sorted by `order` and return the `limit` rows after `cursor` as tuples.
+
+    Every page is an index seek to the cursor position plus `limit` rows, so deep pages
+    cost the same as the first, unlike OFFSET which reads and drops all earlier rows.
+    The order columns must be selected by the query and the last one must be unique.
+    """
+    after = decode_cursor(cursor, len(order))
+    if after is not None:
+        query = query.filter(after_position(order, after))
+    query = query.order_by(*[column.desc() if descending else column for column, descending in order])
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]._mapping[column] for column, _ in order])
+    return Page([tuple(row) for row in rows], next_cursor)
@@ -0,0 +1,103 @@
+from pathlib import Path
+from typing import Dict, Optional
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PosterPipeline:
+    """
+    Builds responsive derivatives of the poster files in static/movies.
+
+    Every poster gets WebP and JPEG copies at a few widths, stored in
+    static/movies/derived/ under content-hashed names (e.g.
+    tt0111161-omdb-poster-320w.1a2b3c4d5e.webp). The names change whenever the
+    source image or the encoder settings change, so they can be cached forever.
+    The returned manifest is stored on MovieOMDB.poster_variants and read by the
+    `poster_srcset` template helper.
+    """
+
+    WIDTHS = (160, 240, 320, 480)
+    FORMATS = {
+        # format: (file extension, Pillow save options)
+        'webp': ('webp', {'quality': 80, 'method': 4}),
+        'jpeg': ('jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    }
+    DERIVED_DIR = 'derived'
+
+    def __init__(self, movies_dir='static/movies', widths=WIDTHS):
+        self.movies_dir = Path(movies_dir)
+        self.output_dir = self.movies_dir / self.DERIVED_DIR
+        self.widths = tuple(sorted(widths))
+
+    def _target_widths(self, original_width: int):
+        """Configured widths smaller than the original, plus the original size as the largest one."""
+        widths = [w for w in self.widths if w < original_width]
+        if original_width <= self.widths[-1]:
+            widths.append(original_width)
+        return widths
+
+    def _content_hash(self, data: bytes) -> str:
+        settings = repr((self.widths, sorted((f, sorted(o[1].items())) for f, o in self.FORMATS.items())))
+        return hashlib.sha256(data + settings.encode('utf-8')).hexdigest()[:10]
+
+    def process(self, filename: str) -> Optional[Dict]:
+        """
+        Create all derivatives of one poster and return its manifest:
+        {'hash': ..., 'width': ..., 'height': ..., 'variants': {'webp': {'160': path, ...}, 'jpeg': {...}}}
+        Paths are relative to the static folder. Returns None if the file is missing or not an image.
+        """
+        if not filename:
+            return None
+        # Pillow is only needed here, not by the web app that renders the srcsets
+        from PIL import Image, UnidentifiedImageError
+        source = self.movies_dir / filename
+        try:
+            data = source.read_bytes()
+            with Image.open(source) as image:
+                image.load()
+                source_format = image.format
+                original = image.convert('RGB')
+        except (OSError, UnidentifiedImageError) as e:
+            logger.warning(f"Cannot build poster variants for {source}: {e}")
+            return None
+
+        content_hash = self._content_hash(data)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(filename).stem
+        variants = {fmt: {} for fmt in self.FORMATS}
+
+        for width in self._target_widths(original.width):
+            height = round(original.height * width / original.width)
+            resized = None
+            for fmt, (extension, options) in self.FORMATS.items():
+                if width == original.width and fmt.upper() == source_format:
+                    # Re-encoding the full size in its own format only makes it bigger
+                    variants[fmt][str(width)] = f"{self.movies_dir.name}/{filename}"
+                    continue
+                name = f"{stem}-{width}w.{content_hash}.{extension}"
+                target = self.output_dir / name
+                # Content-hashed names make existing files safe to reuse
+                if not target.exists():
+                    if resized is None:
+                        resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+                    tmp_target = target.with_name(target.name + '.tmp')
+                    resized.save(tmp_target, format=fmt.upper(), **options)
+                    tmp_target.replace(target)
+                variants[fmt][str(width)] = f"{self.movies_dir.name}/{self.DERIVED_DIR}/{name}"
+
+        return {
+            'hash': content_hash,
+            'width': original.width,
+            'height': original.height,
+            'variants': variants
+        }
+
+
+def poster_srcset(manifest: Optional[Dict], fmt: str, url_for) -> str:
+    """Build a srcset attribute value ('url 160w, url 240w, ...') from a poster manifest."""
+    if not manifest:
+        return ''
+    entries = sorted(manifest.get('variants', {}).get(fmt, {}).items(), key=lambda item: int(item[0]))
+    return ', '.join(f"{url_for('static', filename=path)} {width}w" for width, path in entries)
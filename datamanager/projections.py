@@ -0,0 +1,118 @@
+from .interface import db, Movie, MovieOMDB, Category, movie_categories
+from sqlalchemy.orm import joinedload, selectinload
+from collections.abc import Mapping
+from typing import Dict, List
+
+
+class MovieCard(Mapping):
+    """
+    Compact record holding only what a poster card renders.
+
+    It reads like the movie dictionaries the templates already get (``movie.get('name')``,
+    ``movie['omdb_data']['poster_img']``), but stores a few slots instead of a full ORM
+    graph. Viewer status fields are only present once they are set.
+    """
+
+    __slots__ = ('id', 'name', 'year', 'rating', 'poster_img', 'poster_variants', 'imdb_rating', 'categories',
+                 'user_watched', 'user_watchlist', 'user_rated', 'user_favorite')
+
+    def __init__(self, id, name, year, rating, poster_img=None, imdb_rating=None, categories=(), poster_variants=None):
+        self.id = id
+        self.name = name
+        self.year = year
+        self.rating = rating
+        self.poster_img = poster_img
+        self.poster_variants = poster_variants
+        self.imdb_rating = imdb_rating
+        self.categories = list(categories)
+
+    def __getitem__(self, key):
+        if key == 'omdb_data':
+            # Same shape as MovieOMDB.to_dict() for the fields a card uses
+            if self.poster_img is None and self.imdb_rating is None:
+                return None
+            return {'poster_img': self.poster_img, 'poster_variants': self.poster_variants, 'imdb_rating': self.imdb_rating}
+        if key in self.__slots__:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        raise KeyError(key)
+
+    def __iter__(self):
+        for key in self.__slots__:
+            if hasattr(self, key):
+                yield key
+        yield 'omdb_data'
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"<MovieCard {self.id} {self.name!r}>"
+
+    def update(self, fields: Dict):
+        """Set slot fields (e.g. the viewer status flags) in place."""
+        for key, value in fields.items():
+            setattr(self, key, value)
+
+    def copy(self) -> 'MovieCard':
+        """A new card with the same fields, like dict.copy(): nested values are shared."""
+        card = MovieCard.__new__(MovieCard)
+        for key in self.__slots__:
+            if hasattr(self, key):
+                setattr(card, key, getattr(self, key))
+        return card
+
+    def to_dict(self) -> Dict:
+        return dict(self)
+
+
+def load_movie_cards(movie_ids: List[int]) -> Dict[int, MovieCard]:
+    """Build cards with two narrow queries: movie + poster columns, then category names."""
+    if not movie_ids:
+        return {}
+    rows = db.session.execute(
+        db.select(Movie.id, Movie.name, Movie.year, Movie.rating,
+                  MovieOMDB.poster_img, MovieOMDB.imdb_rating, MovieOMDB.poster_variants)
+        .outerjoin(MovieOMDB, MovieOMDB.id == Movie.id)
+        .where(Movie.id.in_(movie_ids))
+    ).all()
+    if not rows:
+        return {}
+
+    categories = {}
+    category_rows = db.session.execute(
+        db.select(movie_categories.c.movie_id, Category.id, Category.name)
+        .join(Category, Category.id == movie_categories.c.category_id)
+        .where(movie_categories.c.movie_id.in_(movie_ids))
+        .order_by(movie_categories.c.movie_id, Category.id)
+    ).all()
+    for movie_id, category_id, category_name in category_rows:
+        categories.setdefault(movie_id, []).append({'id': category_id, 'name': category_name})
+
+    cards = {}
+    for movie_id, name, year, rating, poster_img, imdb_rating, poster_variants in rows:
+        cards[movie_id] = MovieCard(movie_id, name, year, rating, poster_img, imdb_rating,
+                                    categories.get(movie_id, ()), poster_variants)
+    return cards
+
+
+def load_movie_details(movie_ids: List[int]) -> Dict[int, Dict]:
+    """Full movie dictionaries (Movie.to_dict) with all relationships eager loaded."""
+    if not movie_ids:
+        return {}
+    movies = Movie.query.filter(Movie.id.in_(movie_ids)).options(
+        joinedload(Movie.omdb_data),
+        joinedload(Movie.category),
+        selectinload(Movie.categories),
+        selectinload(Movie.streaming_platforms)
+    ).all()
+    return {movie.id: movie.to_dict() for movie in movies}
+
+
+# Named projections accepted by SQLiteDataManager.get_movies_data(view=...)
+MOVIE_PROJECTIONS = {
+    'card': load_movie_cards,
+    'detail': load_movie_details,
+}
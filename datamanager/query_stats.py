@@ -0,0 +1,174 @@
+from .interface import db, logger
+from contextlib import contextmanager
+from collections import Counter
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from typing import Dict, List, Optional
+import re
+import time
+
+STATS_KEY = '_request_stats'
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\(\?(?:,\s*\?)*\)')
+
+
+def statement_shape(statement: str) -> str:
+    """Statement with whitespace collapsed and IN lists of any length reduced to '(?)'."""
+    return _PLACEHOLDER_LIST.sub('(?)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestStats:
+    """SQL statements and timings collected during one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.shapes = Counter()
+        self.timings = Counter()  # seconds per Server-Timing metric ('db', 'render', 'omdb')
+
+    def repeated(self, threshold: int) -> List:
+        """(count, shape) of statements that ran at least `threshold` times, most frequent first."""
+        return [(count, shape) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self) -> str:
+        metrics = [f'db;dur={self.timings["db"] * 1000:.1f};desc="{self.queries} queries"']
+        metrics += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.timings.items() if name != 'db']
+        metrics.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Stats of the running request, or None outside a request or before the first query."""
+    return g.get(STATS_KEY) if has_request_context() else None
+
+
+@contextmanager
+def timed(metric: str):
+    """Add the time spent in the block to a Server-Timing metric of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context():
+            _request_stats().timings[metric] += time.perf_counter() - started
+
+
+def _request_stats() -> RequestStats:
+    stats = g.get(STATS_KEY)
+    if stats is None:
+        stats = RequestStats()
+        setattr(g, STATS_KEY, stats)
+    return stats
+
+
+class QueryInstrumentation:
+    """
+    Counts SQL statements and their time per request from SQLAlchemy engine events,
+    adds template render time and OMDB API time (`timed('omdb')`), and reports them in
+    a `Server-Timing` response header. Statements of the same shape that run many
+    times in one request (typically a lazy load inside a loop) are logged as a
+    possible N+1 query.
+
+    Configured from app.config:
+        SERVER_TIMING_HEADER    add the Server-Timing header (True)
+        QUERY_REPEAT_THRESHOLD  runs of one statement shape that are logged as N+1 (5, 0 = off)
+    """
+
+    def __init__(self):
+        self.header = True
+        self.repeat_threshold = 5
+
+    def init_app(self, app):
+        """Hook into the engines of the app (after the data manager set up the database)."""
+        self.header = app.config.get('SERVER_TIMING_HEADER', True)
+        self.repeat_threshold = app.config.get('QUERY_REPEAT_THRESHOLD', 5)
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.after_request(self._after_request)
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context():
+            stats = _request_stats()
+            stats.queries += 1
+            stats.shapes[statement_shape(statement)] += 1
+            stats.timings['db'] += elapsed
+
+    @staticmethod
+    def _before_render(sender, template, context, **extra):
+        g.setdefault('_render_started', []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_render(sender, template, context, **extra):
+        started = g.get('_render_started')
+        if started:
+            _request_stats().timings['render'] += time.perf_counter() - started.pop()
+
+    def _after_request(self, response):
+        stats = current_stats()
+        if stats is None:
+            return response
+        for count, shape in stats.repeated(self.repeat_threshold) if self.repeat_threshold else ():
+            logger.warning(f"Possible N+1 query in {request.endpoint}: {count}x {shape[:200]}")
+        if self.header:
+            response.headers['Server-Timing'] = stats.server_timing()
+        return response
+
+
+class QueryCounter:
+    """
+    Records the statements run on the app's engines while the block runs:
+
+        with QueryCounter(app) as queries:
+            client.get('/movies')
+        assert len(queries) <= 12
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.statements: List[str] = []
+        self._engines = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def _listener(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        if self.app is not None:
+            with self.app.app_context():
+                self._engines = list(db.engines.values())
+        else:
+            self._engines = list(db.engines.values())
+        for engine in self._engines:
+            event.listen(engine, 'before_cursor_execute', self._listener)
+        return self
+
+    def __exit__(self, *exc_info):
+        for engine in self._engines:
+            event.remove(engine, 'before_cursor_execute', self._listener)
+        return False
+
+    def shapes(self) -> Dict[str, int]:
+        return dict(Counter(statement_shape(statement) for statement in self.statements))
+
+
+@contextmanager
+def assert_max_queries(limit: int, app=None):
+    """Fail if the block runs more than `limit` SQL statements; lists them in the error."""
+    with QueryCounter(app) as queries:
+        yield queries
+    if len(queries) > limit:
+        listing = '\n'.join(f"  {count}x {shape[:160]}" for shape, count in
+                            sorted(queries.shapes().items(), key=lambda item: -item[1]))
+        raise AssertionError(f"{len(queries)} queries, expected at most {limit}:\n{listing}")
@@ -0,0 +1,273 @@
+from __future__ import annotations
+from .interface import db, logger, UserFavorite, MovieNeighbor, MovieNeighborQueue
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+import time
+
+# numpy is only needed to rebuild neighbours, so it is imported there and not when
+# the web app starts; the annotations below are strings
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class InteractionMatrix:
+    """
+    Sparse user x movie matrix of interaction weights, stored twice in CSR form:
+    by user (the movies of each user) and by movie (the users of each movie).
+    """
+
+    def __init__(self, user_ids, movie_ids, weights):
+        import numpy as np
+        user_ids = np.asarray(user_ids)
+        movie_ids = np.asarray(movie_ids)
+        weights = np.asarray(weights, dtype=np.float64)
+        self.movie_ids, items = np.unique(movie_ids, return_inverse=True)
+        _, users = np.unique(user_ids, return_inverse=True)
+        self.n_users = int(users.max()) + 1 if len(users) else 0
+        self.n_items = len(self.movie_ids)
+
+        by_user = np.argsort(users, kind='stable')
+        self.user_indptr = np.concatenate(([0], np.cumsum(np.bincount(users, minlength=self.n_users))))
+        self.user_items = items[by_user]
+        self.user_weights = weights[by_user]
+
+        by_item = np.argsort(items, kind='stable')
+        self.item_indptr = np.concatenate(([0], np.cumsum(np.bincount(items, minlength=self.n_items))))
+        self.item_users = users[by_item]
+        self.item_weights = weights[by_item]
+
+        self.norms = np.sqrt(np.bincount(items, weights=weights * weights, minlength=self.n_items))
+        # Co-occurrence entries a movie produces: the summed item counts of its users
+        user_sizes = np.diff(self.user_indptr)
+        self.item_costs = np.bincount(items, weights=user_sizes[users], minlength=self.n_items)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.user_items)
+
+    def item_index(self, movie_ids: Iterable[int]) -> np.ndarray:
+        """Matrix columns of the given movie IDs (movies without interactions are dropped)."""
+        import numpy as np
+        movie_ids = np.unique(np.asarray(list(movie_ids), dtype=np.int64))
+        positions = np.searchsorted(self.movie_ids, movie_ids)
+        found = positions < self.n_items
+        positions, movie_ids = positions[found], movie_ids[found]
+        return positions[self.movie_ids[positions] == movie_ids]
+
+
+def _expand(indptr: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """For CSR rows, return (position in `rows`, index into the data arrays) of every stored entry."""
+    import numpy as np
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, starts[owner] + offsets
+
+
+class ItemItemRecommender:
+    """
+    Item-item collaborative filtering over user_favorites.
+
+    Every interaction becomes a weight (watched, watchlist, favorite and the rating
+    relative to 5/10). Movie similarity is the cosine of their user weight vectors;
+    the top `k` neighbours of each movie are stored in movie_neighbors, so serving a
+    "because you watched" row is a single indexed lookup. Favorite writes queue the
+    affected movies in movie_neighbor_queue, and `rebuild()` refreshes only those
+    unless a full rebuild is asked for.
+    """
+
+    WATCHED = 1.0
+    WATCHLIST = 0.5
+    FAVORITE = 2.0
+    # Bounds on the memory of one NumPy step: co-occurrence entries and dense score cells
+    BLOCK_ENTRIES = 4_000_000
+    BLOCK_CELLS = 4_000_000
+
+    def __init__(self, k: int = 20):
+        self.k = k
+
+    # --- Matrix ---
+
+    def load_matrix(self) -> InteractionMatrix:
+        """Read all positive interaction weights from user_favorites."""
+        import numpy as np
+        rows = db.session.execute(text("""
+            SELECT user_id, movie_id,
+                   (CASE WHEN watched THEN :watched ELSE 0 END)
+                 + (CASE WHEN watchlist THEN :watchlist ELSE 0 END)
+                 + (CASE WHEN favorite THEN :favorite ELSE 0 END)
+                 + COALESCE((rating - 5.0) / 5.0, 0) AS weight
+            FROM user_favorites
+        """), {'watched': self.WATCHED, 'watchlist': self.WATCHLIST, 'favorite': self.FAVORITE}).all()
+        data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        data = data[data[:, 2] > 0]
+        return InteractionMatrix(data[:, 0].astype(np.int64), data[:, 1].astype(np.int64), data[:, 2])
+
+    def _blocks(self, matrix: InteractionMatrix, items: np.ndarray):
+        """
+        Split target movies into blocks whose dense score rows fit in BLOCK_CELLS and
+        whose co-occurrence entries fit in BLOCK_ENTRIES.
+        """
+        max_rows = max(1, self.BLOCK_CELLS // max(matrix.n_items, 1))
+        block_start, block_cost = 0, 0.0
+        for position, cost in enumerate(matrix.item_costs[items].tolist()):
+            if position > block_start and (block_cost + cost > self.BLOCK_ENTRIES or position - block_start >= max_rows):
+                yield items[block_start:position]
+                block_start, block_cost = position, 0.0
+            block_cost += cost
+        if block_start < len(items):
+            yield items[block_start:]
+
+    def compute_neighbors(self, matrix: InteractionMatrix, items: Optional[np.ndarray] = None
+                          ) -> Dict[int, List[Tuple[int, float]]]:
+        """
+        Top-k most similar movies for the given matrix columns (all by default), as
+        {movie_id: [(neighbor_id, score), ...]} ordered by descending score.
+        """
+        import numpy as np
+        if items is None:
+            items = np.arange(matrix.n_items)
+        n_items = matrix.n_items
+        k = min(self.k, n_items - 1)
+        neighbors = {}
+        if k < 1:
+            return neighbors
+        for block in self._blocks(matrix, items):
+            # Users of every target movie, then every movie of those users
+            target_of, entry = _expand(matrix.item_indptr, block)
+            users = matrix.item_users[entry]
+            pair_of, user_entry = _expand(matrix.user_indptr, users)
+            others = matrix.user_items[user_entry]
+            products = matrix.item_weights[entry][pair_of] * matrix.user_weights[user_entry]
+
+            # Dot products of each target with every movie, summed in one dense buffer
+            # per block; only the non-zero cells are kept
+            dots = np.bincount(target_of[pair_of] * n_items + others, weights=products,
+                               minlength=len(block) * n_items)
+            cells = np.flatnonzero(dots)
+            rows, others = np.divmod(cells, n_items)
+            targets = block[rows]
+            keep = others != targets
+            rows, others, targets = rows[keep], others[keep], targets[keep]
+            scores = dots[cells[keep]] / (matrix.norms[targets] * matrix.norms[others])
+
+            # Sort by target, then score descending (scores are in (0, 1]) and keep the first k
+            order = np.argsort(rows - scores * 0.5, kind='stable')
+            rows, others, scores = rows[order], others[order], scores[order]
+            first = np.searchsorted(rows, np.arange(len(block)))
+            rank = np.arange(len(rows)) - first[rows]
+            top = rank < k
+            for row, other, score in zip(rows[top].tolist(), others[top].tolist(), scores[top].tolist()):
+                neighbors.setdefault(int(matrix.movie_ids[block[row]]), []).append((int(matrix.movie_ids[other]), score))
+        return neighbors
+
+    # --- Storage ---
+
+    def queue_user_movies(self, user_id: int, movie_id: int):
+        """
+        Mark neighbours stale after a user's interaction with a movie changed: that
+        movie's and those of every other movie the user interacted with.
+        Runs inside the caller's transaction; the caller commits.
+        """
+        table = MovieNeighborQueue.__table__
+        db.session.execute(sqlite_insert(table).values(movie_id=movie_id).on_conflict_do_nothing())
+        db.session.execute(text("""
+            INSERT OR IGNORE INTO movie_neighbor_queue (movie_id)
+            SELECT movie_id FROM user_favorites WHERE user_id = :user_id
+        """), {'user_id': user_id})
+
+    def remove_movie(self, movie_id: int):
+        """Drop a deleted movie from the neighbour lists. Runs in the caller's transaction."""
+        table = MovieNeighbor.__table__
+        db.session.execute(table.delete().where((table.c.movie_id == movie_id) | (table.c.neighbor_id == movie_id)))
+        db.session.execute(MovieNeighborQueue.__table__.delete().where(MovieNeighborQueue.movie_id == movie_id))
+
+    def rebuild(self, full: bool = False) -> Optional[Dict]:
+        """
+        Recompute neighbours of the queued movies (or of all movies) and replace their
+        rows. Returns timings and counts, or None on a database error or without numpy
+        (an optional dependency, see requirements-dev.txt).
+        """
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            logger.error("Rebuilding movie neighbors needs numpy: pip install -r requirements-dev.txt")
+            return None
+        started = time.perf_counter()
+        try:
+            queued = [row.movie_id for row in MovieNeighborQueue.query.all()]
+            if not full and not queued:
+                return {'movies': 0, 'neighbors': 0, 'seconds': 0.0}
+            matrix = self.load_matrix()
+            loaded = time.perf_counter()
+            items = None if full else matrix.item_index(queued)
+            neighbors = self.compute_neighbors(matrix, items)
+            computed = time.perf_counter()
+
+            table = MovieNeighbor.__table__
+            if full:
+                db.session.execute(table.delete())
+            else:
+                db.session.execute(table.delete().where(table.c.movie_id.in_(queued)))
+            rows = [
+                {'movie_id': movie_id, 'rank': rank, 'neighbor_id': neighbor_id, 'score': score}
+                for movie_id, movie_neighbors in neighbors.items()
+                for rank, (neighbor_id, score) in enumerate(movie_neighbors)
+            ]
+            if rows:
+                db.session.execute(table.insert(), rows)
+            # Movies queued while this ran stay queued for the next run
+            queue = MovieNeighborQueue.__table__
+            db.session.execute(queue.delete().where(queue.c.movie_id.in_(queued)))
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error rebuilding movie neighbors: {e}")
+            return None
+
+        stats = {
+            'movies': matrix.n_items if full else len(queued),
+            'neighbors': len(rows),
+            'users': matrix.n_users,
+            'interactions': matrix.nnz,
+            'load_seconds': round(loaded - started, 3),
+            'compute_seconds': round(computed - loaded, 3),
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+        logger.info(f"Rebuilt movie neighbors: {stats}")
+        return stats
+
+    # --- Serving ---
+
+    def similar_movie_ids(self, movie_id: int, limit: int = 10, exclude_user_id: Optional[int] = None) -> List[int]:
+        """Nearest neighbours of one movie, optionally without movies the user already watched."""
+        query = db.session.query(MovieNeighbor.neighbor_id).filter(MovieNeighbor.movie_id == movie_id)
+        if exclude_user_id is not None:
+            query = query.filter(MovieNeighbor.neighbor_id.notin_(self._watched_ids(exclude_user_id)))
+        return [row.neighbor_id for row in query.order_by(MovieNeighbor.rank).limit(limit).all()]
+
+    def because_you_watched(self, user_id: int, limit: int = 10) -> Tuple[Optional[int], List[int]]:
+        """
+        Pick the user's strongest watched or favorited movie that has unwatched
+        neighbours and return (that movie ID, IDs of those neighbours), in one statement.
+        """
+        watched = self._watched_ids(user_id)
+        seed = db.session.query(UserFavorite.movie_id) \
+            .filter(UserFavorite.user_id == user_id, (UserFavorite.watched == True) | (UserFavorite.favorite == True)) \
+            .filter(db.session.query(MovieNeighbor.movie_id).filter(
+                MovieNeighbor.movie_id == UserFavorite.movie_id, MovieNeighbor.neighbor_id.notin_(watched)
+            ).exists()) \
+            .order_by(UserFavorite.favorite.desc(), UserFavorite.rating.desc().nulls_last(), UserFavorite.movie_id.desc()) \
+            .limit(1).scalar_subquery()
+        rows = db.session.query(MovieNeighbor.movie_id, MovieNeighbor.neighbor_id) \
+            .filter(MovieNeighbor.movie_id == seed, MovieNeighbor.neighbor_id.notin_(watched)) \
+            .order_by(MovieNeighbor.rank).limit(limit).all()
+        if not rows:
+            return None, []
+        return rows[0].movie_id, [row.neighbor_id for row in rows]
+
+    def _watched_ids(self, user_id: int):
+        return db.select(UserFavorite.movie_id).where(UserFavorite.user_id == user_id, UserFavorite.watched == True)
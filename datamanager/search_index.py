@@ -0,0 +1,123 @@
+from .interface import db, logger
+from sqlalchemy.exc import SQLAlchemyError, OperationalError
+from sqlalchemy import text
+from typing import List, Optional
+import re
+
+
+class MovieSearchIndex:
+    """
+    SQLite FTS5 full-text index over movie names and OMDB text fields.
+
+    The virtual table uses the movie ID as its rowid. Rows are refreshed explicitly by
+    the data manager whenever a movie or its OMDB data is written, inside the same
+    transaction, so the index never drifts from the catalog.
+    """
+
+    TABLE = 'movie_search'
+    COLUMNS = ('name', 'title', 'actors', 'director', 'plot', 'genre')
+    # BM25 column weights: title matches count far more than a word in the plot
+    WEIGHTS = (10.0, 10.0, 4.0, 4.0, 1.0, 2.0)
+
+    def __init__(self):
+        self.available = False
+
+    def create(self):
+        """Create the FTS5 table if needed and fill it on first use."""
+        try:
+            db.session.execute(text(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5(
+                    {', '.join(self.COLUMNS)},
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            """))
+            db.session.commit()
+            self.available = True
+        except OperationalError as e:
+            # SQLite builds without FTS5: search falls back to LIKE matching
+            db.session.rollback()
+            logger.error(f"FTS5 not available, movie search uses LIKE fallback: {e}")
+            self.available = False
+            return
+
+        indexed = db.session.execute(text(f"SELECT count(*) FROM {self.TABLE}")).scalar()
+        if not indexed and db.session.execute(text("SELECT 1 FROM movies LIMIT 1")).first():
+            self.rebuild()
+
+    def _select_documents(self, where=''):
+        columns = ', '.join(self.COLUMNS)
+        return f"""
+            INSERT INTO {self.TABLE} (rowid, {columns})
+            SELECT m.id, m.name, o.title, o.actors, o.director, o.plot, o.genre
+            FROM movies m LEFT JOIN movies_omdb o ON o.id = m.id
+            {where}
+        """
+
+    def index_movie(self, movie_id: int):
+        """Refresh the index row of one movie. Runs in the caller's transaction."""
+        if not self.available:
+            return
+        db.session.flush()
+        db.session.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :id"), {'id': movie_id})
+        db.session.execute(text(self._select_documents('WHERE m.id = :id')), {'id': movie_id})
+
+    def remove_movie(self, movie_id: int):
+        """Drop a movie from the index. Runs in the caller's transaction."""
+        if not self.available:
+            return
+        db.session.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :id"), {'id': movie_id})
+
+    def rebuild(self):
+        """Re-index the whole catalog from scratch."""
+        if not self.available:
+            return None
+        try:
+            db.session.execute(text(f"DELETE FROM {self.TABLE}"))
+            db.session.execute(text(self._select_documents()))
+            db.session.commit()
+            count = db.session.execute(text(f"SELECT count(*) FROM {self.TABLE}")).scalar()
+            logger.info(f"Rebuilt search index for {count} movies")
+            return count
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error(f"DB Error rebuilding search index: {e}")
+            return None
+
+    @staticmethod
+    def build_match_expression(query: str) -> Optional[str]:
+        """
+        Turn free user input into an FTS5 prefix query: every word must match,
+        and the last characters typed may be the start of a longer word.
+        """
+        tokens = re.findall(r'\w+', query or '', re.UNICODE)
+        if not tokens:
+            return None
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search_ids(self, query: str, limit: int = 20, offset: int = 0) -> List[int]:
+        """Return movie IDs matching the query, best BM25 match first."""
+        if not self.available:
+            return self._like_search_ids(query, limit, offset)
+
+        match = self.build_match_expression(query)
+        if not match:
+            return []
+        weights = ', '.join(str(w) for w in self.WEIGHTS)
+        rows = db.session.execute(text(f"""
+            SELECT rowid FROM {self.TABLE}
+            WHERE {self.TABLE} MATCH :match
+            ORDER BY bm25({self.TABLE}, {weights}), rowid
+            LIMIT :limit OFFSET :offset
+        """), {'match': match, 'limit': limit, 'offset': offset}).all()
+        return [row[0] for row in rows]
+
+    def _like_search_ids(self, query: str, limit: int, offset: int) -> List[int]:
+        """Name substring match, used only when FTS5 is missing."""
+        if not query or not query.strip():
+            return []
+        rows = db.session.execute(
+            text("SELECT id FROM movies WHERE name LIKE :pattern ORDER BY name LIMIT :limit OFFSET :offset"),
+            {'pattern': f"%{query.strip()}%", 'limit': limit, 'offset': offset}
+        ).all()
+        return [row[0] for row in rows]
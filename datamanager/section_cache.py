@@ -0,0 +1,355 @@
+from .interface import logger, Movie, MovieOMDB, Category, StreamingPlatform, UserFavorite, MovieStats, AvatarMovieStats, AvatarCategoryStats, movie_categories, movie_platforms
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import weakref
+
+
+# Which cache tag a write to each model / table invalidates
+MODEL_TAGS = {
+    Movie: 'catalog',
+    MovieOMDB: 'catalog',
+    Category: 'catalog',
+    StreamingPlatform: 'catalog',
+    UserFavorite: 'favorites',
+    MovieStats: 'favorites',
+    AvatarMovieStats: 'favorites',
+    AvatarCategoryStats: 'favorites',
+}
+TABLE_TAGS = {model.__table__.name: tag for model, tag in MODEL_TAGS.items()}
+TABLE_TAGS[movie_categories.name] = 'catalog'
+TABLE_TAGS[movie_platforms.name] = 'catalog'
+
+# Live caches that listen to session writes
+_caches = weakref.WeakSet()
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry. Fast, but private to one worker."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, tag):
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCacheBackend:
+    """
+    Pickle files in a directory, shared by all workers on the same host. Tag
+    generations are append-only logs that grow by one byte per invalidating commit
+    and are kept by clear(), like the memory backend's.
+    """
+
+    name = 'disk'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.PickleError):
+            return None
+
+    def _write(self, path, data):
+        # Write to a temp file first so readers never see half a file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Section cache write failed for {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def get(self, key):
+        path = self._path(key)
+        entry = self._read(path)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def set(self, key, value, ttl=None):
+        self._write(self._path(key), (time.time() + ttl if ttl else None, value))
+
+    def _generation_path(self, tag):
+        return os.path.join(self.directory, f"generation-{tag}.log")
+
+    def generation(self, tag):
+        # The generation is the length of the tag's log, one byte per bump
+        try:
+            return os.stat(self._generation_path(tag)).st_size
+        except OSError:
+            return 0
+
+    def bump(self, tag):
+        # An O_APPEND write is atomic, so concurrent bumps of several workers all count;
+        # reading and rewriting a counter could let two of them write the same N+1
+        fd = os.open(self._generation_path(tag), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, b'.')
+        finally:
+            os.close(fd)
+
+    def clear(self):
+        for filename in os.listdir(self.directory):
+            if filename.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+
+
+class RedisCacheBackend:
+    """Redis (or a compatible server) shared by all workers. Needs the optional `redis` package."""
+
+    name = 'redis'
+
+    def __init__(self, url, prefix='senflix:section:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis section cache backend needs the 'redis' package") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        if data is None:
+            return None
+        # Redis expires keys itself
+        return (None, pickle.loads(data))
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl or None)
+
+    def generation(self, tag):
+        value = self.client.get(f"{self.prefix}generation:{tag}")
+        return int(value) if value is not None else 0
+
+    def bump(self, tag):
+        self.client.incr(f"{self.prefix}generation:{tag}")
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class SectionCache:
+    """
+    Cache for page sections that are the same for every viewer (ranked movie IDs,
+    category rows, platform lists).
+
+    Every entry is stored under the current generation of the tags it depends on
+    ('catalog', 'favorites'). Committed writes to those tables bump the generation,
+    so older entries are never read again and simply expire. The backend only sees
+    writes of this process (memory) or host (disk), so with `versions` set (the data
+    manager sets DataVersions.current) the key also holds the tags' shared data
+    versions: writes of other workers miss the entry as well, and a page is never built
+    from sections older than its ETag. Per-viewer data (status
+    flags on movie cards) is never cached here; it is added when the cached IDs are
+    hydrated.
+
+    Configured from app.config:
+        SECTION_CACHE_BACKEND   'memory' (default), 'disk', 'redis' or 'none'
+        SECTION_CACHE_TTL       default seconds an entry lives (300)
+        SECTION_CACHE_TTLS      per-section overrides, e.g. {'new_releases': 3600}
+        SECTION_CACHE_MAX_ENTRIES   LRU size of the memory backend (512)
+        SECTION_CACHE_DIR       directory of the disk backend (instance/section_cache)
+        SECTION_CACHE_REDIS_URL URL of the redis backend (redis://localhost:6379/0)
+    """
+
+    def __init__(self):
+        self.backend = MemoryCacheBackend()
+        self.enabled = True
+        self.default_ttl = 300
+        self.ttls = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self.listeners = []  # called with the tags of every invalidation (e.g. the catalog snapshot)
+        self.versions = None  # callable(*tags) -> shared data versions of the tags, part of every key
+        _caches.add(self)
+
+    def init_app(self, app):
+        """Select and configure the backend from the app config."""
+        backend = app.config.get('SECTION_CACHE_BACKEND', 'memory')
+        self.default_ttl = app.config.get('SECTION_CACHE_TTL', 300)
+        self.ttls = dict(app.config.get('SECTION_CACHE_TTLS', {}))
+        self.enabled = backend != 'none'
+        try:
+            if backend == 'disk':
+                directory = app.config.get('SECTION_CACHE_DIR') or os.path.join(app.instance_path, 'section_cache')
+                self.backend = DiskCacheBackend(directory)
+            elif backend == 'redis':
+                self.backend = RedisCacheBackend(app.config.get('SECTION_CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+            else:
+                self.backend = MemoryCacheBackend(app.config.get('SECTION_CACHE_MAX_ENTRIES', 512))
+        except Exception as e:
+            # A missing redis package or unwritable directory must not take the site down
+            logger.error(f"Section cache backend '{backend}' unavailable, using memory: {e}")
+            self.backend = MemoryCacheBackend(app.config.get('SECTION_CACHE_MAX_ENTRIES', 512))
+
+    def get_or_set(self, section: str, builder: Callable[[], Any], tags: Iterable[str], key: str = '', ttl: Optional[int] = None):
+        """Return the cached value of a section, building and storing it on a miss."""
+        if not self.enabled:
+            return builder()
+
+        try:
+            generations = ','.join(f"{tag}{self.backend.generation(tag)}" for tag in sorted(tags))
+            if self.versions is not None:
+                generations += ';' + ','.join(f"{name}{version}" for name, version in self.versions(*tags).items())
+            cache_key = f"{section}:{key}@{generations}"
+            entry = self.backend.get(cache_key)
+        except Exception as e:
+            logger.error(f"Section cache read failed for {section}: {e}")
+            return builder()
+
+        if entry is not None:
+            self._count(section, 'hits')
+            return entry[1]
+
+        self._count(section, 'misses')
+        value = builder()
+        try:
+            self.backend.set(cache_key, value, ttl or self.ttls.get(section, self.default_ttl))
+        except Exception as e:
+            logger.error(f"Section cache write failed for {section}: {e}")
+        return value
+
+    def invalidate(self, *tags: str):
+        """Make all entries depending on any of the tags stale."""
+        for tag in tags:
+            try:
+                self.backend.bump(tag)
+            except Exception as e:
+                logger.error(f"Section cache invalidation failed for {tag}: {e}")
+        with self._lock:
+            for tag in tags:
+                self._counts.setdefault('invalidations', {}).setdefault(tag, 0)
+                self._counts['invalidations'][tag] += 1
+        for listener in self.listeners:
+            listener(tags)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        self.backend.clear()
+        with self._lock:
+            self._counts = {}
+
+    def _count(self, section, outcome):
+        with self._lock:
+            counts = self._counts.setdefault('sections', {}).setdefault(section, {'hits': 0, 'misses': 0})
+            counts[outcome] += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counts per section and in total, plus invalidations per tag."""
+        with self._lock:
+            sections = {name: dict(counts) for name, counts in self._counts.get('sections', {}).items()}
+            invalidations = dict(self._counts.get('invalidations', {}))
+        hits = sum(c['hits'] for c in sections.values())
+        misses = sum(c['misses'] for c in sections.values())
+        for counts in sections.values():
+            total = counts['hits'] + counts['misses']
+            counts['hit_rate'] = round(counts['hits'] / total, 3) if total else None
+        return {
+            'backend': self.backend.name if self.enabled else 'none',
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+            'sections': sections,
+            'invalidations': invalidations
+        }
+
+
+# --- Write Tracking ---
+# Tags touched by a session are collected on flush / statement execution and only
+# applied once the transaction commits, so rolled back writes don't evict anything.
+
+def _pending_tags(session):
+    return session.info.setdefault('section_cache_tags', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_tags(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tag = MODEL_TAGS.get(type(obj))
+        if tag:
+            _pending_tags(session).add(tag)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_statement_tags(orm_execute_state):
+    # Bulk INSERT/UPDATE/DELETE statements, e.g. on the association tables
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        tag = TABLE_TAGS.get(getattr(table, 'name', None))
+        if tag:
+            _pending_tags(orm_execute_state.session).add(tag)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending_tags(session):
+    tags = session.info.pop('section_cache_tags', None)
+    if tags:
+        for cache in list(_caches):
+            cache.invalidate(*tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_tags(session):
+    session.info.pop('section_cache_tags', None)
@@ -0,0 +1,186 @@
+from .interface import db, logger, READ_ONLY_BIND
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from typing import Dict, Optional, Union
+import os
+import re
+import threading
+import time
+
+
+# PRAGMA settings per profile, applied to every new connection
+PROFILES = {
+    # SQLite's own defaults: rollback journal, synchronous=FULL, ~2 MB page cache
+    'default': {},
+    # WAL lets readers run next to the one writer; NORMAL is durable in WAL mode
+    # except for the last transactions before a power loss
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -20000,        # KiB, ~20 MB per connection
+        'mmap_size': 268435456,      # 256 MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,        # ms a writer waits for the lock instead of failing
+    },
+    # For throwaway databases (benchmarks, imports): no fsync at all
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -65536,
+        'mmap_size': 1073741824,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+}
+
+# The git-tracked database shipped with the app (and bundled into serverless deploys).
+# journal_mode=WAL is stored in the file, and a WAL database can't be opened read-only
+# without its -shm file, so 'auto' leaves this one in rollback journal mode.
+BUNDLED_DATABASE = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'senflix.sqlite'))
+
+# Settings that only make sense on the writable primary connection
+WRITE_ONLY_PRAGMAS = ('journal_mode', 'synchronous')
+_NAME = re.compile(r'^[a-z_]+$')
+_VALUE = re.compile(r'^-?\w+$')
+
+
+def parse_pragmas(value: Union[str, Dict, None]) -> Dict[str, str]:
+    """
+    PRAGMA overrides from a dict or a 'name=value,name=value' string (SQLITE_PRAGMAS).
+    Names and values are checked, as they end up in SQL verbatim.
+    """
+    if not value:
+        return {}
+    if isinstance(value, str):
+        value = dict(item.split('=', 1) for item in value.split(',') if item.strip())
+    pragmas = {}
+    for name, setting in value.items():
+        name, setting = str(name).strip().lower(), str(setting).strip()
+        if not _NAME.match(name) or not _VALUE.match(setting):
+            raise ValueError(f"Invalid SQLite pragma: {name}={setting}")
+        pragmas[name] = setting
+    return pragmas
+
+
+class SQLiteProfile:
+    """
+    Applies a named set of PRAGMAs to every connection of the SQLite engine, routes
+    GET requests to a read-only engine and runs `PRAGMA optimize` now and then.
+
+    Configured from app.config:
+        SQLITE_PROFILE            'default', 'balanced' (default) or 'fast'
+        SQLITE_PRAGMAS            overrides, dict or 'cache_size=-40000,busy_timeout=10000'
+        SQLITE_READONLY_GETS      open a second, read-only engine for GET/HEAD requests (True)
+        SQLITE_OPTIMIZE_INTERVAL  seconds between `PRAGMA optimize` runs after requests (3600, 0 = off)
+        SQLITE_WAL                'auto' (default), 'true' or 'false': whether the profile's
+                                  journal_mode=WAL is applied; 'auto' skips the bundled
+                                  data/senflix.sqlite
+
+    In-memory databases get neither WAL nor the read-only engine. WAL is skipped as
+    well when the database directory is not writable (read-only deployments), because
+    it needs to create the -wal and -shm files.
+    """
+
+    def __init__(self):
+        self.name = 'default'
+        self.pragmas = {}
+        self.database = None
+        self.wal = True
+        self.optimize_interval = 0
+        self._last_optimize = time.monotonic()
+        self._optimize_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Pick the profile and register the read-only bind. Call before `db.init_app(app)`."""
+        self.name = app.config.get('SQLITE_PROFILE') or 'balanced'
+        if self.name not in PROFILES:
+            raise ValueError(f"Unknown SQLITE_PROFILE '{self.name}', expected one of {sorted(PROFILES)}")
+        self.pragmas = {name: str(value) for name, value in PROFILES[self.name].items()}
+        self.pragmas.update(parse_pragmas(app.config.get('SQLITE_PRAGMAS')))
+        self.optimize_interval = app.config.get('SQLITE_OPTIMIZE_INTERVAL', 3600)
+
+        self.database = self._database_path(app.config['SQLALCHEMY_DATABASE_URI'])
+        wal = str(app.config.get('SQLITE_WAL', 'auto')).lower()
+        self.wal = wal in ('1', 'true') or (wal == 'auto' and self.database != BUNDLED_DATABASE)
+        if self.database and app.config.get('SQLITE_READONLY_GETS', True):
+            binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+            binds.setdefault(READ_ONLY_BIND, f'sqlite:///file:{self.database}?mode=ro&uri=true')
+            app.config['SQLALCHEMY_BINDS'] = binds
+        if self.optimize_interval:
+            app.teardown_request(self._optimize_after_request)
+
+    def attach(self):
+        """Hook the PRAGMAs onto the app's engines. Call inside an app context after `db.init_app`."""
+        event.listen(db.engine, 'connect', self._connect_listener(read_only=False))
+        read_engine = db.engines.get(READ_ONLY_BIND)
+        if read_engine is not None:
+            event.listen(read_engine, 'connect', self._connect_listener(read_only=True))
+        logger.info(f"SQLite profile '{self.name}': {self.pragmas or 'SQLite defaults'}")
+
+    @staticmethod
+    def _database_path(uri: str) -> Optional[str]:
+        """Absolute file path of a sqlite URI, or None for in-memory and non-SQLite databases."""
+        url = make_url(uri)
+        if not url.drivername.startswith('sqlite') or url.database in (None, '', ':memory:'):
+            return None
+        database = url.database[5:] if url.query.get('uri') else url.database
+        return os.path.abspath(database)
+
+    def connection_pragmas(self, read_only: bool = False) -> Dict[str, str]:
+        """The PRAGMAs a new connection gets."""
+        pragmas = dict(self.pragmas)
+        if self.database is None:
+            pragmas.pop('journal_mode', None)
+            pragmas.pop('mmap_size', None)
+        elif pragmas.get('journal_mode', '').upper() == 'WAL' \
+                and (not self.wal or not os.access(os.path.dirname(self.database), os.W_OK)):
+            pragmas.pop('journal_mode')
+        if read_only:
+            for name in WRITE_ONLY_PRAGMAS:
+                pragmas.pop(name, None)
+            pragmas['query_only'] = 'ON'
+        return pragmas
+
+    def _connect_listener(self, read_only: bool):
+        pragmas = self.connection_pragmas(read_only)
+
+        def on_connect(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f'PRAGMA {name} = {value}')
+            finally:
+                cursor.close()
+        return on_connect
+
+    # --- Maintenance ---
+
+    def optimize(self, analyze: bool = False) -> Dict:
+        """
+        Refresh the query planner statistics: `PRAGMA optimize` (only tables whose
+        statistics are stale) or a full ANALYZE. In WAL mode the log is checkpointed
+        and truncated as well, so the database file is complete on its own.
+        """
+        started = time.perf_counter()
+        with db.engine.connect() as connection:
+            connection.execute(text('ANALYZE' if analyze else 'PRAGMA optimize'))
+            journal_mode = connection.execute(text('PRAGMA journal_mode')).scalar()
+            if journal_mode == 'wal':
+                connection.execute(text('PRAGMA wal_checkpoint(TRUNCATE)'))
+            connection.commit()
+        self._last_optimize = time.monotonic()
+        return {'analyze': analyze, 'journal_mode': journal_mode, 'seconds': round(time.perf_counter() - started, 3)}
+
+    def _optimize_after_request(self, exception=None):
+        """Run `optimize()` after a request once the interval passed; one thread at a time."""
+        if time.monotonic() - self._last_optimize < self.optimize_interval:
+            return
+        if not self._optimize_lock.acquire(blocking=False):
+            return
+        try:
+            logger.info(f"SQLite optimize: {self.optimize()}")
+        except Exception as e:
+            logger.error(f"DB Error running PRAGMA optimize: {e}")
+            self._last_optimize = time.monotonic()
+        finally:
+            self._optimize_lock.release()
@@ -0,0 +1,74 @@
+from jinja2 import FileSystemBytecodeCache
+from typing import Dict, Optional
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def bytecode_cache(path: Optional[str]) -> Optional[FileSystemBytecodeCache]:
+    """
+    Jinja bytecode cache in `path` ('none' or empty disables it). Compiled templates
+    are stored under the checksum of their source, so an edited template is compiled
+    again; a read-only directory is only read from.
+    """
+    if not path or path.lower() == 'none':
+        return None
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError as e:
+        # Read-only deployments: the directory comes with the build or the cache stays empty
+        if not os.path.isdir(path):
+            logger.warning(f"Jinja bytecode cache {path} cannot be created, templates compile on every start: {e}")
+            return None
+    return FileSystemBytecodeCache(path)
+
+
+def precompile_templates(app) -> int:
+    """Compile every template of the app into its bytecode cache; returns the number compiled."""
+    if app.jinja_env.bytecode_cache is None:
+        return 0
+    names = app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+class StartupProfile:
+    """
+    Wall time of the phases of a cold start, from the first line of app.py to the end
+    of the first response: mark() closes a phase, the first response closes the last
+    one and logs the breakdown ("Cold start 412ms: imports 301ms, config 2ms, ...").
+    """
+
+    def __init__(self, started: Optional[float] = None):
+        self.started = started if started is not None else time.perf_counter()
+        self._last = self.started
+        self.phases: Dict[str, float] = {}  # phase -> seconds
+        self.complete = False
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases[phase] = now - self._last
+        self._last = now
+
+    def init_app(self, app):
+        self.mark('init')
+        app.after_request(self._after_first_request)
+
+    def report(self) -> Dict[str, float]:
+        """Milliseconds per phase, plus 'total'."""
+        report = {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()}
+        report['total'] = round(sum(self.phases.values()) * 1000, 1)
+        return report
+
+    def _after_first_request(self, response):
+        # Runs before the body of a streamed page is sent, so that part is not included
+        if not self.complete:
+            self.complete = True
+            self.mark('first_response')
+            report = self.report()
+            total = report.pop('total')
+            logger.info(f"Cold start {total:.0f}ms: " + ', '.join(f"{phase} {ms:.0f}ms" for phase, ms in report.items()))
+        return response
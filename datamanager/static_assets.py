@@ -0,0 +1,192 @@
+from flask import request, send_from_directory
+from typing import Dict, Optional
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+# Text assets that get precompressed copies
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+# Names that already carry a content hash (poster derivatives: name-320w.1a2b3c4d5e.webp)
+HASHED_NAME = re.compile(r'\.[0-9a-f]{10}\.[A-Za-z0-9]+$')
+IMMUTABLE_MAX_AGE = 31536000
+# Content-Encoding: file suffix, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def _brotli():
+    """The optional brotli module, None if it is not installed."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def fingerprinted_name(path: str, digest: str) -> str:
+    """js/main.js -> js/main.1a2b3c4d5e.js"""
+    stem, extension = os.path.splitext(path)
+    return f"{stem}.{digest}{extension}"
+
+
+def build_manifest(static_folder: str, compress=True) -> Dict:
+    """
+    Hash every file in the static folder and write static/manifest.json:
+    {'files': {'js/main.js': {'url': 'js/main.1a2b3c4d5e.js', 'size': ..., 'encodings': ['br', 'gzip']}}}
+
+    Text assets get .gz (and .br if the brotli package is installed) copies next to
+    them, only kept when they are smaller. The gzip output has no timestamp, so a
+    rebuild only changes the copies of files that changed.
+    """
+    brotli = _brotli() if compress else None
+    if compress and brotli is None:
+        logger.info("brotli is not installed, writing gzip copies only")
+    files = {}
+    for directory, subdirectories, filenames in os.walk(static_folder):
+        subdirectories[:] = sorted(d for d in subdirectories if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.startswith('.') or filename.endswith(tuple(ENCODINGS.values())) \
+                    or HASHED_NAME.search(filename):
+                continue
+            full_path = os.path.join(directory, filename)
+            path = os.path.relpath(full_path, static_folder).replace(os.sep, '/')
+            if path == MANIFEST_NAME:
+                continue
+            with open(full_path, 'rb') as f:
+                data = f.read()
+            entry = {'url': fingerprinted_name(path, hashlib.sha256(data).hexdigest()[:10]), 'size': len(data),
+                     'encodings': []}
+            if compress and filename.endswith(COMPRESSIBLE):
+                variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    variants['br'] = brotli.compress(data, quality=11)
+                for encoding, suffix in ENCODINGS.items():
+                    compressed = variants.get(encoding)
+                    if compressed is not None and len(compressed) < len(data):
+                        with open(full_path + suffix, 'wb') as f:
+                            f.write(compressed)
+                        entry['encodings'].append(encoding)
+                    elif os.path.exists(full_path + suffix):
+                        os.remove(full_path + suffix)  # stale copy of an older version
+            files[path] = entry
+    with open(os.path.join(static_folder, MANIFEST_NAME), 'w') as f:
+        json.dump({'files': files}, f, indent=1, sort_keys=True)
+    return files
+
+
+class StaticAssets:
+    """
+    Content-hashed static URLs with immutable caching and precompressed variants.
+
+    With a manifest from `flask build-static-assets` loaded, url_for('static',
+    filename='js/main.js') emits /static/js/main.1a2b3c4d5e.js. The static route maps
+    the hashed name back to the file and sends it with `Cache-Control: public,
+    max-age=31536000, immutable`, as the .br or .gz copy when the client accepts it.
+    Files are served in place, nothing is copied. Entries whose file changed since the
+    build are dropped with a warning and served under their plain name.
+    Plain names keep Flask's default caching; already hashed names (poster
+    derivatives) are immutable as well.
+
+    Configured from app.config:
+        STATIC_FINGERPRINTS  use static/manifest.json if it exists (True, off in debug mode)
+    """
+
+    def __init__(self):
+        self.static_folder = None
+        self.urls: Dict[str, str] = {}      # path -> fingerprinted path
+        self.files: Dict[str, Dict] = {}    # fingerprinted path -> manifest entry + 'path'
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        if app.config.get('STATIC_FINGERPRINTS', True) and not app.debug:
+            self.load()
+        app.url_defaults(self._fingerprint_url)
+        app.view_functions['static'] = self.send_static_file
+
+    def load(self) -> int:
+        """Read the manifest; returns the number of usable entries."""
+        self.urls, self.files = {}, {}
+        try:
+            with open(os.path.join(self.static_folder, MANIFEST_NAME)) as f:
+                manifest = json.load(f)['files']
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Unreadable static manifest, serving plain URLs: {e}")
+            return 0
+        stale = 0
+        for path, entry in manifest.items():
+            if not self._unchanged(path, entry):
+                stale += 1
+                continue
+            self.urls[path] = entry['url']
+            self.files[entry['url']] = dict(entry, path=path)
+        if stale:
+            logger.warning(f"{stale} static files changed since the manifest was built, "
+                           f"run `flask build-static-assets`")
+        return len(self.urls)
+
+    def _unchanged(self, path: str, entry: Dict) -> bool:
+        """
+        Whether a file still matches its manifest entry. Text assets, the files that get
+        edited, are hashed again (they are small); for images the size has to do.
+        """
+        full_path = os.path.join(self.static_folder, path)
+        try:
+            if os.path.getsize(full_path) != entry['size']:
+                return False
+            if not path.endswith(COMPRESSIBLE):
+                return True
+            with open(full_path, 'rb') as f:
+                return fingerprinted_name(path, hashlib.sha256(f.read()).hexdigest()[:10]) == entry['url']
+        except OSError:
+            return False
+
+    def url(self, filename: str) -> str:
+        """Fingerprinted path of a static file, or the path itself if it has none."""
+        return self.urls.get(filename, filename)
+
+    def _fingerprint_url(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = self.url(values['filename'])
+
+    def _accepted_encoding(self, entry: Dict) -> Optional[str]:
+        for encoding in ENCODINGS:
+            if encoding in entry['encodings'] and request.accept_encodings[encoding]:
+                return encoding
+        return None
+
+    def send_static_file(self, filename):
+        """The static route: hashed names are resolved through the manifest and cached for good."""
+        entry = self.files.get(filename)
+        if entry is None:
+            response = send_from_directory(self.static_folder, filename)
+            if HASHED_NAME.search(filename):
+                self._immutable(response)
+            return response
+
+        path = entry['path']
+        encoding = self._accepted_encoding(entry)
+        if encoding:
+            response = send_from_directory(self.static_folder, path + ENCODINGS[encoding],
+                                           mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(self.static_folder, path)
+        if entry['encodings']:
+            response.vary.add('Accept-Encoding')
+        return self._immutable(response)
+
+    @staticmethod
+    def _immutable(response):
+        response.cache_control.no_cache = None  # set by send_file for conditional requests
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+        return response
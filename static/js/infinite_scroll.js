@@ -0,0 +1,70 @@
+// infinite_scroll.js
+// Loads the next page of a paginated grid (top rated, blockbusters, community comments)
+// from its /api/...?cursor= endpoint when the "Load More" sentinel scrolls into view.
+
+(function() {
+    async function loadNextPage(sentinel, observer) {
+        if (sentinel.dataset.loading === 'true') return;
+        sentinel.dataset.loading = 'true';
+        sentinel.classList.add('loading');
+
+        const grid = document.getElementById(sentinel.dataset.grid);
+        const url = `${sentinel.dataset.url}?cursor=${encodeURIComponent(sentinel.dataset.cursor)}`;
+        try {
+            const response = await fetch(url, { headers: { 'Accept': 'application/json' } });
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                throw new Error(data.error || `HTTP ${response.status}`);
+            }
+            grid.insertAdjacentHTML('beforeend', data.html);
+            if (typeof window.bindMovieCardActions === 'function') {
+                window.bindMovieCardActions();
+            }
+            grid.dispatchEvent(new CustomEvent('infinite-scroll:loaded', { detail: data }));
+
+            if (data.next_cursor) {
+                sentinel.dataset.cursor = data.next_cursor;
+                sentinel.querySelector('a').href = `${window.location.pathname}?cursor=${encodeURIComponent(data.next_cursor)}`;
+            } else {
+                observer.unobserve(sentinel);
+                sentinel.remove();
+                return;
+            }
+        } catch (error) {
+            // Stop loading on scroll; a click on the link tries again
+            console.error('Error loading next page:', error);
+            observer.unobserve(sentinel);
+            sentinel.classList.remove('loading');
+            sentinel.dataset.loading = 'false';
+            return;
+        }
+        sentinel.classList.remove('loading');
+        sentinel.dataset.loading = 'false';
+        if (sentinel.isConnected) {
+            // Observe again: if the sentinel is still in view, this fires for the next page
+            observer.unobserve(sentinel);
+            observer.observe(sentinel);
+        }
+    }
+
+    function init() {
+        const sentinels = document.querySelectorAll('.infinite-scroll');
+        if (!sentinels.length || !('IntersectionObserver' in window)) return;
+
+        const observer = new IntersectionObserver(entries => {
+            entries.forEach(entry => {
+                if (entry.isIntersecting) loadNextPage(entry.target, observer);
+            });
+        }, { rootMargin: '600px 0px' });  // start loading before the user reaches the end
+
+        sentinels.forEach(sentinel => {
+            observer.observe(sentinel);
+            sentinel.querySelector('a').addEventListener('click', e => {
+                e.preventDefault();
+                loadNextPage(sentinel, observer);
+            });
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', init);
+})();
@@ -46,83 +46,132 @@ console.log('movie_card.js loaded - Adding event listeners for rating buttons');
             }
         });
     }
+    // Clicks are queued for a moment and sent together to /api/interactions: a burst of
+    // list editing is one request and one write transaction instead of one per click.
+    // Two clicks on the same toggle cancel out and are not sent at all.
+    const FLUSH_DELAY_MS = 250;
+    const MAX_BATCH = 100;
+    let queue = []; // {key, operation, count, waiters: [{resolve, reject}]}
+    let flushTimer = null;
+
+    function takeBatch() {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+        const entries = queue;
+        queue = [];
+        entries.filter(entry => entry.count % 2 === 0)
+            .forEach(entry => entry.waiters.forEach(waiter => waiter.resolve(null)));
+        return entries.filter(entry => entry.count % 2 === 1);
+    }
+
+    async function flushInteractions() {
+        const entries = takeBatch();
+        if (!entries.length) return;
+        try {
+            const response = await fetch('/api/interactions', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ operations: entries.map(entry => entry.operation) })
+            });
+            let data = null;
+            try {
+                data = await response.json();
+            } catch (jsonError) {
+                // Not JSON, e.g. the login page after the session expired
+            }
+            if (!data || !Array.isArray(data.results)) {
+                throw new Error((data && data.error) || `Request failed with status ${response.status}`);
+            }
+            entries.forEach((entry, i) => entry.waiters.forEach(waiter => waiter.resolve(data.results[i])));
+        } catch (error) {
+            entries.forEach(entry => entry.waiters.forEach(waiter => waiter.reject(error)));
+        }
+    }
+
+    /**
+     * Queue one operation of POST /api/interactions, e.g. {movie_id: 1, action: 'toggle', attribute: 'watched'}.
+     * Resolves with its result, or with null when it was cancelled out by another toggle.
+     */
+    function queueInteraction(operation) {
+        return new Promise((resolve, reject) => {
+            const key = operation.action === 'toggle' ? `${operation.movie_id}:${operation.attribute}` : null;
+            const entry = key && queue.find(queued => queued.key === key);
+            if (entry) {
+                entry.count += 1;
+                entry.waiters.push({ resolve, reject });
+            } else {
+                queue.push({ key, operation, count: 1, waiters: [{ resolve, reject }] });
+            }
+            if (queue.length >= MAX_BATCH) {
+                flushInteractions();
+            } else if (!flushTimer) {
+                flushTimer = setTimeout(flushInteractions, FLUSH_DELAY_MS);
+            }
+        });
+    }
+
+    // Don't lose clicks of the last moment when the user navigates away
+    window.addEventListener('pagehide', () => {
+        const entries = takeBatch();
+        if (!entries.length) return;
+        const body = JSON.stringify({ operations: entries.map(entry => entry.operation) });
+        navigator.sendBeacon('/api/interactions', new Blob([body], { type: 'application/json' }));
+    });
+
+    function applyInteractionResult(movieId, result) {
+        updateButtonState(movieId, 'watched', result.user_watched);
+        updateButtonState(movieId, 'watchlist', result.user_watchlist);
+        updateButtonState(movieId, 'favorite', result.user_favorite);
+        updateButtonState(movieId, 'rate', result.user_rated);
+    }
+
+    const TOAST_MESSAGES = {
+        watchlist: 'Watchlist updated successfully!',
+        watched: 'Watched status updated successfully!',
+        favorite: 'Favorites updated successfully!'
+    };
+    // Toggle bursts in flight: `${movieId}:${action}` -> {clicks, wasActive}
+    const bursts = new Map();
+
     async function handleButtonClick(button) {
         const movieId = button.dataset.movieId;
         const action = button.dataset.action;
         if (!movieId || !action) return;
-        if (button.classList.contains('processing')) return;
-        
-        button.classList.add('processing');
-        const wasActive = button.classList.contains('active'); 
-
-        try {
-            let endpoint = '';
-            let method = 'POST';
-            let toastMessage = '';
 
-            if (action === 'watchlist') {
-                endpoint = `/toggle_watchlist/${movieId}`;
-                toastMessage = 'Watchlist updated successfully!';
-            } else if (action === 'watched') {
-                endpoint = `/toggle_watched/${movieId}`;
-                toastMessage = 'Watched status updated successfully!';
-            } else if (action === 'favorite') {
-                endpoint = `/toggle_favorite/${movieId}`;
-                toastMessage = 'Favorites updated successfully!';
-            } else if (action === 'rate') {
-                if (typeof window.showRatingModal === 'function') {
-                    console.log(`Opening rating modal for movie ID: ${movieId}`);
-                    window.showRatingModal(movieId);
-                } else {
-                    console.error('showRatingModal function is not defined globally.');
-                    alert('Rating feature is currently unavailable.');
-                }
-                button.classList.remove('processing'); 
-                return; 
-            } else throw new Error('Invalid action');
-
-            const response = await fetch(endpoint, { method });
-            if (!response.ok) {
-                let errorMsg = `Request failed with status ${response.status}`;
-                try {
-                    const errorData = await response.json();
-                    errorMsg = errorData.error || errorMsg;
-                } catch (jsonError) {
-                    errorMsg += await response.text(); 
-                }
-                throw new Error(errorMsg);
-            }
-            
-            // Parse the response for user status information
-            const responseData = await response.json();
-            
-            // Update button states based on server response
-            if (responseData.success) {
-                // Update state for the clicked button
-                updateButtonState(movieId, action, responseData.new_state);
-                
-                // Update other buttons if needed
-                if (responseData.user_watched !== undefined) {
-                    updateButtonState(movieId, 'watched', responseData.user_watched);
-                }
-                if (responseData.user_watchlist !== undefined) {
-                    updateButtonState(movieId, 'watchlist', responseData.user_watchlist);
-                }
-                if (responseData.user_rated !== undefined) {
-                    updateButtonState(movieId, 'rate', responseData.user_rated);
-                }
+        if (action === 'rate') {
+            if (typeof window.showRatingModal === 'function') {
+                console.log(`Opening rating modal for movie ID: ${movieId}`);
+                window.showRatingModal(movieId);
+            } else {
+                console.error('showRatingModal function is not defined globally.');
+                alert('Rating feature is currently unavailable.');
             }
-            
-            // Show success message
-            showToast(toastMessage);
-            
+            return;
+        }
+        if (!TOAST_MESSAGES[action]) throw new Error('Invalid action');
+
+        const key = `${movieId}:${action}`;
+        const burst = bursts.get(key) || { clicks: 0, wasActive: button.classList.contains('active') };
+        bursts.set(key, burst);
+        const click = ++burst.clicks;
+        // Show the new state right away; the server's answer confirms or corrects it
+        updateButtonState(movieId, action, !button.classList.contains('active'));
+
+        try {
+            const result = await queueInteraction({ movie_id: Number(movieId), action: 'toggle', attribute: action });
+            if (burst.clicks !== click) return; // a later click of the burst reports
+            bursts.delete(key);
+            if (result === null) return; // the clicks cancelled out, nothing was sent
+            if (!result.success) throw new Error(result.error || 'Update failed');
+            applyInteractionResult(movieId, result);
+            showToast(TOAST_MESSAGES[action]);
         } catch (error) {
+            if (burst.clicks !== click) return;
+            bursts.delete(key);
             console.error('Error handling button click:', error);
             showToast(`Error: ${error.message}`, 'error');
-            // Revert the button to original state on error
-            button.classList.toggle('active', wasActive);
-        } finally {
-            button.classList.remove('processing');
+            // Revert the buttons to their state before the burst
+            updateButtonState(movieId, action, burst.wasActive);
         }
     }
 
@@ -132,6 +181,9 @@ console.log('movie_card.js loaded - Adding event listeners for rating buttons');
 
     // Expose for potential external use
     window.bindMovieCardActions = bindActionButtons;
+    window.queueInteraction = queueInteraction;
+    window.flushInteractions = flushInteractions;
+    window.applyInteractionResult = applyInteractionResult;
 
     if (typeof window.showRatingModal !== 'function') {
         window.showRatingModal = function(movieId) { 
@@ -180,4 +232,103 @@ console.log('movie_card.js loaded - Adding event listeners for rating buttons');
             }
         }
     });
-})(); 
\ No newline at end of file
+})(); 
+
+// 3D tilt effect of the movie cards
+document.addEventListener('DOMContentLoaded', function() {
+  // Initialize all movie cards for the 3D effect
+  setupMovieCards();
+  
+  // Call this function again when new cards are added
+  function setupMovieCards() {
+    const cards = document.querySelectorAll('.movie-card-wrapper');
+    
+    cards.forEach(card => {
+      // Avoid duplicate event listeners
+      if (card.dataset.tiltInitialized) return;
+      card.dataset.tiltInitialized = 'true';
+      
+      const inner = card.querySelector('.movie-card-3d');
+      const infoContainer = card.querySelector('.movie-info-container');
+      
+      // Tilt effect on mouse movement
+      card.addEventListener('mousemove', e => {
+        if (!inner) return;
+        
+        const rect = card.getBoundingClientRect();
+        const x = e.clientX - rect.left; // x position within the element
+        const y = e.clientY - rect.top;  // y position within the element
+        
+        // Calculate position relative to card center (-1 to 1)
+        const xPercent = (x / rect.width - 0.5) * 2;  // -1 to 1
+        const yPercent = (y / rect.height - 0.5) * 2; // -1 to 1
+        
+        // Check if the card is in a detail container
+        const isDetailView = card.closest('.card-container') !== null;
+        
+        // Smoother transformation through lower rotation factors
+        const rotationFactor = isDetailView ? 5 : 3;
+        const scaleFactor = isDetailView ? 1.05 : 1.02;
+        const zTranslation = isDetailView ? 15 : 5;
+        
+        // Limited 3D rotation to avoid clipping
+        inner.style.transform = `
+          rotateY(${xPercent * rotationFactor}deg) 
+          rotateX(${-yPercent * rotationFactor}deg) 
+          scale(${scaleFactor})
+          translateZ(${zTranslation}px)
+        `;
+        
+        // Move poster background separately for parallax effect
+        const posterBg = card.querySelector('.poster-bg');
+        if (posterBg) {
+          posterBg.style.transform = `translateZ(2px) scale(1.03)`;
+        }
+        
+        // Adjust the glassmorphism effect dynamically
+        if (infoContainer) {
+          // Dynamic blur effect based on mouse position
+          const blurAmount = 4 + Math.abs(xPercent * 3 + yPercent * 3);
+          const opacity = 0.2 + Math.abs(xPercent * 0.08 + yPercent * 0.08);
+          infoContainer.style.backdropFilter = `blur(${blurAmount}px)`;
+          infoContainer.style.backgroundColor = `rgba(0, 0, 0, ${opacity})`;
+          
+          // Ensure the overlay has no background
+          const overlay = card.querySelector('.overlay');
+          if (overlay) {
+            overlay.style.background = 'none';
+          }
+        }
+      });
+      
+      // Reset when leaving
+      card.addEventListener('mouseleave', () => {
+        if (!inner) return;
+        inner.style.transform = 'rotateY(0deg) rotateX(0deg) scale(1) translateZ(0)';
+        
+        // Reset poster background
+        const posterBg = card.querySelector('.poster-bg');
+        if (posterBg) {
+          posterBg.style.transform = 'translateZ(0) scale(1)';
+        }
+        
+        if (infoContainer) {
+          infoContainer.style.backdropFilter = 'blur(8px)';
+          infoContainer.style.backgroundColor = 'rgba(0, 0, 0, 0.2)';
+        }
+      });
+    });
+  }
+  
+  // Observer for dynamically added cards
+  const observer = new MutationObserver(mutations => {
+    mutations.forEach(mutation => {
+      if (mutation.addedNodes.length) {
+        setupMovieCards();
+      }
+    });
+  });
+  
+  // Observe the document for changes
+  observer.observe(document.body, { childList: true, subtree: true });
+});
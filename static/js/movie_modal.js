@@ -157,16 +157,12 @@ window.showRatingModal = function(movieId) {
         }
         
         try {
-            // Submit the rating
-            const response = await fetch('/rate_movie', {
-                method: 'POST',
-                body: new URLSearchParams(formData),
-                headers: {
-                    'Cache-Control': 'no-cache'
-                }
+            // Submit the rating together with any queued card clicks, without waiting for the batch delay
+            const pending = window.queueInteraction({
+                movie_id: Number(movieId), action: 'rate', rating: Number(rating), comment: comment || ''
             });
-            
-            const result = await response.json();
+            window.flushInteractions();
+            const result = await pending;
             
             if (result.success) {
                 // Hide the modal
@@ -184,7 +180,8 @@ window.showRatingModal = function(movieId) {
                 }, 3000);
                 
                 // Update UI to reflect the new rating status
-                updateMovieCardStatus(movieId, { rated: true, rating: rating });
+                updateMovieCardStatus(movieId, { rated: true, rating: rating, watched: result.user_watched });
+                window.applyInteractionResult(movieId, result);
             } else {
                 // Show error message
                 if (errorMessage) {
@@ -321,7 +318,8 @@ function fetchExistingRating(movieId) {
                 console.log(`Updated ${starsUpdated} stars out of ${stars.length}`);
                 
                 // Also update card status
-                updateMovieCardStatus(movieId, { rated: true, rating: rating });
+                updateMovieCardStatus(movieId, { rated: true, rating: rating, watched: result.user_watched });
+                window.applyInteractionResult(movieId, result);
             } else {
                 console.log(`Invalid or zero rating value: ${rating}`);
             }
@@ -1,8 +1,7 @@
 from app import app
 
 def test_static_url():
-    """Test that static URL generation works correctly."""
+    """Test that static URL generation works correctly (conftest.py turns STATIC_FINGERPRINTS off)."""
     with app.test_request_context():
         url = app.url_for('static', filename='movies/tt0062622-omdb-poster.jpg')
-        assert url.startswith('/static/')
-        assert 'movies/tt0062622-omdb-poster.jpg' in url 
\ No newline at end of file
+        assert url == '/static/movies/tt0062622-omdb-poster.jpg'
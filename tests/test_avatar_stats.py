@@ -0,0 +1,109 @@
+import sys
+import os
+import pytest
+from sqlalchemy import event
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import (User, Movie, Category, Avatar, UserFavorite, AvatarMovieStats,
+                                   AvatarCategoryStats, db, movie_categories)
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def seed(user_count=3):
+    """Two avatars, three categories, four movies; users 1..n share avatar 1, user 99 has avatar 2."""
+    db.session.add_all([Avatar(id=1, name='Noir'), Avatar(id=2, name='Blaze')])
+    db.session.add_all([Category(id=i, name=f"Category {i}") for i in (1, 2, 3)])
+    # Movie 1 has category 3 as its primary category as well as linked categories 1 and 3
+    db.session.add_all([Movie(id=1, name='Movie 1', category_id=3)] + [Movie(id=i, name=f"Movie {i}") for i in (2, 3, 4)])
+    db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900', avatar_id=1) for i in range(1, user_count + 1)])
+    db.session.add(User(id=99, name='Other', whatsapp_number='+4900', avatar_id=2))
+    db.session.flush()
+    for movie_id, category_id in ((1, 1), (1, 3), (2, 1), (3, 2), (4, 2)):
+        db.session.execute(movie_categories.insert().values(movie_id=movie_id, category_id=category_id))
+    db.session.commit()
+
+def snapshot():
+    movies = {(s.avatar_id, s.movie_id): s.favorite_count for s in AvatarMovieStats.query.all()}
+    categories = {(s.avatar_id, s.category_id): s.movie_count for s in AvatarCategoryStats.query.all()}
+    return movies, categories
+
+def test_incremental_updates_match_rebuild(db_manager, app):
+    with app.app_context():
+        seed()
+        db_manager.toggle_user_favorite_attribute(1, 1, 'favorite')
+        db_manager.toggle_user_favorite_attribute(2, 1, 'favorite')
+        db_manager.upsert_favorite(3, 2, favorite=True, rating=8)
+        db_manager.upsert_favorite(3, 3, watched=True)  # not a favorite
+        db_manager.toggle_user_favorite_attribute(99, 4, 'favorite')
+        db_manager.toggle_user_favorite_attribute(2, 1, 'favorite')  # un-favorite again
+
+        movies, categories = snapshot()
+        assert movies == {(1, 1): 1, (1, 2): 1, (2, 4): 1}
+        # Movie 1 counts once for category 3 although it is linked and primary
+        assert categories == {(1, 1): 2, (1, 3): 1, (2, 2): 1}
+
+        db_manager.remove_favorite(1, 1)
+        assert snapshot() == ({(1, 2): 1, (2, 4): 1}, {(1, 1): 1, (2, 2): 1})
+
+        incremental = snapshot()
+        db_manager.rebuild_avatar_stats()
+        assert snapshot() == incremental
+
+def test_catalog_changes_refresh_category_counts(db_manager, app):
+    with app.app_context():
+        seed()
+        db_manager.upsert_favorite(1, 3, favorite=True)
+        db_manager.update_movie(3, {'category_id': 1})
+        assert snapshot()[1] == {(1, 1): 1, (1, 2): 1}
+
+        db_manager.delete_movie(3)
+        assert snapshot() == ({}, {})
+
+def test_top_movies_and_categories(db_manager, app):
+    with app.app_context():
+        seed()
+        for user_id, movie_id in ((1, 1), (2, 1), (3, 1), (1, 2), (2, 3), (99, 4)):
+            db_manager.upsert_favorite(user_id, movie_id, favorite=True)
+
+        assert db_manager.get_avatar_top_movie_ids(1) == {1: 3, 2: 1, 3: 1}
+        # The viewer's own favorites don't count for "other users with your avatar"
+        assert db_manager.get_avatar_top_movie_ids(1, exclude_user_id=1) == {1: 2, 3: 1}
+        assert db_manager.get_avatar_top_movie_ids(1, limit=1) == {1: 3}
+        assert [(c['id'], c['count']) for c in db_manager.get_avatar_categories(1)] == [(1, 2), (2, 1), (3, 1)]
+
+def test_avatar_reads_do_not_grow_with_cohort_size(db_manager, app):
+    with app.app_context():
+        seed(user_count=50)
+        for user_id in range(1, 51):
+            for movie_id in (1, 2, 3):
+                db.session.add(UserFavorite(user_id=user_id, movie_id=movie_id, favorite=True))
+        db.session.commit()
+        db_manager.rebuild_avatar_stats()
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            top = db_manager.get_avatar_top_movie_ids(1, exclude_user_id=1)
+            categories = db_manager.get_avatar_categories(1)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert top == {1: 49, 2: 49, 3: 49}
+        assert categories[0]['count'] == 2
+        assert len(statements) == 2
@@ -0,0 +1,158 @@
+import sys
+import os
+import pytest
+from sqlalchemy import event
+from datamanager.catalog_snapshot import CatalogSnapshot, SnapshotDataManager
+from datamanager.data_versions import bump_versions
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import User, Movie, MovieOMDB, Category, StreamingPlatform, UserFavorite, db, movie_categories
+from datamanager.pagination import InvalidCursor
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app(tmp_path):
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'senflix.sqlite'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config['CATALOG_SNAPSHOT'] = str(tmp_path / 'catalog_snapshot.bin')
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SnapshotDataManager(SQLiteDataManager())
+    manager.init_app(app)
+    with app.app_context():
+        drama, comedy = Category(name='Drama'), Category(name='Comedy')
+        platform = StreamingPlatform(name='Netflix')
+        db.session.add_all([drama, comedy, platform])
+        db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900') for i in range(1, 4)])
+        for i in range(1, 13):
+            movie = Movie(id=i, name=f"Movie {i}", year=2000 + i, category=comedy if i == 12 else None,
+                          streaming_platforms=[platform] if i % 3 == 0 else [])
+            movie.omdb_data = MovieOMDB(title=f"Movie {i}", poster_img=f"https://img/{i}.jpg", imdb_rating=str(i / 2))
+            db.session.add(movie)
+        db.session.flush()
+        db.session.execute(movie_categories.insert(), [{'movie_id': i, 'category_id': drama.id} for i in range(1, 13, 2)])
+        # Ties on rating and interaction count, so rankings and cursors have to break them by movie ID
+        db.session.add_all([UserFavorite(user_id=1 + i % 3, movie_id=i, rating=float(i % 3 + 6), watched=True,
+                                         favorite=i % 4 == 0) for i in range(1, 11)])
+        db.session.commit()
+        manager.rebuild_movie_stats()
+        manager.build_snapshot()
+    return manager
+
+def count_orm_queries(app):
+    queries = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+    return queries
+
+def cards(movies):
+    return [dict(movie) for movie in movies]
+
+def all_pages(fetch):
+    items, cursor = [], None
+    while True:
+        page = fetch(cursor)
+        items += cards(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return items
+
+def test_snapshot_matches_the_database(db_manager, app):
+    sql = db_manager.fallback
+    with app.app_context():
+        assert len(db_manager.snapshot) == 12
+        assert db_manager.get_all_movies() == sql.get_all_movies()
+        assert db_manager.get_movie_data(3) == sql.get_movie_data(3)
+        assert db_manager.get_movie_data(99) is None
+        assert cards(db_manager.get_movies_data([5, 1, None, 5], view='card').values()) == \
+            cards(sql.get_movies_data([5, 1], view='card').values())
+        assert db_manager.get_movie_platforms(3) == sql.get_movie_platforms(3)
+        assert db_manager.get_movie_categories(3) == sql.get_movie_categories(3)
+        assert db_manager.get_all_categories() == sql.get_all_categories()
+        assert db_manager.get_all_platforms() == sql.get_all_platforms()
+        for category in sql.get_all_categories():
+            assert db_manager.get_movies_by_category(category['id']) == sql.get_movies_by_category(category['id'])
+            assert [cards(batch) for batch in db_manager.iter_movies_by_category(category['id'], first_batch=2)] == \
+                [cards(batch) for batch in sql.iter_movies_by_category(category['id'], first_batch=2)]
+        assert db_manager.get_movies_by_category(99) == []
+
+        assert db_manager.get_top_rated_movies(limit=None) == sql.get_top_rated_movies(limit=None)
+        assert db_manager.get_popular_movies(limit=4, offset=2) == sql.get_popular_movies(limit=4, offset=2)
+        assert all_pages(lambda cursor: db_manager.get_top_rated_page(cursor, limit=3)) == \
+            all_pages(lambda cursor: sql.get_top_rated_page(cursor, limit=3))
+        assert all_pages(lambda cursor: db_manager.get_popular_page(cursor, limit=4)) == \
+            all_pages(lambda cursor: sql.get_popular_page(cursor, limit=4))
+        with pytest.raises(InvalidCursor):
+            db_manager.get_top_rated_page('garbage')
+
+def test_anonymous_reads_do_not_query(db_manager, app):
+    with app.app_context():
+        db_manager.get_movie_data(1)  # the first use in a request reads the data versions
+        queries = count_orm_queries(app)
+        db_manager.get_movies_data(range(1, 13), view='card')
+        db_manager.get_movies_by_category(db_manager.get_all_categories()[0]['id'])
+        db_manager.get_top_rated_page()
+    assert queries == []
+    with app.app_context():
+        db_manager.get_movie_data(1)
+    assert len(queries) == 1
+
+def test_viewer_flags_come_from_one_query(db_manager, app):
+    with app.app_context():
+        viewer = db.session.get(User, 2)
+        db_manager.get_movie_data(1)
+        expected = db_manager.fallback.get_movies_data([1, 4, 11], viewer=viewer, view='card')
+        queries = count_orm_queries(app)
+        movies = db_manager.get_movies_data([1, 4, 11], viewer=viewer, view='card')
+        assert len(queries) == 1
+        assert cards(movies.values()) == cards(expected.values())
+        assert movies[4]['user_favorite'] is True and movies[1]['user_rated'] is True
+
+def test_local_writes_make_their_part_stale(db_manager, app):
+    with app.app_context():
+        db_manager.get_movie_data(1)
+        db_manager.fallback.toggle_user_favorite_attribute(3, 12, 'watchlist')
+        assert db_manager._stale == {'favorites'}
+        assert 12 in [m['id'] for m in db_manager.get_popular_movies(limit=None)]
+        queries = count_orm_queries(app)
+        db_manager.get_movie_data(12)
+        # The commit dropped the versions read so far; the catalog itself still comes from the file
+        assert len(queries) == 1 and 'data_versions' in queries[0]
+
+        db_manager.update_movie(12, {'name': 'Renamed'})
+        assert db_manager.get_movie_data(12)['name'] == 'Renamed'
+
+        db_manager.build_snapshot()
+        assert db_manager._stale == set() and db_manager.snapshot.detail(12)['name'] == 'Renamed'
+
+def test_writes_of_other_processes_are_detected(db_manager, app):
+    with app.app_context():
+        assert db_manager.get_movie_data(1)['name'] == 'Movie 1'
+        # Another worker renames a movie: only the data version tells this process
+        with db.engine.begin() as connection:
+            connection.execute(Movie.__table__.update().where(Movie.id == 1).values(name='Elsewhere'))
+            bump_versions(connection, ['catalog'])
+    # The next request already sees it
+    with app.app_context():
+        assert db_manager.get_movie_data(1)['name'] == 'Elsewhere'
+        assert db_manager._stale == {'catalog'}
+        assert db_manager.get_top_rated_movies(limit=1) == db_manager.fallback.get_top_rated_movies(limit=1)
+
+def test_missing_or_broken_file_reads_the_database(db_manager, app, tmp_path, caplog):
+    db_manager.path = str(tmp_path / 'missing.bin')
+    assert not db_manager.load() and db_manager.snapshot is None
+
+    (tmp_path / 'broken.bin').write_bytes(b'not a snapshot at all')
+    db_manager.path = str(tmp_path / 'broken.bin')
+    assert not db_manager.load() and 'unreadable' in caplog.text
+    with app.app_context():
+        assert db_manager.get_movie_data(1)['name'] == 'Movie 1'
+        assert db_manager.get_user_by_id(1)['name'] == 'User 1'
+    with pytest.raises(ValueError):
+        CatalogSnapshot(str(tmp_path / 'broken.bin'))
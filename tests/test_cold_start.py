@@ -0,0 +1,92 @@
+import sys
+import os
+import shutil
+import pytest
+from flask import Flask
+from sqlalchemy import inspect
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import db
+from datamanager.startup import StartupProfile, bytecode_cache, precompile_templates
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+
+# Import of the app plus its first response in a fresh interpreter, serverless mode
+COLD_START_BUDGET_MS = float(os.getenv('COLD_START_BUDGET_MS', 1500))
+
+def create_app(uri, schema_setup):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config['SCHEMA_SETUP'] = schema_setup
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return app, manager
+
+def dispose(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+def test_cold_start_budget(tmp_path):
+    sys.path.append(BENCHMARKS)
+    from cold_start_benchmark import DATABASE, cold_start, prepare
+    path = str(tmp_path / 'senflix.sqlite')
+    cache_dir = str(tmp_path / 'jinja_bytecode')
+    shutil.copy(DATABASE, path)
+    prepare(path, cache_dir)
+
+    result = cold_start(path, '/', SERVERLESS='true', JINJA_BYTECODE_CACHE=cache_dir)
+    assert result['status'] == 200
+    # OMDB, recommender rebuilds and poster processing load their libraries on first use
+    assert not {'requests', 'numpy', 'PIL'} & set(result['modules'])
+    elapsed = result['import_ms'] + result['first_response_ms']
+    assert elapsed < COLD_START_BUDGET_MS, f"Cold start took {elapsed:.0f}ms: {result['profile']}"
+
+def test_startup_without_schema_setup_only_checks(tmp_path, caplog):
+    uri = f"sqlite:///{tmp_path / 'new.sqlite'}"
+    app, manager = create_app(uri, schema_setup=False)
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+        assert 'run `flask db-upgrade`' in caplog.text
+        assert manager.setup_schema() == list(range(1, manager.migrations.latest + 1))
+        assert manager.check_schema() and manager.search_index.available
+    dispose(app)
+
+    app, manager = create_app(uri, schema_setup=False)
+    with app.app_context():
+        assert manager.search_index.available
+    dispose(app)
+
+def test_precompiled_templates_are_not_compiled_again(tmp_path):
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'templates' / 'page.html').write_text("{% for i in range(3) %}{{ i }}{% endfor %}")
+    (tmp_path / 'templates' / 'base.html').write_text("<title>{{ title }}</title>")
+
+    def templated_app():
+        app = Flask(__name__, template_folder=str(tmp_path / 'templates'))
+        app.jinja_options = dict(app.jinja_options, bytecode_cache=bytecode_cache(str(tmp_path / 'cache')))
+        return app
+
+    assert precompile_templates(templated_app()) == 2
+    assert len(os.listdir(tmp_path / 'cache')) == 2
+
+    app = templated_app()
+    app.jinja_env.compile = lambda *args, **kwargs: pytest.fail('template compiled again')
+    assert app.jinja_env.get_template('page.html').render() == '012'
+
+    assert bytecode_cache('none') is None
+
+def test_startup_profile_logs_first_response(caplog):
+    app = Flask(__name__)
+    profile = StartupProfile()
+    profile.mark('imports')
+    profile.init_app(app)
+    app.add_url_rule('/', 'index', lambda: 'ok')
+
+    with caplog.at_level('INFO', logger='datamanager.startup'):
+        app.test_client().get('/')
+        app.test_client().get('/')
+    assert list(profile.report()) == ['imports', 'init', 'first_response', 'total']
+    assert caplog.text.count('Cold start') == 1
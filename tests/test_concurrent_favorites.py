@@ -0,0 +1,124 @@
+import sys
+import os
+import threading
+import pytest
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import (User, Movie, Category, Avatar, UserFavorite, MovieStats, AvatarMovieStats,
+                                   AvatarCategoryStats, db, movie_categories)
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+THREADS = 8
+ROUNDS = 25
+
+@pytest.fixture
+def app(tmp_path):
+    from flask import Flask
+    app = Flask(__name__)
+    # A file, so every thread gets its own connection and they really contend for the write lock
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'senflix.sqlite'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config['SQLITE_OPTIMIZE_INTERVAL'] = 0
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    with app.app_context():
+        db.session.add(Avatar(id=1, name='Noir'))
+        db.session.add(Category(id=1, name='Drama'))
+        db.session.add_all([Movie(id=i, name=f"Movie {i}") for i in (1, 2, 3)])
+        db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900', avatar_id=1)
+                            for i in range(1, THREADS + 1)])
+        db.session.flush()
+        db.session.execute(movie_categories.insert().values(movie_id=1, category_id=1))
+        db.session.commit()
+    return manager
+
+def run_threads(app, work):
+    """Run work(thread_index) in THREADS threads that start together; returns their results."""
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+    errors = []
+
+    def target(index):
+        try:
+            with app.app_context():
+                barrier.wait()
+                results[index] = work(index)
+                db.session.remove()
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    return results
+
+def stats_tables():
+    # Incremental updates leave a zero row behind when a movie's last interaction is removed
+    return (
+        sorted(tuple(row) for row in db.session.query(
+            MovieStats.movie_id, MovieStats.rating_sum, MovieStats.rating_count, MovieStats.interaction_count,
+            MovieStats.favorite_count, MovieStats.watched_count, MovieStats.watchlist_count
+        ).filter(MovieStats.interaction_count > 0)),
+        sorted(tuple(row) for row in db.session.query(
+            AvatarMovieStats.avatar_id, AvatarMovieStats.movie_id, AvatarMovieStats.favorite_count)),
+        sorted(tuple(row) for row in db.session.query(
+            AvatarCategoryStats.avatar_id, AvatarCategoryStats.category_id, AvatarCategoryStats.movie_count)),
+    )
+
+def assert_stats_match_rebuild(db_manager):
+    incremental = stats_tables()
+    db_manager.rebuild_movie_stats()
+    db_manager.rebuild_avatar_stats()
+    assert incremental == stats_tables()
+
+def test_concurrent_toggles_of_one_row_are_all_applied(db_manager, app):
+    # Every thread flips the same flag of the same row; a lost update would repeat a state
+    def toggle(index):
+        attribute = 'favorite' if index % 2 else 'watchlist'
+        return [db_manager.toggle_user_favorite_attribute(1, 1, attribute) for _ in range(ROUNDS)]
+
+    results = run_threads(app, toggle)
+    for attribute, threads in (('favorite', results[1::2]), ('watchlist', results[0::2])):
+        states = [result['new_state'] for thread in threads for result in thread]
+        # Each toggle started from the state the previous one left: half switched on, half off
+        assert states.count(True) == states.count(False) == len(states) // 2
+
+    with app.app_context():
+        fav = db.session.get(UserFavorite, (1, 1))
+        assert (fav.favorite, fav.watchlist) == (False, False)
+        assert_stats_match_rebuild(db_manager)
+
+def test_concurrent_first_writes_create_one_row(db_manager, app):
+    # Two quick clicks on a movie the user never touched: both insert, neither fails on the key
+    results = run_threads(app, lambda index: db_manager.upsert_favorite(1, 2, rating=float(index), watched=True))
+    assert results == [True] * THREADS
+
+    with app.app_context():
+        assert UserFavorite.query.filter_by(user_id=1, movie_id=2).count() == 1
+        stats = db.session.get(MovieStats, 2)
+        assert (stats.interaction_count, stats.rating_count, stats.watched_count) == (1, 1, 1)
+        assert_stats_match_rebuild(db_manager)
+
+def test_mixed_writes_of_many_users_keep_stats_exact(db_manager, app):
+    def interact(index):
+        user_id = index + 1
+        for round_ in range(ROUNDS):
+            movie_id = 1 + round_ % 3
+            db_manager.upsert_favorite(user_id, movie_id, rating=float(round_ % 10), comment=f"Round {round_}")
+            db_manager.toggle_user_favorite_attribute(user_id, movie_id, 'favorite')
+            if round_ % 4 == 3:
+                db_manager.remove_favorite(user_id, movie_id)
+        return True
+
+    run_threads(app, interact)
+    with app.app_context():
+        assert_stats_match_rebuild(db_manager)
@@ -0,0 +1,162 @@
+import sys
+import os
+import pytest
+from flask import flash, render_template_string
+from flask_login import LoginManager, login_required, login_user
+from datamanager.data_versions import code_fingerprint
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import User, Movie, DataVersion, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config['SECRET_KEY'] = 'test'
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    with app.app_context():
+        db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900') for i in (1, 2)])
+        db.session.add_all([Movie(id=i, name=f"Movie {i}", year=2000) for i in (1, 2)])
+        db.session.commit()
+    return manager
+
+def test_writes_bump_global_and_entity_versions(db_manager, app):
+    versions = db_manager.data_versions
+    with app.app_context():
+        before = versions.get('catalog', 'favorites', 'movie:1', 'movie:2', 'user:1')
+        assert before['epoch'] > 0
+
+        db_manager.toggle_user_favorite_attribute(1, 1, 'favorite')
+        after = versions.get('catalog', 'favorites', 'movie:1', 'movie:2', 'user:1')
+        assert after['favorites'] > before['favorites']
+        assert after['movie:1'] > before['movie:1'] and after['user:1'] > before['user:1']
+        assert after['movie:2'] == before['movie:2'] and after['catalog'] == before['catalog']
+
+        # Rolled back writes don't count
+        db.session.get(Movie, 2).name = 'Renamed'
+        db.session.flush()
+        db.session.rollback()
+        assert versions.get('movie:2', 'catalog') == {k: after[k] for k in ('epoch', 'movie:2', 'catalog')}
+
+        versions.bump('catalog')
+        assert versions.get('catalog')['catalog'] == after['catalog'] + 1
+
+def test_conditional_get(db_manager, app):
+    versions = db_manager.data_versions
+    calls = []
+
+    @app.route('/movie/<int:movie_id>')
+    @versions.conditional('catalog', 'movie:{movie_id}')
+    def movie(movie_id):
+        calls.append(movie_id)
+        # Like base.html, the page shows pending flash messages
+        return render_template_string("Movie {{ movie_id }} {{ get_flashed_messages()|join }}", movie_id=movie_id)
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        login_user(db.session.get(User, user_id))
+        return 'ok'
+
+    @app.route('/flash')
+    def flash_message():
+        flash('Saved')
+        return 'ok'
+
+    client = app.test_client()
+    client.get('/login/1')
+    first = client.get('/movie/1')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'private, no-cache'
+
+    # Unchanged: 304 without running the view
+    assert client.get('/movie/1', headers={'If-None-Match': etag}).status_code == 304
+    assert calls == [1]
+
+    # Other movies and other users' interactions with them leave the tag alone
+    with app.app_context():
+        db_manager.toggle_user_favorite_attribute(2, 2, 'watched')
+    assert client.get('/movie/1', headers={'If-None-Match': etag}).status_code == 304
+
+    # A write to the movie, or by the viewer, changes it
+    with app.app_context():
+        db_manager.toggle_user_favorite_attribute(2, 1, 'watched')
+    changed = client.get('/movie/1', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+    etag = changed.headers['ETag']
+    with app.app_context():
+        db_manager.toggle_user_favorite_attribute(1, 2, 'watchlist')
+    assert client.get('/movie/1', headers={'If-None-Match': etag}).status_code == 200
+
+    # Tags are per viewer, and a pending flash message is never skipped
+    etag = client.get('/movie/1').headers['ETag']
+    other = app.test_client()
+    other.get('/login/2')
+    assert other.get('/movie/1', headers={'If-None-Match': etag}).status_code == 200
+    client.get('/flash')
+    shown = client.get('/movie/1', headers={'If-None-Match': etag})
+    assert shown.status_code == 200 and 'Saved' in shown.get_data(as_text=True)
+    # Once shown the message is gone from the session, and 304s work again
+    assert client.get('/movie/1', headers={'If-None-Match': etag}).status_code == 304
+
+def test_shared_tags_stay_private_and_behind_the_login(db_manager, app):
+    @app.route('/categories')
+    @login_required
+    @db_manager.data_versions.conditional('catalog', per_viewer=False)
+    def categories():
+        return 'Drama'
+
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        login_user(db.session.get(User, user_id))
+        return 'ok'
+
+    client = app.test_client()
+    client.get('/login/1')
+    first = client.get('/categories')
+    assert first.headers['Cache-Control'] == 'private, no-cache' and 'Cookie' in first.headers['Vary']
+    etag = first.headers['ETag']
+    # Same tag for another viewer, but an anonymous client never gets past the login
+    other = app.test_client()
+    other.get('/login/2')
+    assert other.get('/categories', headers={'If-None-Match': etag}).status_code == 304
+    assert app.test_client().get('/categories', headers={'If-None-Match': etag}).status_code == 401
+
+def test_new_database_gets_a_random_epoch(tmp_path):
+    from flask import Flask
+    epochs = set()
+    for name in ('a', 'b'):
+        other = Flask(__name__)
+        other.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / name}.sqlite'
+        other.config['SECTION_CACHE_BACKEND'] = 'none'
+        SQLiteDataManager().init_app(other)
+        with other.app_context():
+            epochs.add(db.session.get(DataVersion, 'epoch').version)
+            for engine in db.engines.values():
+                engine.dispose()
+    assert len(epochs) == 2
+
+def test_code_fingerprint_covers_only_app_code(tmp_path):
+    (tmp_path / 'app.py').write_text('app = None')
+    (tmp_path / 'templates').mkdir()
+    (tmp_path / 'templates' / 'base.html').write_text('<html>')
+    before = code_fingerprint(str(tmp_path))
+
+    # Reinstalled dependencies don't change the ETags
+    (tmp_path / 'venv' / 'lib').mkdir(parents=True)
+    (tmp_path / 'venv' / 'lib' / 'flask.py').write_text('')
+    assert code_fingerprint(str(tmp_path)) == before
+
+    (tmp_path / 'templates' / 'base.html').write_text('<html lang="en">')
+    assert code_fingerprint(str(tmp_path)) != before
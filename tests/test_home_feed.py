@@ -0,0 +1,134 @@
+import sys
+import os
+import pytest
+from sqlalchemy import event
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.home_feed import HomeFeedAssembler
+from datamanager.interface import User, Movie, Category, StreamingPlatform, UserFavorite, MovieOMDB, Avatar, db, movie_categories
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Query budgets are measured without the section cache
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def seed_catalog(movie_count=30, category_count=4):
+    """Create avatars, categories, platforms and movies with OMDB data."""
+    db.session.add_all([Avatar(id=1, name='Noir', image='jules_noir.jpg'), Avatar(id=2, name='Blaze', image='nova_blaze.jpg')])
+    categories = [Category(name=f"Category {i}", img=None) for i in range(category_count)]
+    platform = StreamingPlatform(name='Kino')
+    db.session.add_all(categories + [platform])
+    for i in range(movie_count):
+        movie = Movie(name=f"Movie {i}", year=1950 + i)
+        movie.streaming_platforms.append(platform)
+        movie.omdb_data = MovieOMDB(imdb_id=f"tt{i:07d}", title=f"Movie {i}", poster_img=f"tt{i:07d}-omdb-poster.jpg",
+                                    released=f"01 Jan {1950 + i}")
+        db.session.add(movie)
+    db.session.flush()
+    # Link through the association table, as app.py does
+    for i, movie in enumerate(Movie.query.order_by(Movie.id).all()):
+        db.session.execute(movie_categories.insert().values(movie_id=movie.id, category_id=categories[i % category_count].id))
+    db.session.commit()
+
+def add_users_with_favorites(db_manager, start_id, count, movie_ids):
+    """Add users sharing avatar 1, each favoriting and commenting on every given movie."""
+    for user_id in range(start_id, start_id + count):
+        db.session.add(User(id=user_id, name=f"User {user_id}", whatsapp_number='+4900', avatar_id=1))
+        for movie_id in movie_ids:
+            db.session.add(UserFavorite(user_id=user_id, movie_id=movie_id, favorite=True, watched=True,
+                                        rating=float(movie_id % 10 + 1), comment=f"Comment {user_id}-{movie_id}"))
+    db.session.commit()
+    db_manager.rebuild_movie_stats()
+    db_manager.rebuild_avatar_stats()
+
+def count_queries(func):
+    """Run func and return (result, number of SQL statements executed)."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return result, len(statements)
+
+def test_home_feed_sections(db_manager, app):
+    with app.app_context():
+        seed_catalog()
+        add_users_with_favorites(db_manager, 1, 3, [1, 2, 3])
+        viewer = db.session.get(User, 1)
+
+        feed = HomeFeedAssembler(db_manager).build(viewer=viewer)
+
+        assert [m['id'] for m in feed['new_releases']][:3] == [30, 29, 28]
+        assert {m['id'] for m in feed['popular_movies']} == {1, 2, 3}
+        assert all(m['interaction_count'] == 3 for m in feed['popular_movies'])
+        assert feed['top_rated'][0]['average_rating'] == 4.0
+        assert len(feed['recent_comments']) == 5
+        assert len(feed['categories']) == 4
+        assert all(len(c['movies']) <= 10 for c in feed['categories'])
+        assert feed['platforms'][0]['name'] == 'Kino'
+        # Only other users with the same avatar count, one card per movie
+        assert [f['movie']['id'] for f in feed['same_avatar_favorites']] == [1, 2, 3]
+        assert all(f['favorite_count'] == 2 for f in feed['same_avatar_favorites'])
+        assert [u.id for u in feed['same_avatar_users']] == [2, 3]
+        # Viewer status is applied to the shared movie set
+        assert feed['popular_movies'][0]['user_favorite'] is True
+        assert feed['popular_movies'][0]['omdb_data']['poster_img'].startswith('tt')
+
+def test_home_feed_query_budget_is_fixed(db_manager, app):
+    with app.app_context():
+        seed_catalog()
+        add_users_with_favorites(db_manager, 1, 2, [1, 2])
+        assembler = HomeFeedAssembler(db_manager)
+
+        viewer = db.session.get(User, 1)
+        _, small_count = count_queries(lambda: assembler.build(viewer=viewer))
+
+        # Grow users and favorites by an order of magnitude
+        add_users_with_favorites(db_manager, 3, 25, list(range(1, 21)))
+        db.session.expire_all()
+        viewer = db.session.get(User, 1)
+        feed, large_count = count_queries(lambda: assembler.build(viewer=viewer))
+
+        assert len(feed['same_avatar_favorites']) == 10
+        assert large_count == small_count
+        assert large_count <= 14
+
+def test_home_feed_deferred_categories(db_manager, app):
+    with app.app_context():
+        seed_catalog()
+        add_users_with_favorites(db_manager, 1, 2, [1, 2])
+        viewer = db.session.get(User, 1)
+        assembler = HomeFeedAssembler(db_manager)
+
+        feed = assembler.build(viewer=viewer, defer_categories=True)
+        assert feed['popular_movies'] and not isinstance(feed['categories'], list)
+        # The category movies are loaded in one pass when the rows are first read
+        categories, queries = count_queries(lambda: list(feed['categories']))
+        assert 0 < queries <= 4
+        assert categories == assembler.build(viewer=viewer)['categories']
+
+def test_home_feed_anonymous_viewer(db_manager, app):
+    with app.app_context():
+        seed_catalog(movie_count=5)
+        feed = HomeFeedAssembler(db_manager).build(viewer=None)
+        assert feed['same_avatar_favorites'] == []
+        assert len(feed['new_releases']) == 5
+        assert 'user_watched' not in feed['new_releases'][0]
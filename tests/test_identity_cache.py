@@ -0,0 +1,121 @@
+import sys
+import os
+import pytest
+from flask import render_template_string
+from flask_login import LoginManager, current_user, login_user
+from sqlalchemy import event, inspect
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import User, Avatar, Movie, UserFavorite, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config['SECRET_KEY'] = 'test'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: manager.identity_cache.get_user(int(user_id)))
+    with app.app_context():
+        db.session.add_all([Avatar(id=1, name='Noir'), Avatar(id=2, name='Pop')])
+        db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900', avatar_id=i) for i in (1, 2)])
+        db.session.add(Movie(id=1, name='Movie 1'))
+        db.session.add(UserFavorite(user_id=1, movie_id=1, favorite=True))
+        db.session.commit()
+    return manager
+
+def count_user_queries(app):
+    queries = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: queries.append(args[2]) if 'users' in args[2] or 'avatars' in args[2] else None)
+    return queries
+
+def test_second_request_needs_no_query(db_manager, app):
+    cache = db_manager.identity_cache
+    queries = count_user_queries(app)
+    with app.app_context():
+        user = cache.get_user(1)
+        assert user.avatar.name == 'Noir'
+        assert len(queries) == 1  # the avatar came with the user
+
+    with app.app_context():
+        user = cache.get_user(1)
+        assert cache.get_user(1) is user and db_manager.get_user_by_id(1)['avatar']['name'] == 'Noir'
+        assert (user.name, user.avatar.name) == ('User 1', 'Noir')
+        assert len(queries) == 1
+        # A regular session object: unloaded relationships still load
+        assert inspect(user).session is db.session()
+        assert [fav.movie_id for fav in user.favorites] == [1]
+        assert cache.get_user(99) is None
+    assert cache.stats()['hits'] == 1
+
+def test_login_and_templates_share_one_lookup(db_manager, app):
+    @app.route('/login/<int:user_id>')
+    def login(user_id):
+        login_user(db_manager.identity_cache.get_user(user_id))
+        return 'ok'
+
+    @app.route('/profile')
+    def profile():
+        return render_template_string("{{ current_user.avatar.name }} {{ get_user(current_user.id)['name'] }}")
+
+    app.context_processor(lambda: dict(get_user=db_manager.get_user_by_id))
+    client = app.test_client()
+    client.get('/login/2')
+    queries = count_user_queries(app)
+    assert client.get('/profile').get_data(as_text=True) == 'Pop User 2'
+    assert client.get('/profile').get_data(as_text=True) == 'Pop User 2'
+    assert queries == []
+
+def test_committed_writes_drop_records(db_manager, app):
+    cache = db_manager.identity_cache
+    with app.app_context():
+        cache.get_user(1), cache.get_user(2)
+        db.session.get(User, 1).name = 'Renamed'
+        db.session.commit()
+    with app.app_context():
+        assert cache.get_user(1).name == 'Renamed'
+        assert 2 in cache._records
+
+        # An avatar is shared, so changing one drops every record
+        db.session.get(Avatar, 2).name = 'Glam'
+        db.session.commit()
+        assert cache._records == {}
+    with app.app_context():
+        assert cache.get_user(2).avatar.name == 'Glam'
+
+        # Values stored after a flush that is rolled back are dropped as well
+        db.session.get(User, 2).name = 'Never'
+        db.session.flush()
+        cache._store(db.session.get(User, 2))
+        db.session.rollback()
+    with app.app_context():
+        assert cache.get_user(2).name == 'User 2'
+
+def test_first_user_and_disabled_cache(db_manager, app):
+    cache = db_manager.identity_cache
+    queries = count_user_queries(app)
+    with app.app_context():
+        assert cache.first_user().id == 1
+    with app.app_context():
+        assert cache.first_user().name == 'User 1'
+    assert len(queries) == 1
+
+    cache.ttl = 0
+    cache.clear()
+    with app.app_context():
+        cache.get_user(2)
+    with app.app_context():
+        cache.get_user(2)
+    assert len(queries) == 3 and cache._records == {}
@@ -0,0 +1,105 @@
+import sys
+import os
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import User, Movie, Avatar, UserFavorite, MovieStats, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    with app.app_context():
+        db.session.add(Avatar(id=1, name='Noir'))
+        db.session.add_all([Movie(id=i, name=f"Movie {i}") for i in (1, 2, 3)])
+        db.session.add(User(id=1, name='User 1', whatsapp_number='+4900', avatar_id=1))
+        db.session.add(UserFavorite(user_id=1, movie_id=3, watched=True, rating=6.0))
+        db.session.commit()
+        manager.rebuild_movie_stats()
+    return manager
+
+def count_commits(app):
+    commits = []
+    with app.app_context():
+        event.listen(db.engine, 'commit', lambda connection: commits.append(connection))
+    return commits
+
+def test_batch_is_applied_in_one_transaction(db_manager, app):
+    operations = [
+        {'movie_id': 1, 'action': 'toggle', 'attribute': 'watchlist'},
+        {'movie_id': 1, 'action': 'toggle', 'attribute': 'favorite'},
+        {'movie_id': 2, 'action': 'rate', 'rating': 8, 'comment': 'Great'},
+        {'movie_id': 2, 'action': 'set', 'favorite': True},
+        {'movie_id': 3, 'action': 'remove'},
+    ]
+    commits = count_commits(app)
+    with app.app_context():
+        results = db_manager.apply_interactions(1, operations)
+        assert len(commits) == 1
+        assert [result['success'] for result in results] == [True] * 5
+        assert results[1] == {'movie_id': 1, 'success': True, 'user_watched': False, 'user_watchlist': True,
+                              'user_favorite': True, 'user_rated': False}
+        assert results[3]['user_rated'] and results[3]['user_watched'] and results[3]['user_favorite']
+        assert results[4]['user_watched'] is False
+
+        fav = db.session.get(UserFavorite, (1, 2))
+        assert (fav.rating, fav.comment, fav.watched, fav.favorite) == (8.0, 'Great', True, True)
+        assert db.session.get(UserFavorite, (1, 3)) is None
+        stats = {row.movie_id: row for row in MovieStats.query}
+        assert (stats[1].watchlist_count, stats[1].favorite_count) == (1, 1)
+        assert (stats[2].rating_count, stats[2].rating_sum) == (1, 8.0)
+        assert stats[3].interaction_count == 0
+
+def test_invalid_operations_fail_alone(db_manager, app):
+    operations = [
+        {'movie_id': 1, 'action': 'toggle', 'attribute': 'rating'},
+        {'movie_id': 99, 'action': 'toggle', 'attribute': 'watched'},
+        {'movie_id': '1', 'action': 'remove'},
+        {'movie_id': 1, 'action': 'rate', 'rating': 11},
+        {'movie_id': 1, 'action': 'set', 'watched': 'yes'},
+        {'movie_id': 1, 'action': 'launch'},
+        'watched',
+        {'movie_id': 2, 'action': 'remove'},
+        {'movie_id': 1, 'action': 'toggle', 'attribute': 'watched'},
+    ]
+    with app.app_context():
+        results = db_manager.apply_interactions(1, operations)
+        assert [result['success'] for result in results] == [False] * 8 + [True]
+        assert results[1]['error'] == 'User or movie not found'
+        assert results[6]['movie_id'] is None
+        # No entry for movie 2: nothing was removed, so nothing is reported as done
+        assert results[7] == {'movie_id': 2, 'success': False, 'error': 'Nothing to remove'}
+        assert db.session.get(UserFavorite, (1, 1)).watched is True
+        assert UserFavorite.query.filter_by(movie_id=99).count() == 0
+
+def test_database_error_rolls_back_the_batch(db_manager, app, monkeypatch):
+    original = db_manager._update_movie_stats
+
+    def update_movie_stats(movie_id, before, after):
+        if movie_id == 2:
+            raise OperationalError('UPDATE movie_stats', {}, Exception('database is locked'))
+        original(movie_id, before, after)
+
+    # The second operation fails after the first one was written
+    monkeypatch.setattr(db_manager, '_update_movie_stats', update_movie_stats)
+    with app.app_context():
+        results = db_manager.apply_interactions(1, [
+            {'movie_id': 1, 'action': 'toggle', 'attribute': 'watched'},
+            {'movie_id': 2, 'action': 'toggle', 'attribute': 'watched'},
+        ])
+        assert results == [{'movie_id': 1, 'success': False, 'error': 'Database error'},
+                           {'movie_id': 2, 'success': False, 'error': 'Database error'}]
+        assert UserFavorite.query.filter(UserFavorite.movie_id.in_([1, 2])).count() == 0
@@ -0,0 +1,157 @@
+import sys
+import os
+import re
+import shutil
+import sqlite3
+import pytest
+from sqlalchemy import create_engine, event, text
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.migrations import MIGRATIONS, Migration, MigrationRunner
+from datamanager.interface import (User, Movie, Category, StreamingPlatform, UserFavorite, MovieOMDB, db,
+                                   movie_categories, movie_platforms)
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def seed():
+    db.session.add_all([Category(id=1, name='Drama'), StreamingPlatform(id=1, name='Netflix')])
+    db.session.add_all([Movie(id=i, name=f"Movie {i}", year=2000 + i, category_id=1) for i in range(1, 4)])
+    db.session.add(User(id=1, name='User 1', whatsapp_number='+4900'))
+    db.session.add(MovieOMDB(id=1, imdb_id='tt0000001', title='Movie 1'))
+    db.session.add(UserFavorite(user_id=1, movie_id=1, watched=True, favorite=True, comment='Great'))
+    db.session.execute(movie_categories.insert().values(movie_id=2, category_id=1))
+    db.session.execute(movie_platforms.insert().values(movie_id=3, platform_id=1))
+    db.session.commit()
+
+def test_fresh_database_is_at_latest_version(db_manager, app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            assert MigrationRunner.current_version(connection) == MIGRATIONS[-1].version
+        indexes = {row[0] for row in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert {'ix_user_favorites_movie', 'ix_user_favorites_comments', 'ix_movies_omdb_imdb_id',
+                'ix_movies_release_date'} <= indexes
+        assert 'ix_movies_year_name' not in indexes
+        # Nothing left to do on the next start
+        assert db_manager.migrations.upgrade() == []
+
+def test_existing_database_gets_missing_columns_and_indexes(app, tmp_path):
+    path = tmp_path / 'old.sqlite'
+    connection = sqlite3.connect(path)
+    # user_favorites as it looked before the favorite flag was added
+    connection.execute("""CREATE TABLE user_favorites (user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL,
+                          watched BOOLEAN, comment TEXT, rating FLOAT, watchlist BOOLEAN,
+                          PRIMARY KEY (user_id, movie_id))""")
+    connection.execute("INSERT INTO user_favorites VALUES (1, 1, 1, 'Old comment', 8, 0)")
+    connection.commit()
+    connection.close()
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    SQLiteDataManager().init_app(app)
+    with app.app_context():
+        favorite = db.session.get(UserFavorite, (1, 1))
+        assert favorite.comment == 'Old comment' and favorite.favorite is None
+        plan = db.session.execute(text("EXPLAIN QUERY PLAN SELECT * FROM user_favorites WHERE movie_id = 1")).all()
+        assert 'ix_user_favorites_movie' in plan[0][3]
+
+def schema(connection):
+    """Columns of every table and the names of the indexes, as the database has them."""
+    names = connection.exec_driver_sql("SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' "
+                                       "AND name NOT LIKE 'movie_search%'").all()
+    tables = {name: {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info({name})')}
+              for kind, name in names if kind == 'table'}
+    return tables, {name for kind, name in names if kind == 'index'}
+
+def test_models_match_the_migrated_schema(db_manager, app):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            tables, _ = schema(connection)
+    # A model change without a migration shows up here
+    assert tables == {table.name: {column.name for column in table.columns} for table in db.metadata.sorted_tables}
+
+def test_upgraded_database_matches_a_fresh_one(db_manager, app, tmp_path):
+    with app.app_context():
+        with db.engine.connect() as connection:
+            fresh = schema(connection)
+    # The bundled database was created long before the migrations and upgraded since
+    path = tmp_path / 'bundled.sqlite'
+    shutil.copy(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'senflix.sqlite'),
+                path)
+    engine = create_engine(f'sqlite:///{path}')
+    MigrationRunner().upgrade(engine)
+    with engine.connect() as connection:
+        assert schema(connection) == fresh
+    engine.dispose()
+
+def test_failed_migration_is_rolled_back(app):
+    def broken(connection):
+        connection.execute(text('CREATE TABLE half_done (id INTEGER)'))
+        raise RuntimeError('boom')
+
+    SQLiteDataManager().init_app(app)
+    with app.app_context():
+        runner = MigrationRunner(MIGRATIONS + [Migration(99, 'Broken', broken)])
+        with pytest.raises(RuntimeError):
+            runner.upgrade()
+        with db.engine.connect() as connection:
+            assert MigrationRunner.current_version(connection) == MIGRATIONS[-1].version
+            assert not connection.execute(text("SELECT name FROM sqlite_master WHERE name = 'half_done'")).first()
+
+# --- Query plans ---
+
+# A plain table scan, or a walk over the whole primary key; ordered scans of an ix_ index are fine
+FULL_SCAN = re.compile(r'^SCAN \w+( USING (COVERING )?INDEX sqlite_autoindex_\w+)?$')
+
+def full_scans(callable_):
+    """Run `callable_` and return the EXPLAIN QUERY PLAN lines of its statements that scan a whole table."""
+    statements = []
+    listener = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        callable_()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    assert statements
+    scans = []
+    connection = db.session.connection()
+    for statement, parameters in statements:
+        for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all():
+            if FULL_SCAN.match(row[3]):
+                scans.append(f"{row[3]} in: {statement[:120]}")
+    return scans
+
+@pytest.mark.parametrize('name, call', [
+    ('get_recent_commented_movies', lambda dm: dm.get_recent_commented_movies()),
+    ('get_new_releases', lambda dm: dm.get_new_releases()),
+    ('get_movies_released_in_year', lambda dm: dm.get_movies_released_in_year(2002)),
+    ('get_popular_movies', lambda dm: dm.get_popular_movies()),
+    ('get_top_rated_movies', lambda dm: dm.get_top_rated_movies()),
+    ('get_most_loved_movies', lambda dm: dm.get_most_loved_movies()),
+    ('get_movies_by_category', lambda dm: dm.get_movies_by_category(1)),
+    ('get_movies_by_platform', lambda dm: dm.get_movies_by_platform(1)),
+    ('get_movie_data', lambda dm: dm.get_movie_data(1)),
+    ('get_user_favorites', lambda dm: dm.get_user_favorites(1)),
+    ('get_similar_movies', lambda dm: dm.get_similar_movies(1)),
+    ('toggle_user_favorite_attribute', lambda dm: dm.toggle_user_favorite_attribute(1, 2, 'favorite')),
+    ('watched by (movie page)', lambda dm: db.session.query(UserFavorite.user_id, UserFavorite.rating)
+        .filter_by(movie_id=1, watched=True).all()),
+    ('imdb lookup (add_new_movie)', lambda dm: MovieOMDB.query.filter_by(imdb_id='tt0000001').first()),
+])
+def test_hot_paths_use_indexes(db_manager, app, name, call):
+    with app.app_context():
+        seed()
+        assert full_scans(lambda: call(db_manager)) == []
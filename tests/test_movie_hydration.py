@@ -0,0 +1,170 @@
+import sys
+import os
+import pytest
+from flask_login import LoginManager
+from sqlalchemy import event
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.projections import MovieCard
+from datamanager.interface import User, Movie, Category, StreamingPlatform, UserFavorite, MovieOMDB, db, movie_categories
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # current_user is resolved inside requests, as in app.py
+    login_manager = LoginManager(app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def seed_movies(movie_count=20):
+    """Movies with OMDB data, one category and one platform each, and a viewer."""
+    category = Category(name='Drama')
+    platform = StreamingPlatform(name='Kino')
+    db.session.add_all([category, platform, User(id=1, name='Viewer', whatsapp_number='+4900')])
+    for i in range(movie_count):
+        movie = Movie(id=i + 1, name=f"Movie {i}", year=1950 + i)
+        movie.streaming_platforms.append(platform)
+        movie.omdb_data = MovieOMDB(imdb_id=f"tt{i:07d}", title=f"Movie {i}")
+        db.session.add(movie)
+    db.session.flush()
+    for i in range(movie_count):
+        db.session.execute(movie_categories.insert().values(movie_id=i + 1, category_id=category.id))
+    db.session.add(UserFavorite(user_id=1, movie_id=2, watched=True, rating=4.0))
+    db.session.commit()
+
+def count_queries(func):
+    """Run func and return (result, number of SQL statements executed)."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return result, len(statements)
+
+def test_get_movies_data_query_count_is_constant(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        viewer = db.session.get(User, 1)
+
+        _, few = count_queries(lambda: db_manager.get_movies_data([1, 2, 3], viewer=viewer))
+        movies, many = count_queries(lambda: db_manager.get_movies_data(list(range(4, 21)), viewer=viewer))
+
+        assert len(movies) == 17
+        assert few == many <= 4
+
+def test_get_movies_data_content_and_viewer_status(db_manager, app):
+    with app.app_context():
+        seed_movies(movie_count=3)
+        viewer = db.session.get(User, 1)
+        movies = db_manager.get_movies_data([3, 2, 99, 2], viewer=viewer)
+
+        # Requested order kept, duplicates and unknown IDs dropped
+        assert list(movies.keys()) == [3, 2]
+        assert movies[2]['user_watched'] is True
+        assert movies[2]['user_rated'] is True
+        assert 'user_watched' not in movies[3]
+        assert movies[3]['omdb_data']['imdb_id'] == 'tt0000002'
+        assert movies[3]['categories'][0]['name'] == 'Drama'
+        assert movies[3]['streaming_platforms'][0]['name'] == 'Kino'
+        assert db_manager.get_movie_data(3) == db_manager.get_movies_data([3])[3]
+
+def test_get_movies_data_memoizes_within_request(db_manager, app):
+    with app.test_request_context():
+        seed_movies(movie_count=5)
+        first, _ = count_queries(lambda: db_manager.get_movies_data([1, 2, 3]))
+        second, cached = count_queries(lambda: db_manager.get_movies_data([3, 2, 1]))
+        assert cached == 0
+        assert second == first
+
+        # Returned dicts are copies, callers can decorate them freely
+        second[1]['interaction_count'] = 7
+        assert 'interaction_count' not in db_manager.get_movies_data([1])[1]
+
+        # Only movies not seen yet in this request are loaded
+        _, partial = count_queries(lambda: db_manager.get_movies_data([1, 4]))
+        assert partial > 0
+
+def test_get_movies_data_memo_cleared_on_commit(db_manager, app):
+    with app.test_request_context():
+        seed_movies(movie_count=2)
+        assert db_manager.get_movie_data(1)['name'] == 'Movie 0'
+        db_manager.update_movie(1, {'name': 'Renamed'})
+        assert db_manager.get_movie_data(1)['name'] == 'Renamed'
+
+def test_card_view_is_compact(db_manager, app):
+    with app.app_context():
+        seed_movies(movie_count=3)
+        db.session.add(Movie(id=10, name='No OMDB', year=1999))
+        db.session.commit()
+        viewer = db.session.get(User, 1)
+
+        cards, queries = count_queries(lambda: db_manager.get_movies_data([1, 2, 10], viewer=viewer, view='card'))
+
+        # Movie + poster columns, category names, viewer status
+        assert queries == 3
+        card = cards[2]
+        assert isinstance(card, MovieCard)
+        assert not hasattr(card, '__dict__')
+        assert card['name'] == 'Movie 1'
+        assert card['categories'] == [{'id': 1, 'name': 'Drama'}]
+        assert card['user_watched'] is True
+        assert 'user_watched' not in cards[1]
+        assert cards[10]['omdb_data'] is None
+        # Extra fields are added by copying into a plain dict, as the templates expect
+        assert dict(card, average_rating=4.0)['average_rating'] == 4.0
+
+def test_memoized_cards_are_copies(db_manager, app):
+    with app.test_request_context():
+        seed_movies(movie_count=2)
+        viewer = db.session.get(User, 1)
+        card = db_manager.get_movies_data([2], viewer=viewer, view='card')[2]
+        # One section of a page changing its card leaves the others' alone
+        card.update({'name': 'Changed', 'user_watched': False})
+        again = db_manager.get_movies_data([2], viewer=viewer, view='card')[2]
+        assert again is not card and isinstance(again, MovieCard)
+        assert (again['name'], again['user_watched']) == ('Movie 1', True)
+        assert dict(again.copy()) == dict(again)
+
+def test_card_view_for_ranked_lists(db_manager, app):
+    with app.app_context():
+        seed_movies(movie_count=3)
+        db.session.query(MovieOMDB).filter_by(id=3).update({'poster_img': 'tt3.jpg', 'imdb_rating': 8.1})
+        db.session.commit()
+        db_manager.upsert_favorite(1, 3, rating=5.0)
+
+        top_rated = db_manager.get_top_rated_movies(limit=1, view='card')
+        assert top_rated[0]['id'] == 3
+        assert top_rated[0]['average_rating'] == 5.0
+        assert top_rated[0]['omdb_data'] == {'poster_img': 'tt3.jpg', 'poster_variants': None, 'imdb_rating': 8.1}
+        assert 'plot' not in top_rated[0]['omdb_data']
+        assert [m['id'] for m in db_manager.get_movies_by_category(1, view='card')] == [1, 2, 3]
+
+def test_category_movies_in_growing_batches(db_manager, app):
+    with app.test_request_context():
+        seed_movies(movie_count=20)
+        category_id = Category.query.one().id
+        batches = db_manager.iter_movies_by_category(category_id, first_batch=3, max_batch=8)
+
+        sizes, ids = [], []
+        for batch in batches:
+            sizes.append(len(batch))
+            ids += [m['id'] for m in batch]
+        assert sizes == [3, 6, 8, 3]
+        assert ids == [m['id'] for m in db_manager.get_movies_by_category(category_id, view='card')]
+        assert list(db_manager.iter_movies_by_category(999)) == []
@@ -0,0 +1,92 @@
+import sys
+import os
+import pytest
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import User, Movie, MovieStats, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    with app.app_context():
+        db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900') for i in range(1, 4)])
+        db.session.add_all([Movie(id=i, name=f"Movie {i}", year=2000 + i) for i in range(1, 4)])
+        db.session.commit()
+    return manager
+
+def snapshot_stats():
+    return {s.movie_id: s.to_dict() for s in MovieStats.query.order_by(MovieStats.movie_id).all()}
+
+def test_writes_maintain_stats(db_manager, app):
+    with app.app_context():
+        db_manager.upsert_favorite(1, 1, rating=8.0, watched=True)
+        db_manager.upsert_favorite(2, 1, rating=6.0)
+        db_manager.toggle_user_favorite_attribute(3, 1, 'favorite')
+        db_manager.toggle_user_favorite_attribute(1, 2, 'watchlist')
+
+        stats = db_manager.get_movie_stats(1)
+        assert stats['interaction_count'] == 3
+        assert stats['rating_count'] == 2
+        assert stats['rating_avg'] == 7.0
+        assert stats['favorite_count'] == 1
+        assert stats['watched_count'] == 1
+        assert db_manager.get_avg_movie_rating(1) == 7.0
+
+        # Re-rating replaces the old rating instead of adding to it
+        db_manager.upsert_favorite(2, 1, rating=10.0)
+        assert db_manager.get_movie_stats(1)['rating_avg'] == 9.0
+
+        # Toggling back and removing decrement the counters
+        db_manager.toggle_user_favorite_attribute(3, 1, 'favorite')
+        db_manager.remove_favorite(1, 1)
+        stats = db_manager.get_movie_stats(1)
+        assert stats['favorite_count'] == 0
+        assert stats['watched_count'] == 0
+        assert stats['interaction_count'] == 2
+        assert stats['rating_count'] == 1
+
+def test_incremental_stats_match_rebuild(db_manager, app):
+    with app.app_context():
+        db_manager.upsert_favorite(1, 1, rating=3.0, watched=True, favorite=True)
+        db_manager.upsert_favorite(2, 2, rating=9.0, watchlist=True)
+        db_manager.toggle_user_favorite_attribute(2, 2, 'watched')
+        db_manager.toggle_user_favorite_attribute(3, 3, 'favorite')
+        db_manager.remove_favorite(2, 2)
+        incremental = snapshot_stats()
+
+        assert db_manager.rebuild_movie_stats() == 2
+        rebuilt = snapshot_stats()
+        # Rows that dropped to zero interactions are not recreated by the rebuild
+        assert {k: v for k, v in incremental.items() if v['interaction_count']} == rebuilt
+
+def test_rankings_read_from_stats(db_manager, app):
+    with app.app_context():
+        db_manager.upsert_favorite(1, 1, rating=4.0)
+        db_manager.upsert_favorite(1, 2, rating=9.0, favorite=True)
+        db_manager.upsert_favorite(2, 2, watched=True)
+        db_manager.upsert_favorite(1, 3, favorite=True)
+        db_manager.upsert_favorite(2, 3, favorite=True)
+        db_manager.upsert_favorite(3, 3, favorite=True)
+
+        assert [m['id'] for m in db_manager.get_top_rated_movies(limit=None)] == [2, 1]
+        assert db_manager.get_top_rated_movies(limit=1)[0]['average_rating'] == 9.0
+        assert [m['id'] for m in db_manager.get_popular_movies(limit=2)] == [3, 2]
+        assert db_manager.get_popular_movies(limit=None)[0]['interaction_count'] == 3
+        assert [(m['id'], m['favorite_count']) for m in db_manager.get_most_loved_movies()] == [(3, 3), (2, 1)]
+
+def test_delete_movie_removes_stats(db_manager, app):
+    with app.app_context():
+        db_manager.upsert_favorite(1, 1, rating=5.0)
+        assert db_manager.delete_movie(1) is True
+        assert db.session.get(MovieStats, 1) is None
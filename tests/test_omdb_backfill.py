@@ -0,0 +1,161 @@
+import sys
+import os
+import io
+import json
+import threading
+import time
+import pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from PIL import Image
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.omdb_manager import OMDBManager
+from datamanager.omdb_cache import OMDBResponseCache
+from datamanager.omdb_backfill import OMDBBackfill, RateLimiter
+from datamanager.poster_pipeline import PosterPipeline
+from datamanager.interface import Movie, MovieOMDB, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Titles the fake OMDB server knows, with the movie's IMDb ID
+FAKE_TITLES = {f"Movie {i}": f"tt{i:07d}" for i in range(1, 13)}
+
+class FakeOMDBHandler(BaseHTTPRequestHandler):
+    """Answers OMDB title / ID lookups and serves poster JPEGs."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        server = self.server
+        if url.path.startswith('/posters/'):
+            buffer = io.BytesIO()
+            Image.new('RGB', (300, 445), (120, 40, 40)).save(buffer, 'JPEG')
+            return self._send(buffer.getvalue(), 'image/jpeg')
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with server.lock:
+            server.api_calls.append(params)
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(0.02)  # Long enough for requests to overlap
+        imdb_id = params.get('i') or FAKE_TITLES.get(params.get('t'))
+        if imdb_id and imdb_id != 'tt0000007':  # Movie 7 is unknown to OMDB
+            number = int(imdb_id[2:])
+            body = {
+                'Response': 'True', 'Title': f"Movie {number}", 'Year': '2001', 'imdbID': imdb_id,
+                'Plot': f"Plot {number}", 'Director': 'Someone', 'imdbRating': '7.5',
+                'Poster': f"http://{server.server_address[0]}:{server.server_address[1]}/posters/{imdb_id}.jpg",
+            }
+        else:
+            body = {'Response': 'False', 'Error': 'Movie not found!'}
+        with server.lock:
+            server.active -= 1
+        self._send(json.dumps(body).encode(), 'application/json')
+
+    def _send(self, payload, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def fake_omdb():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOMDBHandler)
+    server.lock = threading.Lock()
+    server.api_calls = []
+    server.active = 0
+    server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+@pytest.fixture
+def omdb_manager(db_manager, fake_omdb, tmp_path):
+    manager = OMDBManager(db_manager)
+    manager.api_key = 'test-key'
+    manager.base_url = f"http://127.0.0.1:{fake_omdb.server_address[1]}/"
+    manager.movies_dir = tmp_path / 'movies'
+    manager.movies_dir.mkdir()
+    manager.poster_pipeline = PosterPipeline(manager.movies_dir)
+    # Fresh response cache per test, shared by the worker threads
+    manager.response_cache = OMDBResponseCache(str(tmp_path / 'omdb_cache.sqlite'))
+    return manager
+
+def seed_movies():
+    db.session.add_all([Movie(id=i, name=f"Movie {i}", year=2001) for i in range(1, 13)])
+    # Complete already, must not be fetched
+    db.session.add(MovieOMDB(id=1, imdb_id='tt0000001', title='Movie 1', plot='Plot', poster_img='p.jpg'))
+    # Partially missing: no poster yet, looked up by its IMDb ID
+    db.session.add(MovieOMDB(id=2, imdb_id='tt0000002', title='Movie 2', plot='Plot'))
+    db.session.commit()
+
+def test_backfill_fetches_missing_movies_in_parallel(app, omdb_manager, fake_omdb, tmp_path):
+    with app.app_context():
+        seed_movies()
+        reports = []
+        backfill = OMDBBackfill(omdb_manager, workers=4, rate_limit=None, batch_size=4,
+                                state_path=str(tmp_path / 'state.json'))
+
+        stats = backfill.run(progress=reports.append)
+
+        assert stats == {'total': 11, 'processed': 11, 'saved': 10, 'failed': 1}
+        assert fake_omdb.max_active > 1
+        assert {'i': 'tt0000002', 'apikey': 'test-key', 'plot': 'full'} in fake_omdb.api_calls
+        # Progress is reported per committed batch
+        assert [r['processed'] for r in reports] == [4, 8, 11]
+
+        omdb = db.session.get(MovieOMDB, 5)
+        assert omdb.plot == 'Plot 5' and omdb.imdb_rating == 7.5
+        assert omdb.poster_img == 'tt0000005-omdb-poster.jpg'
+        assert omdb.poster_variants['variants']['webp']
+        assert db.session.get(MovieOMDB, 2).poster_img == 'tt0000002-omdb-poster.jpg'
+        assert db.session.get(MovieOMDB, 1).poster_img == 'p.jpg'
+        assert db.session.get(MovieOMDB, 7) is None
+
+def test_backfill_is_resumable(app, omdb_manager, fake_omdb, tmp_path):
+    with app.app_context():
+        seed_movies()
+        state_path = str(tmp_path / 'state.json')
+
+        first = OMDBBackfill(omdb_manager, workers=2, rate_limit=None, batch_size=2, state_path=state_path).run(limit=3)
+        assert first['saved'] == 3
+
+        # The second run only sees what is still missing; the unknown movie is remembered
+        second = OMDBBackfill(omdb_manager, workers=2, rate_limit=None, state_path=state_path).run()
+        assert second['total'] == 8 and second['failed'] == 1
+        assert json.load(open(state_path))['failed'] == [7]
+
+        third = OMDBBackfill(omdb_manager, rate_limit=None, state_path=state_path).run()
+        assert third['total'] == 0
+        assert OMDBBackfill(omdb_manager, rate_limit=None, state_path=state_path).run(retry_failed=True)['total'] == 1
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(50)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.wait) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Six calls at 50/s need at least five intervals of 20ms
+    assert time.monotonic() - start >= 0.09
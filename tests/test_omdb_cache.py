@@ -0,0 +1,141 @@
+import sys
+import os
+import json
+import threading
+import pytest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from datamanager import omdb_cache
+from datamanager.omdb_cache import OMDBResponseCache
+from datamanager.omdb_manager import OMDBManager
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class FakeOMDBHandler(BaseHTTPRequestHandler):
+    """Knows one movie, rate limits 'Busy Movie' and doesn't know anything else."""
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlparse(self.path).query).items()}
+        self.server.api_calls.append(params)
+        if params.get('t') == 'Inception' or params.get('i') == 'tt1375666':
+            body = {'Response': 'True', 'Title': 'Inception', 'Year': '2010', 'imdbID': 'tt1375666'}
+        elif params.get('t') == 'Busy Movie':
+            body = {'Response': 'False', 'Error': 'Request limit reached!'}
+        else:
+            body = {'Response': 'False', 'Error': 'Movie not found!'}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def fake_omdb():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOMDBHandler)
+    server.api_calls = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def cache(tmp_path):
+    return OMDBResponseCache(str(tmp_path / 'omdb_cache.sqlite'))
+
+@pytest.fixture
+def omdb_manager(fake_omdb, cache):
+    manager = OMDBManager(data_manager=None)
+    manager.api_key = 'test-key'
+    manager.base_url = f"http://127.0.0.1:{fake_omdb.server_address[1]}/"
+    manager.response_cache = cache
+    return manager
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr(omdb_cache.time, 'time', lambda: now[0])
+    return now
+
+def test_make_key_normalizes_queries():
+    assert OMDBResponseCache.make_key('title', '  The   Godfather ', 1972) == 'title:the godfather:1972'
+    assert OMDBResponseCache.make_key('title', 'the godfather', None) == 'title:the godfather'
+    assert OMDBResponseCache.make_key('imdb', 'TT0068646') == 'imdb:tt0068646'
+
+def test_hits_misses_and_negative_entries(cache):
+    assert cache.get('title:inception') is None
+    cache.set('title:inception', {'Title': 'Inception'})
+    cache.set('title:nothing', None)
+
+    assert cache.get('title:inception') == (True, {'Title': 'Inception'})
+    assert cache.get('title:nothing') == (False, None)
+    stats = cache.stats()
+    assert (stats['hits'], stats['negative_hits'], stats['misses']) == (1, 1, 1)
+    assert stats['hit_rate'] == round(2 / 3, 3)
+    assert (stats['entries'], stats['negative_entries'], stats['stored_hits']) == (2, 1, 2)
+
+def test_hits_and_misses_expire_separately(cache, clock):
+    cache.hit_ttl, cache.miss_ttl = 100, 10
+    cache.set('title:inception', {'Title': 'Inception'})
+    cache.set('title:nothing', None)
+
+    clock[0] += 50
+    assert cache.get('title:inception') is not None
+    assert cache.get('title:nothing') is None
+
+    clock[0] += 60
+    assert cache.get('title:inception') is None
+    assert cache.evict() == 2
+
+def test_evicts_least_recently_used_entries(cache, clock):
+    cache.max_entries = 2
+    for key in ('a', 'b', 'c'):
+        clock[0] += 1
+        cache.set(key, {'key': key})
+    clock[0] += 1
+    cache.get('a')  # 'b' is now the least recently used
+
+    assert cache.evict() == 1
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+
+def test_cache_is_shared_between_instances_and_threads(cache):
+    cache.set('imdb:tt1375666', {'Title': 'Inception'})
+    other = OMDBResponseCache(cache.path)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(other.get('imdb:tt1375666'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [(True, {'Title': 'Inception'})] * 4
+
+def test_disabled_cache_is_a_no_op():
+    cache = OMDBResponseCache()
+    cache.set('title:inception', {'Title': 'Inception'})
+    assert cache.get('title:inception') is None
+    assert cache.stats()['enabled'] is False
+
+def test_manager_serves_repeated_lookups_from_cache(omdb_manager, fake_omdb):
+    first = omdb_manager.fetch_omdb_data_by_title('Inception', 2010)
+    second = omdb_manager.fetch_omdb_data_by_title(' inception ', '2010')
+    assert first == second and first['imdbID'] == 'tt1375666'
+    assert omdb_manager.fetch_omdb_data_by_imdb_id('tt1375666')['Title'] == 'Inception'
+    assert omdb_manager.fetch_omdb_data_by_imdb_id('tt1375666')['Title'] == 'Inception'
+    assert len(fake_omdb.api_calls) == 2
+
+def test_manager_caches_not_found_but_not_errors(omdb_manager, fake_omdb):
+    assert omdb_manager.fetch_omdb_data_by_title('No Such Movie') is None
+    assert omdb_manager.fetch_omdb_data_by_title('No Such Movie') is None
+    assert len(fake_omdb.api_calls) == 1
+
+    # Rate limits and similar errors are retried on the next lookup
+    assert omdb_manager.fetch_omdb_data_by_title('Busy Movie') is None
+    assert omdb_manager.fetch_omdb_data_by_title('Busy Movie') is None
+    assert len(fake_omdb.api_calls) == 3
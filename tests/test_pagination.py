@@ -0,0 +1,93 @@
+import sys
+import os
+import pytest
+from sqlalchemy import event
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import User, Movie, UserFavorite, db
+from datamanager.pagination import InvalidCursor, decode_cursor, encode_cursor
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    with app.app_context():
+        db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900') for i in range(1, 6)])
+        db.session.add_all([Movie(id=i, name=f"Movie {i}", year=2000 + i) for i in range(1, 31)])
+        # Ratings with many ties (i % 4), so pages have to break ties by movie ID
+        db.session.add_all([UserFavorite(user_id=1 + i % 5, movie_id=i, rating=float(i % 4 + 5), watched=True,
+                                         comment=f"Comment {i}" if i % 3 else None) for i in range(1, 31)])
+        db.session.commit()
+        manager.rebuild_movie_stats()
+    return manager
+
+def all_pages(fetch, key):
+    """Follow the cursors from the first page to the last; returns the keys and the page count."""
+    keys, cursor, pages = [], None, 0
+    while True:
+        page = fetch(cursor)
+        keys += [key(item) for item in page.items]
+        pages += 1
+        cursor = page.next_cursor
+        if cursor is None:
+            return keys, pages
+
+def test_cursor_round_trip():
+    cursor = encode_cursor([7.5, 12])
+    assert decode_cursor(cursor, 2) == [7.5, 12]
+    assert decode_cursor(None, 2) is None
+    for bad in ('not a cursor!', encode_cursor([1]), encode_cursor([{'a': 1}, 2])):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(bad, 2)
+
+def test_pages_match_the_full_ranking(db_manager, app):
+    with app.app_context():
+        expected = [m['id'] for m in db_manager.get_top_rated_movies(limit=None, view='card')]
+        ids, pages = all_pages(lambda cursor: db_manager.get_top_rated_page(cursor, limit=7), lambda m: m['id'])
+        assert ids == expected and pages == 5
+
+        expected = [m['id'] for m in db_manager.get_popular_movies(limit=None, view='card')]
+        ids, _ = all_pages(lambda cursor: db_manager.get_popular_page(cursor, limit=4), lambda m: m['id'])
+        assert ids == expected
+
+        expected = [c['composite_id'] for c in db_manager.get_recent_commented_movies(limit=None)]
+        ids, _ = all_pages(lambda cursor: db_manager.get_comments_page(cursor, limit=6),
+                           lambda c: c['composite_id'])
+        assert ids == expected and len(ids) == 20
+
+def test_popular_page_has_favorite_counts(db_manager, app):
+    with app.app_context():
+        db_manager.toggle_user_favorite_attribute(2, 3, 'favorite')
+        movie = next(m for m in db_manager.get_popular_page(limit=30).items if m['id'] == 3)
+        assert movie['favorite_count'] == 1 and movie['interaction_count'] == 2
+        assert 'favorites' not in movie
+
+def test_invalid_cursor_is_rejected(db_manager, app):
+    with app.app_context():
+        with pytest.raises(InvalidCursor):
+            db_manager.get_top_rated_page('garbage')
+
+def test_deep_pages_seek_into_the_index(db_manager, app):
+    with app.app_context():
+        cursor = db_manager.get_top_rated_page(limit=20).next_cursor
+        statements = []
+        listener = lambda conn, cursor_, statement, parameters, *args: statements.append((statement, parameters))
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            db_manager.get_top_rated_page(cursor, limit=5)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        statement, parameters = next((s, p) for s, p in statements if 'FROM movie_stats' in s)
+        plan = db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        assert plan[0][3].startswith('SEARCH movie_stats USING INDEX ix_movie_stats_rating_avg')
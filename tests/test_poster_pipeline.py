@@ -0,0 +1,86 @@
+import sys
+import os
+import pytest
+from PIL import Image
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.omdb_manager import OMDBManager
+from datamanager.poster_pipeline import PosterPipeline, poster_srcset
+from datamanager.interface import Movie, MovieOMDB, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+@pytest.fixture
+def movies_dir(tmp_path):
+    """A static/movies folder with one 300x445 poster, the usual OMDB size."""
+    directory = tmp_path / 'movies'
+    directory.mkdir()
+    Image.new('RGB', (300, 445), (200, 30, 30)).save(directory / 'tt0000001-omdb-poster.jpg', 'JPEG')
+    return directory
+
+def test_process_creates_hashed_variants(movies_dir):
+    manifest = PosterPipeline(movies_dir).process('tt0000001-omdb-poster.jpg')
+
+    assert manifest['width'] == 300 and manifest['height'] == 445
+    # Configured widths below the original, plus the original width
+    assert sorted(manifest['variants']['webp'], key=int) == ['160', '240', '300']
+    path = manifest['variants']['webp']['160']
+    assert path == f"movies/derived/tt0000001-omdb-poster-160w.{manifest['hash']}.webp"
+    with Image.open(movies_dir.parent / path) as image:
+        assert image.format == 'WEBP'
+        assert image.size == (160, 237)
+    with Image.open(movies_dir.parent / manifest['variants']['jpeg']['240']) as image:
+        assert image.format == 'JPEG'
+    # The full size JPEG is the original file
+    assert manifest['variants']['jpeg']['300'] == 'movies/tt0000001-omdb-poster.jpg'
+
+def test_process_is_idempotent_and_content_addressed(movies_dir):
+    pipeline = PosterPipeline(movies_dir)
+    first = pipeline.process('tt0000001-omdb-poster.jpg')
+    assert pipeline.process('tt0000001-omdb-poster.jpg') == first
+
+    Image.new('RGB', (300, 445), (10, 10, 200)).save(movies_dir / 'tt0000001-omdb-poster.jpg', 'JPEG')
+    assert pipeline.process('tt0000001-omdb-poster.jpg')['hash'] != first['hash']
+
+def test_process_skips_missing_and_broken_files(movies_dir):
+    (movies_dir / 'broken.jpg').write_bytes(b'not an image')
+    pipeline = PosterPipeline(movies_dir)
+    assert pipeline.process('missing.jpg') is None
+    assert pipeline.process('broken.jpg') is None
+    assert pipeline.process(None) is None
+
+def test_poster_srcset():
+    manifest = {'variants': {'webp': {'320': 'movies/derived/b.webp', '160': 'movies/derived/a.webp'}}}
+    url_for = lambda endpoint, filename: f"/static/{filename}"
+    assert poster_srcset(manifest, 'webp', url_for) == '/static/movies/derived/a.webp 160w, /static/movies/derived/b.webp 320w'
+    assert poster_srcset(None, 'webp', url_for) == ''
+
+def test_variants_recorded_on_omdb_save_and_backfill(db_manager, app, movies_dir):
+    with app.app_context():
+        omdb_manager = OMDBManager(db_manager)
+        omdb_manager.poster_pipeline = PosterPipeline(movies_dir)
+        db.session.add_all([Movie(id=1, name='Saved'), Movie(id=2, name='Existing')])
+        db.session.add(MovieOMDB(id=2, title='Existing', poster_img='tt0000001-omdb-poster.jpg'))
+        db.session.commit()
+
+        assert omdb_manager.save_omdb_data_to_db(1, {'id': 1, 'title': 'Saved', 'poster_img': 'tt0000001-omdb-poster.jpg'})
+        assert db.session.get(MovieOMDB, 1).poster_variants['width'] == 300
+
+        assert omdb_manager.build_poster_variants() == 1
+        assert omdb_manager.build_poster_variants() == 0
+        card = db_manager.get_movies_data([2], view='card')[2]
+        assert card['omdb_data']['poster_variants']['variants']['jpeg']['160'].endswith('.jpg')
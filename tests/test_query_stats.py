@@ -0,0 +1,73 @@
+import sys
+import os
+import logging
+import pytest
+from flask import render_template_string
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import Movie, db
+from datamanager.query_stats import QueryInstrumentation, assert_max_queries, statement_shape, timed
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def create_app(**config):
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    app.config.update(config)
+    SQLiteDataManager().init_app(app)
+    QueryInstrumentation().init_app(app)
+
+    @app.route('/movies')
+    def movies():
+        # One query for the IDs, then one lazy lookup per movie: an N+1 pattern
+        ids = [row.id for row in db.session.query(Movie.id).all()]
+        names = [db.session.get(Movie, movie_id).name for movie_id in ids]
+        with timed('omdb'):
+            pass
+        return render_template_string('{{ names|join(", ") }}', names=names)
+
+    with app.app_context():
+        db.session.add_all([Movie(id=i, name=f"Movie {i}") for i in range(1, 7)])
+        db.session.commit()
+    return app
+
+@pytest.fixture
+def app():
+    return create_app()
+
+def test_server_timing_header(app):
+    response = app.test_client().get('/movies')
+    assert response.data == b'Movie 1, Movie 2, Movie 3, Movie 4, Movie 5, Movie 6'
+    metrics = {part.split(';')[0]: part for part in response.headers['Server-Timing'].split(', ')}
+    assert set(metrics) == {'db', 'omdb', 'render', 'total'}
+    assert 'desc="7 queries"' in metrics['db']
+
+def test_repeated_statements_are_logged(app, caplog):
+    with caplog.at_level(logging.WARNING):
+        app.test_client().get('/movies')
+    warnings = [record.getMessage() for record in caplog.records if 'N+1' in record.getMessage()]
+    assert len(warnings) == 1
+    assert warnings[0].startswith('Possible N+1 query in movies: 6x SELECT movies.id')
+
+def test_header_can_be_disabled():
+    app = create_app(SERVER_TIMING_HEADER=False)
+    assert 'Server-Timing' not in app.test_client().get('/movies').headers
+
+def test_assert_max_queries(app):
+    client = app.test_client()
+    with assert_max_queries(7, app=app) as queries:
+        client.get('/movies')
+    assert len(queries) == 7
+
+    with pytest.raises(AssertionError) as error:
+        with assert_max_queries(3, app=app):
+            client.get('/movies')
+    assert '7 queries, expected at most 3' in str(error.value)
+    assert '6x SELECT movies.id' in str(error.value)
+
+def test_statement_shape_ignores_in_list_length():
+    assert statement_shape('SELECT * FROM movies\n WHERE id IN (?, ?, ?)') == \
+           statement_shape('SELECT * FROM movies WHERE id IN (?)')
@@ -0,0 +1,139 @@
+import sys
+import os
+import pytest
+from sqlalchemy import event
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.recommender import InteractionMatrix, ItemItemRecommender
+from datamanager.interface import User, Movie, UserFavorite, MovieNeighbor, MovieNeighborQueue, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# An optional dependency (requirements-dev.txt)
+np = pytest.importorskip('numpy')
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def seed():
+    """
+    Users 1-3 watch the sci-fi movies 1-3, users 4-5 the dramas 4-5;
+    user 3 also watched drama 4.
+    """
+    db.session.add_all([Movie(id=i, name=f"Movie {i}") for i in range(1, 7)])
+    db.session.add_all([User(id=i, name=f"User {i}", whatsapp_number='+4900') for i in range(1, 7)])
+    watched = {1: (1, 2, 3), 2: (1, 2, 3), 3: (1, 2, 3, 4), 4: (4, 5), 5: (4, 5)}
+    for user_id, movie_ids in watched.items():
+        db.session.add_all([UserFavorite(user_id=user_id, movie_id=m, watched=True) for m in movie_ids])
+    db.session.commit()
+
+def neighbor_rows():
+    return {(n.movie_id, n.rank): (n.neighbor_id, round(n.score, 6)) for n in MovieNeighbor.query.all()}
+
+def test_neighbors_match_dense_cosine_similarity():
+    rng = np.random.default_rng(7)
+    pairs = np.unique(rng.integers(0, 40, 600) * 1000 + rng.integers(0, 30, 600) * 3 + 100)
+    users, movies = pairs // 1000, pairs % 1000
+    weights = rng.random(len(pairs)) + 0.1
+    matrix = InteractionMatrix(users, movies, weights)
+
+    recommender = ItemItemRecommender(k=5)
+    recommender.BLOCK_ENTRIES = 200  # force many small blocks
+    neighbors = recommender.compute_neighbors(matrix)
+
+    dense = np.zeros((matrix.n_users, matrix.n_items))
+    dense[np.unique(users, return_inverse=True)[1], np.searchsorted(matrix.movie_ids, movies)] = weights
+    norms = np.linalg.norm(dense, axis=0)
+    similarity = dense.T @ dense / np.outer(norms, norms)
+    np.fill_diagonal(similarity, 0)
+    for column, movie_id in enumerate(matrix.movie_ids):
+        expected = np.sort(similarity[column][similarity[column] > 0])[::-1][:5]
+        assert np.allclose([score for _, score in neighbors[int(movie_id)]], expected)
+
+    # A subset gives the same lists as the full run
+    subset = recommender.compute_neighbors(matrix, matrix.item_index([100, 103, 99999]))
+    assert subset == {100: neighbors[100], 103: neighbors[103]}
+
+def test_full_rebuild_and_serving(db_manager, app):
+    with app.app_context():
+        seed()
+        stats = db_manager.rebuild_recommendations(full=True)
+        assert stats['movies'] == 5
+
+        # Sci-fi movies are each other's closest neighbours, drama 4 comes last
+        assert db_manager.recommender.similar_movie_ids(1) == [2, 3, 4]
+        assert db_manager.recommender.similar_movie_ids(5) == [4]
+        assert [m['id'] for m in db_manager.get_similar_movies(1, limit=2)] == [2, 3]
+        assert 'omdb_data' in db_manager.get_similar_movies(1)[0]
+
+        # User 4 watched 4 and 5; 5 has no unwatched neighbours, so 4 is the seed
+        assert db_manager.recommender.because_you_watched(4) == (4, [1, 2, 3])
+
+def test_because_you_watched_is_one_query(db_manager, app):
+    with app.app_context():
+        seed()
+        db_manager.upsert_favorite(6, 1, favorite=True, watched=True, rating=9)
+        db_manager.rebuild_recommendations(full=True)
+
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            seed_id, movie_ids = db_manager.recommender.because_you_watched(6)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert (seed_id, movie_ids) == (1, [2, 3, 4])
+        assert len(statements) == 1
+        assert db_manager.recommender.because_you_watched(99) == (None, [])
+
+def test_incremental_rebuild_matches_full(db_manager, app):
+    with app.app_context():
+        seed()
+        db_manager.rebuild_recommendations(full=True)
+        assert MovieNeighborQueue.query.count() == 0
+
+        # User 5 starts watching sci-fi: 1 and every movie user 5 interacted with are stale
+        db_manager.toggle_user_favorite_attribute(5, 1, 'watched')
+        assert {q.movie_id for q in MovieNeighborQueue.query.all()} == {1, 4, 5}
+        stats = db_manager.rebuild_recommendations()
+        assert stats['movies'] == 3
+        assert MovieNeighborQueue.query.count() == 0
+        incremental = neighbor_rows()
+
+        db_manager.rebuild_recommendations(full=True)
+        full = neighbor_rows()
+        # Only lists of queued movies are refreshed; the others may keep older scores
+        assert {key: value for key, value in incremental.items() if key[0] in (1, 4, 5)} == \
+               {key: value for key, value in full.items() if key[0] in (1, 4, 5)}
+
+        assert db_manager.rebuild_recommendations() == {'movies': 0, 'neighbors': 0, 'seconds': 0.0}
+
+def test_deleted_movie_leaves_neighbor_lists(db_manager, app):
+    with app.app_context():
+        seed()
+        db_manager.rebuild_recommendations(full=True)
+        assert db_manager.delete_movie(2)
+        assert not MovieNeighbor.query.filter((MovieNeighbor.movie_id == 2) | (MovieNeighbor.neighbor_id == 2)).count()
+
+def test_rebuild_without_numpy_keeps_the_neighbors(db_manager, app, monkeypatch, caplog):
+    with app.app_context():
+        seed()
+        db_manager.rebuild_recommendations(full=True)
+        before = MovieNeighbor.query.count()
+        # numpy is not deployed; a rebuild must not take the app down
+        monkeypatch.setitem(sys.modules, 'numpy', None)
+        assert db_manager.rebuild_recommendations(full=True) is None
+        assert MovieNeighbor.query.count() == before and 'needs numpy' in caplog.text
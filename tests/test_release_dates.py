@@ -0,0 +1,98 @@
+import sys
+import os
+import sqlite3
+import pytest
+from datetime import date
+from sqlalchemy import text
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import Movie, MovieOMDB, db, parse_release_date
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def create_app(uri='sqlite:///:memory:'):
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def app():
+    return create_app()
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def add_movie(movie_id, released):
+    movie = Movie(id=movie_id, name=f"Movie {movie_id}", year=2000)
+    movie.omdb_data = MovieOMDB(title=movie.name, released=released)
+    db.session.add(movie)
+
+def test_parse_release_date():
+    assert parse_release_date('16 Jul 2010') == date(2010, 7, 16)
+    assert parse_release_date('2010-07-16') == date(2010, 7, 16)
+    assert parse_release_date('16 September 2010') == date(2010, 9, 16)
+    for value in (None, '', 'N/A', '2010', 'soon'):
+        assert parse_release_date(value) is None
+
+def test_omdb_saves_keep_release_date_in_sync(db_manager, app):
+    with app.app_context():
+        add_movie(1, '16 Jul 2010')
+        db.session.commit()
+        assert db.session.get(Movie, 1).release_date == date(2010, 7, 16)
+
+        db.session.get(MovieOMDB, 1).released = '01 Feb 2011'
+        db.session.commit()
+        assert db.session.get(Movie, 1).release_date == date(2011, 2, 1)
+
+        db_manager.update_movie(1, {'omdb_data': {'released': 'N/A'}})
+        assert db.session.get(Movie, 1).release_date is None
+
+def test_new_releases_and_date_ranges(db_manager, app):
+    with app.app_context():
+        for movie_id, released in enumerate(['16 Jul 2010', '02 Mar 2024', 'N/A', '20 Mar 2024', '01 Jan 1999'], 1):
+            add_movie(movie_id, released)
+        db.session.commit()
+
+        db.session.add(Movie(id=6, name='No OMDB', year=2001))
+        db.session.commit()
+
+        # Movies without a parsed date come after the dated ones, by year
+        assert [m['id'] for m in db_manager.get_new_releases()] == [4, 2, 1, 5, 6, 3]
+        assert db_manager.get_new_releases(limit=1)[0]['release_date'] == '2024-03-20'
+        assert [m['id'] for m in db_manager.get_movies_released_in_year(2024)] == [4, 2]
+        assert [m['id'] for m in db_manager.get_released_this_month(today=date(2024, 3, 5))] == [4, 2]
+        assert db_manager.get_released_this_month(today=date(2024, 4, 1)) == []
+
+def test_migration_backfills_existing_rows(tmp_path):
+    path = tmp_path / 'old.sqlite'
+    old_app = create_app(f'sqlite:///{path}')
+    SQLiteDataManager().init_app(old_app)
+    with old_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    # Turn the file back into a version 2 database with OMDB rows but no release_date column
+    connection = sqlite3.connect(path)
+    connection.execute('DROP INDEX ix_movies_release_date')
+    connection.execute('ALTER TABLE movies DROP COLUMN release_date')
+    connection.execute("INSERT INTO movies (id, name, year) VALUES (1, 'Inception', 2010), (2, 'Unknown', 2011)")
+    connection.execute("INSERT INTO movies_omdb (id, title, released) VALUES (1, 'Inception', '16 Jul 2010'), "
+                       "(2, 'Unknown', 'N/A')")
+    connection.execute('PRAGMA user_version = 2')
+    connection.commit()
+    connection.close()
+
+    app = create_app(f'sqlite:///{path}')
+    db_manager = SQLiteDataManager()
+    db_manager.init_app(app)
+    with app.app_context():
+        assert [m['id'] for m in db_manager.get_new_releases()] == [1, 2]
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM movies ORDER BY release_date DESC, year DESC, id LIMIT 10"
+        )).all()
+        assert len(plan) == 1 and 'ix_movies_release_date' in plan[0][3]
@@ -0,0 +1,90 @@
+import sys
+import os
+import pytest
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.omdb_manager import OMDBManager
+from datamanager.search_index import MovieSearchIndex
+from datamanager.interface import Movie, MovieOMDB, db
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def seed_movies():
+    """Movies whose names and OMDB fields exercise ranking and prefix matching."""
+    db.session.add_all([
+        Movie(id=1, name='Inception', year=2010, omdb_data=MovieOMDB(
+            title='Inception', director='Christopher Nolan', actors='Leonardo DiCaprio',
+            plot='A thief who steals corporate secrets through dream-sharing.', genre='Sci-Fi')),
+        Movie(id=2, name='The Wolf of Wall Street', year=2013, omdb_data=MovieOMDB(
+            title='The Wolf of Wall Street', director='Martin Scorsese', actors='Leonardo DiCaprio',
+            plot='Based on the true story of a stockbroker, not about inception.', genre='Crime')),
+        Movie(id=3, name='Amélie', year=2001),
+    ])
+    db.session.commit()
+
+def test_search_uses_fts5(db_manager, app):
+    with app.app_context():
+        assert db_manager.search_index.available is True
+
+def test_search_ranks_title_over_plot(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        db_manager.rebuild_search_index()
+        results = db_manager.search_movies('inception')
+        assert [m['id'] for m in results] == [1, 2]
+        assert results[0]['omdb_data']['director'] == 'Christopher Nolan'
+
+def test_search_prefix_and_diacritics(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        db_manager.rebuild_search_index()
+        assert [m['id'] for m in db_manager.search_movies('leo dica')] == [1, 2]
+        assert [m['id'] for m in db_manager.search_movies('amelie')] == [3]
+        assert db_manager.search_movies('scorsese nolan') == []
+
+def test_search_limit_offset_and_bad_input(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        db_manager.rebuild_search_index()
+        assert [m['id'] for m in db_manager.search_movies('leonardo', limit=1)] == [1]
+        assert [m['id'] for m in db_manager.search_movies('leonardo', limit=1, offset=1)] == [2]
+        # FTS5 syntax characters in user input are ignored, not parsed
+        assert db_manager.search_movies('"*') == []
+        assert [m['id'] for m in db_manager.search_movies('inception" (')] == [1, 2]
+
+def test_index_follows_catalog_writes(db_manager, app):
+    with app.app_context():
+        movie = db_manager.add_movie({'name': 'Blade Runner', 'year': 1982})
+        assert [m['id'] for m in db_manager.search_movies('blade')] == [movie['id']]
+
+        db_manager.update_movie(movie['id'], {'name': 'Metropolis'})
+        assert db_manager.search_movies('blade') == []
+        assert [m['id'] for m in db_manager.search_movies('metro')] == [movie['id']]
+
+        db_manager.delete_movie(movie['id'])
+        assert db_manager.search_movies('metro') == []
+
+def test_index_follows_omdb_save(db_manager, app):
+    with app.app_context():
+        movie = db_manager.add_movie({'name': 'Alien', 'year': 1979})
+        omdb_manager = OMDBManager(db_manager)
+        assert omdb_manager.save_omdb_data_to_db(movie['id'], {'id': movie['id'], 'title': 'Alien', 'director': 'Ridley Scott'})
+        assert [m['id'] for m in db_manager.search_movies('ridley')] == [movie['id']]
+
+def test_build_match_expression():
+    assert MovieSearchIndex.build_match_expression('  ') is None
+    assert MovieSearchIndex.build_match_expression('dark kni') == '"dark"* "kni"*'
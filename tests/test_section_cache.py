@@ -0,0 +1,163 @@
+import sys
+import os
+import threading
+import time
+import pytest
+from datetime import date
+from datamanager.data_versions import bump_versions
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.home_feed import HomeFeedAssembler
+from datamanager.section_cache import SectionCache, MemoryCacheBackend, DiskCacheBackend
+from datamanager.interface import User, Movie, Category, UserFavorite, MovieStats, db, movie_categories
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app():
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'memory'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def seed_movies(movie_count=5):
+    category = Category(name='Drama')
+    db.session.add_all([category, User(id=1, name='Viewer', whatsapp_number='+4900')])
+    db.session.add_all([Movie(id=i, name=f"Movie {i}", year=2000 + i, release_date=date(2000 + i, 1, 1))
+                        for i in range(1, movie_count + 1)])
+    db.session.flush()
+    db.session.execute(movie_categories.insert().values(movie_id=1, category_id=category.id))
+    db.session.commit()
+
+def test_memory_backend_lru_and_ttl():
+    backend = MemoryCacheBackend(max_entries=2)
+    backend.set('a', 1)
+    backend.set('b', 2)
+    backend.get('a')
+    backend.set('c', 3)
+    # 'b' was the least recently used entry
+    assert backend.get('b') is None
+    assert backend.get('a') == (None, 1)
+
+    backend.set('short', 'x', ttl=0.01)
+    time.sleep(0.02)
+    assert backend.get('short') is None
+
+def test_disk_backend_round_trip(tmp_path):
+    backend = DiskCacheBackend(str(tmp_path))
+    backend.set('section:key', {'ids': [1, 2]}, ttl=60)
+    assert backend.get('section:key')[1] == {'ids': [1, 2]}
+    assert backend.generation('catalog') == 0
+    backend.bump('catalog')
+    assert DiskCacheBackend(str(tmp_path)).generation('catalog') == 1
+    backend.clear()
+    assert backend.get('section:key') is None
+
+def test_disk_backend_concurrent_bumps_all_count(tmp_path):
+    # Workers committing at the same moment must not collapse into one bump
+    backends = [DiskCacheBackend(str(tmp_path)) for _ in range(8)]
+    threads = [threading.Thread(target=lambda b=backend: [b.bump('favorites') for _ in range(50)])
+               for backend in backends]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backends[0].generation('favorites') == 400
+
+def test_missing_redis_falls_back_to_memory(app):
+    app.config['SECTION_CACHE_BACKEND'] = 'redis'
+    cache = SectionCache()
+    cache.init_app(app)
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        assert cache.backend.name == 'memory'
+
+def test_home_feed_sections_are_cached(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        assembler = HomeFeedAssembler(db_manager)
+
+        first = assembler.build()
+        second = assembler.build()
+
+        assert [m['id'] for m in second['new_releases']] == [m['id'] for m in first['new_releases']]
+        stats = db_manager.section_cache.stats()
+        assert stats['backend'] == 'memory'
+        assert stats['sections']['new_releases'] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+        assert stats['hits'] == 6 and stats['misses'] == 6
+
+def test_catalog_writes_invalidate_sections(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        assembler = HomeFeedAssembler(db_manager)
+        assert assembler.build()['new_releases'][0]['id'] == 5
+
+        movie = db_manager.add_movie({'name': 'Newest', 'year': 2030, 'omdb_data': {'released': '01 Jan 2030'}})
+        assert assembler.build()['new_releases'][0]['id'] == movie['id']
+
+        db_manager.update_movie(movie['id'], {'omdb_data': {'released': '01 Jan 1900'}})
+        assert assembler.build()['new_releases'][0]['id'] == 5
+
+        db_manager.delete_movie(5)
+        assert assembler.build()['new_releases'][0]['id'] == 4
+        assert db_manager.section_cache.stats()['invalidations']['catalog'] >= 3
+
+def test_favorite_writes_invalidate_rankings(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        assert db_manager.get_top_rated_movies(view='card') == []
+
+        db_manager.upsert_favorite(1, 3, rating=4.0)
+        assert [m['id'] for m in db_manager.get_top_rated_movies(view='card')] == [3]
+        assert [m['id'] for m in db_manager.get_popular_movies(view='card')] == [3]
+
+        # Cached: no write in between
+        db_manager.get_top_rated_movies(view='card')
+        assert db_manager.section_cache.stats()['sections']['top_rated']['hits'] == 1
+
+        db_manager.remove_favorite(1, 3)
+        assert db_manager.get_top_rated_movies(view='card') == []
+
+def test_writes_of_other_workers_invalidate(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        db_manager.upsert_favorite(1, 3, rating=4.0)
+        db_manager.upsert_favorite(1, 4, rating=3.0)
+        assert [m['id'] for m in db_manager.get_top_rated_movies(view='card')] == [3, 4]
+        # Another worker removes a rating: its commit bumps the shared data version,
+        # but never this process' cache generations
+        with db.engine.begin() as connection:
+            connection.execute(MovieStats.__table__.delete().where(MovieStats.movie_id == 3))
+            bump_versions(connection, ['favorites'])
+    with app.app_context():
+        assert [m['id'] for m in db_manager.get_top_rated_movies(view='card')] == [4]
+
+def test_association_table_writes_invalidate(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        assert [m['id'] for m in db_manager.get_movies_by_category(1)] == [1]
+        db.session.execute(movie_categories.insert().values(movie_id=2, category_id=1))
+        db.session.commit()
+        assert [m['id'] for m in db_manager.get_movies_by_category(1)] == [1, 2]
+
+def test_rolled_back_writes_keep_entries(db_manager, app):
+    with app.app_context():
+        seed_movies()
+        db_manager.get_movies_by_category(1)
+        invalidations = db_manager.section_cache.stats()['invalidations']['catalog']
+        db.session.add(Movie(name='Never saved', year=2000))
+        db.session.flush()
+        db.session.rollback()
+        db_manager.get_movies_by_category(1)
+        stats = db_manager.section_cache.stats()
+        assert stats['sections']['category_movies']['hits'] == 1
+        assert stats['invalidations']['catalog'] == invalidations
@@ -0,0 +1,148 @@
+import sys
+import os
+import pytest
+from sqlalchemy import select, text, update
+from datamanager.db_manager import SQLiteDataManager
+from datamanager.interface import Movie, User, READ_ONLY_BIND, db
+from datamanager.sqlite_profile import BUNDLED_DATABASE, SQLiteProfile, parse_pragmas
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def app(tmp_path):
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'senflix.sqlite'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECTION_CACHE_BACKEND'] = 'none'
+    return app
+
+@pytest.fixture
+def db_manager(app):
+    manager = SQLiteDataManager()
+    manager.init_app(app)
+    return manager
+
+def pragma(name):
+    return db.session.execute(text(f'PRAGMA {name}')).scalar()
+
+def test_balanced_profile_applies_to_every_connection(db_manager, app):
+    with app.app_context():
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1  # NORMAL
+        assert pragma('busy_timeout') == 5000
+        assert pragma('cache_size') == -20000
+        assert pragma('temp_store') == 2  # MEMORY
+
+        # A second pooled connection gets the same settings
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+def test_profile_and_overrides_from_config(app):
+    app.config['SQLITE_PROFILE'] = 'default'
+    app.config['SQLITE_PRAGMAS'] = 'busy_timeout=1234, cache_size=-4000'
+    SQLiteDataManager().init_app(app)
+    with app.app_context():
+        assert pragma('journal_mode') == 'delete'
+        assert pragma('busy_timeout') == 1234
+        assert pragma('cache_size') == -4000
+
+def test_wal_is_skipped_for_the_bundled_database(app):
+    from flask import Flask
+    bundled = Flask(__name__)
+    bundled.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{BUNDLED_DATABASE}"
+    profile = SQLiteProfile()
+    profile.init_app(bundled)
+    # Only computed, no connection is opened: the tracked file stays untouched
+    assert 'journal_mode' not in profile.connection_pragmas()
+    assert profile.connection_pragmas()['synchronous'] == 'NORMAL'
+
+    bundled.config['SQLITE_WAL'] = 'true'
+    profile.init_app(bundled)
+    assert profile.connection_pragmas()['journal_mode'] == 'WAL'
+
+    app.config['SQLITE_WAL'] = 'false'
+    SQLiteDataManager().init_app(app)
+    with app.app_context():
+        assert pragma('journal_mode') == 'delete'
+
+def test_invalid_profile_and_pragmas_are_rejected(app):
+    app.config['SQLITE_PROFILE'] = 'turbo'
+    with pytest.raises(ValueError):
+        SQLiteDataManager().init_app(app)
+    with pytest.raises(ValueError):
+        parse_pragmas('cache_size=1; DROP TABLE movies')
+
+def test_get_requests_use_read_only_connection(db_manager, app):
+    with app.app_context():
+        db.session.add(Movie(id=1, name='Movie 1'))
+        db.session.commit()
+
+    with app.test_request_context('/movies', method='GET'):
+        assert db.session.get_bind(clause=select(Movie)) is db.engines[READ_ONLY_BIND]
+        assert db.session.get_bind(clause=text('SELECT 1')) is db.engines[READ_ONLY_BIND]
+        assert Movie.query.get(1).name == 'Movie 1'
+        # Writes and bare connections never get the read-only engine
+        assert db.session.get_bind(clause=update(Movie).values(name='Changed')) is db.engine
+        assert db.session.get_bind(clause=text("UPDATE movies SET name = 'Changed'")) is db.engine
+        assert db.session.get_bind() is db.engine
+        db.session.rollback()
+
+        # Pending ORM changes go to the primary engine, so a writing GET view still works
+        db.session.add(Movie(id=2, name='Movie 2'))
+        assert db.session.get_bind(clause=select(Movie)) is db.engine
+        db.session.commit()
+
+    with app.test_request_context('/toggle_favorite/1', method='POST'):
+        assert db.session.get_bind(clause=select(Movie)) is db.engine
+        assert Movie.query.count() == 2
+
+def test_get_request_writing_through_core(db_manager, app):
+    with app.app_context():
+        db.session.add(Movie(id=1, name='Movie 1'))
+        db.session.add(User(id=1, name='User 1', whatsapp_number='+4900'))
+        db.session.commit()
+
+    with app.test_request_context('/movie/1', method='GET'):
+        # INSERT ... ON CONFLICT ... RETURNING of the favorite writes
+        result = db_manager.toggle_user_favorite_attribute(1, 1, 'watched')
+        assert result['success'] and result['new_state'] is True
+
+        # Reads after a write in the same transaction see its uncommitted rows
+        db.session.execute(update(Movie).where(Movie.id == 1).values(name='Renamed'))
+        assert db.session.execute(select(Movie.name).where(Movie.id == 1)).scalar() == 'Renamed'
+        assert db.session.get_bind(clause=select(Movie)) is db.engine
+        db.session.commit()
+
+        # A new transaction reads from the read-only engine again
+        assert db.session.get_bind(clause=select(Movie)) is db.engines[READ_ONLY_BIND]
+        assert db.session.execute(select(Movie.name).where(Movie.id == 1)).scalar() == 'Renamed'
+
+def test_in_memory_database_has_no_read_only_engine(app):
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    SQLiteDataManager().init_app(app)
+    with app.app_context():
+        assert READ_ONLY_BIND not in db.engines
+        assert pragma('busy_timeout') == 5000
+
+def test_optimize_checkpoints_the_wal(db_manager, app):
+    with app.app_context():
+        db.session.add(Movie(id=1, name='Movie 1'))
+        db.session.commit()
+        stats = db_manager.sqlite_profile.optimize(analyze=True)
+        assert stats['journal_mode'] == 'wal'
+        assert db.session.execute(text("SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")).scalar() == 1
+
+def test_optimize_runs_after_request_once_interval_passed(db_manager, app):
+    app.add_url_rule('/ping', 'ping', lambda: 'ok')
+    profile = db_manager.sqlite_profile
+    client = app.test_client()
+
+    before = profile._last_optimize
+    client.get('/ping')
+    assert profile._last_optimize == before  # interval (1 hour) not over yet
+
+    profile._last_optimize -= profile.optimize_interval + 1
+    client.get('/ping')
+    assert profile._last_optimize > before
@@ -0,0 +1,74 @@
+import sys
+import os
+import gzip
+import json
+import pytest
+from flask import url_for
+from datamanager.static_assets import StaticAssets, build_manifest, MANIFEST_NAME
+
+# Add the main directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCRIPT = "document.querySelectorAll('.movie-card').forEach(card => card.classList.add('ready'));\n" * 20
+
+@pytest.fixture
+def static_folder(tmp_path):
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'js' / 'main.js').write_text(SCRIPT)
+    (tmp_path / 'img.png').write_bytes(b'\x89PNG' + bytes(range(64)))
+    (tmp_path / 'poster-320w.0123456789.webp').write_bytes(b'RIFF')
+    return tmp_path
+
+def create_app(static_folder):
+    from flask import Flask
+    app = Flask(__name__, static_folder=str(static_folder), static_url_path='/static')
+    assets = StaticAssets()
+    assets.init_app(app)
+    return app, assets
+
+def test_build_manifest(static_folder):
+    files = build_manifest(str(static_folder))
+    assert set(files) == {'js/main.js', 'img.png'}  # already hashed names are left alone
+    entry = files['js/main.js']
+    assert entry['url'].startswith('js/main.') and entry['url'].endswith('.js') and 'gzip' in entry['encodings']
+    assert gzip.decompress((static_folder / 'js' / 'main.js.gz').read_bytes()).decode() == SCRIPT
+    assert files['img.png']['encodings'] == []
+    assert json.loads((static_folder / MANIFEST_NAME).read_text())['files'] == files
+
+    # Rebuilding without changes gives the same output
+    before = (static_folder / 'js' / 'main.js.gz').read_bytes()
+    assert build_manifest(str(static_folder)) == files
+    assert (static_folder / 'js' / 'main.js.gz').read_bytes() == before
+
+def test_hashed_urls_are_immutable_and_precompressed(static_folder):
+    files = build_manifest(str(static_folder))
+    app, assets = create_app(static_folder)
+    with app.test_request_context():
+        url = url_for('static', filename='js/main.js')
+    assert url == f"/static/{files['js/main.js']['url']}"
+
+    client = app.test_client()
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert compressed.mimetype == 'text/javascript'
+    assert gzip.decompress(compressed.data).decode() == SCRIPT
+
+    identity = client.get(url)
+    assert 'Content-Encoding' not in identity.headers and identity.data.decode() == SCRIPT
+
+    # Plain names keep the default caching, derived hashed names are immutable, made up ones 404
+    assert 'immutable' not in client.get('/static/js/main.js').headers.get('Cache-Control', '')
+    assert 'immutable' in client.get('/static/poster-320w.0123456789.webp').headers['Cache-Control']
+    assert client.get('/static/js/main.ffffffffff.js').status_code == 404
+
+def test_changed_files_fall_back_to_plain_urls(static_folder):
+    build_manifest(str(static_folder))
+    (static_folder / 'js' / 'main.js').write_text(SCRIPT.replace('ready', 'shown'))
+    app, assets = create_app(static_folder)
+    assert assets.url('js/main.js') == 'js/main.js'
+    assert assets.url('img.png') != 'img.png'
+
+    app, assets = create_app(static_folder / 'missing')
+    assert assets.urls == {}